@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Servicio HTTP del agente de cotización
+
+Cada worker compila el grafo una vez al arrancar (warmup) y atiende las
+solicitudes con el grafo asíncrono compartido, sin pagar el arranque del
+intérprete ni los imports en cada cotización como el CLI.
+
+Uso:
+    python -m api.main --workers 4
+    uvicorn api.main:app --workers 4
+
+Endpoints:
+    POST /api/v1/quote        {"message": "Necesito 100 unidades de ABC-45", "session_id": "opcional"}
+    POST /api/v1/quote/batch  {"messages": ["...", "..."]}
+    POST /api/v1/quote/stream {"message": "..."}  avance por nodo (SSE)
+    DELETE /api/v1/sessions/{session_id}  descarta una sesión
+    GET  /api/v1/orders/{quote_id}  estado de la orden de una cotización aceptada
+    GET  /api/v1/quotes/{quote_id}  cotización guardada
+    GET  /api/v1/quotes?customer_id=...&part_number=...  cotizaciones de un cliente o parte
+    GET  /health              estado del worker, latencia p50/p99 por endpoint, proveedores y router LLM
+    GET  /metrics             histogramas por nodo, LLM y tool (Prometheus; TRACING_ENABLED)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+# Agregar src al path para imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quoting_agent.agent import arun_agent, astream_agent
+from quoting_agent.config import config
+from quoting_agent.llm_extraction import parse_stats
+from quoting_agent.llm_factory import get_model_router_stats, get_provider_chain_stats
+from quoting_agent.llm_limiter import get_rate_limit_stats
+from quoting_agent.models import OrderStatus, Quote
+from quoting_agent.orders import get_order_dispatcher, get_order_outbox
+from quoting_agent.quote_store import get_quote_store
+from quoting_agent.runtime import get_runtime
+from quoting_agent.state import AgentState
+from quoting_agent.tracing import get_tracer
+
+from .metrics import LatencyRecorder
+
+
+# ============================================================================
+# Esquemas
+# ============================================================================
+
+class QuoteRequestBody(BaseModel):
+    """Mensaje del cliente a cotizar"""
+    
+    message: str = Field(..., min_length=1, description="Ej: Necesito 100 unidades de ABC-45")
+    session_id: Optional[str] = Field(
+        None,
+        max_length=128,
+        description="Continúa una conversación de varios turnos"
+    )
+    customer_id: Optional[str] = Field(
+        None,
+        max_length=128,
+        description="Cliente que cotiza (permite buscar sus cotizaciones)"
+    )
+
+
+class BatchQuoteRequestBody(BaseModel):
+    """Varios mensajes a cotizar en una sola solicitud"""
+    
+    messages: List[str] = Field(..., min_length=1)
+
+
+class QuoteResponse(BaseModel):
+    """Respuesta del agente para un mensaje"""
+    
+    reply: str = Field("", description="Último mensaje del agente")
+    session_id: Optional[str] = None
+    quote: Optional[Quote] = None
+    order: Optional[OrderStatus] = Field(None, description="Orden registrada al aceptar la cotización")
+    needs_clarification: bool = False
+    error: Optional[str] = None
+    elapsed_ms: float = 0
+
+
+class BatchQuoteResponse(BaseModel):
+    """Respuestas en el mismo orden que los mensajes"""
+    
+    results: List[QuoteResponse]
+    elapsed_ms: float
+
+
+def _to_response(state: AgentState, elapsed: float, session_id: Optional[str] = None) -> QuoteResponse:
+    messages = state.get("messages") or []
+    return QuoteResponse(
+        reply=messages[-1].content if messages else "",
+        session_id=session_id,
+        quote=state.get("quote"),
+        order=state.get("order"),
+        needs_clarification=bool(state.get("needs_clarification")),
+        error=state.get("error_message"),
+        elapsed_ms=round(elapsed * 1000, 2)
+    )
+
+
+async def _quote(
+    message: str,
+    session_id: Optional[str] = None,
+    customer_id: Optional[str] = None
+) -> QuoteResponse:
+    start = time.perf_counter()
+    state = await arun_agent(message, thread_id=session_id, customer_id=customer_id)
+    return _to_response(state, time.perf_counter() - start, session_id)
+
+
+async def _quote_or_error(message: str, semaphore: asyncio.Semaphore) -> QuoteResponse:
+    """Cotiza un mensaje del lote; un error no detiene a los demás"""
+    start = time.perf_counter()
+    async with semaphore:
+        try:
+            return await _quote(message)
+        except Exception as e:
+            return QuoteResponse(
+                error=f"{type(e).__name__}: {e}",
+                elapsed_ms=round((time.perf_counter() - start) * 1000, 2)
+            )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_quote(
+    message: str,
+    session_id: Optional[str] = None,
+    customer_id: Optional[str] = None
+):
+    """Eventos SSE: "node" y "token" a medida que avanza el grafo, "final" al terminar"""
+    start = time.perf_counter()
+    try:
+        async for event in astream_agent(message, thread_id=session_id, customer_id=customer_id):
+            if event.type == "final":
+                response = _to_response(event.state or {}, time.perf_counter() - start, session_id)
+                yield _sse("final", response.model_dump(mode="json"))
+            else:
+                yield _sse(event.type, {"node": event.node, "content": event.content})
+    except Exception as e:
+        yield _sse("error", {"error": f"{type(e).__name__}: {e}"})
+
+
+# ============================================================================
+# Aplicación
+# ============================================================================
+
+def create_app(warmup: bool = True) -> FastAPI:
+    """
+    Crea la aplicación del servicio.
+    
+    Args:
+        warmup: Compilar el grafo (y crear el cliente LLM si está
+                configurado) al arrancar el worker
+    
+    Returns:
+        Aplicación FastAPI
+    """
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if warmup:
+            runtime = get_runtime()
+            try:
+                runtime.warmup()
+            except (ValueError, ImportError):
+                # Sin LLM configurado el fast path igual responde
+                runtime.warmup(llm=False)
+            # Despacha también lo que quedó pendiente antes de un reinicio
+            get_order_dispatcher().start()
+        yield
+        if warmup:
+            get_order_dispatcher().stop()
+    
+    app = FastAPI(title="Quoting Agent API", version="0.1.0", lifespan=lifespan)
+    app.state.latency = LatencyRecorder(window=config.API_LATENCY_WINDOW)
+    app.state.started_at = time.time()
+    
+    @app.middleware("http")
+    async def record_latency(request: Request, call_next):
+        start = time.perf_counter()
+        error = True
+        try:
+            response = await call_next(request)
+            error = response.status_code >= 500
+        finally:
+            elapsed = time.perf_counter() - start
+            # Plantilla de la ruta (no la URL) para no abrir una serie por parámetro
+            route = request.scope.get("route")
+            endpoint = f"{request.method} {route.path}" if route is not None else "unmatched"
+            app.state.latency.record(endpoint, elapsed, error=error)
+        response.headers["X-Response-Time-Ms"] = f"{elapsed * 1000:.2f}"
+        return response
+    
+    @app.post("/api/v1/quote", response_model=QuoteResponse)
+    async def quote(body: QuoteRequestBody):
+        return await _quote(body.message, body.session_id, body.customer_id)
+    
+    @app.post("/api/v1/quote/batch", response_model=BatchQuoteResponse)
+    async def quote_batch(body: BatchQuoteRequestBody):
+        if len(body.messages) > config.API_MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Máximo {config.API_MAX_BATCH_SIZE} mensajes por lote"
+            )
+        
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(config.BATCH_MAX_CONCURRENCY)
+        results = await asyncio.gather(*(_quote_or_error(message, semaphore) for message in body.messages))
+        return BatchQuoteResponse(
+            results=list(results),
+            elapsed_ms=round((time.perf_counter() - start) * 1000, 2)
+        )
+    
+    @app.post("/api/v1/quote/stream")
+    async def quote_stream(body: QuoteRequestBody):
+        # La latencia registrada para este endpoint es el tiempo al primer byte
+        return StreamingResponse(
+            _stream_quote(body.message, body.session_id, body.customer_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    # Los endpoints que consultan SQLite (sesiones, outbox, quote store) son
+    # def: FastAPI los corre en su threadpool y no frenan el event loop
+    @app.delete("/api/v1/sessions/{session_id}", status_code=204)
+    def delete_session(session_id: str):
+        get_runtime().delete_session(session_id)
+    
+    @app.get("/api/v1/orders/{quote_id}", response_model=OrderStatus)
+    def get_order(quote_id: str):
+        order = get_order_outbox().get(quote_id)
+        if order is None:
+            raise HTTPException(status_code=404, detail="No hay orden para esa cotización")
+        return order
+    
+    @app.get("/api/v1/quotes/{quote_id}", response_model=Quote)
+    def get_quote(quote_id: str):
+        quote = get_quote_store().get(quote_id)
+        if quote is None:
+            raise HTTPException(status_code=404, detail="Cotización no encontrada")
+        return quote
+    
+    @app.get("/api/v1/quotes", response_model=List[Quote])
+    def search_quotes(
+        customer_id: Optional[str] = None,
+        part_number: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=1000)
+    ):
+        if customer_id:
+            quotes = get_quote_store().by_customer(customer_id, limit)
+            if part_number:
+                part_number = part_number.strip().upper()
+                quotes = [q for q in quotes if part_number in ({line.part_number for line in q.line_items} or {q.part_number})]
+            return quotes
+        if part_number:
+            return get_quote_store().by_part(part_number, limit)
+        raise HTTPException(status_code=422, detail="Indicar customer_id o part_number")
+    
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - app.state.started_at, 1),
+            "runtime": get_runtime().stats(),
+            "latency": app.state.latency.stats(),
+            "orders": {**get_order_outbox().stats(), "dispatcher": get_order_dispatcher().stats()},
+            "quote_store": get_quote_store().stats(),
+            "llm_providers": get_provider_chain_stats(),
+            "llm_router": get_model_router_stats(),
+            "llm_rate_limit": get_rate_limit_stats(),
+            "llm_parse": parse_stats(),
+        }
+    
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        # Cada worker expone sus propias métricas (Prometheus agrega por instancia)
+        return PlainTextResponse(
+            get_tracer().metrics.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+    
+    return app
+
+
+app = create_app()
+
+
+def main():
+    """Levanta el servicio con uvicorn (un proceso por worker)"""
+    parser = argparse.ArgumentParser(description="Quoting Agent API")
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    parser.add_argument("--workers", type=int, default=config.API_WORKERS)
+    args = parser.parse_args()
+    
+    import uvicorn
+    
+    # Con varios workers uvicorn importa la app en cada proceso
+    uvicorn.run(
+        "api.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=config.LOG_LEVEL.lower()
+    )
+
+
+if __name__ == "__main__":
+    main()
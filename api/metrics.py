@@ -0,0 +1,72 @@
+"""
+Latencia por endpoint (p50/p99) del servicio HTTP
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+import numpy as np
+
+
+class LatencyRecorder:
+    """
+    Guarda las últimas N latencias de cada endpoint y calcula percentiles.
+    
+    Cada worker de uvicorn es un proceso aparte con su propio registro;
+    /health reporta el pid para saber qué worker respondió.
+    """
+    
+    def __init__(self, window: int = 10_000):
+        """
+        Args:
+            window: Latencias recientes a conservar por endpoint
+        """
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, endpoint: str, seconds: float, error: bool = False) -> None:
+        """Registra la duración de una solicitud"""
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+            if error:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+    
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Percentiles por endpoint.
+        
+        Returns:
+            {endpoint: {requests, errors, p50_ms, p99_ms, max_ms}}
+        """
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            counts = dict(self._counts)
+            errors = dict(self._errors)
+        
+        result = {}
+        for endpoint, samples in snapshot.items():
+            values = np.array(samples) * 1000
+            p50, p99 = np.percentile(values, [50, 99])
+            result[endpoint] = {
+                "requests": counts[endpoint],
+                "errors": errors.get(endpoint, 0),
+                "p50_ms": round(float(p50), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(values.max()), 2),
+            }
+        return result
+    
+    def reset(self) -> None:
+        """Descarta todas las mediciones"""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._errors.clear()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark del catálogo: carga, snapshot y búsquedas por segundo
+
+Genera catálogos sintéticos (1M y 10M de SKUs por defecto) y mide:
+construcción desde columnas, escritura del snapshot, apertura con mmap
+(arranque en frío), búsquedas por segundo (hits y misses), el índice
+aproximado de part numbers (construcción y µs por resolución) y, para el
+tamaño más chico, la carga desde CSV.
+
+Uso:
+    python benchmarks/bench_catalog.py --sizes 1000000,10000000 --lookups 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import numpy as np
+
+from quoting_agent.catalog import Catalog
+from quoting_agent.part_resolver import FuzzyPartIndex
+
+
+def synthetic_columns(size: int, seed: int = 42) -> dict:
+    """Columnas sintéticas: part numbers "SKU-00000001", stock, precio y lead time"""
+    rng = np.random.default_rng(seed)
+    numbers = np.char.zfill(np.arange(size).astype("U9"), 9)
+    part_numbers = np.char.add("SKU-", numbers).astype("S13")
+    price = np.round(rng.uniform(0.5, 2000, size=size), 2)
+    price[rng.random(size) < 0.01] = np.nan
+    return {
+        "part_numbers": part_numbers,
+        "stock": rng.integers(0, 10_000, size=size),
+        "unit_price": price,
+        "lead_time_days": rng.integers(0, 30, size=size),
+    }
+
+
+def write_csv(path: str, columns: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("part_number,stock,unit_price,lead_time_days,alternatives\n")
+        for pn, stock, price, lead in zip(
+            columns["part_numbers"].tolist(), columns["stock"].tolist(),
+            columns["unit_price"].tolist(), columns["lead_time_days"].tolist()
+        ):
+            f.write(f"{pn.decode()},{stock},{'' if price != price else price},{lead},\n")
+
+
+def lookups_per_second(catalog: Catalog, keys: list) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        catalog.get(key)
+    return len(keys) / (time.perf_counter() - start)
+
+
+def microseconds_per_resolve(index: FuzzyPartIndex, queries: list) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        index.resolve(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<28} {time.perf_counter() - start:8.2f} s")
+    return result
+
+
+def run(size: int, lookups: int, csv_rows: int, workdir: str) -> None:
+    print(f"\n{size:,} SKUs")
+    print("-" * 60)
+    
+    columns = timed("Generar datos", lambda: synthetic_columns(size))
+    catalog = timed("Construir (columnas+índice)", lambda: Catalog.from_arrays(
+        columns["part_numbers"], columns["stock"], columns["unit_price"],
+        columns["lead_time_days"], normalize=False
+    ))
+    
+    snapshot_root = os.path.join(workdir, f"snapshot_{size}")
+    timed("Escribir snapshot", lambda: catalog.save_snapshot(snapshot_root))
+    opened = timed("Abrir snapshot (mmap)", lambda: Catalog.open_snapshot(snapshot_root))
+    
+    rng = random.Random(7)
+    hits = [f"sku-{rng.randrange(size):09d}" for _ in range(lookups)]
+    misses = [f"SKU-X{rng.randrange(size):08d}" for _ in range(lookups)]
+    
+    print(f"  {'Búsquedas (hits)':<28} {lookups_per_second(opened, hits):>10,.0f} /s")
+    print(f"  {'Búsquedas (misses)':<28} {lookups_per_second(opened, misses):>10,.0f} /s")
+    
+    index = timed("Índice aproximado", lambda: FuzzyPartIndex(opened))
+    # Errores típicos: dígitos transpuestos, sin guion, un dígito de menos
+    typos = [f"SKU-{rng.randrange(size):09d}" for _ in range(2_000)]
+    typos = [pn[:-2] + pn[-1] + pn[-2] for pn in typos] + [pn.replace("-", "") for pn in typos] + [pn[:-1] for pn in typos]
+    print(f"  {'Resolución aproximada':<28} {microseconds_per_resolve(index, typos):>10,.0f} µs")
+    
+    if csv_rows:
+        rows = min(size, csv_rows)
+        csv_path = os.path.join(workdir, f"catalog_{rows}.csv")
+        write_csv(csv_path, {name: values[:rows] for name, values in columns.items()})
+        timed(f"Cargar CSV ({rows:,} filas)", lambda: Catalog.load_csv(csv_path))
+    
+    assert opened.get(hits[0]) is not None
+    assert opened.get(misses[0]) is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del catálogo")
+    parser.add_argument("--sizes", default="1000000,10000000")
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--csv-rows", type=int, default=1_000_000,
+                        help="Filas a cargar desde CSV (0 = omitir)")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("📈 BENCHMARK CATÁLOGO")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in (int(value) for value in args.sizes.split(",")):
+            run(size, args.lookups, args.csv_rows, workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
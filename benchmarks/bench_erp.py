@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark del cliente ERP contra el ERP stand-in (sin red externa)
+
+Levanta integrations.erp_standin en un hilo, lanza solicitudes concurrentes
+a través de ERPClient y reporta throughput y latencias p50/p95/p99.
+
+Uso:
+    python benchmarks/bench_erp.py --requests 2000 --concurrency 32 \\
+        --latency-ms 10 --jitter-ms 10 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+
+import uvicorn
+
+from integrations.erp_standin import FaultConfig, create_app
+from quoting_agent.erp_client import ERPClient, ERPError
+from quoting_agent.tools import MOCK_INVENTORY
+
+
+def start_standin(port: int, faults: FaultConfig) -> uvicorn.Server:
+    """Levanta el ERP stand-in en un hilo daemon y espera a que escuche"""
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(faults), host="127.0.0.1", port=port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(label: str, latencies: list, failures: int, elapsed: float, client: ERPClient) -> None:
+    print(f"\n{label}")
+    print("-" * 60)
+    print(f"  Solicitudes:  {len(latencies):,} ({failures:,} fallidas tras reintentos)")
+    print(f"  Throughput:   {len(latencies) / elapsed:,.0f} req/s")
+    print(f"  Latencia:     media={statistics.mean(latencies) * 1000:.1f} ms  "
+          f"p50={percentile(latencies, 50) * 1000:.1f} ms  "
+          f"p95={percentile(latencies, 95) * 1000:.1f} ms  "
+          f"p99={percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"  Reintentos:   {client.stats()['retries']:,}")
+
+
+def run_sync(client: ERPClient, parts: list, total: int, concurrency: int) -> None:
+    latencies, failures = [], 0
+    
+    def one(i: int):
+        start = time.perf_counter()
+        try:
+            client.get_inventory(parts[i % len(parts)])
+            ok = True
+        except ERPError:
+            ok = False
+        return time.perf_counter() - start, ok
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, ok in pool.map(one, range(total)):
+            latencies.append(latency)
+            failures += not ok
+    report(f"SYNC (hilos={concurrency})", latencies, failures, time.perf_counter() - start, client)
+
+
+async def run_async(client: ERPClient, parts: list, total: int, concurrency: int) -> None:
+    latencies, failures = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(i: int):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client.aget_inventory(parts[i % len(parts)])
+            except ERPError:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    report(f"ASYNC (concurrencia={concurrency})", latencies, failures, time.perf_counter() - start, client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cliente ERP")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=500)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    
+    start_standin(args.port, FaultConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+        seed=42
+    ))
+    base_url = f"http://127.0.0.1:{args.port}"
+    parts = list(MOCK_INVENTORY) + ["NONEXISTENT-999"]
+    
+    print("=" * 60)
+    print("📈 BENCHMARK CLIENTE ERP")
+    print("=" * 60)
+    print(f"  latencia={args.latency_ms}ms ±{args.jitter_ms}ms  "
+          f"lentas={args.slow_rate:.0%}@{args.slow_ms}ms  errores={args.error_rate:.0%}")
+    
+    client = ERPClient(base_url=base_url, max_connections=args.concurrency)
+    run_sync(client, parts, args.requests, args.concurrency)
+    client.close()
+    
+    client = ERPClient(base_url=base_url, max_connections=args.concurrency)
+    asyncio.run(run_async(client, parts, args.requests, args.concurrency))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extracción: prompt JSON vs reparación local vs structured output
+
+Pasa mensajes ambiguos (los que el fast path no resuelve) por el nodo de
+parse con el LLM falso, que devuelve una fracción de respuestas JSON con
+defectos típicos (texto y markdown alrededor, coma final, comillas
+simples, truncado). Compara:
+
+- Prompt JSON con el parser anterior (solo quitaba el ```json del inicio)
+- Prompt JSON con reparación local + un reintento barato
+- Structured output con el prompt corto (los tokens del esquema cuentan)
+
+Reporta la tasa de fallas de parse (cada una era un turno extra del
+cliente), llamadas al LLM y tokens de entrada por mensaje.
+
+Uso:
+    python benchmarks/bench_extraction.py --messages 300 --malformed-rate 0.1
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from quoting_agent.config import config
+from quoting_agent.fake_llm import FakeQuotingLLM
+from quoting_agent.llm_extraction import StructuredOutputLLM, extract
+from quoting_agent.models import QuoteRequest
+from quoting_agent.nodes import PARSE_SYSTEM_PROMPT, STRUCTURED_PARSE_PROMPT, _parse_llm_content
+
+PARTS = ["ABC-45", "XYZ-100", "DEF-200", "GHI-300", "JKL-400"]
+TEMPLATES = [
+    "¿me cotizas {part}? serían unas {qty} piezas",
+    "Hola, para el proyecto del mes necesito {part}, cantidad {qty}",
+    "Buen día, quisiera {qty} de {part} por favor",
+    "{part}: {qty}, {other}: {qty2}",
+    "Para la obra: {qty} x {part} y {qty2} x {other}, gracias",
+]
+
+
+class CountingLLM(FakeQuotingLLM):
+    """LLM falso que acumula llamadas y tokens de entrada"""
+    calls: int = 0
+    input_tokens: int = 0
+    
+    def _result(self, messages, schema_tokens=None):
+        result = super()._result(messages, schema_tokens)
+        self.calls += 1
+        self.input_tokens += result.generations[0].message.usage_metadata["input_tokens"]
+        return result
+
+
+def corpus(size: int) -> List[str]:
+    messages = []
+    for i in range(size):
+        template = TEMPLATES[i % len(TEMPLATES)]
+        messages.append(template.format(
+            part=PARTS[i % len(PARTS)],
+            other=PARTS[(i + 2) % len(PARTS)],
+            qty=10 + i,
+            qty2=5 + i % 7,
+        ))
+    return messages
+
+
+def legacy_parse(content: str) -> QuoteRequest:
+    """Parser anterior: quita el bloque markdown solo si la respuesta empieza con él"""
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif content.startswith("```"):
+        content = content.split("```")[1].split("```")[0].strip()
+    return QuoteRequest(**json.loads(content))
+
+
+def run(label: str, texts: List[str], llm: CountingLLM, prompt: str,
+        parse: Callable[[Any, List[BaseMessage]], Any]) -> Dict[str, float]:
+    failures = 0
+    for text in texts:
+        messages = [SystemMessage(content=prompt), HumanMessage(content=text)]
+        try:
+            parse(llm, messages)
+        except Exception:
+            failures += 1
+    
+    stats = {
+        "failure_rate": failures / len(texts),
+        "calls": llm.inner.calls if isinstance(llm, StructuredOutputLLM) else llm.calls,
+        "input_tokens": (llm.inner if isinstance(llm, StructuredOutputLLM) else llm).input_tokens,
+    }
+    print(
+        f"  {label:<38} fallas {stats['failure_rate']:6.1%}   llamadas/msg {stats['calls'] / len(texts):4.2f}"
+        f"   tokens entrada/msg {stats['input_tokens'] / len(texts):6.1f}"
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extracción con el LLM")
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--malformed-rate", type=float, default=0.1)
+    args = parser.parse_args()
+    
+    # Sin caché: cada mensaje llega al modelo
+    config.LLM_CACHE_ENABLED = False
+    texts = corpus(args.messages)
+    
+    print("=" * 60)
+    print("📈 BENCHMARK EXTRACCIÓN CON EL LLM")
+    print("=" * 60)
+    print(f"  {args.messages} mensajes, {args.malformed_rate:.0%} de respuestas JSON con defectos\n")
+    
+    def fake() -> CountingLLM:
+        return CountingLLM(malformed_rate=args.malformed_rate)
+    
+    legacy = run(
+        "Prompt JSON, parser anterior", texts, fake(), PARSE_SYSTEM_PROMPT,
+        lambda llm, messages: legacy_parse(llm.invoke(messages).content)
+    )
+    repaired = run(
+        "Prompt JSON + reparación + reintento", texts, fake(), PARSE_SYSTEM_PROMPT,
+        lambda llm, messages: extract(llm, messages, _parse_llm_content)
+    )
+    structured = run(
+        "Structured output", texts, StructuredOutputLLM(inner=fake()), STRUCTURED_PARSE_PROMPT,
+        lambda llm, messages: extract(llm, messages, _parse_llm_content)
+    )
+    
+    print()
+    for label, stats in (("Reparación", repaired), ("Structured output", structured)):
+        change = stats["input_tokens"] / legacy["input_tokens"] - 1
+        avoided = (legacy["failure_rate"] - stats["failure_rate"]) * args.messages
+        print(f"  {label:<18} tokens de entrada {change:+.0%} vs. hoy, turnos extra evitados {avoided:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark de hedging entre proveedores LLM: latencia de cola vs costo
+
+Simula un proveedor primario con cola larga (lognormal) y uno secundario
+más estable con el LLM falso, y compara el primario solo contra la cadena
+con hedge al p95: p50/p95/p99 de la llamada y llamadas extra pagadas.
+Las latencias van escaladas (ms en lugar de cientos de ms) para que la
+corrida dure segundos.
+
+Uso:
+    python benchmarks/bench_failover.py --calls 2000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from langchain_core.messages import HumanMessage
+
+from quoting_agent.fake_llm import FakeQuotingLLM
+from quoting_agent.llm_failover import ProviderChain
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run(llm, calls: int, concurrency: int, offset: int) -> List[float]:
+    """Latencia de cada llamada (mensajes distintos: el jitter es por mensaje)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await llm.ainvoke([HumanMessage(content=f"ABC-45 x {offset + i}")])
+            latencies.append((time.perf_counter() - start) * 1000)
+    
+    await asyncio.gather(*[one(i) for i in range(calls)])
+    return latencies
+
+
+def report(label: str, latencies: List[float], extra_calls: float) -> None:
+    print(
+        f"  {label:<22} p50 {percentile(latencies, 50):7.1f} ms   p95 {percentile(latencies, 95):7.1f} ms"
+        f"   p99 {percentile(latencies, 99):7.1f} ms   llamadas extra {extra_calls:5.1%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de hedging entre proveedores LLM")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--primary-median-ms", type=float, default=40)
+    parser.add_argument("--primary-p95-ms", type=float, default=200)
+    parser.add_argument("--secondary-median-ms", type=float, default=60)
+    parser.add_argument("--secondary-p95-ms", type=float, default=120)
+    parser.add_argument("--percentile", type=float, default=95)
+    args = parser.parse_args()
+    
+    def provider(median: float, p95: float, seed: int) -> FakeQuotingLLM:
+        # Semillas distintas: la latencia de un proveedor no predice la del otro
+        return FakeQuotingLLM(latency_ms=median, jitter_ms=p95 - median, latency_distribution="lognormal", seed=seed)
+    
+    primary = provider(args.primary_median_ms, args.primary_p95_ms, seed=1)
+    secondary = provider(args.secondary_median_ms, args.secondary_p95_ms, seed=2)
+    
+    print("=" * 60)
+    print("📈 BENCHMARK HEDGING ENTRE PROVEEDORES LLM")
+    print("=" * 60)
+    
+    single = asyncio.run(run(primary, args.calls, args.concurrency, offset=0))
+    report("Solo primario", single, 0.0)
+    
+    chain = ProviderChain([("primary", primary), ("secondary", secondary)], hedge_percentile=args.percentile)
+    # Calentamiento: el umbral de hedge sale de las latencias observadas
+    asyncio.run(run(chain, 200, args.concurrency, offset=args.calls))
+    warmup_calls = chain.stats()["secondary"]["calls"]
+    
+    hedged = asyncio.run(run(chain, args.calls, args.concurrency, offset=0))
+    extra = (chain.stats()["secondary"]["calls"] - warmup_calls) / args.calls
+    report(f"Hedge al p{args.percentile:g}", hedged, extra)
+    
+    stats = chain.stats()
+    print(f"\n  Umbral de hedge: {stats['primary'][f'p{args.percentile:g}_ms']:.1f} ms")
+    print(f"  Victorias: primario {stats['primary']['wins']}, secundario {stats['secondary']['wins']}")
+
+
+if __name__ == "__main__":
+    main()
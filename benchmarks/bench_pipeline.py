@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline del pipeline del agente (sin red ni API key)
+
+Usa el LLM falso determinista (LLM_PROVIDER=fake) con latencia
+configurable y el inventario local (o el ERP stand-in en un hilo) y mide:
+- compilación del grafo
+- latencia de run_agent (p50/p99) con fast path y con LLM
+- throughput y p99 de arun_agent a varias concurrencias (mediana de
+  --repeat corridas)
+- tiempo medio por nodo y overhead del grafo fuera de los nodos
+- construcción/serialización de los modelos Pydantic
+- memoria por sesión (heap de Python y bytes en SQLite)
+
+Los resultados se comparan contra benchmarks/baselines/pipeline.json: el
+script termina con código 1 si algún throughput baja o algún p99 sube más
+que --threshold. Las líneas base dependen de la máquina; regenerarlas con
+--save-baseline en la máquina donde corre el control (ej: CI).
+
+Uso:
+    python benchmarks/bench_pipeline.py                      # medir y comparar
+    python benchmarks/bench_pipeline.py --save-baseline      # guardar línea base
+    python benchmarks/bench_pipeline.py --llm-latency-ms 200 --concurrency 1,16,64
+    python benchmarks/bench_pipeline.py --inventory standin --erp-latency-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+
+from quoting_agent import quote_store, runtime as runtime_module, tracing
+from quoting_agent.agent import arun_agent, create_quoting_agent, run_agent
+from quoting_agent.config import Config, config
+from quoting_agent.models import InventoryResult, Quote, QuoteLine, QuoteRequest
+from quoting_agent.quote_store import QuoteStore
+from quoting_agent.runtime import AgentRuntime
+from quoting_agent.sessions import SessionCheckpointer
+from quoting_agent.tracing import Tracer
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "pipeline.json")
+
+# Mensajes que resuelve el fast parser y mensajes que necesitan al LLM
+FAST_MESSAGES = [
+    "Necesito 100 unidades de ABC-45",
+    "Necesito 20 unidades de XYZ-100",
+    "Necesito 5 unidades de DEF-200",
+]
+LLM_MESSAGES = [
+    "hola, ¿me cotizas ABC-45? serían unas 40 piezas",
+    "para la planta norte: XYZ-100, 15 pzas, gracias",
+    "¿cuánto saldrían DEF-200, 8 piezas, con entrega normal?",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_stats(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+
+
+def microseconds(fn: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - start) / repeat * 1e6, 2)
+
+
+# ============================================================================
+# Entorno
+# ============================================================================
+
+def configure(args) -> None:
+    """LLM falso, sin caché de LLM (cada llamada paga la latencia) y stores en memoria"""
+    # get_llm_config() es classmethod: lee los atributos de la clase
+    Config.LLM_PROVIDER = "fake"
+    Config.FAKE_LLM_LATENCY_MS = args.llm_latency_ms
+    Config.FAKE_LLM_JITTER_MS = args.llm_jitter_ms
+    config.LLM_CACHE_ENABLED = False
+    config.TRACING_ENABLED = False
+    quote_store._store = QuoteStore()
+    
+    if args.inventory == "standin":
+        start_standin(args.erp_port, args.erp_latency_ms)
+        config.ENABLE_MOCK_DATA = False
+        config.ERP_API_URL = f"http://127.0.0.1:{args.erp_port}"
+
+
+def start_standin(port: int, latency_ms: float) -> None:
+    """Levanta el ERP stand-in en un hilo daemon y espera a que escuche"""
+    import uvicorn
+    
+    from integrations.erp_standin import FaultConfig, create_app
+    
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(FaultConfig(latency_ms=latency_ms)), host="127.0.0.1", port=port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+
+# ============================================================================
+# Mediciones
+# ============================================================================
+
+def median_of(repeat: int, measure: Callable[[], Dict[str, float]]) -> Dict[str, float]:
+    """Repite una medición y toma la mediana de cada valor (p99 y rps son ruidosos)"""
+    samples = [measure() for _ in range(repeat)]
+    return {key: sorted(sample[key] for sample in samples)[len(samples) // 2] for key in samples[0]}
+
+
+def bench_compile(repeat: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        create_quoting_agent()
+    return {"compile_ms": round((time.perf_counter() - start) / repeat * 1000, 3)}
+
+
+def bench_sequential(messages: List[str], runs: int) -> Dict[str, float]:
+    latencies = []
+    for i in range(runs):
+        start = time.perf_counter()
+        state = run_agent(messages[i % len(messages)])
+        latencies.append(time.perf_counter() - start)
+        assert state.get("quote") is not None, state["messages"][-1].content
+    return latency_stats(latencies, sum(latencies))
+
+
+def bench_concurrent(messages: List[str], runs: int, concurrency: int) -> Dict[str, float]:
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                await arun_agent(messages[i % len(messages)])
+                latencies.append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(runs)))
+        return latency_stats(latencies, time.perf_counter() - start)
+    
+    return asyncio.run(main())
+
+
+def bench_nodes(messages: List[str], runs: int) -> Dict[str, float]:
+    """Tiempo medio por nodo y lo que el grafo agrega fuera de los nodos"""
+    tracer = Tracer(enabled=True)
+    previous = tracing._tracer
+    tracing._tracer = tracer
+    try:
+        for i in range(runs):
+            run_agent(messages[i % len(messages)])
+    finally:
+        tracing._tracer = previous
+    
+    summary = tracer.metrics.summary()
+    result = {
+        key.split(":", 1)[1] + "_ms": round(stats["mean_ms"], 3)
+        for key, stats in summary.items() if key.startswith("node:")
+    }
+    graph_ms = summary["graph:agent"]["mean_ms"]
+    nodes_ms = sum(stats["mean_ms"] * stats["count"] for key, stats in summary.items() if key.startswith("node:")) / runs
+    result["graph_overhead_ms"] = round(graph_ms - nodes_ms, 3)
+    return result
+
+
+def bench_models(repeat: int) -> Dict[str, float]:
+    valid_until = datetime.now() + timedelta(days=30)
+    lines = [QuoteLine(part_number="ABC-45", quantity=100, unit_price=25.5, subtotal=2550.0)]
+    quote = Quote(
+        quote_id="Q-1", part_number="ABC-45", quantity=100, unit_price=25.5, subtotal=2550.0,
+        tax=484.5, total=3034.5, valid_until=valid_until, line_items=lines
+    )
+    return {
+        "quote_request_us": microseconds(lambda: QuoteRequest(part_number="abc-45", quantity=100), repeat),
+        "inventory_result_us": microseconds(lambda: InventoryResult(
+            part_number="ABC-45", status="available", available_stock=500, unit_price=25.5
+        ), repeat),
+        "quote_us": microseconds(lambda: Quote(
+            quote_id="Q-1", part_number="ABC-45", quantity=100, unit_price=25.5, subtotal=2550.0,
+            tax=484.5, total=3034.5, valid_until=valid_until, line_items=lines
+        ), repeat),
+        "quote_dump_json_us": microseconds(quote.model_dump_json, repeat),
+    }
+
+
+def bench_session_memory(sessions: int) -> Dict[str, float]:
+    """Heap de Python y bytes en disco por sesión con un turno"""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "sessions.sqlite3")
+        previous = runtime_module._runtime
+        runtime_module._runtime = AgentRuntime(checkpointer=SessionCheckpointer.from_path(path))
+        try:
+            # Un turno previo para no medir la compilación del grafo
+            run_agent(FAST_MESSAGES[0], thread_id="warmup")
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            for i in range(sessions):
+                run_agent(FAST_MESSAGES[i % len(FAST_MESSAGES)], thread_id=f"bench-{i}")
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        finally:
+            runtime_module._runtime = previous
+        
+        heap = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        return {
+            "heap_bytes_per_session": round(heap / sessions, 1),
+            "db_bytes_per_session": round(os.path.getsize(path) / sessions, 1),
+        }
+
+
+# ============================================================================
+# Línea base
+# ============================================================================
+
+def regressions(current: Dict, baseline: Dict, threshold: float, prefix: str = "") -> List[str]:
+    """Throughput (rps) que bajó o p99 que subió más que threshold respecto a la línea base"""
+    problems = []
+    for key, value in current.items():
+        if key not in baseline:
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            problems += regressions(value, baseline[key], threshold, f"{name}.")
+        elif key == "rps" and value < baseline[key] * (1 - threshold):
+            problems.append(f"{name}: {value} < {baseline[key]} (-{(1 - value / baseline[key]) * 100:.0f}%)")
+        elif key == "p99_ms" and value > baseline[key] * (1 + threshold):
+            problems.append(f"{name}: {value} > {baseline[key]} (+{(value / baseline[key] - 1) * 100:.0f}%)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del pipeline del agente")
+    parser.add_argument("--runs", type=int, default=200, help="Ejecuciones por medición")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se toma la mediana)")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--llm-latency-ms", type=float, default=20)
+    parser.add_argument("--llm-jitter-ms", type=float, default=10)
+    parser.add_argument("--inventory", choices=["mock", "standin"], default="mock")
+    parser.add_argument("--erp-port", type=int, default=8011)
+    parser.add_argument("--erp-latency-ms", type=float, default=0)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.3, help="Regresión tolerada (0.3 = 30%)")
+    args = parser.parse_args()
+    
+    configure(args)
+    
+    print("=" * 60)
+    print("📈 BENCHMARK PIPELINE (LLM falso, sin red)")
+    print("=" * 60)
+    
+    results: Dict[str, Dict] = {}
+    results["compile"] = bench_compile(20)
+    # Compilar el grafo compartido antes de medir
+    run_agent(FAST_MESSAGES[0])
+    
+    for scenario, messages, fast_parse in (("fast_path", FAST_MESSAGES, True), ("llm", LLM_MESSAGES, False)):
+        config.FAST_PARSE_ENABLED = fast_parse
+        runs = args.runs if fast_parse else max(10, args.runs // 5)
+        results[scenario] = {
+            "sequential": median_of(args.repeat, lambda: bench_sequential(messages, runs)),
+            **{
+                f"concurrency_{level}": median_of(args.repeat, lambda: bench_concurrent(messages, runs, level))
+                for level in (int(value) for value in args.concurrency.split(","))
+            },
+        }
+        results[f"{scenario}_nodes"] = bench_nodes(messages, runs)
+    config.FAST_PARSE_ENABLED = True
+    
+    results["models"] = bench_models(20_000)
+    results["sessions"] = bench_session_memory(args.sessions)
+    results["_meta"] = {
+        "llm_latency_ms": args.llm_latency_ms,
+        "llm_jitter_ms": args.llm_jitter_ms,
+        "inventory": args.inventory,
+        "runs": args.runs,
+        "repeat": args.repeat,
+    }
+    
+    for section, values in results.items():
+        if section.startswith("_"):
+            continue
+        print(f"\n{section}")
+        print("-" * 60)
+        for key, value in values.items():
+            print(f"  {key:<28} {json.dumps(value)}")
+    
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n💾 Línea base guardada en {args.baseline}")
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        print("\n(sin línea base; generarla con --save-baseline)")
+        return 0
+    
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("_meta") != results["_meta"]:
+        print("\n⚠️  Parámetros distintos a los de la línea base; la comparación no es válida")
+        return 0
+    
+    problems = regressions(results, baseline, args.threshold)
+    if problems:
+        print(f"\n❌ Regresiones (umbral {args.threshold:.0%}):")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print(f"\n✅ Sin regresiones respecto a la línea base (umbral {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
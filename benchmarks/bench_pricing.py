@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor de precios: líneas por segundo
+
+Precia RFQs sintéticas con reglas de tamaño realista (tramos generales y
+por parte, contratos por cliente, varias regiones y monedas) y reporta
+líneas/s para cliente sin contrato, con contrato y con conversión de moneda.
+
+Uso:
+    python benchmarks/bench_pricing.py --lines 200000 --rfq-size 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from quoting_agent.pricing import PricingEngine
+
+
+def synthetic_rules(parts: int, customers: int, seed: int = 42) -> dict:
+    """Tramos para 10% de las partes, contratos con 200 precios por cliente"""
+    rng = random.Random(seed)
+    part_numbers = [f"SKU-{i:07d}" for i in range(parts)]
+    return {
+        "base_currency": "USD",
+        "default_region": "CO",
+        "tax_rates": {"CO": 19, "MX": 16, "PE": 18, "US-TX": 8.25},
+        "currencies": {"USD": 1, "COP": "3950.50", "MXN": "17.05", "PEN": "3.74"},
+        "volume_tiers": {
+            "*": [[10, 1], [100, 2], [500, 3.5], [1000, 5], [5000, 7.5]],
+            **{pn: [[q, rng.randint(1, 15)] for q in sorted(rng.sample(range(1, 10_000), 8))]
+               for pn in rng.sample(part_numbers, parts // 10)},
+        },
+        "customers": {
+            f"C-{i:05d}": {
+                "region": rng.choice(["CO", "MX", "PE", "US-TX"]),
+                "currency": rng.choice(["USD", "COP", "MXN", "PEN"]),
+                "discount_percent": rng.choice([0, 2, 5]),
+                "prices": {pn: round(rng.uniform(1, 500), 2) for pn in rng.sample(part_numbers, 200)},
+            }
+            for i in range(customers)
+        },
+    }
+
+
+def lines_per_second(engine: PricingEngine, rfqs: list, customer_id) -> float:
+    start = time.perf_counter()
+    count = 0
+    for rfq in rfqs:
+        count += len(engine.price(rfq, customer_id).lines)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de precios")
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--rfq-size", type=int, default=500)
+    parser.add_argument("--parts", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, default=1_000)
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("📈 BENCHMARK MOTOR DE PRECIOS")
+    print("=" * 60)
+    
+    rules = synthetic_rules(args.parts, args.customers)
+    start = time.perf_counter()
+    engine = PricingEngine(rules)
+    print(f"  {'Compilar reglas':<28} {time.perf_counter() - start:8.2f} s")
+    
+    rng = random.Random(7)
+    rfqs = [
+        [(f"SKU-{rng.randrange(args.parts):07d}", rng.randint(1, 10_000), round(rng.uniform(0.5, 2000), 2))
+         for _ in range(args.rfq_size)]
+        for _ in range(max(1, args.lines // args.rfq_size))
+    ]
+    converted = next(cid for cid, terms in engine.customers.items() if terms.currency != "USD")
+    
+    for label, customer_id in (("Sin contrato", None), ("Con contrato", "C-00000"), ("Con moneda", converted)):
+        print(f"  {label:<28} {lines_per_second(engine, rfqs, customer_id):>10,.0f} líneas/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
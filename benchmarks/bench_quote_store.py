@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark del repositorio de cotizaciones
+
+Carga N cotizaciones sintéticas con save_many y mide: costo de save() en
+el camino de la cotización (µs por cotización, solo buffer), carga masiva
+(cotizaciones/s) y latencia de las consultas indexadas con el repositorio
+lleno (por ID, cliente, parte y rango de vencimiento).
+
+Uso:
+    python benchmarks/bench_quote_store.py --quotes 1000000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from quoting_agent.models import Quote, QuoteLine
+from quoting_agent.quote_store import QuoteStore
+
+
+def synthetic_quotes(count: int, customers: int, parts: int, seed: int = 42):
+    """Cotizaciones de 1 a 3 líneas con clientes, partes y vencimientos aleatorios"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    for i in range(count):
+        lines = [
+            QuoteLine(part_number=f"SKU-{rng.randrange(parts):07d}", quantity=10, unit_price=9.5, subtotal=95.0)
+            for _ in range(rng.randint(1, 3))
+        ]
+        yield Quote(
+            quote_id=f"Q-{i:09d}",
+            part_number=lines[0].part_number,
+            quantity=10 * len(lines),
+            unit_price=9.5,
+            subtotal=95.0 * len(lines),
+            tax=18.05 * len(lines),
+            total=113.05 * len(lines),
+            valid_until=now + timedelta(days=rng.randint(1, 90)),
+            customer_id=f"C-{rng.randrange(customers):06d}",
+            line_items=lines
+        )
+
+
+def latency_ms(fn, args_list: list) -> str:
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"p50 {statistics.median(samples):7.3f} ms   p99 {p99:7.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del repositorio de cotizaciones")
+    parser.add_argument("--quotes", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=50_000)
+    parser.add_argument("--parts", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("📈 BENCHMARK REPOSITORIO DE COTIZACIONES")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        store = QuoteStore(os.path.join(workdir, "quotes.sqlite3"), batch_size=5000)
+        
+        start = time.perf_counter()
+        store.save_many(synthetic_quotes(args.quotes, args.customers, args.parts))
+        elapsed = time.perf_counter() - start
+        print(f"  {'Carga masiva':<28} {args.quotes / elapsed:>10,.0f} cotizaciones/s")
+        
+        # Camino de la cotización: save() solo encola
+        extra = list(synthetic_quotes(10_000, args.customers, args.parts, seed=7))
+        for i, quote in enumerate(extra):
+            quote.quote_id = f"Q-NEW-{i:06d}"
+        start = time.perf_counter()
+        for quote in extra:
+            store.save(quote)
+        print(f"  {'save() (buffer)':<28} {(time.perf_counter() - start) / len(extra) * 1e6:>10,.1f} µs")
+        store.flush()
+        
+        rng = random.Random(3)
+        now = datetime.now()
+        ids = [(f"Q-{rng.randrange(args.quotes):09d}",) for _ in range(args.queries)]
+        customers = [(f"C-{rng.randrange(args.customers):06d}",) for _ in range(args.queries)]
+        parts = [(f"SKU-{rng.randrange(args.parts):07d}",) for _ in range(args.queries)]
+        ranges = [(now + timedelta(days=d), now + timedelta(days=d, hours=1), 100)
+                  for d in (rng.randint(1, 90) for _ in range(args.queries // 10))]
+        
+        print(f"  {'get(quote_id)':<28} {latency_ms(store.get, ids)}")
+        print(f"  {'by_customer':<28} {latency_ms(store.by_customer, customers)}")
+        print(f"  {'by_part':<28} {latency_ms(store.by_part, parts)}")
+        print(f"  {'expiring_between (1 h)':<28} {latency_ms(store.expiring_between, ranges)}")
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark del rate limiting del lado del cliente bajo una ráfaga
+
+Un proveedor falso con cuota (token bucket del lado del "servidor" que
+responde 429) recibe más llamadas por segundo de las que permite. Sin
+limitador cada 429 termina en un "reformula tu mensaje"; con el limitador
+las llamadas esperan en cola y el throughput queda justo por debajo de la
+cuota. Las ráfagas van escaladas (1 s en lugar de 10) para que la corrida
+dure segundos.
+
+Uso:
+    python benchmarks/bench_rate_limit.py --quota-rpm 1200 --load 1.5 --seconds 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from langchain_core.messages import HumanMessage
+
+from quoting_agent import llm_limiter
+from quoting_agent.fake_llm import FakeQuotingLLM
+from quoting_agent.llm_limiter import AdaptiveConcurrency, LLMRateLimiter, MemoryBucketStore, RateLimitedLLM
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class QuotaExceeded(Exception):
+    """429 del proveedor falso"""
+    status_code = 429
+
+
+class QuotaServer:
+    """Cuota del proveedor: token bucket de requests por segundo"""
+    
+    def __init__(self, rate: float, burst_seconds: float):
+        self.rate = rate
+        self.capacity = rate * burst_seconds
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.rejected = 0
+        self._lock = threading.Lock()
+    
+    def try_take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.level >= 1:
+                self.level -= 1
+                return True
+            self.rejected += 1
+            return False
+
+
+class QuotaLLM(FakeQuotingLLM):
+    """LLM falso que responde 429 por encima de la cuota"""
+    server: Any = None
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not self.server.try_take():
+            raise QuotaExceeded("429 Too Many Requests")
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+async def run(llm, rate: float, seconds: float) -> Dict[str, Any]:
+    """Llamadas llegando a `rate` por segundo durante `seconds`"""
+    latencies: List[float] = []
+    finished: List[float] = []
+    failures = 0
+    
+    async def one(i: int) -> None:
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            await llm.ainvoke([HumanMessage(content=f"ABC-45 x {i}")])
+            latencies.append((time.perf_counter() - start) * 1000)
+            finished.append(time.perf_counter())
+        except Exception:
+            failures += 1
+    
+    start = time.perf_counter()
+    tasks = []
+    for i in range(int(rate * seconds)):
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    # Throughput sostenido: sin el primer segundo (la ráfaga inicial del bucket)
+    steady = [t for t in finished if t - start > 1]
+    throughput = (len(steady) - 1) / (steady[-1] - steady[0]) if len(steady) > 1 else 0.0
+    return {"latencies": latencies, "failures": failures, "throughput": throughput}
+
+
+def report(label: str, result: Dict[str, Any], quota_rps: float) -> None:
+    latencies = result["latencies"]
+    throughput = result["throughput"]
+    print(
+        f"  {label:<16} atendidas {len(latencies):5d}   429 al cliente {result['failures']:5d}"
+        f"   throughput {throughput:6.1f}/s ({throughput / quota_rps:4.0%} de la cuota)"
+        f"   p95 {percentile(latencies, 95) if latencies else 0:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del rate limiting del LLM")
+    parser.add_argument("--quota-rpm", type=float, default=1200)
+    parser.add_argument("--load", type=float, default=1.5, help="Llamadas ofrecidas / cuota")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--target", type=float, default=0.9)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    
+    quota_rps = args.quota_rpm / 60
+    offered_rps = quota_rps * args.load
+    llm_limiter.BURST_SECONDS = 1
+    
+    print("=" * 60)
+    print("📈 BENCHMARK RATE LIMITING DEL LLM")
+    print("=" * 60)
+    print(f"  Cuota {quota_rps:.0f}/s, carga ofrecida {offered_rps:.0f}/s durante {args.seconds:g} s\n")
+    
+    unlimited = QuotaLLM(latency_ms=args.latency_ms, server=QuotaServer(quota_rps, burst_seconds=1))
+    report("Sin limitador", asyncio.run(run(unlimited, offered_rps, args.seconds)), quota_rps)
+    
+    server = QuotaServer(quota_rps, burst_seconds=1)
+    limiter = LLMRateLimiter(
+        "fake:bench",
+        MemoryBucketStore(),
+        rpm=args.quota_rpm,
+        tpm=0,
+        target=args.target,
+        concurrency=AdaptiveConcurrency(max_limit=64),
+        queue_timeout=60
+    )
+    limited = RateLimitedLLM(inner=QuotaLLM(latency_ms=args.latency_ms, server=server), limiter=limiter)
+    report(f"Limitado al {args.target:.0%}", asyncio.run(run(limited, offered_rps, args.seconds)), quota_rps)
+    
+    stats = limiter.stats()
+    print(f"\n  En cola: {stats['queued']} llamadas, {stats['wait_seconds']:.1f} s de espera total")
+    print(f"  429 del proveedor: {server.rejected} (reintentados dentro del plazo)")
+
+
+if __name__ == "__main__":
+    main()
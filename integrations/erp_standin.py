@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+ERP local de reemplazo (stand-in) para pruebas offline del cliente ERP
+
+Expone el mismo API de inventario y órdenes que consume quoting_agent.erp_client,
+sirviendo el catálogo local (MOCK_INVENTORY o CATALOG_PATH) con latencia
+configurable e inyección de errores.
+
+Uso:
+    python -m integrations.erp_standin --port 8001 --latency-ms 20 --error-rate 0.05
+    python -m integrations.erp_standin --catalog data/catalog_snapshot
+
+Los parámetros de fallas se pueden cambiar en caliente:
+    curl -X PUT localhost:8001/_admin/faults -d '{"latency_ms": 200}' \\
+        -H "Content-Type: application/json"
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+# Agregar src al path para imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quoting_agent.catalog import get_catalog, reload_catalog
+
+
+class FaultConfig(BaseModel):
+    """Perfil de latencia y errores del ERP simulado"""
+    
+    latency_ms: float = Field(0, ge=0, description="Latencia base por solicitud")
+    jitter_ms: float = Field(0, ge=0, description="Variación uniforme adicional")
+    slow_rate: float = Field(0, ge=0, le=1, description="Proporción de solicitudes lentas (cola)")
+    slow_ms: float = Field(1000, ge=0, description="Latencia de las solicitudes lentas")
+    error_rate: float = Field(0, ge=0, le=1, description="Proporción de respuestas 503")
+    rate_limit_rate: float = Field(0, ge=0, le=1, description="Proporción de respuestas 429")
+    seed: Optional[int] = None
+
+
+class BulkInventoryRequest(BaseModel):
+    """Consulta de inventario de varias partes"""
+    
+    part_numbers: List[str] = Field(..., max_length=1000)
+
+
+class OrderLine(BaseModel):
+    """Línea de una orden"""
+    
+    part_number: str
+    quantity: int = Field(..., gt=0)
+    unit_price: Decimal = Field(..., ge=0)
+
+
+class Order(BaseModel):
+    """Orden de una cotización aceptada"""
+    
+    idempotency_key: str = Field(..., min_length=1)
+    quote_id: str
+    line_items: List[OrderLine] = Field(..., min_length=1)
+    subtotal: Decimal
+    tax: Decimal
+    total: Decimal
+
+
+class OrderBatchRequest(BaseModel):
+    """Lote de órdenes"""
+    
+    orders: List[Order] = Field(..., max_length=1000)
+
+
+def create_app(faults: Optional[FaultConfig] = None) -> FastAPI:
+    """
+    Crea la aplicación del ERP simulado.
+    
+    Args:
+        faults: Perfil inicial de latencia/errores
+    
+    Returns:
+        Aplicación FastAPI
+    """
+    app = FastAPI(title="ERP stand-in")
+    app.state.faults = faults or FaultConfig()
+    app.state.rng = random.Random(app.state.faults.seed)
+    app.state.requests = 0
+    # idempotency_key → order_id (los reenvíos no crean otra orden)
+    app.state.orders = {}
+    
+    async def inject_faults() -> None:
+        faults = app.state.faults
+        rng = app.state.rng
+        app.state.requests += 1
+        
+        delay = faults.latency_ms + rng.uniform(0, faults.jitter_ms)
+        if faults.slow_rate and rng.random() < faults.slow_rate:
+            delay = faults.slow_ms
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        
+        if faults.error_rate and rng.random() < faults.error_rate:
+            raise HTTPException(status_code=503, detail="ERP temporalmente no disponible")
+        if faults.rate_limit_rate and rng.random() < faults.rate_limit_rate:
+            raise HTTPException(status_code=429, detail="Demasiadas solicitudes")
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": app.state.requests, "orders": len(app.state.orders)}
+    
+    @app.get("/inventory/{part_number}")
+    async def get_inventory(part_number: str):
+        await inject_faults()
+        part_number = part_number.strip().upper()
+        item = get_catalog().get(part_number)
+        if item is None:
+            return JSONResponse(status_code=404, content={"detail": "Parte no encontrada"})
+        return {"part_number": part_number, **item}
+    
+    @app.post("/inventory/bulk")
+    async def get_inventory_bulk(request: BulkInventoryRequest):
+        await inject_faults()
+        catalog = get_catalog()
+        items = {}
+        for part_number in request.part_numbers:
+            part_number = part_number.strip().upper()
+            item = catalog.get(part_number)
+            items[part_number] = {"part_number": part_number, **item} if item is not None else None
+        return {"items": items}
+    
+    @app.post("/orders/batch")
+    async def submit_orders(request: OrderBatchRequest):
+        await inject_faults()
+        catalog = get_catalog()
+        results = {}
+        for order in request.orders:
+            key = order.idempotency_key
+            if key in app.state.orders:
+                results[key] = {"status": "accepted", "order_id": app.state.orders[key]}
+                continue
+            unknown = [line.part_number for line in order.line_items if catalog.get(line.part_number.upper()) is None]
+            if unknown:
+                results[key] = {"status": "rejected", "detail": f"Partes inexistentes: {', '.join(unknown)}"}
+                continue
+            order_id = f"ORD-{len(app.state.orders) + 1:06d}"
+            app.state.orders[key] = order_id
+            results[key] = {"status": "accepted", "order_id": order_id}
+        return {"results": results}
+    
+    @app.get("/_admin/faults")
+    async def get_faults():
+        return app.state.faults
+    
+    @app.put("/_admin/faults")
+    async def set_faults(faults: FaultConfig):
+        app.state.faults = faults
+        app.state.rng = random.Random(faults.seed)
+        return faults
+    
+    return app
+
+
+def main():
+    """Levanta el ERP simulado con uvicorn"""
+    parser = argparse.ArgumentParser(description="ERP stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--slow-rate", type=float, default=0)
+    parser.add_argument("--slow-ms", type=float, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--catalog", default=None, help="Snapshot, CSV o JSONL (por defecto CATALOG_PATH)")
+    args = parser.parse_args()
+    
+    import uvicorn
+    
+    if args.catalog:
+        reload_catalog(args.catalog)
+    
+    app = create_app(FaultConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    ))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
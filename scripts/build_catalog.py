@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Script para construir el snapshot binario del catálogo desde CSV/JSONL
+
+Uso:
+    python scripts/build_catalog.py data/catalog.csv data/catalog_snapshot
+    CATALOG_PATH=data/catalog_snapshot python scripts/run_agent.py "..."
+"""
+
+import argparse
+import sys
+import os
+import time
+
+# Agregar src al path para imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quoting_agent.catalog import Catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye el snapshot del catálogo")
+    parser.add_argument("source", help="CSV (part_number,stock,unit_price,lead_time_days,alternatives) o JSONL")
+    parser.add_argument("output", help="Directorio de snapshots")
+    parser.add_argument("--keep", type=int, default=2, help="Versiones anteriores a conservar")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    catalog = Catalog.load(args.source)
+    loaded = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    path = catalog.save_snapshot(args.output, keep=args.keep)
+    saved = time.perf_counter() - start
+    
+    print(f"✓ {len(catalog):,} SKUs cargados en {loaded:.2f}s")
+    print(f"✓ Snapshot {path} escrito en {saved:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
 Script principal para ejecutar el agente de cotización
+
+Los mensajes de cada nodo se muestran apenas terminan (stream_agent).
 """
 
 import sys
@@ -9,7 +11,7 @@ import os
 # Agregar src al path para imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from quoting_agent import run_agent
+from quoting_agent.agent import stream_agent
 from quoting_agent.config import config
 
 
@@ -79,18 +81,17 @@ def main():
     print("-" * 60)
     
     try:
-        result = run_agent(user_message)
-        
-        # Mostrar respuesta
-        print()
-        print("🤖 Respuesta:")
-        print("-" * 60)
+        result = None
+        for event in stream_agent(user_message):
+            if event.type == "final":
+                result = event.state
+            elif event.content:
+                # Cada nodo se muestra en cuanto termina
+                print()
+                print(f"🤖 [{event.node}]")
+                print(event.content, flush=True)
         
-        # Obtener último mensaje (respuesta del agente)
-        if result["messages"]:
-            last_message = result["messages"][-1]
-            print(last_message.content)
-        else:
+        if not result or not result["messages"]:
             print("No se generó respuesta")
         
         print()
@@ -102,7 +103,7 @@ def main():
             print()
             print("✅ Cotización generada exitosamente")
             print(f"   ID: {quote.quote_id}")
-            print(f"   Total: ${quote.total:,.2f}")
+            print(f"   Total: {quote.total:,.2f} {quote.currency}")
         
         return 0
         
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Script para re-cotizar muchas solicitudes en paralelo (ej: RFQs abiertos)
+"""
+
+import argparse
+import json
+import sys
+import os
+import time
+
+# Agregar src al path para imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quoting_agent import run_agent_batch
+from quoting_agent.config import config
+
+
+def load_messages(path: str) -> list:
+    """Lee mensajes: una línea por mensaje, o JSONL con campo "message" """
+    messages = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                messages.append(json.loads(line)["message"])
+            else:
+                messages.append(line)
+    return messages
+
+
+def percentile(values: list, pct: float) -> float:
+    """Percentil por rango más cercano"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main():
+    """Procesa un archivo de mensajes con run_agent_batch"""
+    
+    parser = argparse.ArgumentParser(description="Cotización en lote")
+    parser.add_argument("input", help="Archivo .txt (un mensaje por línea) o .jsonl")
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=config.BATCH_MAX_CONCURRENCY,
+        help="Ejecuciones simultáneas"
+    )
+    parser.add_argument("-o", "--output", help="Archivo JSONL de resultados")
+    args = parser.parse_args()
+    
+    try:
+        config.validate()
+    except ValueError as e:
+        print(f"❌ Error de configuración: {e}")
+        return 1
+    
+    messages = load_messages(args.input)
+    print(f"🔄 Procesando {len(messages):,} mensajes (concurrencia={args.concurrency})...")
+    
+    start = time.perf_counter()
+    results = run_agent_batch(messages, max_concurrency=args.concurrency)
+    elapsed = time.perf_counter() - start
+    
+    failures = 0
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        for result in results:
+            quote = result.state.get("quote") if result.ok else None
+            if not result.ok:
+                failures += 1
+            if out:
+                out.write(json.dumps({
+                    "index": result.index,
+                    "message": result.user_message,
+                    "ok": result.ok,
+                    "error": result.error,
+                    "quote_id": quote.quote_id if quote else None,
+                    "total": str(quote.total) if quote else None,
+                    "elapsed_seconds": result.elapsed_seconds,
+                }, ensure_ascii=False) + "\n")
+    finally:
+        if out:
+            out.close()
+    
+    latencies = [r.elapsed_seconds for r in results]
+    print()
+    print("=" * 60)
+    print(f"✅ {len(results) - failures:,} correctos, ❌ {failures:,} con error")
+    print(f"   Tiempo total: {elapsed:.2f}s "
+          f"({len(results) / elapsed if elapsed else 0:.1f} mensajes/s)")
+    print(f"   Latencia p50: {percentile(latencies, 50) * 1000:.0f} ms")
+    print(f"   Latencia p99: {percentile(latencies, 99) * 1000:.0f} ms")
+    print("=" * 60)
+    
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,21 +5,45 @@ Quoting Agent - Sistema de cotización inteligente con LangGraph
 __version__ = "0.1.0"
 __author__ = "Tu Nombre"
 
-from .agent import create_quoting_agent, run_agent
-from .models import QuoteRequest, InventoryResult, Quote
+from .agent import (
+    create_quoting_agent,
+    run_agent,
+    arun_agent,
+    run_agent_batch,
+    BatchResult,
+    stream_agent,
+    astream_agent,
+    AgentEvent,
+)
+from .models import QuoteRequest, QuoteLineItem, InventoryResult, Quote, QuoteLine, OrderStatus
 from .state import AgentState, create_initial_state
-from .tools import check_inventory_tool, generate_quote_tool
-from .llm_factory import create_llm, get_llm_info
+from .tools import check_inventory_tool, check_inventory_lines_tool, generate_quote_tool, submit_order_tool
+from .llm_factory import create_llm, get_llm, get_llm_info
+from .runtime import AgentRuntime, get_runtime, warmup
 
 __all__ = [
     # Main functions
     "create_quoting_agent",
     "run_agent",
+    "arun_agent",
+    "run_agent_batch",
+    "BatchResult",
+    "stream_agent",
+    "astream_agent",
+    "AgentEvent",
+    
+    # Runtime
+    "AgentRuntime",
+    "get_runtime",
+    "warmup",
     
     # Models
     "QuoteRequest",
+    "QuoteLineItem",
     "InventoryResult",
     "Quote",
+    "QuoteLine",
+    "OrderStatus",
     
     # State
     "AgentState",
@@ -27,10 +51,13 @@ __all__ = [
     
     # Tools
     "check_inventory_tool",
+    "check_inventory_lines_tool",
     "generate_quote_tool",
+    "submit_order_tool",
     
     # LLM
     "create_llm",
+    "get_llm",
     "get_llm_info",
     
     # Metadata
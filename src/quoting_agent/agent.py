@@ -2,33 +2,70 @@
 Construcción del grafo LangGraph para el agente de cotización
 """
 
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.constants import START
 from langgraph.graph import StateGraph, END
+from langgraph.utils import RunnableCallable
 
-from .state import AgentState, create_initial_state
+from .state import AgentState, create_initial_state, create_turn_input
+from .runtime import get_runtime
+from .config import config
+from .tracing import traced
 from .nodes import (
     parse_request_node,
+    update_request_node,
     check_inventory_node,
     handle_insufficient_stock_node,
     generate_quote_node,
-    clarification_node
+    clarification_node,
+    submit_order_node,
+    aparse_request_node,
+    aupdate_request_node,
+    acheck_inventory_node,
+    ahandle_insufficient_stock_node,
+    agenerate_quote_node,
+    aclarification_node,
+    asubmit_order_node
 )
 from .edges import (
+    route_entry,
     should_continue_after_parse,
+    should_continue_after_update,
     should_continue_after_inventory,
     should_end_after_quote,
     should_end_after_clarification
 )
 
 
-def create_quoting_agent() -> StateGraph:
+def _node(name: str, func, afunc) -> RunnableCallable:
+    """
+    Combina la versión sync y async de un nodo en un solo runnable, cada
+    una medida como un span "node" con el nombre del nodo en el grafo.
+    """
+    return RunnableCallable(traced("node", name)(func), traced("node", name)(afunc), name=func.__name__)
+
+
+def create_quoting_agent(checkpointer: Optional[BaseCheckpointSaver] = None) -> StateGraph:
     """
     Crea el grafo del agente de cotización.
     
     Flujo:
     1. parse_request: Extrae información del mensaje
+       (update_request en los turnos siguientes de una sesión: aplica solo
+       el cambio y salta a check_inventory o generate_quote)
     2. check_inventory: Consulta disponibilidad
     3. generate_quote o handle_insufficient: Genera cotización o maneja problemas
     4. clarification: Pide aclaraciones si es necesario
+    5. submit_order: Registra la orden cuando el cliente acepta la
+       cotización en el turno siguiente
+    
+    Args:
+        checkpointer: Persistencia del estado por thread_id (sesiones de
+                      varios turnos); None para ejecuciones de un solo turno
     
     Returns:
         StateGraph compilado listo para ejecutar
@@ -37,15 +74,24 @@ def create_quoting_agent() -> StateGraph:
     # Crear grafo
     workflow = StateGraph(AgentState)
     
-    # Agregar nodos
-    workflow.add_node("parse_request", parse_request_node)
-    workflow.add_node("check_inventory", check_inventory_node)
-    workflow.add_node("generate_quote", generate_quote_node)
-    workflow.add_node("handle_insufficient", handle_insufficient_stock_node)
-    workflow.add_node("clarification", clarification_node)
+    # Agregar nodos (sync para invoke/batch, async nativo para ainvoke)
+    workflow.add_node("parse_request", _node("parse_request", parse_request_node, aparse_request_node))
+    workflow.add_node("update_request", _node("update_request", update_request_node, aupdate_request_node))
+    workflow.add_node("check_inventory", _node("check_inventory", check_inventory_node, acheck_inventory_node))
+    workflow.add_node("generate_quote", _node("generate_quote", generate_quote_node, agenerate_quote_node))
+    workflow.add_node("handle_insufficient", _node("handle_insufficient", handle_insufficient_stock_node, ahandle_insufficient_stock_node))
+    workflow.add_node("clarification", _node("clarification", clarification_node, aclarification_node))
+    workflow.add_node("submit_order", _node("submit_order", submit_order_node, asubmit_order_node))
     
-    # Definir punto de entrada
-    workflow.set_entry_point("parse_request")
+    # Definir punto de entrada (los turnos siguientes de una sesión no re-parsean todo)
+    workflow.set_conditional_entry_point(
+        route_entry,
+        {
+            "parse_request": "parse_request",
+            "update_request": "update_request",
+            "submit_order": "submit_order"
+        }
+    )
     
     # Agregar edges condicionales
     workflow.add_conditional_edges(
@@ -57,12 +103,23 @@ def create_quoting_agent() -> StateGraph:
         }
     )
     
+    workflow.add_conditional_edges(
+        "update_request",
+        should_continue_after_update,
+        {
+            "check_inventory": "check_inventory",
+            "generate_quote": "generate_quote",
+            "clarification": "clarification"
+        }
+    )
+    
     workflow.add_conditional_edges(
         "check_inventory",
         should_continue_after_inventory,
         {
             "generate_quote": "generate_quote",
-            "handle_insufficient": "handle_insufficient"
+            "handle_insufficient": "handle_insufficient",
+            "clarification": "clarification"
         }
     )
     
@@ -70,17 +127,49 @@ def create_quoting_agent() -> StateGraph:
     workflow.add_edge("generate_quote", END)
     workflow.add_edge("handle_insufficient", "clarification")
     workflow.add_edge("clarification", END)
+    workflow.add_edge("submit_order", END)
     
     # Compilar grafo
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def _agent_input(
+    user_message: str,
+    thread_id: Optional[str],
+    customer_id: Optional[str] = None
+) -> Tuple[dict, Optional[dict]]:
+    """
+    Estado de entrada y config de una ejecución.
+    
+    Sin thread_id, un estado inicial nuevo. Con thread_id, el primer turno
+    también parte del estado inicial y los siguientes solo agregan el
+    mensaje: el resto (incluido customer_id) se retoma del checkpoint de
+    la sesión.
+    """
+    if not thread_id:
+        return create_initial_state(user_message, customer_id), None
+    
+    run_config = {"configurable": {"thread_id": thread_id}}
+    if get_runtime().has_session(thread_id):
+        agent_input = create_turn_input(user_message)
+        if customer_id:
+            agent_input["customer_id"] = customer_id
+        return agent_input, run_config
+    return create_initial_state(user_message, customer_id), run_config
 
 
-def run_agent(user_message: str) -> AgentState:
+def run_agent(
+    user_message: str,
+    thread_id: Optional[str] = None,
+    customer_id: Optional[str] = None
+) -> AgentState:
     """
     Ejecuta el agente con un mensaje del usuario.
     
     Args:
         user_message: Mensaje del usuario (ej: "Necesito 100 unidades de ABC-45")
+        thread_id: Sesión a continuar (None = conversación de un solo turno)
+        customer_id: Cliente que cotiza (se guarda con la cotización)
         
     Returns:
         Estado final del agente con la respuesta
@@ -88,13 +177,199 @@ def run_agent(user_message: str) -> AgentState:
     Example:
         >>> result = run_agent("Necesito 100 unidades de ABC-45")
         >>> print(result["messages"][-1].content)
+        >>> run_agent("Necesito 1000 unidades de DEF-200", thread_id="cliente-42")
+        >>> run_agent("Mejor 50 unidades de DEF-200", thread_id="cliente-42")
     """
     
-    # Crear estado inicial
-    initial_state = create_initial_state(user_message)
+    # Crear estado inicial (o el turno siguiente de la sesión)
+    agent_input, run_config = _agent_input(user_message, thread_id, customer_id)
     
-    # Crear y ejecutar agente
-    agent = create_quoting_agent()
-    final_state = agent.invoke(initial_state)
+    # Ejecutar con el grafo compilado compartido del proceso
+    final_state = get_runtime().invoke(agent_input, config=run_config)
     
-    return final_state
\ No newline at end of file
+    return final_state
+
+
+# ============================================================================
+# Ejecución concurrente
+# ============================================================================
+
+@dataclass
+class BatchResult:
+    """Resultado de un mensaje dentro de run_agent_batch"""
+    
+    index: int
+    user_message: str
+    state: Optional[AgentState]
+    error: Optional[str]
+    elapsed_seconds: float
+    
+    @property
+    def ok(self) -> bool:
+        """True si el mensaje se procesó sin excepciones"""
+        return self.error is None
+
+
+async def arun_agent(
+    user_message: str,
+    thread_id: Optional[str] = None,
+    customer_id: Optional[str] = None
+) -> AgentState:
+    """
+    Versión asíncrona de run_agent.
+    
+    Args:
+        user_message: Mensaje del usuario
+        thread_id: Sesión a continuar (None = conversación de un solo turno)
+        customer_id: Cliente que cotiza (se guarda con la cotización)
+        
+    Returns:
+        Estado final del agente con la respuesta
+        
+    Example:
+        >>> result = await arun_agent("Necesito 100 unidades de ABC-45")
+    """
+    agent_input, run_config = _agent_input(user_message, thread_id, customer_id)
+    return await get_runtime().ainvoke(agent_input, config=run_config)
+
+
+def run_agent_batch(
+    user_messages: List[str],
+    max_concurrency: Optional[int] = None
+) -> List[BatchResult]:
+    """
+    Ejecuta el agente sobre muchos mensajes de forma concurrente.
+    
+    Usa Runnable.batch sobre el grafo compilado compartido. Los resultados
+    vuelven en el mismo orden que los mensajes y un error en un mensaje
+    no detiene a los demás.
+    
+    Args:
+        user_messages: Mensajes a procesar
+        max_concurrency: Ejecuciones simultáneas (default: BATCH_MAX_CONCURRENCY)
+        
+    Returns:
+        Un BatchResult por mensaje, con estado final o error y su duración
+    """
+    runtime = get_runtime()
+    
+    def _timed_invoke(item) -> BatchResult:
+        index, user_message = item
+        start = time.perf_counter()
+        try:
+            state = runtime.invoke(create_initial_state(user_message))
+            error = None
+        except Exception as e:
+            state = None
+            error = f"{type(e).__name__}: {e}"
+        return BatchResult(
+            index=index,
+            user_message=user_message,
+            state=state,
+            error=error,
+            elapsed_seconds=time.perf_counter() - start
+        )
+    
+    # Compilar antes de repartir el trabajo entre hilos
+    runtime.graph
+    
+    return RunnableCallable(_timed_invoke, name="run_agent_batch").batch(
+        list(enumerate(user_messages)),
+        config={"max_concurrency": max_concurrency or config.BATCH_MAX_CONCURRENCY}
+    )
+
+
+# ============================================================================
+# Streaming
+# ============================================================================
+
+@dataclass
+class AgentEvent:
+    """
+    Avance de stream_agent / astream_agent.
+    
+    type es "node" (un nodo terminó; content trae sus mensajes), "token"
+    (fragmento de la respuesta del LLM, si el proveedor hace streaming) o
+    "final" (state trae el estado final, como el de run_agent).
+    """
+    
+    type: str
+    node: Optional[str] = None
+    content: str = ""
+    state: Optional[AgentState] = None
+
+
+def _node_event(node: str, update: Optional[dict]) -> AgentEvent:
+    messages = (update or {}).get("messages") or []
+    return AgentEvent(type="node", node=node, content="\n".join(m.content for m in messages))
+
+
+def stream_agent(
+    user_message: str,
+    thread_id: Optional[str] = None,
+    customer_id: Optional[str] = None
+) -> Iterator[AgentEvent]:
+    """
+    Ejecuta el agente emitiendo los mensajes de cada nodo apenas termina.
+    
+    Args:
+        user_message: Mensaje del usuario
+        thread_id: Sesión a continuar (None = conversación de un solo turno)
+        customer_id: Cliente que cotiza (se guarda con la cotización)
+        
+    Yields:
+        AgentEvent "node" por cada nodo ejecutado y uno "final" al terminar
+        
+    Example:
+        >>> for event in stream_agent("Necesito 100 unidades de ABC-45"):
+        ...     print(event.content)
+    """
+    agent_input, run_config = _agent_input(user_message, thread_id, customer_id)
+    final_state = None
+    for mode, chunk in get_runtime().stream(
+        agent_input,
+        config=run_config,
+        stream_mode=["updates", "values"]
+    ):
+        if mode == "updates":
+            for node, update in chunk.items():
+                yield _node_event(node, update)
+        else:
+            final_state = chunk
+    
+    yield AgentEvent(type="final", state=final_state)
+
+
+async def astream_agent(
+    user_message: str,
+    thread_id: Optional[str] = None,
+    customer_id: Optional[str] = None
+) -> AsyncIterator[AgentEvent]:
+    """
+    Versión asíncrona de stream_agent que además emite los tokens del LLM.
+    
+    Args:
+        user_message: Mensaje del usuario
+        thread_id: Sesión a continuar (None = conversación de un solo turno)
+        customer_id: Cliente que cotiza (se guarda con la cotización)
+        
+    Yields:
+        AgentEvent "token" mientras el LLM responde, "node" por cada nodo
+        ejecutado y "final" al terminar
+    """
+    agent_input, run_config = _agent_input(user_message, thread_id, customer_id)
+    async for event in get_runtime().astream_events(agent_input, config=run_config):
+        kind = event["event"]
+        node = event.get("metadata", {}).get("langgraph_node")
+        
+        if kind == "on_chat_model_stream":
+            content = event["data"]["chunk"].content
+            if content:
+                yield AgentEvent(type="token", node=node, content=content)
+        
+        # El runnable del nodo se llama igual que el nodo; su salida es la actualización
+        elif kind == "on_chain_end" and node not in (None, START) and event["name"] == node:
+            yield _node_event(node, event["data"].get("output"))
+        
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            yield AgentEvent(type="final", state=event["data"].get("output"))
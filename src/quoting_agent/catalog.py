@@ -0,0 +1,512 @@
+"""
+Catálogo de partes en columnas numpy (millones de SKUs)
+
+Reemplaza el dict MOCK_INVENTORY como fuente local de inventario:
+
+- Columnas compactas: part numbers de ancho fijo, stock, precio en
+  centavos, lead time y alternativas en formato CSR.
+- Índice hash en buckets (CSR) para búsqueda O(1) por part number
+  normalizado, sin un dict de Python por SKU.
+- Snapshots binarios (.npy por columna) que se abren con mmap: arrancar
+  con 10M de SKUs no requiere parsear el CSV otra vez.
+- Recargas copy-on-write: se construye el catálogo nuevo completo y se
+  cambia la referencia de una vez; una consulta en curso sigue usando
+  la versión que tomó al empezar.
+"""
+
+import csv
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+
+from .config import config
+
+
+Record = Optional[Dict[str, Any]]
+
+# Hash de 64 bits por palabras de 8 bytes con mezcla final de murmur3
+# (mismo resultado vectorizado y escalar)
+_HASH_SEED = 0xCBF29CE484222325
+_HASH_MULT = 0x9E3779B97F4A7C15
+_FMIX_1 = 0xFF51AFD7ED558CCD
+_FMIX_2 = 0xC4CEB9FE1A85EC53
+_MASK64 = (1 << 64) - 1
+
+_COLUMNS = ("keys", "stock", "price_cents", "lead_time_days", "alt_offsets", "alt_values", "offsets", "order")
+_CURRENT = "CURRENT"
+
+_version_lock = threading.Lock()
+_last_version_ns = 0
+
+
+def normalize_part_number(part_number: str) -> str:
+    """Misma normalización que QuoteRequest: sin espacios y en mayúsculas"""
+    return part_number.strip().upper()
+
+
+def _padded_width(width: int) -> int:
+    return max(8, -(-width // 8) * 8)
+
+
+def hash_keys(keys: np.ndarray) -> np.ndarray:
+    """Hash de todas las claves (array 'S') en una pasada por columna de 8 bytes"""
+    width = _padded_width(keys.dtype.itemsize)
+    padded = np.zeros(len(keys), dtype=f"S{width}")
+    padded[:] = keys
+    words = padded.view("<u8").reshape(len(keys), width // 8)
+    
+    hashes = np.full(len(keys), _HASH_SEED, dtype=np.uint64)
+    for k in range(words.shape[1]):
+        hashes ^= words[:, k]
+        hashes *= np.uint64(_HASH_MULT)
+    
+    shift = np.uint64(33)
+    hashes ^= hashes >> shift
+    hashes *= np.uint64(_FMIX_1)
+    hashes ^= hashes >> shift
+    hashes *= np.uint64(_FMIX_2)
+    hashes ^= hashes >> shift
+    return hashes
+
+
+def _hash_key(key: bytes, width: int) -> int:
+    """Versión escalar de hash_keys para una clave"""
+    key = key.ljust(width, b"\0")
+    value = _HASH_SEED
+    for k in range(0, width, 8):
+        value = ((value ^ int.from_bytes(key[k:k + 8], "little")) * _HASH_MULT) & _MASK64
+    
+    value ^= value >> 33
+    value = (value * _FMIX_1) & _MASK64
+    value ^= value >> 33
+    value = (value * _FMIX_2) & _MASK64
+    return value ^ (value >> 33)
+
+
+def _parse_price(value: Any) -> float:
+    if value is None or value == "":
+        return float("nan")
+    return float(value)
+
+
+def _parse_alternatives(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace(";", "|").split("|")
+    return [normalize_part_number(alt) for alt in value if alt and alt.strip()]
+
+
+class Catalog:
+    """
+    Versión inmutable del catálogo.
+    
+    Se construye con from_records / from_arrays / load y no se modifica
+    después; para cambiar datos se construye otra versión y se publica en
+    el CatalogStore.
+    """
+    
+    def __init__(self, columns: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        self._keys = columns["keys"]
+        self._stock = columns["stock"]
+        self._price_cents = columns["price_cents"]
+        self._lead_time_days = columns["lead_time_days"]
+        self._alt_offsets = columns["alt_offsets"]
+        self._alt_values = columns["alt_values"]
+        self._offsets = columns["offsets"]
+        self._order = columns["order"]
+        self.meta = meta
+        
+        self._width = self._keys.dtype.itemsize
+        self._hash_width = _padded_width(self._width)
+        self._shift = 64 - meta["bits"]
+    
+    # ------------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------------
+    
+    @classmethod
+    def from_arrays(
+        cls,
+        part_numbers: Union[np.ndarray, List[str]],
+        stock: Union[np.ndarray, List[int]],
+        unit_price: Union[np.ndarray, List[float]],
+        lead_time_days: Optional[Union[np.ndarray, List[int]]] = None,
+        alternatives: Optional[List[List[str]]] = None,
+        normalize: bool = True,
+        source: str = ""
+    ) -> "Catalog":
+        """
+        Construye el catálogo a partir de columnas.
+        
+        Args:
+            part_numbers: Números de parte
+            stock: Stock por parte
+            unit_price: Precio unitario (NaN = sin precio)
+            lead_time_days: Lead time por parte (-1 = desconocido)
+            alternatives: Alternativas por parte
+            normalize: Normalizar los part numbers (strip + mayúsculas)
+            source: Origen de los datos, para meta
+        
+        Si un part number aparece más de una vez, gana la última fila.
+        """
+        keys = np.asarray(part_numbers)
+        if keys.size == 0:
+            keys = np.zeros(0, dtype="S1")
+        elif keys.dtype.kind == "U":
+            if normalize:
+                keys = np.char.upper(np.char.strip(keys))
+            keys = np.char.encode(keys, "utf-8")
+        elif normalize:
+            keys = np.char.upper(np.char.strip(keys))
+        keys = keys.astype(f"S{max(1, keys.dtype.itemsize)}")
+        
+        count = len(keys)
+        stock = np.asarray(stock, dtype=np.int64)
+        price = np.asarray(unit_price, dtype=np.float64)
+        price_cents = np.where(np.isnan(price), -1, np.rint(np.nan_to_num(price, nan=0.0) * 100)).astype(np.int64)
+        if lead_time_days is None:
+            lead = np.full(count, -1, dtype=np.int32)
+        else:
+            lead = np.asarray(lead_time_days, dtype=np.int32)
+        
+        # Índice: ordenar por hash deja las claves agrupadas por bucket
+        hashes = hash_keys(keys)
+        order = np.argsort(hashes, kind="stable")
+        sorted_hashes = hashes[order]
+        
+        drop = cls._duplicates(keys, order, sorted_hashes)
+        if drop is not None:
+            keep = ~drop
+            if alternatives is not None:
+                alternatives = [alts for alts, kept in zip(alternatives, keep.tolist()) if kept]
+            return cls.from_arrays(
+                keys[keep], stock[keep], price[keep], lead[keep], alternatives,
+                normalize=False, source=source
+            )
+        
+        bits = max(1, int(count - 1).bit_length()) if count > 1 else 1
+        buckets = (sorted_hashes >> np.uint64(64 - bits)).astype(np.int64)
+        index_dtype = np.int32 if count < 2 ** 31 else np.int64
+        offsets = np.searchsorted(buckets, np.arange((1 << bits) + 1)).astype(index_dtype)
+        
+        # Alternativas en CSR: alt_values[alt_offsets[i]:alt_offsets[i + 1]]
+        if alternatives:
+            lengths = np.fromiter((len(alts) for alts in alternatives), dtype=np.int64, count=count)
+            flat = [alt for alts in alternatives for alt in alts]
+            alt_values = np.array([alt.encode("utf-8") for alt in flat], dtype="S") if flat else np.zeros(0, dtype="S1")
+        else:
+            lengths = np.zeros(count, dtype=np.int64)
+            alt_values = np.zeros(0, dtype="S1")
+        alt_offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        
+        columns = {
+            "keys": keys,
+            "stock": stock,
+            "price_cents": price_cents,
+            "lead_time_days": lead,
+            "alt_offsets": alt_offsets,
+            "alt_values": alt_values,
+            "offsets": offsets,
+            "order": order.astype(index_dtype),
+        }
+        meta = {"count": count, "bits": bits, "source": source, "built_at": time.time()}
+        return cls(columns, meta)
+    
+    @staticmethod
+    def _duplicates(keys: np.ndarray, order: np.ndarray, sorted_hashes: np.ndarray) -> Optional[np.ndarray]:
+        """Marca las filas repetidas (se conserva la última); None si no hay"""
+        candidates = np.nonzero(sorted_hashes[1:] == sorted_hashes[:-1])[0]
+        if candidates.size == 0:
+            return None
+        
+        drop = np.zeros(len(keys), dtype=bool)
+        for j in candidates.tolist():
+            first, second = int(order[j]), int(order[j + 1])
+            if keys[first] == keys[second]:
+                # argsort estable: first < second
+                drop[first] = True
+        return drop if drop.any() else None
+    
+    @classmethod
+    def from_records(cls, records: Union[Mapping[str, Dict[str, Any]], Iterable[Dict[str, Any]]], source: str = "") -> "Catalog":
+        """
+        Construye el catálogo desde registros tipo MOCK_INVENTORY.
+        
+        Args:
+            records: {part_number: registro} o registros con campo part_number
+        """
+        items = records.items() if isinstance(records, Mapping) else (
+            (record["part_number"], record) for record in records
+        )
+        
+        part_numbers, stock, price, lead, alternatives = [], [], [], [], []
+        for part_number, record in items:
+            part_numbers.append(part_number)
+            stock.append(int(record.get("stock") or 0))
+            price.append(_parse_price(record.get("unit_price")))
+            lead_time = record.get("lead_time_days")
+            lead.append(-1 if lead_time in (None, "") else int(lead_time))
+            alternatives.append(_parse_alternatives(record.get("alternatives")))
+        
+        return cls.from_arrays(part_numbers, stock, price, lead, alternatives, source=source)
+    
+    @classmethod
+    def load_csv(cls, path: str) -> "Catalog":
+        """
+        Carga un CSV con columnas part_number, stock, unit_price,
+        lead_time_days y alternatives (separadas por "|").
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_records(csv.DictReader(f), source=path)
+    
+    @classmethod
+    def load_jsonl(cls, path: str) -> "Catalog":
+        """Carga un JSONL con un registro por línea (mismos campos que el CSV)"""
+        with open(path, encoding="utf-8") as f:
+            return cls.from_records((json.loads(line) for line in f if line.strip()), source=path)
+    
+    @classmethod
+    def load(cls, path: str) -> "Catalog":
+        """Carga un snapshot (directorio), un CSV o un JSONL según la ruta"""
+        if os.path.isdir(path):
+            return cls.open_snapshot(path)
+        if path.endswith(".jsonl"):
+            return cls.load_jsonl(path)
+        return cls.load_csv(path)
+    
+    # ------------------------------------------------------------------------
+    # Snapshots binarios
+    # ------------------------------------------------------------------------
+    
+    def save_snapshot(self, root: str, keep: int = 2) -> str:
+        """
+        Guarda el catálogo como snapshot versionado bajo root.
+        
+        Cada versión es un directorio con un .npy por columna; el archivo
+        root/CURRENT apunta a la vigente y se reemplaza de forma atómica.
+        
+        Args:
+            root: Directorio de snapshots
+            keep: Versiones a conservar (las más viejas se borran)
+        
+        Returns:
+            Ruta del snapshot creado
+        """
+        os.makedirs(root, exist_ok=True)
+        version = _next_version()
+        tmp_dir = os.path.join(root, f".{version}.tmp")
+        os.makedirs(tmp_dir)
+        
+        for name in _COLUMNS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(self, f"_{name}"))
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({**self.meta, "version": version}, f)
+        
+        snapshot_dir = os.path.join(root, version)
+        os.replace(tmp_dir, snapshot_dir)
+        
+        pointer_tmp = os.path.join(root, f".{_CURRENT}.{uuid.uuid4().hex[:6]}.tmp")
+        with open(pointer_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(pointer_tmp, os.path.join(root, _CURRENT))
+        
+        _prune_snapshots(root, keep)
+        return snapshot_dir
+    
+    @classmethod
+    def open_snapshot(cls, path: str, mmap: bool = True) -> "Catalog":
+        """
+        Abre un snapshot; con mmap las columnas se leen bajo demanda.
+        
+        Args:
+            path: Directorio de snapshots (con CURRENT) o de una versión
+            mmap: Mapear los .npy en memoria en lugar de leerlos completos
+        """
+        current = _current_version(path)
+        if current is not None:
+            path = os.path.join(path, current)
+        
+        mode = "r" if mmap else None
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in _COLUMNS}
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(columns, meta)
+    
+    # ------------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------------
+    
+    def __len__(self) -> int:
+        return self.meta["count"]
+    
+    def __contains__(self, part_number: str) -> bool:
+        return self.index_of(part_number) >= 0
+    
+    def index_of(self, part_number: str) -> int:
+        """Fila de una parte, o -1 si no existe"""
+        key = normalize_part_number(part_number).encode("utf-8")
+        if not key or len(key) > self._width:
+            return -1
+        
+        bucket = _hash_key(key, self._hash_width) >> self._shift
+        start, end = self._offsets[bucket:bucket + 2].tolist()
+        for j in range(start, end):
+            row = int(self._order[j])
+            if self._keys[row] == key:
+                return row
+        return -1
+    
+    def _record(self, row: int) -> Dict[str, Any]:
+        price_cents = int(self._price_cents[row])
+        lead_time = int(self._lead_time_days[row])
+        start, end = self._alt_offsets[row:row + 2].tolist()
+        return {
+            "stock": int(self._stock[row]),
+            "unit_price": None if price_cents < 0 else price_cents / 100,
+            "lead_time_days": None if lead_time < 0 else lead_time,
+            "alternatives": [alt.decode("utf-8") for alt in self._alt_values[start:end].tolist()],
+        }
+    
+    def get(self, part_number: str) -> Record:
+        """
+        Registro de inventario de una parte.
+        
+        Returns:
+            {"stock", "unit_price", "lead_time_days", "alternatives"}
+            (mismo formato que MOCK_INVENTORY), o None si no existe
+        """
+        row = self.index_of(part_number)
+        return self._record(row) if row >= 0 else None
+    
+    def get_many(self, part_numbers: List[str]) -> Dict[str, Record]:
+        """Registros de varias partes (None para las que no existen)"""
+        return {part_number: self.get(part_number) for part_number in part_numbers}
+    
+    def part_numbers(self) -> List[str]:
+        """Todos los part numbers (para catálogos chicos o inspección)"""
+        return [key.decode("utf-8") for key in self._keys.tolist()]
+    
+    def part_number_at(self, row: int) -> str:
+        """Part number de una fila"""
+        return self._keys[row].decode("utf-8")
+    
+    @property
+    def keys(self) -> np.ndarray:
+        """Columna de part numbers (array 'S' de ancho fijo, solo lectura)"""
+        return self._keys
+
+
+def _next_version() -> str:
+    """
+    Nombre de versión que ordena por fecha de creación: UTC con
+    nanosegundos, estrictamente creciente dentro del proceso.
+    """
+    global _last_version_ns
+    with _version_lock:
+        _last_version_ns = max(time.time_ns(), _last_version_ns + 1)
+        seconds, nanos = divmod(_last_version_ns, 1_000_000_000)
+    return f"v{time.strftime('%Y%m%d%H%M%S', time.gmtime(seconds))}-{nanos:09d}"
+
+
+def _current_version(root: str) -> Optional[str]:
+    """Versión a la que apunta root/CURRENT (None si no hay puntero)"""
+    pointer = os.path.join(root, _CURRENT)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def _prune_snapshots(root: str, keep: int) -> None:
+    """
+    Borra las versiones más viejas; las abiertas con mmap siguen siendo
+    legibles. La que apunta CURRENT nunca se borra (otro proceso pudo
+    publicar después una versión anterior en el orden).
+    """
+    current = _current_version(root)
+    versions = sorted(
+        name for name in os.listdir(root)
+        if name.startswith("v") and os.path.isdir(os.path.join(root, name))
+    )
+    for name in versions[:-keep] if keep > 0 else []:
+        if name != current:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+# ============================================================================
+# Versión publicada (copy-on-write)
+# ============================================================================
+
+class CatalogStore:
+    """
+    Referencia a la versión vigente del catálogo.
+    
+    Las consultas toman store.current una vez y trabajan sobre esa
+    versión; reload construye la nueva por completo antes de publicarla,
+    así que nunca se observa un catálogo a medio cargar.
+    """
+    
+    def __init__(self, catalog: Catalog):
+        self._catalog = catalog
+        self._lock = threading.Lock()
+        self.version = 1
+    
+    @property
+    def current(self) -> Catalog:
+        """Versión vigente"""
+        return self._catalog
+    
+    def swap(self, catalog: Catalog) -> Catalog:
+        """Publica una versión nueva y retorna la anterior"""
+        with self._lock:
+            previous, self._catalog = self._catalog, catalog
+            self.version += 1
+        return previous
+    
+    def reload(self, path: str) -> Catalog:
+        """Carga path (snapshot, CSV o JSONL) y lo publica"""
+        catalog = Catalog.load(path)
+        self.swap(catalog)
+        return catalog
+
+
+_store: Optional[CatalogStore] = None
+_store_lock = threading.Lock()
+
+
+def _initial_catalog() -> Catalog:
+    if config.CATALOG_PATH:
+        return Catalog.load(config.CATALOG_PATH)
+    
+    from .tools import MOCK_INVENTORY
+    return Catalog.from_records(MOCK_INVENTORY, source="MOCK_INVENTORY")
+
+
+def get_catalog_store() -> CatalogStore:
+    """Retorna el store compartido (CATALOG_PATH o, si no hay, MOCK_INVENTORY)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CatalogStore(_initial_catalog())
+    return _store
+
+
+def get_catalog() -> Catalog:
+    """Versión vigente del catálogo compartido"""
+    return get_catalog_store().current
+
+
+def reload_catalog(path: Optional[str] = None) -> Catalog:
+    """Recarga el catálogo compartido desde path (por defecto CATALOG_PATH)"""
+    path = path or config.CATALOG_PATH
+    if not path:
+        raise ValueError("No hay CATALOG_PATH configurado")
+    return get_catalog_store().reload(path)
@@ -3,7 +3,7 @@ Configuración centralizada del agente
 """
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -26,61 +26,234 @@ class Config:
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
     OPENAI_TEMPERATURE: float = float(os.getenv("OPENAI_TEMPERATURE", "0"))
     
+    # LLM falso sin red (LLM_PROVIDER=fake): benchmarks y desarrollo offline
+    FAKE_LLM_LATENCY_MS: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+    FAKE_LLM_JITTER_MS: float = float(os.getenv("FAKE_LLM_JITTER_MS", "0"))
+    # "uniform" | "lognormal" | "cassette" (latencias grabadas en LLM_CASSETTE_PATH)
+    FAKE_LLM_LATENCY_DISTRIBUTION: str = os.getenv("FAKE_LLM_LATENCY_DISTRIBUTION", "uniform").lower()
+    FAKE_LLM_ERROR_RATE: float = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+    # Fracción de respuestas JSON con defectos típicos (fences, comas, truncado)
+    FAKE_LLM_MALFORMED_RATE: float = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+    FAKE_LLM_SEED: int = int(os.getenv("FAKE_LLM_SEED", "0"))
+    
+    # Grabación y reproducción (LLM_PROVIDER=record | replay)
+    LLM_RECORD_PROVIDER: str = os.getenv("LLM_RECORD_PROVIDER", "gemini").lower()
+    LLM_CASSETTE_PATH: str = os.getenv("LLM_CASSETTE_PATH", ".cache/llm_cassette.jsonl")
+    LLM_REPLAY_LATENCY: bool = os.getenv("LLM_REPLAY_LATENCY", "true").lower() == "true"
+    
+    # Cadena de proveedores: LLM_PROVIDER primero y luego estos, en orden
+    # (ej: "openai,fake"); vacío = un solo proveedor
+    LLM_FALLBACK_PROVIDERS: str = os.getenv("LLM_FALLBACK_PROVIDERS", "")
+    # Hedging: si el proveedor supera su percentil de latencia, la misma
+    # llamada sale también al siguiente y gana la primera respuesta válida
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_INITIAL_DELAY_MS: float = float(os.getenv("LLM_HEDGE_INITIAL_DELAY_MS", "2000"))
+    LLM_HEDGE_MIN_DELAY_MS: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "100"))
+    # Circuit breaker por proveedor: N errores en la ventana lo abren
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_WINDOW_SECONDS: float = float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", "30"))
+    LLM_BREAKER_COOLDOWN_SECONDS: float = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+    
+    # Router de modelos: mensajes simples al modelo rápido, el resto al fuerte
+    # (vacío = el modelo configurado del proveedor)
+    LLM_ROUTER_ENABLED: bool = os.getenv("LLM_ROUTER_ENABLED", "false").lower() == "true"
+    LLM_ROUTER_FAST_MODEL: str = os.getenv("LLM_ROUTER_FAST_MODEL", "")
+    LLM_ROUTER_STRONG_MODEL: str = os.getenv("LLM_ROUTER_STRONG_MODEL", "")
+    LLM_ROUTER_THRESHOLD: float = float(os.getenv("LLM_ROUTER_THRESHOLD", "0.5"))
+    LLM_ROUTER_MIN_ACCURACY: float = float(os.getenv("LLM_ROUTER_MIN_ACCURACY", "0.9"))
+    LLM_ROUTER_WINDOW: int = int(os.getenv("LLM_ROUTER_WINDOW", "200"))
+    
+    # Rate limiting del lado del cliente: cuota por proveedor/modelo
+    # (0 = sin límite) usada al LLM_RATE_LIMIT_TARGET, compartida entre
+    # workers vía SQLite (LLM_RATE_LIMIT_PATH vacío = por proceso)
+    LLM_RATE_LIMIT_ENABLED: bool = os.getenv("LLM_RATE_LIMIT_ENABLED", "false").lower() == "true"
+    LLM_RPM_LIMIT: float = float(os.getenv("LLM_RPM_LIMIT", "60"))
+    LLM_TPM_LIMIT: float = float(os.getenv("LLM_TPM_LIMIT", "100000"))
+    LLM_RATE_LIMIT_TARGET: float = float(os.getenv("LLM_RATE_LIMIT_TARGET", "0.9"))
+    LLM_RATE_LIMIT_PATH: str = os.getenv("LLM_RATE_LIMIT_PATH", ".cache/llm_rate_limit.sqlite3")
+    # Concurrencia AIMD: techo de llamadas en vuelo y latencia que cuenta
+    # como saturación (0 = solo los 429)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_LATENCY_TARGET_MS: float = float(os.getenv("LLM_LATENCY_TARGET_MS", "0"))
+    # Espera máxima en cola antes de responder "alta demanda"
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+    
+    # Fast path: parser determinista antes del LLM
+    FAST_PARSE_ENABLED: bool = os.getenv("FAST_PARSE_ENABLED", "true").lower() == "true"
+    
+    # Turnos siguientes de una sesión: aplicar solo el cambio a la solicitud vigente
+    DELTA_PARSE_ENABLED: bool = os.getenv("DELTA_PARSE_ENABLED", "true").lower() == "true"
+    
+    # Extracción con structured output (tool calling) en los proveedores que
+    # lo soportan; en el resto, reparación local del JSON y un reintento corto
+    LLM_STRUCTURED_OUTPUT: bool = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+    LLM_PARSE_RETRY_ENABLED: bool = os.getenv("LLM_PARSE_RETRY_ENABLED", "true").lower() == "true"
+    
+    # Caché de respuestas del LLM (memoria LRU + SQLite)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+    LLM_CACHE_MEMORY_ENTRIES: int = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+    
     # ERP
     ERP_API_URL: str = os.getenv("ERP_API_URL", "http://localhost:8000")
     ERP_API_KEY: str = os.getenv("ERP_API_KEY", "")
     ENABLE_MOCK_DATA: bool = os.getenv("ENABLE_MOCK_DATA", "true").lower() == "true"
+    ERP_TIMEOUT: float = float(os.getenv("ERP_TIMEOUT", "10"))
+    ERP_MAX_RETRIES: int = int(os.getenv("ERP_MAX_RETRIES", "3"))
+    ERP_MAX_CONNECTIONS: int = int(os.getenv("ERP_MAX_CONNECTIONS", "100"))
+    ERP_MAX_KEEPALIVE: int = int(os.getenv("ERP_MAX_KEEPALIVE", "20"))
+    
+    # Catálogo local (snapshot, CSV o JSONL); vacío = MOCK_INVENTORY
+    CATALOG_PATH: str = os.getenv("CATALOG_PATH", "")
+    
+    # Resolución de números de parte mal escritos ("¿quisiste decir?")
+    FUZZY_MATCH_ENABLED: bool = os.getenv("FUZZY_MATCH_ENABLED", "true").lower() == "true"
+    FUZZY_AUTOCORRECT_SCORE: float = float(os.getenv("FUZZY_AUTOCORRECT_SCORE", "0.9"))
+    FUZZY_MAX_CANDIDATES: int = int(os.getenv("FUZZY_MAX_CANDIDATES", "5"))
+    
+    # Sesiones de varios turnos (checkpoints por thread_id)
+    SESSION_DB_PATH: str = os.getenv("SESSION_DB_PATH", ".cache/sessions.sqlite3")
+    SESSION_IDLE_TTL_SECONDS: float = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))
+    SESSION_EVICT_INTERVAL_SECONDS: float = float(os.getenv("SESSION_EVICT_INTERVAL_SECONDS", "60"))
+    
+    # Envío de órdenes al ERP (outbox SQLite + despachador en segundo plano)
+    ORDER_OUTBOX_PATH: str = os.getenv("ORDER_OUTBOX_PATH", ".cache/orders.sqlite3")
+    ORDER_BATCH_SIZE: int = int(os.getenv("ORDER_BATCH_SIZE", "50"))
+    ORDER_DISPATCH_CONCURRENCY: int = int(os.getenv("ORDER_DISPATCH_CONCURRENCY", "4"))
+    ORDER_MAX_ATTEMPTS: int = int(os.getenv("ORDER_MAX_ATTEMPTS", "8"))
+    ORDER_RETRY_BASE_SECONDS: float = float(os.getenv("ORDER_RETRY_BASE_SECONDS", "1"))
+    ORDER_RETRY_MAX_SECONDS: float = float(os.getenv("ORDER_RETRY_MAX_SECONDS", "300"))
+    ORDER_LEASE_SECONDS: float = float(os.getenv("ORDER_LEASE_SECONDS", "60"))
+    ORDER_POLL_SECONDS: float = float(os.getenv("ORDER_POLL_SECONDS", "1"))
+    
+    # Trazas por nodo/LLM/tool (JSON lines) y métricas para /metrics
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACE_PATH: str = os.getenv("TRACE_PATH", ".cache/traces.jsonl")
+    
+    # Reglas de precios (JSON con tramos de volumen, contratos, IVA por región y monedas)
+    PRICING_RULES_PATH: str = os.getenv("PRICING_RULES_PATH", "")
+    
+    # Repositorio de cotizaciones generadas (SQLite, escritura en lotes)
+    QUOTE_STORE_ENABLED: bool = os.getenv("QUOTE_STORE_ENABLED", "true").lower() == "true"
+    QUOTE_STORE_PATH: str = os.getenv("QUOTE_STORE_PATH", ".cache/quotes.sqlite3")
+    QUOTE_STORE_BATCH_SIZE: int = int(os.getenv("QUOTE_STORE_BATCH_SIZE", "1000"))
+    QUOTE_STORE_FLUSH_MS: float = float(os.getenv("QUOTE_STORE_FLUSH_MS", "50"))
+    
+    # Caché de inventario (delante del ERP)
+    INVENTORY_CACHE_ENABLED: bool = os.getenv("INVENTORY_CACHE_ENABLED", "true").lower() == "true"
+    INVENTORY_CACHE_TTL_SECONDS: float = float(os.getenv("INVENTORY_CACHE_TTL_SECONDS", "5"))
+    INVENTORY_CACHE_TTL_OVERRIDES: str = os.getenv("INVENTORY_CACHE_TTL_OVERRIDES", "")
+    INVENTORY_CACHE_MAX_ENTRIES: int = int(os.getenv("INVENTORY_CACHE_MAX_ENTRIES", "10000"))
+    
+    # Agrupación de consultas de inventario en llamadas bulk al ERP
+    INVENTORY_BATCH_ENABLED: bool = os.getenv("INVENTORY_BATCH_ENABLED", "true").lower() == "true"
+    INVENTORY_BATCH_WINDOW_MS: float = float(os.getenv("INVENTORY_BATCH_WINDOW_MS", "5"))
+    INVENTORY_BATCH_MAX_SIZE: int = int(os.getenv("INVENTORY_BATCH_MAX_SIZE", "100"))
     
     # Application
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     MAX_ITERATIONS: int = int(os.getenv("MAX_ITERATIONS", "5"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
     QUOTE_VALIDITY_DAYS: int = int(os.getenv("QUOTE_VALIDITY_DAYS", "30"))
     
     # API Server
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
+    API_WORKERS: int = int(os.getenv("API_WORKERS", "4"))
+    API_MAX_BATCH_SIZE: int = int(os.getenv("API_MAX_BATCH_SIZE", "100"))
+    API_LATENCY_WINDOW: int = int(os.getenv("API_LATENCY_WINDOW", "10000"))
     
     @classmethod
     def validate(cls) -> None:
         """Valida que la configuración sea correcta según el proveedor"""
-        if cls.LLM_PROVIDER == "gemini":
+        provider = cls.LLM_RECORD_PROVIDER if cls.LLM_PROVIDER == "record" else cls.LLM_PROVIDER
+        if provider == "gemini":
             if not cls.GOOGLE_API_KEY:
                 raise ValueError(
                     "GOOGLE_API_KEY no está configurada. "
                     "Obtén una en: https://aistudio.google.com/app/apikey"
                 )
-        elif cls.LLM_PROVIDER == "openai":
+        elif provider == "openai":
             if not cls.OPENAI_API_KEY:
                 raise ValueError(
                     "OPENAI_API_KEY no está configurada. "
                     "Obtén una en: https://platform.openai.com/api-keys"
                 )
-        else:
+        elif provider == "replay":
+            if not os.path.exists(cls.LLM_CASSETTE_PATH):
+                raise ValueError(f"No existe el cassette LLM_CASSETTE_PATH={cls.LLM_CASSETTE_PATH}")
+        elif provider != "fake":
             raise ValueError(
                 f"LLM_PROVIDER inválido: {cls.LLM_PROVIDER}. "
-                f"Usa 'gemini' o 'openai'"
+                f"Usa 'gemini', 'openai', 'fake', 'record' o 'replay'"
             )
     
     @classmethod
     def get_llm_config(cls) -> Dict[str, Any]:
         """Retorna la configuración del LLM seleccionado"""
-        if cls.LLM_PROVIDER == "gemini":
+        if cls.LLM_PROVIDER == "record":
+            # El modelo real que se graba; el cassette va en la config
+            # para que cambiar de archivo cree otro cliente en el pool
+            return {
+                **cls.get_provider_config(cls.LLM_RECORD_PROVIDER),
+                "provider": "record",
+                "upstream": cls.LLM_RECORD_PROVIDER,
+                "cassette_path": cls.LLM_CASSETTE_PATH
+            }
+        return cls.get_provider_config(cls.LLM_PROVIDER)
+    
+    @classmethod
+    def get_provider_config(cls, provider: str) -> Dict[str, Any]:
+        """Configuración de un proveedor por nombre (los de la cadena de fallback)"""
+        if provider == "gemini":
             return {
                 "provider": "gemini",
                 "api_key": cls.GOOGLE_API_KEY,
                 "model": cls.GEMINI_MODEL,
                 "temperature": cls.GEMINI_TEMPERATURE
             }
-        elif cls.LLM_PROVIDER == "openai":
+        elif provider == "openai":
             return {
                 "provider": "openai",
                 "api_key": cls.OPENAI_API_KEY,
                 "model": cls.OPENAI_MODEL,
                 "temperature": cls.OPENAI_TEMPERATURE
             }
+        elif provider == "fake":
+            return {
+                "provider": "fake",
+                "api_key": "",
+                "model": "fake-quoting",
+                "temperature": 0,
+                "latency_ms": cls.FAKE_LLM_LATENCY_MS,
+                "jitter_ms": cls.FAKE_LLM_JITTER_MS,
+                "latency_distribution": cls.FAKE_LLM_LATENCY_DISTRIBUTION,
+                "error_rate": cls.FAKE_LLM_ERROR_RATE,
+                "malformed_rate": cls.FAKE_LLM_MALFORMED_RATE,
+                "seed": cls.FAKE_LLM_SEED,
+                "cassette_path": cls.LLM_CASSETTE_PATH
+            }
+        elif provider == "replay":
+            return {
+                "provider": "replay",
+                "api_key": "",
+                "model": "replay",
+                "temperature": 0,
+                "cassette_path": cls.LLM_CASSETTE_PATH,
+                "replay_latency": cls.LLM_REPLAY_LATENCY
+            }
         else:
-            raise ValueError(f"Proveedor no soportado: {cls.LLM_PROVIDER}")
+            raise ValueError(f"Proveedor no soportado: {provider}")
+    
+    @classmethod
+    def get_fallback_providers(cls) -> List[str]:
+        """Proveedores de LLM_FALLBACK_PROVIDERS, sin repetir LLM_PROVIDER"""
+        providers = [name.strip().lower() for name in cls.LLM_FALLBACK_PROVIDERS.split(",") if name.strip()]
+        return [name for i, name in enumerate(providers) if name != cls.LLM_PROVIDER and name not in providers[:i]]
     
     @classmethod
     def is_development(cls) -> bool:
@@ -3,6 +3,27 @@ Lógica condicional para las transiciones entre nodos (edges)
 """
 
 from .state import AgentState
+from .config import config
+from .fast_parser import is_confirmation
+
+
+def route_entry(state: AgentState) -> str:
+    """
+    Decide por dónde entra cada turno al grafo.
+    
+    Returns:
+        "submit_order" si el cliente acepta la cotización del turno anterior
+        "update_request" si la sesión ya tiene una solicitud (turno siguiente)
+        "parse_request" en el primer turno o sin sesión
+    """
+    messages = state.get("messages") or []
+    if state.get("quote") is not None and messages and is_confirmation(messages[-1].content):
+        return "submit_order"
+    
+    if config.DELTA_PARSE_ENABLED and state.get("quote_request") is not None:
+        return "update_request"
+    
+    return "parse_request"
 
 
 def should_continue_after_parse(state: AgentState) -> str:
@@ -22,6 +43,25 @@ def should_continue_after_parse(state: AgentState) -> str:
     return "check_inventory"
 
 
+def should_continue_after_update(state: AgentState) -> str:
+    """
+    Decide a dónde saltar después de actualizar la solicitud.
+    
+    Returns:
+        "generate_quote" si el inventario del turno anterior alcanza
+        "check_inventory" si hay que volver a consultarlo
+        "clarification" si no se pudo interpretar el cambio
+    """
+    if state.get("needs_clarification", False) or state.get("quote_request") is None:
+        return "clarification"
+    
+    inventory = state.get("inventory_result")
+    if inventory is not None and inventory.status == "available":
+        return "generate_quote"
+    
+    return "check_inventory"
+
+
 def should_continue_after_inventory(state: AgentState) -> str:
     """
     Decide si continuar después de consultar inventario.
@@ -29,7 +69,11 @@ def should_continue_after_inventory(state: AgentState) -> str:
     Returns:
         "generate_quote" si hay stock disponible
         "handle_insufficient" si hay problemas
+        "clarification" si no se pudo consultar (p. ej. el ERP no responde)
     """
+    if state.get("needs_clarification", False):
+        return "clarification"
+    
     inventory = state.get("inventory_result")
     
     if inventory is None:
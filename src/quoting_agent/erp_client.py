@@ -0,0 +1,285 @@
+"""
+Cliente HTTP del ERP - conexiones persistentes, timeouts y reintentos
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from .config import config
+
+
+class ERPError(Exception):
+    """Error al consultar el ERP (tras agotar los reintentos)"""
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Reintenta errores de red, timeouts, 429 y 5xx; nunca otros 4xx"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+class ERPClient:
+    """
+    Cliente del API de inventario del ERP.
+    
+    Mantiene un pool de conexiones keep-alive (httpx) compartido por todos
+    los hilos, y uno asíncrono por event loop. Los errores transitorios se
+    reintentan con backoff exponencial con jitter (tenacity).
+    
+    Endpoints usados:
+        GET {base_url}/inventory/{part_number}
+            200 → {"part_number", "stock", "unit_price", "lead_time_days", "alternatives"}
+            404 → la parte no existe
+        POST {base_url}/inventory/bulk  {"part_numbers": [...]}
+            200 → {"items": {part_number: registro | null}}
+        POST {base_url}/orders/batch  {"orders": [...]}
+            200 → {"results": {idempotency_key: {"status", "order_id" | "detail"}}}
+    """
+    
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = (base_url or config.ERP_API_URL).rstrip("/")
+        self.api_key = api_key if api_key is not None else config.ERP_API_KEY
+        self.timeout = timeout if timeout is not None else config.ERP_TIMEOUT
+        self.max_retries = max_retries if max_retries is not None else config.ERP_MAX_RETRIES
+        self.limits = httpx.Limits(
+            max_connections=max_connections or config.ERP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive or config.ERP_MAX_KEEPALIVE
+        )
+        self._transport = transport
+        self._async_transport = async_transport
+        
+        self._client: Optional[httpx.Client] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "failures": 0}
+    
+    # ------------------------------------------------------------------------
+    # Clientes HTTP
+    # ------------------------------------------------------------------------
+    
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Accept": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+    
+    @property
+    def client(self) -> httpx.Client:
+        """Cliente sync compartido (pool de conexiones keep-alive)"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        base_url=self.base_url,
+                        headers=self._headers(),
+                        timeout=self.timeout,
+                        limits=self.limits,
+                        transport=self._transport
+                    )
+        return self._client
+    
+    def _async_client(self) -> httpx.AsyncClient:
+        """Cliente async del event loop actual (no se comparte entre loops)"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers(),
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self._async_transport
+            )
+            self._async_clients[loop] = client
+        return client
+    
+    def _retrying(self, retry_class):
+        return retry_class(
+            stop=stop_after_attempt(self.max_retries + 1),
+            wait=wait_random_exponential(multiplier=0.05, max=2.0),
+            retry=retry_if_exception(_is_retryable),
+            before_sleep=self._count_retry,
+            reraise=True
+        )
+    
+    def _count_retry(self, retry_state) -> None:
+        self._stats["retries"] += 1
+    
+    # ------------------------------------------------------------------------
+    # Inventario
+    # ------------------------------------------------------------------------
+    
+    @staticmethod
+    def _parse_inventory(response: httpx.Response) -> Optional[Dict[str, Any]]:
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+    
+    def get_inventory(self, part_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el registro de inventario de una parte.
+        
+        Args:
+            part_number: Número de parte normalizado
+        
+        Returns:
+            Registro crudo del ERP, o None si la parte no existe
+        
+        Raises:
+            ERPError: Si el ERP no responde tras los reintentos
+        """
+        self._stats["requests"] += 1
+        try:
+            for attempt in self._retrying(Retrying):
+                with attempt:
+                    response = self.client.get(f"/inventory/{part_number}")
+                    return self._parse_inventory(response)
+        except httpx.HTTPError as e:
+            self._stats["failures"] += 1
+            raise ERPError(f"ERP no disponible consultando {part_number}: {e}") from e
+    
+    async def aget_inventory(self, part_number: str) -> Optional[Dict[str, Any]]:
+        """Versión asíncrona de get_inventory"""
+        self._stats["requests"] += 1
+        try:
+            async for attempt in self._retrying(AsyncRetrying):
+                with attempt:
+                    response = await self._async_client().get(f"/inventory/{part_number}")
+                    return self._parse_inventory(response)
+        except httpx.HTTPError as e:
+            self._stats["failures"] += 1
+            raise ERPError(f"ERP no disponible consultando {part_number}: {e}") from e
+    
+    @staticmethod
+    def _parse_bulk(response: httpx.Response, part_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        response.raise_for_status()
+        items = response.json()["items"]
+        return {part_number: items.get(part_number) for part_number in part_numbers}
+    
+    def get_inventory_many(self, part_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Obtiene los registros de varias partes en una sola solicitud.
+        
+        Args:
+            part_numbers: Números de parte normalizados
+            
+        Returns:
+            Registro crudo por parte (None si no existe)
+            
+        Raises:
+            ERPError: Si el ERP no responde tras los reintentos
+        """
+        self._stats["requests"] += 1
+        try:
+            for attempt in self._retrying(Retrying):
+                with attempt:
+                    response = self.client.post(
+                        "/inventory/bulk", json={"part_numbers": list(part_numbers)}
+                    )
+                    return self._parse_bulk(response, part_numbers)
+        except httpx.HTTPError as e:
+            self._stats["failures"] += 1
+            raise ERPError(f"ERP no disponible consultando {len(part_numbers)} partes: {e}") from e
+    
+    async def aget_inventory_many(self, part_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Versión asíncrona de get_inventory_many"""
+        self._stats["requests"] += 1
+        try:
+            async for attempt in self._retrying(AsyncRetrying):
+                with attempt:
+                    response = await self._async_client().post(
+                        "/inventory/bulk", json={"part_numbers": list(part_numbers)}
+                    )
+                    return self._parse_bulk(response, part_numbers)
+        except httpx.HTTPError as e:
+            self._stats["failures"] += 1
+            raise ERPError(f"ERP no disponible consultando {len(part_numbers)} partes: {e}") from e
+    
+    # ------------------------------------------------------------------------
+    # Órdenes
+    # ------------------------------------------------------------------------
+    
+    def submit_orders(self, orders: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Envía un lote de órdenes.
+        
+        Cada orden lleva su idempotency_key: reenviar una orden que el ERP
+        ya registró devuelve el mismo order_id sin crear otra.
+        
+        Args:
+            orders: Órdenes (ver orders.order_payload)
+        
+        Returns:
+            Resultado por idempotency_key: {"status": "accepted", "order_id"}
+            o {"status": "rejected", "detail"}
+        
+        Raises:
+            ERPError: Si el ERP no responde tras los reintentos
+        """
+        self._stats["requests"] += 1
+        try:
+            for attempt in self._retrying(Retrying):
+                with attempt:
+                    response = self.client.post("/orders/batch", json={"orders": orders})
+                    response.raise_for_status()
+                    return response.json()["results"]
+        except httpx.HTTPError as e:
+            self._stats["failures"] += 1
+            raise ERPError(f"ERP no disponible enviando {len(orders)} órdenes: {e}") from e
+    
+    def stats(self) -> Dict[str, int]:
+        """Solicitudes, reintentos y fallos definitivos"""
+        return dict(self._stats)
+    
+    def close(self) -> None:
+        """Cierra el pool de conexiones sync"""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# ============================================================================
+# Instancia global
+# ============================================================================
+
+_erp_client: Optional[ERPClient] = None
+_erp_client_lock = threading.Lock()
+
+
+def get_erp_client() -> ERPClient:
+    """Retorna el cliente ERP compartido del proceso"""
+    global _erp_client
+    if _erp_client is None:
+        with _erp_client_lock:
+            if _erp_client is None:
+                _erp_client = ERPClient()
+    return _erp_client
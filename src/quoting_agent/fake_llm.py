@@ -0,0 +1,259 @@
+"""
+LLM falso determinista para benchmarks y desarrollo sin red
+
+Responde los prompts de parse_request y update_request con el JSON que
+devolvería un modelo real, extrayendo números de parte y cantidades del
+último mensaje con expresiones regulares, y simula la latencia del
+proveedor (con jitter determinista por mensaje, así dos corridas del mismo
+benchmark esperan lo mismo). Reporta usage_metadata con tokens estimados
+(~4 caracteres por token).
+
+Distribuciones de latencia (FAKE_LLM_LATENCY_DISTRIBUTION):
+- uniform: FAKE_LLM_LATENCY_MS + U(0, FAKE_LLM_JITTER_MS)
+- lognormal: mediana FAKE_LLM_LATENCY_MS y p95 en LATENCY + JITTER
+  (cola larga, como un proveedor real)
+- cassette: las latencias grabadas en LLM_CASSETTE_PATH con
+  LLM_PROVIDER=record (perfil de producción)
+
+FAKE_LLM_ERROR_RATE es la fracción de llamadas que fallan con
+FakeLLMError; la secuencia de fallas sale de FAKE_LLM_SEED, así un
+reintento puede tener éxito y dos corridas fallan igual. La semilla
+también entra en el cuantil de latencia de cada mensaje.
+
+FAKE_LLM_MALFORMED_RATE es la fracción de respuestas JSON que salen con
+un defecto típico de un modelo al que se le pide JSON por prompt (texto
+y bloque markdown alrededor, coma final, comillas simples o respuesta
+truncada), elegido por el contenido del prompt. Con structured output
+(with_structured_output) la respuesta siempre cumple el esquema, y los
+tokens del esquema se suman a los de entrada como en un proveedor real.
+
+Se activa con LLM_PROVIDER=fake.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from statistics import NormalDist
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.pydantic_v1 import PrivateAttr
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from .fast_parser import SKU_PATTERN
+
+_NUMBER_PATTERN = re.compile(r"\d[\d.,]*")
+_CURRENT_REQUEST_PATTERN = re.compile(r"Solicitud en curso: (\{.*\})")
+_CLIENT_MESSAGE_MARKER = "Mensaje del cliente:"
+
+LATENCY_DISTRIBUTIONS = ("uniform", "lognormal", "cassette")
+
+# z del percentil 95 de la normal estándar
+_Z95 = NormalDist().inv_cdf(0.95)
+
+
+class FakeLLMError(RuntimeError):
+    """Falla simulada del proveedor (FAKE_LLM_ERROR_RATE)"""
+
+
+def _quantities(text: str) -> List[int]:
+    """Números del texto que no son parte de un número de parte"""
+    text = SKU_PATTERN.sub(" ", text)
+    return [int(re.sub(r"[.,]", "", match)) for match in _NUMBER_PATTERN.findall(text) if re.sub(r"[.,]", "", match)]
+
+
+def _extract_lines(text: str) -> List[dict]:
+    """Empareja partes y cantidades en el orden en que aparecen"""
+    parts = [part.upper() for part in SKU_PATTERN.findall(text)]
+    quantities = [q for q in _quantities(text) if q > 0]
+    return [
+        {"part_number": part, "quantity": quantity}
+        for part, quantity in zip(parts, quantities)
+    ]
+
+
+def fake_response(messages: List[BaseMessage]) -> str:
+    """
+    Respuesta determinista para un prompt del agente.
+    
+    - Prompt de cambio (update_request): la solicitud en curso con la
+      cantidad o la parte del mensaje, o {} si el mensaje no trae ninguna
+    - Prompt de parse: las líneas del mensaje, o texto sin JSON si no hay
+      partes con cantidad (el nodo pide aclaración)
+    """
+    text = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+    
+    current = _CURRENT_REQUEST_PATTERN.search(text)
+    if current is not None:
+        request = json.loads(current.group(1))
+        message = text.split(_CLIENT_MESSAGE_MARKER, 1)[-1]
+        lines = _extract_lines(message)
+        if lines:
+            return json.dumps({"line_items": lines})
+        quantities = _quantities(message)
+        if quantities and len(request["line_items"]) == 1:
+            return json.dumps({"line_items": [{**request["line_items"][0], "quantity": quantities[0]}]})
+        return "{}"
+    
+    lines = _extract_lines(text)
+    if not lines:
+        return "No encontré número de parte y cantidad en el mensaje."
+    if len(lines) == 1:
+        return json.dumps(lines[0])
+    return json.dumps({"line_items": lines})
+
+
+# Defectos de malformed_rate, en el orden en que se eligen
+_MALFORMATIONS = (
+    lambda content: f"Claro, aquí está la solicitud:\n```json\n{content}\n```",
+    lambda content: content[:-1] + ", }",
+    lambda content: content.replace('"', "'"),
+    lambda content: content[:-2],
+)
+
+
+def _structured_content(content: str) -> str:
+    """La respuesta con la forma del esquema de extracción: line_items, o {} sin partes"""
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return "{}"
+    if "part_number" in data:
+        data = {"line_items": [data]}
+    return json.dumps(data)
+
+
+class FakeQuotingLLM(BaseChatModel):
+    """Chat model sin red que responde como el modelo de producción"""
+    
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    latency_distribution: str = "uniform"
+    # Latencias de referencia en ms, ordenadas (distribución "cassette")
+    latency_profile: List[float] = []
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    seed: int = 0
+    
+    _rng: random.Random = PrivateAttr()
+    _rng_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Distribución de latencia no soportada: {self.latency_distribution}. "
+                f"Usa {', '.join(LATENCY_DISTRIBUTIONS)}"
+            )
+        if self.latency_distribution == "cassette" and not self.latency_profile:
+            raise ValueError("La distribución 'cassette' necesita latencias grabadas")
+        self._rng = random.Random(self.seed)
+    
+    @property
+    def _llm_type(self) -> str:
+        return "fake-quoting"
+    
+    def _delay(self, messages: List[BaseMessage]) -> float:
+        """Latencia en segundos; el cuantil depende solo del contenido"""
+        if self.latency_distribution == "uniform" and not self.jitter_ms:
+            return self.latency_ms / 1000
+        # La semilla separa proveedores falsos: con semillas distintas sus
+        # latencias para el mismo mensaje son independientes
+        salt = f"{self.seed}:" if self.seed else ""
+        digest = hashlib.blake2b((salt + "".join(str(m.content) for m in messages)).encode(), digest_size=4).digest()
+        fraction = int.from_bytes(digest, "big") / 0xFFFFFFFF
+        
+        if self.latency_distribution == "cassette":
+            profile = self.latency_profile
+            return profile[min(int(fraction * len(profile)), len(profile) - 1)] / 1000
+        
+        if self.latency_distribution == "lognormal" and self.latency_ms > 0:
+            sigma = math.log((self.latency_ms + self.jitter_ms) / self.latency_ms) / _Z95
+            # Cuantiles extremos acotados: inv_cdf no acepta 0 ni 1
+            z = NormalDist().inv_cdf(min(max(fraction, 1e-6), 1 - 1e-6))
+            return self.latency_ms * math.exp(sigma * z) / 1000
+        
+        return (self.latency_ms + fraction * self.jitter_ms) / 1000
+    
+    def _maybe_fail(self) -> None:
+        """Lanza FakeLLMError con probabilidad error_rate"""
+        if not self.error_rate:
+            return
+        with self._rng_lock:
+            failed = self._rng.random() < self.error_rate
+        if failed:
+            raise FakeLLMError("Falla simulada del proveedor (FAKE_LLM_ERROR_RATE)")
+    
+    def _malform(self, messages: List[BaseMessage], content: str) -> str:
+        """Aplica un defecto con probabilidad malformed_rate (decidido por el prompt)"""
+        if not content.startswith("{") or content == "{}":
+            return content
+        digest = hashlib.blake2b(
+            ("malformed:" + "".join(str(m.content) for m in messages)).encode(), digest_size=4
+        ).digest()
+        if int.from_bytes(digest[:2], "big") / 0xFFFF >= self.malformed_rate:
+            return content
+        return _MALFORMATIONS[digest[2] % len(_MALFORMATIONS)](content)
+    
+    def _result(self, messages: List[BaseMessage], schema_tokens: Optional[int] = None) -> ChatResult:
+        """schema_tokens: tokens del esquema con structured output (None = prompt JSON)"""
+        content = fake_response(messages)
+        if schema_tokens is not None:
+            content = _structured_content(content)
+        elif self.malformed_rate:
+            content = self._malform(messages, content)
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4 + (schema_tokens or 0)
+        output_tokens = max(1, len(content) // 4)
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        delay = self._delay(messages)
+        if delay:
+            time.sleep(delay)
+        self._maybe_fail()
+        return self._result(messages, kwargs.get("schema_tokens"))
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        delay = self._delay(messages)
+        if delay:
+            await asyncio.sleep(delay)
+        self._maybe_fail()
+        return self._result(messages, kwargs.get("schema_tokens"))
+    
+    def with_structured_output(self, schema: Any, *, include_raw: bool = False, **kwargs: Any) -> Runnable:
+        """Structured output simulado: JSON con la forma del esquema, sin defectos"""
+        schema_tokens = len(json.dumps(schema)) // 4 if isinstance(schema, dict) else 0
+        
+        def output(message: AIMessage) -> Any:
+            parsed = json.loads(message.content)
+            return {"raw": message, "parsed": parsed, "parsing_error": None} if include_raw else parsed
+        
+        return self.bind(schema_tokens=schema_tokens) | RunnableLambda(output)
@@ -0,0 +1,577 @@
+"""
+Parser determinista (fast path) para solicitudes de cotización bien formadas
+
+Extrae número de parte y cantidad con reglas para mensajes como
+"Necesito 100 unidades de ABC-45" (o un renglón así por parte) sin pasar
+por el LLM. Solo responde cuando no hay ambigüedad: la cantidad debe
+llevar unidad ("100 unidades", "20 pzas") o ir junto al número de parte
+("100 ABC-45", "ABC-45 x 100"), y el mensaje no puede tener fechas,
+plazos, identificadores ("cliente 4521", "modelo 2024") ni negaciones.
+En cualquier otro caso devuelve None y el nodo de parseo usa el LLM.
+"""
+
+import re
+import threading
+import unicodedata
+from typing import Dict, Any, List, Optional, Tuple
+
+from .models import QuoteRequest
+
+
+# ============================================================================
+# Vocabulario
+# ============================================================================
+
+# Números de parte con guion: ABC-45, XYZ-100, AB-12-R
+SKU_PATTERN = re.compile(r"\b([A-Za-z]{1,6}-\d{1,6}(?:-[A-Za-z0-9]{1,6})?)\b")
+
+# Números con decimales o porcentajes hacen el mensaje ambiguo
+AMBIGUOUS_NUMBER_PATTERN = re.compile(r"\d+[.,]\d{1,2}(?!\d)|\d+\s*%|[$€]\s*\d")
+
+UNIT_WORDS = {
+    # Español
+    "unidad", "unidades", "ud", "uds", "u", "pieza", "piezas", "pza", "pzas", "pz", "pzs",
+    "articulo", "articulos", "item", "items",
+    # English
+    "unit", "units", "piece", "pieces", "pc", "pcs", "ea", "each",
+}
+
+# Empaques: "2 cajas de 50 unidades" requiere interpretación, se deriva al LLM
+CONTAINER_WORDS = {
+    "caja", "cajas", "paquete", "paquetes", "bolsa", "bolsas", "rollo", "rollos",
+    "pallet", "pallets", "tarima", "tarimas", "lote", "lotes",
+    "box", "boxes", "pack", "packs", "package", "packages", "bag", "bags", "roll", "rolls",
+}
+
+# Artículos que valen 1 solo si van seguidos de una palabra de unidad
+ARTICLE_WORDS = {"un", "una", "a", "an"}
+
+# Palabras que pueden ir entre la cantidad y el número de parte ("100 de ABC-45",
+# "25 del producto DEF-200", "ABC-45 x 100")
+SKU_CONNECTOR_WORDS = {"x", "de", "del", "of", "producto", "parte", "part", "sku"}
+
+# Números que no son cantidades: plazos, fechas e identificadores
+# ("entrega en 3 dias", "para el 15 de marzo", "cliente 4521", "modelo 2024")
+CONTEXT_WORDS = {
+    # Español
+    "hora", "horas", "dia", "dias", "semana", "semanas", "mes", "meses", "ano", "anos",
+    "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+    "septiembre", "setiembre", "octubre", "noviembre", "diciembre",
+    "cliente", "modelo", "sucursal", "pedido", "folio", "factura", "cuenta", "serie", "version",
+    # English
+    "hour", "hours", "day", "days", "week", "weeks", "month", "months", "year", "years",
+    "january", "february", "march", "april", "june", "july", "august",
+    "september", "october", "november", "december",
+    "customer", "model", "branch", "invoice", "account", "serial",
+}
+
+NEGATION_WORDS = {
+    "no", "not", "don", "nunca", "never", "cancel", "cancela", "cancelar",
+    "espera", "wait", "pero", "but", "aun", "todavia",
+}
+
+NUMBER_WORDS: Dict[str, int] = {
+    # Español
+    "cero": 0, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "once": 11,
+    "doce": 12, "trece": 13, "catorce": 14, "quince": 15, "dieciseis": 16,
+    "diecisiete": 17, "dieciocho": 18, "diecinueve": 19, "veinte": 20,
+    "veintiuno": 21, "veintiun": 21, "veintiuna": 21, "veintidos": 22,
+    "veintitres": 23, "veinticuatro": 24, "veinticinco": 25, "veintiseis": 26,
+    "veintisiete": 27, "veintiocho": 28, "veintinueve": 29, "treinta": 30,
+    "cuarenta": 40, "cincuenta": 50, "sesenta": 60, "setenta": 70,
+    "ochenta": 80, "noventa": 90, "cien": 100, "ciento": 100,
+    "doscientos": 200, "doscientas": 200, "trescientos": 300, "trescientas": 300,
+    "cuatrocientos": 400, "cuatrocientas": 400, "quinientos": 500, "quinientas": 500,
+    "seiscientos": 600, "seiscientas": 600, "setecientos": 700, "setecientas": 700,
+    "ochocientos": 800, "ochocientas": 800, "novecientos": 900, "novecientas": 900,
+    # English
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20,
+    "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70,
+    "eighty": 80, "ninety": 90,
+}
+
+MULTIPLIER_WORDS: Dict[str, int] = {
+    "hundred": 100,
+    "docena": 12, "docenas": 12, "dozen": 12, "dozens": 12,
+    "mil": 1000, "thousand": 1000,
+}
+
+# Conectores permitidos dentro de un número ("treinta y cinco", "one hundred and five")
+NUMBER_CONNECTORS = {"y", "and"}
+
+
+# ============================================================================
+# Estadísticas
+# ============================================================================
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+
+def _record(hit: bool) -> None:
+    with _stats_lock:
+        _stats["hits" if hit else "misses"] += 1
+
+
+def get_fast_parse_stats() -> Dict[str, Any]:
+    """
+    Estadísticas del fast path.
+    
+    Returns:
+        Diccionario con:
+        - hits: Mensajes resueltos sin LLM (llamadas LLM ahorradas)
+        - misses: Mensajes derivados al LLM
+        - hit_rate: Proporción de mensajes resueltos sin LLM
+    """
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "llm_calls_saved": hits,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+
+def reset_fast_parse_stats() -> None:
+    """Reinicia los contadores del fast path"""
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+# ============================================================================
+# Extracción
+# ============================================================================
+
+def _strip_accents(text: str) -> str:
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+# Marca que ocupa el lugar de cada número de parte en el texto sin SKUs
+SKU_MARKER = "_sku_"
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(rf"{SKU_MARKER}|[a-z]+|\d+(?:[.,]\d{{3}})*", _strip_accents(text.lower()))
+
+
+def _without_skus(text: str) -> str:
+    """Reemplaza los números de parte por SKU_MARKER (para ubicar las cantidades)"""
+    return SKU_PATTERN.sub(f" {SKU_MARKER} ", text)
+
+
+def _next_to_sku(tokens: List[str], start: int, end: int) -> bool:
+    """True si tokens[start:end] está junto a un número de parte (salvo conectores)"""
+    i = start - 1
+    while i >= 0 and tokens[i] in SKU_CONNECTOR_WORDS:
+        i -= 1
+    if i >= 0 and tokens[i] == SKU_MARKER:
+        return True
+    
+    j = end
+    while j < len(tokens) and tokens[j] in SKU_CONNECTOR_WORDS:
+        j += 1
+    return j < len(tokens) and tokens[j] == SKU_MARKER
+
+
+def _has_context(tokens: List[str]) -> bool:
+    """True si hay plazos, fechas, identificadores o negaciones"""
+    return bool(CONTEXT_WORDS.intersection(tokens) or NEGATION_WORDS.intersection(tokens))
+
+
+def _words_to_number(words: List[str]) -> Optional[int]:
+    """Convierte una secuencia de palabras numéricas en entero"""
+    total = 0
+    current = 0
+    seen = False
+    
+    for word in words:
+        if word in NUMBER_CONNECTORS:
+            continue
+        if word in NUMBER_WORDS:
+            current += NUMBER_WORDS[word]
+            seen = True
+        elif word == "hundred":
+            current = max(current, 1) * 100
+            seen = True
+        elif word in MULTIPLIER_WORDS:
+            total += max(current, 1) * MULTIPLIER_WORDS[word]
+            current = 0
+            seen = True
+        else:
+            return None
+    
+    return total + current if seen else None
+
+
+def _is_number_word(token: str) -> bool:
+    return token in NUMBER_WORDS or token in MULTIPLIER_WORDS
+
+
+def _quantity_candidates(text: str) -> List[Tuple[int, bool]]:
+    """
+    Encuentra cantidades en el texto (números de parte como SKU_MARKER).
+    
+    Returns:
+        Lista de (cantidad, anclada): anclada si va seguida de una unidad o
+        junto a un número de parte
+    """
+    tokens = _tokenize(text)
+    candidates: List[Tuple[int, bool]] = []
+    i = 0
+    
+    while i < len(tokens):
+        token = tokens[i]
+        
+        if token[0].isdigit():
+            value = int(re.sub(r"[.,]", "", token))
+            j = i + 1
+            # "2 mil", "3 docenas"
+            while j < len(tokens) and tokens[j] in MULTIPLIER_WORDS:
+                value *= MULTIPLIER_WORDS[tokens[j]]
+                j += 1
+            followed_by_unit = j < len(tokens) and tokens[j] in UNIT_WORDS
+            candidates.append((value, followed_by_unit or _next_to_sku(tokens, i, j)))
+            i = j
+            continue
+        
+        if _is_number_word(token):
+            j = i
+            words = []
+            while j < len(tokens) and (
+                _is_number_word(tokens[j])
+                or (tokens[j] in NUMBER_CONNECTORS and j + 1 < len(tokens) and _is_number_word(tokens[j + 1]))
+            ):
+                words.append(tokens[j])
+                j += 1
+            value = _words_to_number(words)
+            if value is not None:
+                followed_by_unit = j < len(tokens) and tokens[j] in UNIT_WORDS
+                candidates.append((value, followed_by_unit or _next_to_sku(tokens, i, j)))
+            i = j
+            continue
+        
+        if token in ARTICLE_WORDS and i + 1 < len(tokens) and tokens[i + 1] in UNIT_WORDS:
+            candidates.append((1, True))
+            i += 2
+            continue
+        
+        i += 1
+    
+    return candidates
+
+
+def _pick_quantity(candidates: List[Tuple[int, bool]]) -> Optional[int]:
+    """Elige la cantidad solo si hay exactamente una anclada"""
+    anchored = [value for value, is_anchored in candidates if is_anchored]
+    if len(anchored) == 1:
+        return anchored[0]
+    
+    return None
+
+
+def extract_quote_fields(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Extrae part_number y quantity de un mensaje si no hay ambigüedad.
+    
+    Args:
+        text: Mensaje del usuario
+    
+    Returns:
+        {"part_number": ..., "quantity": ...} o None si el mensaje es ambiguo
+    """
+    if not text or AMBIGUOUS_NUMBER_PATTERN.search(text):
+        return None
+    
+    skus = {match.upper() for match in SKU_PATTERN.findall(text)}
+    if len(skus) != 1:
+        return None
+    
+    remainder = _without_skus(text)
+    tokens = _tokenize(remainder)
+    if CONTAINER_WORDS.intersection(tokens) or _has_context(tokens):
+        return None
+    
+    quantity = _pick_quantity(_quantity_candidates(remainder))
+    if quantity is None or quantity <= 0:
+        return None
+    
+    return {"part_number": skus.pop(), "quantity": quantity}
+
+
+def extract_quote_lines(text: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Extrae las líneas de un RFQ escrito con una parte por renglón.
+    
+    Cada renglón con número de parte debe ser inequívoco por sí solo;
+    los renglones sin números ("Hola, necesito cotizar:") se ignoran.
+    
+    Args:
+        text: Mensaje del usuario
+    
+    Returns:
+        Lista de {"part_number", "quantity"} (dos o más), o None
+    """
+    rows = [row for row in (text or "").splitlines() if row.strip()]
+    if len(rows) < 2:
+        return None
+    
+    lines = []
+    for row in rows:
+        if not SKU_PATTERN.search(row):
+            if re.search(r"\d", row) or _quantity_candidates(row):
+                return None
+            continue
+        fields = extract_quote_fields(row)
+        if fields is None:
+            return None
+        lines.append(fields)
+    
+    return lines if len(lines) >= 2 else None
+
+
+def fast_parse(text: str) -> Optional[QuoteRequest]:
+    """
+    Intenta construir un QuoteRequest sin LLM.
+    
+    Args:
+        text: Mensaje del usuario (ej: "Necesito 100 unidades de ABC-45")
+    
+    Returns:
+        QuoteRequest si el mensaje es inequívoco, None para derivar al LLM
+    """
+    lines = extract_quote_lines(text)
+    data = {"line_items": lines} if lines else extract_quote_fields(text)
+    _record(data is not None)
+    
+    if data is None:
+        return None
+    
+    return QuoteRequest(**data)
+
+
+def fast_path_confidence(text: str) -> float:
+    """
+    Qué tan cerca estuvo el mensaje de resolverse con reglas (0 a 1).
+    
+    1.0 si fast_parse lo resuelve; si no, suma crédito parcial por tener
+    números de parte y una cantidad clara, y lo pierde por decimales,
+    porcentajes o empaques. El router de modelos lo usa para elegir un
+    modelo rápido en los mensajes casi inequívocos.
+    """
+    if not text:
+        return 0.0
+    if extract_quote_lines(text) or extract_quote_fields(text):
+        return 1.0
+    
+    score = 0.0
+    skus = {match.upper() for match in SKU_PATTERN.findall(text)}
+    if len(skus) == 1:
+        score += 0.4
+    elif skus:
+        score += 0.3
+    
+    remainder = _without_skus(text)
+    candidates = _quantity_candidates(remainder)
+    if _pick_quantity(candidates) is not None:
+        score += 0.4
+    elif candidates:
+        score += 0.2
+    
+    tokens = _tokenize(remainder)
+    if AMBIGUOUS_NUMBER_PATTERN.search(text):
+        score -= 0.2
+    if CONTAINER_WORDS.intersection(tokens):
+        score -= 0.2
+    if _has_context(tokens):
+        score -= 0.2
+    
+    return max(0.0, min(score, 0.9))
+
+
+# ============================================================================
+# Cambios sobre una solicitud en curso
+# ============================================================================
+
+# "Cotiza las disponibles": la cantidad pasa a ser el stock disponible
+AVAILABLE_WORDS = {"disponible", "disponibles", "available"}
+
+# "Opción 1" se refiere a la lista de opciones, no a una cantidad
+OPTION_WORDS = {"opcion", "opciones", "option", "options"}
+
+# Palabras justo antes de una cantidad nueva sin unidad ("que sean 80",
+# "mejor ochenta", "make it 80")
+CHANGE_WORDS = {"sean", "seran", "mejor", "cambia", "cambialo", "cambiala", "ponle", "it"}
+
+# Agregan una línea en vez de reemplazar la vigente ("agrega 20 de XYZ-100")
+ADD_WORDS = {
+    "agrega", "agregale", "agregar", "agregues", "anade", "anadele", "anadir", "suma", "sumale",
+    "tambien", "ademas", "add", "also", "plus", "too",
+}
+
+
+def _change_quantity(remainder: str) -> Optional[int]:
+    """Cantidad única sin unidad dicha como cambio ("que sean 80")"""
+    tokens = _tokenize(remainder)
+    numbers = [i for i, token in enumerate(tokens) if token[0].isdigit() or _is_number_word(token)]
+    if not numbers or numbers[0] == 0 or tokens[numbers[0] - 1] not in CHANGE_WORDS:
+        return None
+    candidates = _quantity_candidates(remainder)
+    return candidates[0][0] if len(candidates) == 1 else None
+
+
+def extract_delta(
+    text: str,
+    request: QuoteRequest,
+    available_stock: Optional[int] = None
+) -> Optional[QuoteRequest]:
+    """
+    Aplica a una solicitud existente el cambio pedido en un turno siguiente.
+    
+    Reconoce respuestas de una sola modificación: "que sean 80" (cantidad),
+    "mejor ABC-46" o "ABC-46 en vez de ABC-45" (parte), "DEF-200, 50
+    unidades" (cantidad de una línea), "agrega 20 de XYZ-100" (línea
+    nueva) y "cotiza las disponibles". Como en
+    extract_quote_fields, un número solo es cantidad si lleva unidad, va
+    junto al número de parte o sigue a un "que sean"/"mejor"; con plazos,
+    fechas, identificadores o negaciones el mensaje va al LLM.
+    
+    Args:
+        text: Mensaje del usuario en este turno
+        request: Solicitud vigente de la sesión
+        available_stock: Stock visto en el turno anterior (solicitudes de
+                         una parte), para "las disponibles"
+    
+    Returns:
+        Solicitud actualizada, o None si el mensaje no es un cambio inequívoco
+    """
+    if not text or AMBIGUOUS_NUMBER_PATTERN.search(text):
+        return None
+    
+    skus = list(dict.fromkeys(match.upper() for match in SKU_PATTERN.findall(text)))
+    remainder = _without_skus(text)
+    tokens = set(_tokenize(remainder))
+    if tokens & CONTAINER_WORDS or tokens & OPTION_WORDS or _has_context(tokens):
+        return None
+    
+    candidates = _quantity_candidates(remainder)
+    quantity = _pick_quantity(candidates)
+    if quantity is None:
+        quantity = _change_quantity(remainder)
+    if candidates and (quantity is None or quantity <= 0):
+        return None
+    
+    current = [item.part_number for item in request.line_items]
+    known = [sku for sku in skus if sku in current]
+    new = [sku for sku in skus if sku not in current]
+    if len(known) > 1 or len(new) > 1:
+        return None
+    
+    if tokens & ADD_WORDS:
+        # Una línea nueva con su cantidad; "agrega 20 de ABC-45" (¿suma o
+        # reemplaza?) o sin cantidad va al LLM
+        if known or len(new) != 1 or not quantity:
+            return None
+        return QuoteRequest(
+            line_items=[
+                *({"part_number": item.part_number, "quantity": item.quantity} for item in request.line_items),
+                {"part_number": new[0], "quantity": quantity},
+            ],
+            customer_id=request.customer_id,
+            notes=request.notes
+        )
+    
+    if known:
+        target = known[0]
+    elif request.is_multi_line:
+        return None  # "que sean 80" no dice qué línea
+    else:
+        target = request.part_number
+    
+    if quantity is None and not new:
+        if available_stock and not request.is_multi_line and tokens & AVAILABLE_WORDS:
+            quantity = available_stock
+        else:
+            return None
+    
+    return QuoteRequest(
+        line_items=[
+            {
+                "part_number": new[0] if new and item.part_number == target else item.part_number,
+                "quantity": quantity if quantity and item.part_number == target else item.quantity,
+            }
+            for item in request.line_items
+        ],
+        customer_id=request.customer_id,
+        notes=request.notes
+    )
+
+
+def fast_parse_delta(
+    text: str,
+    request: QuoteRequest,
+    available_stock: Optional[int] = None
+) -> Optional[QuoteRequest]:
+    """
+    Intenta aplicar sin LLM el cambio de un turno siguiente.
+    
+    Un mensaje que es una solicitud completa ("Necesito 50 unidades de
+    DEF-200") también se resuelve aquí, como reemplazo.
+    
+    Returns:
+        Solicitud actualizada, o None para derivar al LLM
+    """
+    updated = extract_delta(text, request, available_stock)
+    _record(updated is not None)
+    return updated
+
+
+# ============================================================================
+# Aceptación de una cotización
+# ============================================================================
+
+# Frases que aceptan explícitamente; un "ok" o "sí" suelto no basta
+ACCEPT_WORDS = {
+    # Español
+    "procede", "proceder", "procedamos", "confirmo", "confirmado", "confirmamos",
+    "acepto", "aceptamos", "adelante", "hazlo", "ordena", "ordenala",
+    # English
+    "proceed", "confirm", "confirmed", "accept", "accepted",
+}
+ACCEPT_PHRASES = {("go", "ahead")}
+
+# Palabras que pueden acompañar la aceptación sin cambiarla
+ACCEPT_FILLER_WORDS = {
+    # Español
+    "si", "ok", "vale", "dale", "perfecto", "de", "acuerdo", "por", "favor",
+    "entonces", "con", "la", "el", "lo", "esa", "esta", "orden", "cotizacion",
+    # English
+    "yes", "okay", "sure", "please", "then", "with", "the", "it", "that", "this",
+    "order", "quote", "go", "ahead",
+}
+
+
+def is_confirmation(text: str) -> bool:
+    """
+    True si el mensaje acepta explícitamente la cotización ("sí, procede",
+    "confirmo", "acepto", "go ahead").
+    
+    Aceptar registra una orden real, así que ante la duda es False: un "ok"
+    o "sí" suelto, una pregunta ("ok, ¿cuál es el plazo?") o cualquier
+    otra palabra ("ok gracias", cantidades, números de parte, negaciones)
+    no es una aceptación.
+    """
+    if not text or "?" in text or "¿" in text or SKU_PATTERN.search(text) or re.search(r"\d", text):
+        return False
+    
+    tokens = _tokenize(text)
+    if not tokens or not set(tokens) <= ACCEPT_WORDS | ACCEPT_FILLER_WORDS:
+        return False
+    
+    return bool(ACCEPT_WORDS.intersection(tokens)) or any(pair in ACCEPT_PHRASES for pair in zip(tokens, tokens[1:]))
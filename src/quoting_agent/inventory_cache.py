@@ -0,0 +1,436 @@
+"""
+Caché read-through de registros de inventario (stock, precio, lead time)
+
+Guarda el registro crudo por número de parte; el status de disponibilidad
+se sigue calculando por cantidad solicitada (InventoryResult.from_record).
+Un miss concurrente sobre la misma parte dispara una sola carga al ERP
+(single-flight), tanto entre hilos como entre corrutinas, y también
+entre consultas de varias partes que se superponen.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .config import config
+
+
+Record = Optional[Dict[str, Any]]
+
+
+class _InFlight:
+    """Carga en curso compartida por los hilos que esperan la misma parte"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.record: Record = None
+        self.error: Optional[BaseException] = None
+
+
+class InventoryCache:
+    """
+    Caché con TTL por parte, invalidación explícita y protección de estampida.
+    
+    Las partes inexistentes (registro None) también se cachean, para que
+    un SKU desconocido consultado en ráfaga no llegue al ERP cada vez.
+    """
+    
+    def __init__(
+        self,
+        ttl_seconds: float = 5.0,
+        ttl_overrides: Optional[Dict[str, float]] = None,
+        max_entries: int = 10_000
+    ):
+        """
+        Args:
+            ttl_seconds: TTL por defecto de cada registro
+            ttl_overrides: TTL específico por número de parte
+            max_entries: Tope de registros en caché
+        """
+        self.ttl_seconds = ttl_seconds
+        self.ttl_overrides: Dict[str, float] = dict(ttl_overrides or {})
+        self.max_entries = max_entries
+        
+        self._entries: Dict[str, Tuple[Record, float]] = {}
+        # Invalidaciones numeradas: una carga no se guarda si su parte se
+        # invalidó después de empezar (solo se recuerdan mientras alguna
+        # carga en curso puede necesitarlas)
+        self._sequence = 0
+        self._cleared_at = 0
+        self._invalidated: Dict[str, int] = {}
+        self._loading: Dict[int, int] = {}
+        self._inflight: Dict[str, _InFlight] = {}
+        self._ainflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "coalesced": 0, "invalidations": 0}
+    
+    # ------------------------------------------------------------------------
+    # TTL e invalidación
+    # ------------------------------------------------------------------------
+    
+    def ttl_for(self, part_number: str) -> float:
+        """TTL aplicable a una parte"""
+        return self.ttl_overrides.get(part_number, self.ttl_seconds)
+    
+    def set_ttl(self, part_number: str, ttl_seconds: Optional[float]) -> None:
+        """Define (o elimina con None) el TTL específico de una parte"""
+        with self._lock:
+            if ttl_seconds is None:
+                self.ttl_overrides.pop(part_number, None)
+            else:
+                self.ttl_overrides[part_number] = ttl_seconds
+    
+    def invalidate(self, part_number: Optional[str] = None) -> None:
+        """
+        Invalida una parte (o toda la caché si part_number es None).
+        
+        Una carga que esté en curso al invalidar no se guarda en caché.
+        """
+        with self._lock:
+            self._stats["invalidations"] += 1
+            self._sequence += 1
+            if part_number is None:
+                self._cleared_at = self._sequence
+                self._entries.clear()
+                self._invalidated.clear()
+            else:
+                self._entries.pop(part_number, None)
+                if self._loading:
+                    self._invalidated[part_number] = self._sequence
+                    if len(self._invalidated) > self.max_entries:
+                        self._prune_invalidations()
+    
+    def _prune_invalidations(self) -> None:
+        """Olvida las invalidaciones anteriores a toda carga en curso (requiere self._lock)"""
+        oldest = min(self._loading, default=self._sequence)
+        self._invalidated = {
+            part_number: sequence for part_number, sequence in self._invalidated.items() if sequence > oldest
+        }
+    
+    # ------------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------------
+    
+    def _lookup(self, part_number: str, now: float) -> Tuple[bool, Record]:
+        """Busca un registro vigente (requiere self._lock)"""
+        entry = self._entries.get(part_number)
+        if entry is not None:
+            record, expires_at = entry
+            if now < expires_at:
+                self._stats["hits"] += 1
+                return True, record
+            del self._entries[part_number]
+        return False, None
+    
+    def _begin_load(self) -> int:
+        """Registra una carga en curso; retorna su número (requiere self._lock)"""
+        self._loading[self._sequence] = self._loading.get(self._sequence, 0) + 1
+        return self._sequence
+    
+    def _end_load(self, started: int) -> None:
+        """Da por terminada una carga (requiere self._lock)"""
+        self._loading[started] -= 1
+        if not self._loading[started]:
+            del self._loading[started]
+        if not self._loading:
+            self._invalidated.clear()
+    
+    def _store(self, part_number: str, record: Record, started: int) -> None:
+        """Guarda un registro cargado si no hubo invalidación (requiere self._lock)"""
+        if max(self._cleared_at, self._invalidated.get(part_number, 0)) > started:
+            return
+        
+        if len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            for key in [k for k, (_, exp) in self._entries.items() if exp <= now]:
+                del self._entries[key]
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+        
+        self._entries[part_number] = (record, time.monotonic() + self.ttl_for(part_number))
+    
+    def get_or_load(self, part_number: str, loader: Callable[[str], Record]) -> Record:
+        """
+        Retorna el registro cacheado o lo carga con loader.
+        
+        Si otro hilo ya está cargando la misma parte, espera su resultado
+        en lugar de llamar al loader otra vez.
+        
+        Args:
+            part_number: Número de parte normalizado
+            loader: Función que consulta la fuente (ej: ERP)
+        
+        Returns:
+            Registro crudo, o None si la parte no existe
+        """
+        with self._lock:
+            found, record = self._lookup(part_number, time.monotonic())
+            if found:
+                return record
+            
+            inflight = self._inflight.get(part_number)
+            leader = inflight is None
+            if leader:
+                inflight = _InFlight()
+                self._inflight[part_number] = inflight
+                started = self._begin_load()
+                self._stats["misses"] += 1
+                self._stats["loads"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        
+        if not leader:
+            return self._wait(inflight)
+        
+        try:
+            inflight.record = loader(part_number)
+            with self._lock:
+                self._store(part_number, inflight.record, started)
+            return inflight.record
+        except BaseException as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(part_number, None)
+                self._end_load(started)
+            inflight.done.set()
+    
+    @staticmethod
+    def _wait(inflight: _InFlight) -> Record:
+        """Resultado de la carga de otro hilo"""
+        inflight.done.wait()
+        if inflight.error is not None:
+            raise inflight.error
+        return inflight.record
+    
+    async def aget_or_load(
+        self,
+        part_number: str,
+        loader: Callable[[str], Awaitable[Record]]
+    ) -> Record:
+        """Versión asíncrona de get_or_load (single-flight por event loop)"""
+        loop = asyncio.get_running_loop()
+        
+        with self._lock:
+            found, record = self._lookup(part_number, time.monotonic())
+            if found:
+                return record
+            
+            pending = self._ainflight.setdefault(loop, {})
+            future = pending.get(part_number)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                pending[part_number] = future
+                started = self._begin_load()
+                self._stats["misses"] += 1
+                self._stats["loads"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        
+        if not leader:
+            return await asyncio.shield(future)
+        
+        try:
+            record = await loader(part_number)
+            with self._lock:
+                self._store(part_number, record, started)
+            future.set_result(record)
+            return record
+        except BaseException as e:
+            _fail(future, e)
+            raise
+        finally:
+            with self._lock:
+                pending.pop(part_number, None)
+                self._end_load(started)
+    
+    def _claim_many(
+        self,
+        part_numbers: List[str],
+        inflight: Dict[str, Any],
+        new: Callable[[], Any]
+    ) -> Tuple[Dict[str, Record], Dict[str, Any], Dict[str, Any], int]:
+        """
+        Separa las partes en hits, cargas propias y cargas de otros.
+        
+        Args:
+            inflight: Cargas en curso (de hilos o del event loop)
+            new: Crea la marca de una carga propia
+        
+        Returns:
+            (registros vigentes, partes a cargar → marca, partes que ya
+            carga otro → su marca, número de la carga)
+        """
+        records: Dict[str, Record] = {}
+        leading: Dict[str, Any] = {}
+        waiting: Dict[str, Any] = {}
+        now = time.monotonic()
+        
+        with self._lock:
+            for part_number in part_numbers:
+                if part_number in records or part_number in leading or part_number in waiting:
+                    continue
+                found, record = self._lookup(part_number, now)
+                if found:
+                    records[part_number] = record
+                elif part_number in inflight:
+                    waiting[part_number] = inflight[part_number]
+                    self._stats["coalesced"] += 1
+                else:
+                    leading[part_number] = inflight[part_number] = new()
+                    self._stats["misses"] += 1
+            started = self._begin_load()
+            if leading:
+                self._stats["loads"] += 1
+        
+        return records, leading, waiting, started
+    
+    def _finish_many(
+        self,
+        leading: Dict[str, Any],
+        inflight: Dict[str, Any],
+        started: int,
+        loaded: Optional[Dict[str, Record]]
+    ) -> None:
+        """Guarda lo cargado (None si falló) y libera las partes en curso"""
+        with self._lock:
+            for part_number in leading:
+                if loaded is not None:
+                    self._store(part_number, loaded.get(part_number), started)
+                inflight.pop(part_number, None)
+            self._end_load(started)
+    
+    def get_many_or_load(
+        self,
+        part_numbers: List[str],
+        loader_many: Callable[[List[str]], Dict[str, Record]]
+    ) -> Dict[str, Record]:
+        """
+        Retorna los registros de varias partes; los misses se cargan juntos.
+        
+        Las partes que ya está cargando otro hilo (por una consulta de una
+        o de varias partes) no se vuelven a pedir: se espera su resultado.
+        
+        Args:
+            part_numbers: Números de parte normalizados
+            loader_many: Función que consulta varias partes en una llamada
+        
+        Returns:
+            Registro por parte (None si no existe)
+        """
+        records, leading, waiting, started = self._claim_many(part_numbers, self._inflight, _InFlight)
+        
+        loaded = None
+        try:
+            if leading:
+                loaded = loader_many(list(leading))
+                for part_number, inflight in leading.items():
+                    inflight.record = records[part_number] = loaded.get(part_number)
+        except BaseException as e:
+            for inflight in leading.values():
+                inflight.error = e
+            raise
+        finally:
+            self._finish_many(leading, self._inflight, started, loaded)
+            for inflight in leading.values():
+                inflight.done.set()
+        
+        # Después de la carga propia: dos consultas que esperan una parte
+        # de la otra no se bloquean entre sí
+        for part_number, inflight in waiting.items():
+            records[part_number] = self._wait(inflight)
+        return records
+    
+    async def aget_many_or_load(
+        self,
+        part_numbers: List[str],
+        loader_many: Callable[[List[str]], Awaitable[Dict[str, Record]]]
+    ) -> Dict[str, Record]:
+        """Versión asíncrona de get_many_or_load (single-flight por event loop)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pending = self._ainflight.setdefault(loop, {})
+        records, leading, waiting, started = self._claim_many(part_numbers, pending, loop.create_future)
+        
+        loaded = None
+        try:
+            if leading:
+                loaded = await loader_many(list(leading))
+                for part_number, future in leading.items():
+                    records[part_number] = loaded.get(part_number)
+                    future.set_result(records[part_number])
+        except BaseException as e:
+            for future in leading.values():
+                if not future.done():
+                    _fail(future, e)
+            raise
+        finally:
+            self._finish_many(leading, pending, started, loaded)
+        
+        for part_number, future in waiting.items():
+            records[part_number] = await asyncio.shield(future)
+        return records
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de la caché.
+        
+        Returns:
+            Diccionario con hits, misses, loads (llamadas reales a la fuente),
+            coalesced (esperas evitadas por single-flight), invalidations,
+            size y hit_rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+        return stats
+
+
+def _fail(future: asyncio.Future, error: BaseException) -> None:
+    future.set_exception(error)
+    # Marca la excepción como recuperada si nadie más esperaba
+    future.exception()
+
+
+# ============================================================================
+# Instancia global
+# ============================================================================
+
+def _parse_ttl_overrides(raw: str) -> Dict[str, float]:
+    """Convierte "ABC-45=2,XYZ-100=30" en {"ABC-45": 2.0, "XYZ-100": 30.0}"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        part_number, _, ttl = item.partition("=")
+        overrides[part_number.strip().upper()] = float(ttl)
+    return overrides
+
+
+_cache: Optional[InventoryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_inventory_cache() -> InventoryCache:
+    """Retorna la caché de inventario compartida del proceso"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = InventoryCache(
+                    ttl_seconds=config.INVENTORY_CACHE_TTL_SECONDS,
+                    ttl_overrides=_parse_ttl_overrides(config.INVENTORY_CACHE_TTL_OVERRIDES),
+                    max_entries=config.INVENTORY_CACHE_MAX_ENTRIES
+                )
+    return _cache
+
+
+def invalidate_inventory(part_number: Optional[str] = None) -> None:
+    """Invalida una parte (o todo) en la caché global, ej: tras un webhook del ERP"""
+    get_inventory_cache().invalidate(part_number.strip().upper() if part_number else None)
@@ -0,0 +1,202 @@
+"""
+Agrupación de consultas de inventario (estilo dataloader)
+
+Las partes pedidas por conversaciones concurrentes dentro de una ventana
+corta se envían al ERP en una sola llamada bulk, y cada llamador recibe
+solo su registro. Se sitúa detrás de la caché de inventario: la caché
+resuelve hits y colapsa misses de la misma parte; el loader agrupa los
+misses de partes distintas.
+"""
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .config import config
+
+
+Record = Optional[Dict[str, Any]]
+BatchFn = Callable[[List[str]], Dict[str, Record]]
+AsyncBatchFn = Callable[[List[str]], Awaitable[Dict[str, Record]]]
+
+
+class InventoryBatchLoader:
+    """
+    Acumula part numbers durante window_seconds y los resuelve en bloque.
+    
+    Un lote se envía al cumplirse la ventana o al llegar a max_batch_size,
+    lo que ocurra primero. Las partes repetidas dentro del lote se piden
+    una sola vez.
+    """
+    
+    def __init__(
+        self,
+        batch_fn: BatchFn,
+        abatch_fn: Optional[AsyncBatchFn] = None,
+        window_seconds: float = 0.005,
+        max_batch_size: int = 100
+    ):
+        """
+        Args:
+            batch_fn: Consulta bulk sync (ej: ERPClient.get_inventory_many)
+            abatch_fn: Consulta bulk async (ej: ERPClient.aget_inventory_many)
+            window_seconds: Tiempo máximo que espera un lote en formarse
+            max_batch_size: Partes distintas por llamada bulk
+        """
+        self.batch_fn = batch_fn
+        self.abatch_fn = abatch_fn
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Future]] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._apending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, List[asyncio.Future]]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._stats = {"loads": 0, "batches": 0, "keys_sent": 0}
+    
+    # ------------------------------------------------------------------------
+    # Sync (hilos)
+    # ------------------------------------------------------------------------
+    
+    def load(self, part_number: str) -> Record:
+        """
+        Retorna el registro de una parte, agrupando con otros hilos.
+        
+        Raises:
+            Exception: La que haya lanzado la consulta bulk del lote
+        """
+        future: Future = Future()
+        flush_now = False
+        
+        with self._lock:
+            self._stats["loads"] += 1
+            self._pending.setdefault(part_number, []).append(future)
+            
+            if len(self._pending) >= self.max_batch_size:
+                flush_now = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        
+        if flush_now:
+            self._flush()
+        
+        return future.result()
+    
+    def _flush(self) -> None:
+        """Envía el lote pendiente en una sola llamada bulk"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not batch:
+                return
+            self._stats["batches"] += 1
+            self._stats["keys_sent"] += len(batch)
+        
+        try:
+            records = self.batch_fn(list(batch))
+        except BaseException as e:
+            for futures in batch.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        
+        for part_number, futures in batch.items():
+            for future in futures:
+                future.set_result(records.get(part_number))
+    
+    # ------------------------------------------------------------------------
+    # Async (un lote pendiente por event loop)
+    # ------------------------------------------------------------------------
+    
+    async def aload(self, part_number: str) -> Record:
+        """Versión asíncrona de load"""
+        if self.abatch_fn is None:
+            return await asyncio.to_thread(self.load, part_number)
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        with self._lock:
+            self._stats["loads"] += 1
+            pending = self._apending.get(loop)
+            if pending is None:
+                pending = self._apending[loop] = {}
+                loop.call_later(self.window_seconds, self._aflush_soon, loop)
+            pending.setdefault(part_number, []).append(future)
+            flush_now = len(pending) >= self.max_batch_size
+        
+        if flush_now:
+            self._aflush_soon(loop)
+        
+        return await future
+    
+    def _aflush_soon(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Toma el lote pendiente del loop y programa su envío"""
+        with self._lock:
+            batch = self._apending.pop(loop, None)
+            if not batch:
+                return
+            self._stats["batches"] += 1
+            self._stats["keys_sent"] += len(batch)
+        loop.create_task(self._aflush(batch))
+    
+    async def _aflush(self, batch: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            records = await self.abatch_fn(list(batch))
+        except BaseException as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        for part_number, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(records.get(part_number))
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de agrupación.
+        
+        Returns:
+            Diccionario con loads (consultas recibidas), batches (llamadas
+            bulk al ERP), keys_sent y requests_saved
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["requests_saved"] = stats["loads"] - stats["batches"]
+        stats["avg_batch_size"] = stats["keys_sent"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+
+# ============================================================================
+# Instancia global
+# ============================================================================
+
+_loader: Optional[InventoryBatchLoader] = None
+_loader_lock = threading.Lock()
+
+
+def get_inventory_loader() -> InventoryBatchLoader:
+    """Retorna el loader compartido del proceso, conectado al ERP"""
+    global _loader
+    if _loader is None:
+        with _loader_lock:
+            if _loader is None:
+                from .tools import check_inventory_many, acheck_inventory_many
+                _loader = InventoryBatchLoader(
+                    batch_fn=check_inventory_many,
+                    abatch_fn=acheck_inventory_many,
+                    window_seconds=config.INVENTORY_BATCH_WINDOW_MS / 1000,
+                    max_batch_size=config.INVENTORY_BATCH_MAX_SIZE
+                )
+    return _loader
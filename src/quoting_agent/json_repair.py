@@ -0,0 +1,136 @@
+"""
+Reparación local del JSON que devuelven los LLM
+
+Antes de dar por fallida una respuesta (y pedirle al cliente que
+reformule) se corrigen localmente los defectos típicos:
+- texto antes o después del JSON, o un bloque ```json en cualquier lugar
+- comas finales antes de } o ]
+- comillas simples, claves sin comillas, True/False/None de Python
+- comentarios // y /* */
+- respuestas truncadas entre miembros de un objeto (faltan las llaves de
+  cierre); un valor cortado a la mitad o una lista sin cerrar no se
+  adivinan
+
+Todo es puro texto, sin llamadas al modelo: cuesta microsegundos.
+"""
+
+import json
+import re
+from typing import Any, List
+
+_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+_UNQUOTED_KEY_PATTERN = re.compile(r"([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)(\s*:)")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _extract(text: str) -> str:
+    """El bloque JSON del texto: dentro del fence si lo hay, desde la primera llave"""
+    fence = _FENCE_PATTERN.search(text)
+    if fence is not None:
+        text = fence.group(1)
+    
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return text.strip()
+    text = text[min(starts):]
+    
+    # Sin texto después del último cierre (si la respuesta no viene truncada)
+    end = max(text.rfind("}"), text.rfind("]"))
+    if end >= 0 and not _unclosed(text[:end + 1]):
+        text = text[:end + 1]
+    return text.strip()
+
+
+def _tokens(text: str):
+    """(es_string, fragmento) alternando código y strings entre comillas"""
+    i, start, quote = 0, 0, None
+    while i < len(text):
+        char = text[i]
+        if quote is None and char in "\"'":
+            if start < i:
+                yield False, text[start:i]
+            start, quote = i, char
+        elif quote is not None and char == "\\":
+            i += 1
+        elif quote is not None and char == quote:
+            yield True, text[start:i + 1]
+            start, quote = i + 1, None
+        i += 1
+    if start < len(text):
+        # Un string sin cerrar (respuesta truncada) no se completa
+        yield False, text[start:]
+
+
+def _unclosed(text: str) -> List[str]:
+    """Llaves y corchetes abiertos sin cerrar, en orden"""
+    stack: List[str] = []
+    for is_string, fragment in _tokens(text):
+        if is_string:
+            continue
+        for char in fragment:
+            if char in _CLOSERS:
+                stack.append(char)
+            elif char in "}]" and stack:
+                stack.pop()
+    return stack
+
+
+def _fix_code(fragment: str) -> str:
+    """Correcciones fuera de los strings"""
+    fragment = re.sub(r"//[^\n]*", "", fragment)
+    fragment = re.sub(r"/\*.*?\*/", "", fragment, flags=re.DOTALL)
+    fragment = _UNQUOTED_KEY_PATTERN.sub(r'\1"\2"\3', fragment)
+    for literal, value in _PYTHON_LITERALS.items():
+        fragment = re.sub(rf"\b{literal}\b", value, fragment)
+    return fragment
+
+
+def _fix_string(fragment: str) -> str:
+    """'texto' → "texto" (escapando las comillas dobles internas)"""
+    if fragment.startswith("'"):
+        inner = fragment[1:-1].replace('\\"', '"').replace("\\'", "'").replace('"', '\\"')
+        return f'"{inner}"'
+    return fragment
+
+
+def repair_json(text: str) -> str:
+    """
+    Corrige localmente el JSON de una respuesta del LLM.
+    
+    Returns:
+        Texto JSON corregido (puede seguir siendo inválido si la respuesta
+        no traía JSON)
+    """
+    text = _extract(text)
+    text = "".join(_fix_string(f) if is_string else _fix_code(f) for is_string, f in _tokens(text))
+    
+    # Cerrar lo que dejó abierto una respuesta truncada, solo si se cortó
+    # entre miembros de un objeto: un número o string a medias
+    # ("quantity": 2…) podría ser otro valor, y en una lista sin cerrar
+    # ("line_items": [{…}, …) pueden faltar líneas. En esos casos es mejor
+    # reintentar que cotizar otra cosa
+    text = text.rstrip()
+    unclosed = _unclosed(text)
+    if text.endswith(("}", "]", ",")) and "[" not in unclosed:
+        text = text.rstrip(",")
+        text += "}" * len(unclosed)
+    
+    return _TRAILING_COMMA_PATTERN.sub(r"\1", text)
+
+
+def loads_lenient(text: str) -> Any:
+    """
+    json.loads con reparación local si el texto no es JSON válido.
+    
+    Raises:
+        json.JSONDecodeError: El error original, si ni reparado es JSON
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as original:
+        try:
+            return json.loads(repair_json(text))
+        except json.JSONDecodeError:
+            raise original
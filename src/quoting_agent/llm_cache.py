@@ -0,0 +1,391 @@
+"""
+Caché de respuestas del LLM - memoria (LRU) + SQLite compartido entre procesos
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+
+from .config import config
+from .llm_failover import ProviderChain
+from .llm_validation import is_valid_answer
+from .model_router import ModelRouter
+from .tracing import get_tracer
+
+
+# Cada cuántas escrituras se aplica el tope de tamaño en disco
+_PRUNE_EVERY = 256
+
+
+class LLMResponseCache:
+    """
+    Caché de dos niveles para respuestas del LLM.
+    
+    - Nivel 1: LRU en memoria del proceso
+    - Nivel 2: SQLite en disco (modo WAL), compartido por los workers
+    
+    Ambos niveles respetan el mismo TTL; el nivel en disco se poda por
+    último acceso cuando supera max_entries.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = 86400,
+        max_entries: int = 100_000,
+        memory_entries: int = 1024
+    ):
+        """
+        Args:
+            path: Archivo SQLite (None = solo memoria)
+            ttl_seconds: Vida de cada entrada
+            max_entries: Tope de entradas en disco
+            memory_entries: Tope de entradas en memoria
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)"
+            )
+            self._conn.commit()
+    
+    @staticmethod
+    def make_key(messages: List[BaseMessage], llm_config: Dict[str, Any]) -> str:
+        """
+        Genera la clave de caché.
+        
+        Normaliza el historial (tipo + contenido sin espacios redundantes)
+        y lo combina con proveedor, modelo y temperatura. La API key no
+        forma parte de la clave.
+        """
+        history = [
+            (message.type, " ".join(str(message.content).split()))
+            for message in messages
+        ]
+        payload = json.dumps(
+            {
+                "provider": llm_config["provider"],
+                "model": llm_config["model"],
+                "temperature": llm_config["temperature"],
+                "messages": history,
+            },
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Retorna la respuesta cacheada o None si no existe o expiró"""
+        return self.get_first([key])
+    
+    def get_first(self, keys: List[str]) -> Optional[str]:
+        """
+        Primera respuesta cacheada entre varias claves (en orden).
+        
+        Cuenta un solo hit o miss para toda la consulta.
+        """
+        now = time.time()
+        
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    value, created_at = entry
+                    if now - created_at < self.ttl_seconds:
+                        self._memory.move_to_end(key)
+                        self._stats["memory_hits"] += 1
+                        return value
+                    del self._memory[key]
+            
+            if self._conn is not None:
+                for key in keys:
+                    value = self._disk_get(key, now)
+                    if value is not None:
+                        self._stats["disk_hits"] += 1
+                        return value
+            
+            self._stats["misses"] += 1
+            return None
+    
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        """Lee una entrada vigente del nivel en disco (requiere self._lock)"""
+        row = self._conn.execute(
+            "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        value, created_at = row
+        if now - created_at < self.ttl_seconds:
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self._remember(key, value, created_at)
+            return value
+        
+        self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+        self._conn.commit()
+        return None
+    
+    def set(self, key: str, value: str) -> None:
+        """Guarda una respuesta en ambos niveles"""
+        now = time.time()
+        
+        with self._lock:
+            self._remember(key, value, now)
+            
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._writes += 1
+                if self._writes % _PRUNE_EVERY == 0:
+                    self._prune(now)
+                self._conn.commit()
+    
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        """Inserta en el LRU en memoria (requiere self._lock)"""
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+    
+    def _prune(self, now: float) -> None:
+        """Elimina entradas expiradas y aplica el tope en disco (requiere self._lock)"""
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl_seconds,)
+        )
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+            self._stats["evictions"] += excess
+    
+    def clear(self) -> None:
+        """Vacía ambos niveles"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de la caché.
+        
+        Returns:
+            Diccionario con hits por nivel, misses, evictions,
+            hit_rate y tamaño de cada nivel
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_size"] = len(self._memory)
+            stats["disk_size"] = (
+                self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+                if self._conn is not None else 0
+            )
+        
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        total = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = hits / total if total else 0.0
+        return stats
+
+
+# ============================================================================
+# Instancia global
+# ============================================================================
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Retorna la caché compartida del proceso (se crea en el primer uso)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache(
+                    path=config.LLM_CACHE_PATH or None,
+                    ttl_seconds=config.LLM_CACHE_TTL_SECONDS,
+                    max_entries=config.LLM_CACHE_MAX_ENTRIES,
+                    memory_entries=config.LLM_CACHE_MEMORY_ENTRIES
+                )
+    return _cache
+
+
+def _record_usage(span, message: AIMessage) -> str:
+    """Anota los tokens de la respuesta en el span y retorna el contenido"""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        span.set("input_tokens", usage.get("input_tokens", 0))
+        span.set("output_tokens", usage.get("output_tokens", 0))
+    return message.content
+
+
+def _invoke(llm: BaseChatModel, messages: List[BaseMessage], validate: Optional[Callable[[str], Any]]) -> AIMessage:
+    """llm.invoke; la cadena de proveedores y el router reciben además el validador"""
+    if isinstance(llm, (ProviderChain, ModelRouter)):
+        return llm.invoke(messages, validate=validate)
+    return llm.invoke(messages)
+
+
+async def _ainvoke(llm: BaseChatModel, messages: List[BaseMessage], validate: Optional[Callable[[str], Any]]) -> AIMessage:
+    if isinstance(llm, (ProviderChain, ModelRouter)):
+        return await llm.ainvoke(messages, validate=validate)
+    return await llm.ainvoke(messages)
+
+
+def _accepted_configs(llm: BaseChatModel, llm_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Modelos cuyas respuestas cacheadas sirven para este cliente, en orden.
+    
+    Con el router, las del fuerte y las del rápido (ya validadas); con una
+    cadena, solo las del proveedor principal: una respuesta de un fallback
+    no se sirve cuando el principal está sano.
+    """
+    if isinstance(llm, ModelRouter):
+        return [{**llm_config, "model": llm.strong_model}, {**llm_config, "model": llm.fast_model}]
+    return [llm_config]
+
+
+def _answered_config(message: AIMessage, llm_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Config del modelo que respondió (anotado por la cadena y el router)"""
+    metadata = getattr(message, "response_metadata", None) or {}
+    provider = metadata.get("llm_provider")
+    if provider and provider != llm_config["provider"]:
+        return config.get_provider_config(provider)
+    if metadata.get("llm_model"):
+        return {**llm_config, "model": metadata["llm_model"]}
+    return llm_config
+
+
+def _lookup(
+    cache: LLMResponseCache,
+    llm: BaseChatModel,
+    messages: List[BaseMessage],
+    llm_config: Dict[str, Any]
+) -> Optional[str]:
+    keys = [cache.make_key(messages, accepted) for accepted in _accepted_configs(llm, llm_config)]
+    return cache.get_first(keys)
+
+
+def _store(
+    cache: LLMResponseCache,
+    messages: List[BaseMessage],
+    message: AIMessage,
+    llm_config: Dict[str, Any],
+    validate: Optional[Callable[[str], Any]]
+) -> None:
+    """Guarda la respuesta bajo el modelo que la produjo, solo si es válida (un {} también)"""
+    answered = _answered_config(message, llm_config)
+    if answered["temperature"] != 0:
+        return
+    if not is_valid_answer(message.content, validate):
+        return  # La resuelve el reintento o el cliente; no se repite desde la caché
+    cache.set(cache.make_key(messages, answered), message.content)
+
+
+def cached_invoke(
+    llm: BaseChatModel,
+    messages: List[BaseMessage],
+    validate: Optional[Callable[[str], Any]] = None
+) -> str:
+    """
+    Invoca el LLM pasando por la caché de respuestas.
+    
+    Solo se cachea con temperatura 0: con otra temperatura la respuesta
+    no es determinista y se invoca siempre al modelo. La respuesta se
+    guarda con la clave del modelo que realmente respondió (el rápido o
+    el fuerte del router, o el fallback de una cadena) y, con validate,
+    solo si pasa la validación. Cada llamada queda como un span "llm" con
+    tokens y acierto de caché.
+    
+    Args:
+        llm: Cliente LLM (o cadena de proveedores / router de modelos)
+        messages: Historial completo enviado al modelo
+        validate: Función que lanza excepción si la respuesta no sirve:
+            no se cachea y, con una cadena o el router, se prueba el
+            siguiente proveedor o el modelo fuerte
+    
+    Returns:
+        Contenido de la respuesta del modelo
+    """
+    llm_config = config.get_llm_config()
+    
+    with get_tracer().span("llm", llm_config["model"]) as span:
+        if not config.LLM_CACHE_ENABLED or llm_config["temperature"] != 0:
+            return _record_usage(span, _invoke(llm, messages, validate))
+        
+        cache = get_llm_cache()
+        content = _lookup(cache, llm, messages, llm_config)
+        span.set("cache_hit", content is not None)
+        if content is None:
+            message = _invoke(llm, messages, validate)
+            content = _record_usage(span, message)
+            _store(cache, messages, message, llm_config, validate)
+        
+        return content
+
+
+async def acached_invoke(
+    llm: BaseChatModel,
+    messages: List[BaseMessage],
+    validate: Optional[Callable[[str], Any]] = None
+) -> str:
+    """Versión asíncrona de cached_invoke (usa llm.ainvoke)"""
+    llm_config = config.get_llm_config()
+    
+    with get_tracer().span("llm", llm_config["model"]) as span:
+        if not config.LLM_CACHE_ENABLED or llm_config["temperature"] != 0:
+            return _record_usage(span, await _ainvoke(llm, messages, validate))
+        
+        cache = get_llm_cache()
+        content = _lookup(cache, llm, messages, llm_config)
+        span.set("cache_hit", content is not None)
+        if content is None:
+            message = await _ainvoke(llm, messages, validate)
+            content = _record_usage(span, message)
+            _store(cache, messages, message, llm_config, validate)
+        
+        return content
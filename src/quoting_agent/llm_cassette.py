@@ -0,0 +1,238 @@
+"""
+Grabación y reproducción de llamadas al LLM (LLM_PROVIDER=record | replay)
+
+- record: envuelve al proveedor real (LLM_RECORD_PROVIDER) y agrega cada
+  par prompt/respuesta al cassette LLM_CASSETTE_PATH, con la latencia
+  medida y los tokens reportados
+- replay: sirve las respuestas del cassette sin red; con
+  LLM_REPLAY_LATENCY=true espera la latencia grabada, así una corrida de
+  carga reproduce el perfil de latencia de producción
+
+El cassette es un archivo JSON lines (una llamada por línea, legible y
+fácil de versionar). Al abrirlo se indexa por la huella del historial
+normalizado: un prompt grabado varias veces conserva todas sus
+respuestas y el replay las rota en orden.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class CassetteMissError(LookupError):
+    """El prompt no está grabado en el cassette"""
+
+
+def prompt_key(messages: List[BaseMessage]) -> str:
+    """
+    Huella del historial (tipo + contenido sin espacios redundantes).
+    
+    No incluye proveedor ni modelo: un cassette grabado con Gemini se
+    reproduce igual con cualquier configuración.
+    """
+    history = [(message.type, " ".join(str(message.content).split())) for message in messages]
+    payload = json.dumps(history, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Archivo JSON lines de llamadas grabadas, indexado por prompt_key"""
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Archivo del cassette (se crea al grabar la primera llamada)
+        """
+        self.path = path
+        self._index: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._index.setdefault(entry["key"], []).append(entry)
+    
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._index.values())
+    
+    def record(
+        self,
+        messages: List[BaseMessage],
+        content: str,
+        latency_ms: float,
+        model: str = "",
+        usage: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Agrega una llamada al cassette (y al índice en memoria).
+        
+        Cada llamada se escribe con un solo write en modo append, así
+        varios workers pueden grabar en el mismo archivo.
+        """
+        entry = {
+            "key": prompt_key(messages),
+            "messages": [[message.type, str(message.content)] for message in messages],
+            "response": content,
+            "latency_ms": round(latency_ms, 3),
+            "model": model,
+            "usage": usage or {},
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self._index.setdefault(entry["key"], []).append(entry)
+        return entry
+    
+    def lookup(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        """
+        Siguiente respuesta grabada para el prompt.
+        
+        Raises:
+            CassetteMissError: Si el prompt no fue grabado
+        """
+        key = prompt_key(messages)
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                raise CassetteMissError(f"Prompt no grabado en {self.path} ({key[:12]})")
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+            return entries[position % len(entries)]
+    
+    def latencies(self) -> List[float]:
+        """Latencias grabadas en ms, ordenadas (perfil para el LLM falso)"""
+        with self._lock:
+            return sorted(entry["latency_ms"] for entries in self._index.values() for entry in entries)
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _result(content: str, usage: Optional[Dict[str, int]]) -> ChatResult:
+    message = AIMessage(content=content, usage_metadata=usage) if usage else AIMessage(content=content)
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _usage(message: AIMessage) -> Optional[Dict[str, int]]:
+    usage = getattr(message, "usage_metadata", None)
+    return dict(usage) if usage else None
+
+
+# ============================================================================
+# Proveedores
+# ============================================================================
+
+class RecordingLLM(BaseChatModel):
+    """Envuelve un modelo real y graba cada llamada en el cassette"""
+    
+    inner: BaseChatModel
+    cassette: Cassette
+    model_name: str = ""
+    
+    @property
+    def _llm_type(self) -> str:
+        return "record"
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        start = time.perf_counter()
+        message = self.inner.invoke(messages, stop=stop, **kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        usage = _usage(message)
+        self.cassette.record(messages, message.content, latency_ms, self.model_name, usage)
+        return _result(message.content, usage)
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        start = time.perf_counter()
+        message = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        usage = _usage(message)
+        self.cassette.record(messages, message.content, latency_ms, self.model_name, usage)
+        return _result(message.content, usage)
+
+
+class ReplayLLM(BaseChatModel):
+    """Sirve las respuestas grabadas en el cassette, sin red"""
+    
+    cassette: Cassette
+    replay_latency: bool = True
+    
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        entry = self.cassette.lookup(messages)
+        if self.replay_latency and entry["latency_ms"]:
+            time.sleep(entry["latency_ms"] / 1000)
+        return _result(entry["response"], entry["usage"])
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        entry = self.cassette.lookup(messages)
+        if self.replay_latency and entry["latency_ms"]:
+            await asyncio.sleep(entry["latency_ms"] / 1000)
+        return _result(entry["response"], entry["usage"])
+
+
+# ============================================================================
+# Cassettes compartidos
+# ============================================================================
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str) -> Cassette:
+    """Cassette del proceso para el archivo (record, replay y el LLM falso comparten el índice)"""
+    cassette = _cassettes.get(path)
+    if cassette is None:
+        with _cassettes_lock:
+            cassette = _cassettes.get(path)
+            if cassette is None:
+                cassette = _cassettes[path] = Cassette(path)
+    return cassette
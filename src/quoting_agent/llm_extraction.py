@@ -0,0 +1,278 @@
+"""
+Extracción de la solicitud con el LLM sin perder turnos por JSON mal formado
+
+Dos caminos, según el proveedor:
+
+- Structured output (LLM_STRUCTURED_OUTPUT, proveedores que lo soportan):
+  el cliente se envuelve en StructuredOutputLLM, que usa
+  with_structured_output con el esquema de líneas de QuoteRequest (tool
+  calling del proveedor). La respuesta vuelve como el mismo texto JSON de
+  siempre, así la caché, los cassettes, la cadena de proveedores y el
+  router no cambian, y el prompt ya no necesita formato ni ejemplos JSON.
+- Resto: reparación local del JSON (json_repair) y, si aun así no sirve,
+  un solo reintento barato (LLM_PARSE_RETRY_ENABLED): prompt corto con el
+  formato y solo el último mensaje, sin el historial.
+
+parse_stats() cuenta las respuestas válidas al primer intento, las
+reparadas localmente, las recuperadas con el reintento y las fallidas.
+"""
+
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.pydantic_v1 import PrivateAttr
+from pydantic import ValidationError
+
+from .config import config
+from .llm_cache import acached_invoke, cached_invoke
+from .llm_validation import EmptyExtractionError
+from .models import QuoteLineItem
+
+T = TypeVar("T")
+
+# Proveedores con tool calling / JSON schema en su cliente de LangChain
+STRUCTURED_PROVIDERS = ("openai", "gemini", "fake")
+
+RETRY_SYSTEM_PROMPT = """Tu respuesta anterior no se pudo usar ({reason}).
+
+Responde SOLO con JSON válido, sin texto ni markdown:
+{{"line_items": [{{"part_number": "ABC-45", "quantity": 100}}]}}
+
+Si hay una solicitud en curso, responde con la solicitud completa actualizada.
+Si no hay partes con cantidad (o nada cambia), responde: {{}}"""
+
+
+def extraction_schema() -> Dict[str, Any]:
+    """
+    Esquema de la respuesta: las líneas de QuoteRequest.
+    
+    Dict JSON schema plano (sin $defs) porque el cliente de Gemini no
+    convierte modelos de pydantic v2.
+    """
+    line = QuoteLineItem.model_json_schema()
+    return {
+        "title": "quote_request",
+        "description": "Partes y cantidades que pide el cliente",
+        "type": "object",
+        "properties": {
+            "line_items": {
+                "type": "array",
+                "description": "Líneas de la solicitud; vacía si no hay partes con cantidad o nada cambia",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        name: {"type": field["type"], "description": field["description"]}
+                        for name, field in line["properties"].items()
+                    },
+                    "required": line["required"],
+                },
+            }
+        },
+        "required": ["line_items"],
+    }
+
+
+def provider_supports_structured_output(provider: str) -> bool:
+    """record/replay responden como el proveedor que grabaron"""
+    if provider in ("record", "replay"):
+        provider = config.LLM_RECORD_PROVIDER
+    return provider in STRUCTURED_PROVIDERS
+
+
+def structured_output_active() -> bool:
+    """
+    True si todos los proveedores configurados usan structured output.
+    
+    Con una cadena mixta se usa el prompt JSON en todos: el prompt es uno
+    solo y debe servirle a cualquier proveedor que conteste.
+    """
+    if not config.LLM_STRUCTURED_OUTPUT:
+        return False
+    providers = [config.LLM_PROVIDER] + config.get_fallback_providers()
+    return all(provider_supports_structured_output(provider) for provider in providers)
+
+
+# ============================================================================
+# Cliente con structured output
+# ============================================================================
+
+class StructuredOutputLLM(BaseChatModel):
+    """Llama al cliente con el esquema de extracción y devuelve el JSON como texto"""
+    
+    inner: BaseChatModel
+    
+    _structured: Any = PrivateAttr(default=None)
+    
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._structured = self.inner.with_structured_output(extraction_schema(), include_raw=True)
+    
+    @property
+    def _llm_type(self) -> str:
+        return "structured-output"
+    
+    @staticmethod
+    def _result(output: Dict[str, Any]) -> ChatResult:
+        raw = output["raw"]
+        parsed = output.get("parsed")
+        if parsed is None:
+            # El proveedor no llenó el esquema: sus argumentos o su texto
+            # pasan por la reparación local como cualquier respuesta
+            tool_calls = getattr(raw, "tool_calls", None)
+            content = json.dumps(tool_calls[0]["args"]) if tool_calls else str(raw.content)
+        else:
+            content = json.dumps(parsed, ensure_ascii=False) if parsed.get("line_items") else "{}"
+        
+        message = AIMessage(content=content, usage_metadata=getattr(raw, "usage_metadata", None))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        return self._result(self._structured.invoke(messages))
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        return self._result(await self._structured.ainvoke(messages))
+
+
+# ============================================================================
+# Reintento barato y estadísticas
+# ============================================================================
+
+_PARSE_STATS: Dict[str, int] = {
+    "calls": 0,
+    "first_try": 0,
+    "repaired": 0,
+    "retried": 0,
+    "empty": 0,
+    "failed": 0,
+}
+_PARSE_STATS_LOCK = threading.Lock()
+
+
+def _count(outcome: str) -> None:
+    with _PARSE_STATS_LOCK:
+        _PARSE_STATS["calls"] += 1
+        _PARSE_STATS[outcome] += 1
+
+
+def _is_strict_json(content: str) -> bool:
+    try:
+        json.loads(content)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def _reason(error: Exception) -> str:
+    """Motivo corto para el prompt de reintento (sin los valores del cliente)"""
+    if isinstance(error, ValidationError):
+        fields = sorted({".".join(str(part) for part in e["loc"]) or "raíz" for e in error.errors()})
+        return f"no cumple el formato en: {', '.join(fields)}"
+    return "no era JSON válido"
+
+
+def retry_prompt(messages: List[BaseMessage], error: Exception) -> List[BaseMessage]:
+    """Prompt del reintento: formato corto y solo el último mensaje del cliente"""
+    last = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), HumanMessage(content=""))
+    return [SystemMessage(content=RETRY_SYSTEM_PROMPT.format(reason=_reason(error))), last]
+
+
+def _first_try(content: str, result: T) -> T:
+    _count("first_try" if _is_strict_json(content) else "repaired")
+    return result
+
+
+def extract(llm: BaseChatModel, messages: List[BaseMessage], parse: Callable[[str], T]) -> T:
+    """
+    cached_invoke + parse, con un reintento barato si la respuesta no sirve.
+    
+    Args:
+        llm: Cliente, cadena de proveedores o router
+        messages: Prompt completo
+        parse: Convierte el contenido (lanza si no sirve)
+    
+    Raises:
+        json.JSONDecodeError / ValidationError: Si tampoco sirve el reintento
+        EmptyExtractionError: Si el mensaje no trae partes con cantidad
+    """
+    content = cached_invoke(llm, messages, validate=parse)
+    try:
+        return _first_try(content, parse(content))
+    except EmptyExtractionError:
+        _count("empty")
+        raise
+    except (json.JSONDecodeError, ValidationError) as e:
+        if not config.LLM_PARSE_RETRY_ENABLED:
+            _count("failed")
+            raise
+        error = e
+    
+    content = cached_invoke(llm, retry_prompt(messages, error), validate=parse)
+    return _retried(content, parse)
+
+
+async def aextract(llm: BaseChatModel, messages: List[BaseMessage], parse: Callable[[str], T]) -> T:
+    """Versión asíncrona de extract (usa acached_invoke)"""
+    content = await acached_invoke(llm, messages, validate=parse)
+    try:
+        return _first_try(content, parse(content))
+    except EmptyExtractionError:
+        _count("empty")
+        raise
+    except (json.JSONDecodeError, ValidationError) as e:
+        if not config.LLM_PARSE_RETRY_ENABLED:
+            _count("failed")
+            raise
+        error = e
+    
+    content = await acached_invoke(llm, retry_prompt(messages, error), validate=parse)
+    return _retried(content, parse)
+
+
+def _retried(content: str, parse: Callable[[str], T]) -> T:
+    try:
+        result = parse(content)
+    except EmptyExtractionError:
+        _count("empty")
+        raise
+    except (json.JSONDecodeError, ValidationError):
+        _count("failed")
+        raise
+    _count("retried")
+    return result
+
+
+def parse_stats() -> Dict[str, Any]:
+    """
+    Returns:
+        Conteo por resultado y failure_rate (fallidas / llamadas que
+        traían una solicitud)
+    """
+    with _PARSE_STATS_LOCK:
+        stats = dict(_PARSE_STATS)
+    attempted = stats["calls"] - stats["empty"]
+    stats["failure_rate"] = round(stats["failed"] / attempted, 4) if attempted else 0.0
+    stats["structured_output"] = structured_output_active()
+    return stats
+
+
+def reset_parse_stats() -> None:
+    with _PARSE_STATS_LOCK:
+        for key in _PARSE_STATS:
+            _PARSE_STATS[key] = 0
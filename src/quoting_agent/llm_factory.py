@@ -2,10 +2,31 @@
 Factory para crear instancias de LLM según configuración
 """
 
-from typing import Dict, Any
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from langchain_core.language_models import BaseChatModel
 
 from .config import config
+from .llm_extraction import STRUCTURED_PROVIDERS, StructuredOutputLLM, structured_output_active
+from .llm_failover import CircuitBreaker, ProviderChain
+from .model_router import ModelRouter
+
+
+# ============================================================================
+# Pool de clientes LLM
+# ============================================================================
+
+# Un cliente por configuración: reutiliza el cliente HTTP (y su conexión TLS)
+# entre invocaciones en lugar de construirlo en cada mensaje. La cadena de
+# proveedores se arma dentro del lock con clientes del mismo pool (RLock).
+_LLM_POOL: Dict[Tuple, BaseChatModel] = {}
+_LLM_POOL_LOCK = threading.RLock()
+_LLM_POOL_STATS: Dict[str, float] = {
+    "hits": 0,
+    "misses": 0,
+    "init_seconds": 0.0,
+}
 
 
 def create_llm() -> BaseChatModel:
@@ -15,6 +36,9 @@ def create_llm() -> BaseChatModel:
     Soporta:
     - Google Gemini (langchain_google_genai)
     - OpenAI (langchain_openai)
+    - fake: LLM determinista sin red (benchmarks, desarrollo offline)
+    - record: el proveedor LLM_RECORD_PROVIDER, grabando en LLM_CASSETTE_PATH
+    - replay: respuestas grabadas en LLM_CASSETTE_PATH, sin red
     
     Returns:
         Instancia del LLM configurado
@@ -23,8 +47,22 @@ def create_llm() -> BaseChatModel:
         ValueError: Si el proveedor no está soportado o falta configuración
         ImportError: Si falta instalar el paquete del proveedor
     """
-    
-    llm_config = config.get_llm_config()
+    return _create_provider(config.get_llm_config())
+
+
+def _create_provider(llm_config: Dict[str, Any]) -> BaseChatModel:
+    llm = _create_client(llm_config)
+    if llm_config["provider"] in STRUCTURED_PROVIDERS and structured_output_active():
+        llm = StructuredOutputLLM(inner=llm)
+    if config.LLM_RATE_LIMIT_ENABLED and llm_config["provider"] in ("gemini", "openai", "fake"):
+        # Cuota por proveedor/modelo (record envuelve al upstream ya limitado)
+        from .llm_limiter import RateLimitedLLM, get_rate_limiter
+        
+        return RateLimitedLLM(inner=llm, limiter=get_rate_limiter(f"{llm_config['provider']}:{llm_config['model']}"))
+    return llm
+
+
+def _create_client(llm_config: Dict[str, Any]) -> BaseChatModel:
     provider = llm_config["provider"]
     
     if provider == "gemini":
@@ -70,10 +108,46 @@ def create_llm() -> BaseChatModel:
             temperature=llm_config["temperature"]
         )
     
+    elif provider == "fake":
+        from .fake_llm import FakeQuotingLLM
+        from .llm_cassette import get_cassette
+        
+        latency_profile = []
+        if llm_config["latency_distribution"] == "cassette":
+            latency_profile = get_cassette(llm_config["cassette_path"]).latencies()
+        
+        return FakeQuotingLLM(
+            latency_ms=llm_config["latency_ms"],
+            jitter_ms=llm_config["jitter_ms"],
+            latency_distribution=llm_config["latency_distribution"],
+            latency_profile=latency_profile,
+            error_rate=llm_config["error_rate"],
+            malformed_rate=llm_config["malformed_rate"],
+            seed=llm_config["seed"]
+        )
+    
+    elif provider == "record":
+        from .llm_cassette import RecordingLLM, get_cassette
+        
+        return RecordingLLM(
+            inner=_create_provider({**llm_config, "provider": llm_config["upstream"]}),
+            cassette=get_cassette(llm_config["cassette_path"]),
+            model_name=llm_config["model"]
+        )
+    
+    elif provider == "replay":
+        from .llm_cassette import ReplayLLM, get_cassette
+        
+        cassette = get_cassette(llm_config["cassette_path"])
+        if not len(cassette):
+            raise ValueError(f"El cassette {llm_config['cassette_path']} está vacío o no existe")
+        
+        return ReplayLLM(cassette=cassette, replay_latency=llm_config["replay_latency"])
+    
     else:
         raise ValueError(
             f"Proveedor LLM no soportado: {provider}. "
-            f"Usa 'gemini' o 'openai'"
+            f"Usa 'gemini', 'openai', 'fake', 'record' o 'replay'"
         )
 
 
@@ -86,7 +160,7 @@ def get_llm_info() -> Dict[str, Any]:
         - provider: Nombre del proveedor
         - model: Modelo configurado
         - temperature: Temperatura configurada
-        - configured: Si tiene API key configurada
+        - configured: Si tiene API key configurada (o no necesita red)
     """
     
     llm_config = config.get_llm_config()
@@ -95,5 +169,180 @@ def get_llm_info() -> Dict[str, Any]:
         "provider": llm_config["provider"],
         "model": llm_config["model"],
         "temperature": llm_config["temperature"],
-        "configured": bool(llm_config["api_key"])
-    }
\ No newline at end of file
+        "configured": provider_ready(llm_config)
+    }
+
+
+def provider_ready(llm_config: Dict[str, Any]) -> bool:
+    """True si el proveedor puede responder (API key configurada, LLM falso o replay)"""
+    return llm_config["provider"] in ("fake", "replay") or bool(llm_config["api_key"])
+
+
+def _llm_pool_key(llm_config: Dict[str, Any]) -> Tuple:
+    """Clave del pool: la tupla completa de Config.get_llm_config()"""
+    return tuple(sorted(llm_config.items()))
+
+
+def get_llm() -> BaseChatModel:
+    """
+    Obtiene el cliente LLM compartido para la configuración actual.
+    
+    El cliente se crea con create_llm() la primera vez y se reutiliza
+    mientras no cambie la tupla de Config.get_llm_config(). Con
+    LLM_FALLBACK_PROVIDERS retorna la ProviderChain compartida (ver
+    llm_failover.py), que conserva breakers y latencias entre llamadas;
+    con LLM_ROUTER_ENABLED, el ModelRouter que elige modelo por mensaje
+    (ver model_router.py).
+    
+    Returns:
+        Instancia del LLM configurado (compartida en el proceso)
+    """
+    llm_config = config.get_llm_config()
+    if config.LLM_ROUTER_ENABLED and config.LLM_ROUTER_FAST_MODEL:
+        return _pooled(_router_key(llm_config), lambda: _create_router(llm_config))
+    return _client_for(llm_config, create_llm)
+
+
+def _client_for(llm_config: Dict[str, Any], factory: Callable[[], BaseChatModel]) -> BaseChatModel:
+    """Cliente del pool para la config, o la cadena con los fallbacks si los hay"""
+    fallbacks = config.get_fallback_providers()
+    if not fallbacks:
+        return _pooled(_llm_pool_key(llm_config), factory)
+    
+    chain_configs = [llm_config] + [config.get_provider_config(name) for name in fallbacks]
+    return _pooled(_chain_key(chain_configs), lambda: _create_chain(chain_configs))
+
+
+def _router_tiers(llm_config: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Config del modelo rápido y del fuerte (mismo proveedor)"""
+    fast = {**llm_config, "model": config.LLM_ROUTER_FAST_MODEL}
+    strong = {**llm_config, "model": config.LLM_ROUTER_STRONG_MODEL or llm_config["model"]}
+    return fast, strong
+
+
+def _router_key(llm_config: Dict[str, Any]) -> Tuple:
+    settings = (config.LLM_ROUTER_THRESHOLD, config.LLM_ROUTER_MIN_ACCURACY, config.LLM_ROUTER_WINDOW)
+    fast, strong = _router_tiers(llm_config)
+    return ("router", settings, _llm_pool_key(fast), _llm_pool_key(strong), tuple(config.get_fallback_providers()))
+
+
+def _create_router(llm_config: Dict[str, Any]) -> ModelRouter:
+    fast, strong = _router_tiers(llm_config)
+    return ModelRouter(
+        fast=(fast["model"], _client_for(fast, lambda: _create_provider(fast))),
+        strong=(strong["model"], _client_for(strong, lambda: _create_provider(strong))),
+        threshold=config.LLM_ROUTER_THRESHOLD,
+        min_accuracy=config.LLM_ROUTER_MIN_ACCURACY,
+        window=config.LLM_ROUTER_WINDOW
+    )
+
+
+def _chain_key(chain_configs: List[Dict[str, Any]]) -> Tuple:
+    """Clave del pool para la cadena: proveedores y parámetros de hedge/breaker"""
+    settings = (
+        config.LLM_HEDGE_ENABLED,
+        config.LLM_HEDGE_PERCENTILE,
+        config.LLM_HEDGE_INITIAL_DELAY_MS,
+        config.LLM_HEDGE_MIN_DELAY_MS,
+        config.LLM_BREAKER_FAILURES,
+        config.LLM_BREAKER_WINDOW_SECONDS,
+        config.LLM_BREAKER_COOLDOWN_SECONDS,
+    )
+    return ("chain", settings) + tuple(_llm_pool_key(llm_config) for llm_config in chain_configs)
+
+
+def _create_chain(chain_configs: List[Dict[str, Any]]) -> ProviderChain:
+    providers = [
+        (llm_config["provider"], _pooled(_llm_pool_key(llm_config), lambda c=llm_config: _create_provider(c)))
+        for llm_config in chain_configs
+    ]
+    return ProviderChain(
+        providers,
+        hedge_enabled=config.LLM_HEDGE_ENABLED,
+        hedge_percentile=config.LLM_HEDGE_PERCENTILE,
+        hedge_initial_delay_ms=config.LLM_HEDGE_INITIAL_DELAY_MS,
+        hedge_min_delay_ms=config.LLM_HEDGE_MIN_DELAY_MS,
+        breaker_factory=lambda: CircuitBreaker(
+            failure_threshold=config.LLM_BREAKER_FAILURES,
+            window_seconds=config.LLM_BREAKER_WINDOW_SECONDS,
+            cooldown_seconds=config.LLM_BREAKER_COOLDOWN_SECONDS
+        )
+    )
+
+
+def _pooled(key: Tuple, factory: Callable[[], Any]) -> Any:
+    """Cliente del pool para la clave (lo crea con factory la primera vez)"""
+    llm = _LLM_POOL.get(key)
+    if llm is not None:
+        _LLM_POOL_STATS["hits"] += 1
+        return llm
+    
+    with _LLM_POOL_LOCK:
+        llm = _LLM_POOL.get(key)
+        if llm is not None:
+            _LLM_POOL_STATS["hits"] += 1
+            return llm
+        
+        start = time.perf_counter()
+        llm = factory()
+        _LLM_POOL_STATS["init_seconds"] += time.perf_counter() - start
+        _LLM_POOL_STATS["misses"] += 1
+        _LLM_POOL[key] = llm
+        return llm
+
+
+def get_provider_chain_stats() -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Estadísticas de la cadena de proveedores vigente.
+    
+    Returns:
+        Llamadas, hedges, errores, respuestas inválidas, victorias, estado
+        del breaker y percentil de latencia por proveedor; None si hay un
+        solo proveedor o la cadena aún no se creó
+    """
+    fallbacks = config.get_fallback_providers()
+    if not fallbacks:
+        return None
+    
+    chain_configs = [config.get_llm_config()] + [config.get_provider_config(name) for name in fallbacks]
+    chain = _LLM_POOL.get(_chain_key(chain_configs))
+    return chain.stats() if chain is not None else None
+
+
+def get_model_router_stats() -> Optional[Dict[str, Any]]:
+    """
+    Reparto de decisiones del router de modelos vigente.
+    
+    Returns:
+        ModelRouter.stats(), o None si el router está apagado o aún no se creó
+    """
+    if not (config.LLM_ROUTER_ENABLED and config.LLM_ROUTER_FAST_MODEL):
+        return None
+    router = _LLM_POOL.get(_router_key(config.get_llm_config()))
+    return router.stats() if router is not None else None
+
+
+def get_llm_pool_stats() -> Dict[str, Any]:
+    """
+    Estadísticas del pool de clientes LLM.
+    
+    Returns:
+        Diccionario con:
+        - clients: Clientes vivos en el pool
+        - hits: Invocaciones que reutilizaron un cliente
+        - misses: Clientes creados
+        - init_seconds: Tiempo total invertido creando clientes
+    """
+    return {
+        "clients": len(_LLM_POOL),
+        "hits": int(_LLM_POOL_STATS["hits"]),
+        "misses": int(_LLM_POOL_STATS["misses"]),
+        "init_seconds": _LLM_POOL_STATS["init_seconds"],
+    }
+
+
+def clear_llm_pool() -> None:
+    """Descarta todos los clientes del pool (ej: tras rotar API keys)"""
+    with _LLM_POOL_LOCK:
+        _LLM_POOL.clear()
+        _LLM_POOL_STATS.update(hits=0, misses=0, init_seconds=0.0)
@@ -0,0 +1,423 @@
+"""
+Cadena de proveedores LLM con hedging y circuit breakers
+
+Con LLM_FALLBACK_PROVIDERS, get_llm() retorna una ProviderChain en lugar
+de un solo cliente. Cada llamada:
+
+1. Sale al primer proveedor con el circuito cerrado
+2. Si no respondió al llegar a su percentil de latencia observado
+   (LLM_HEDGE_PERCENTILE, p95 por defecto), la misma llamada sale también
+   al siguiente proveedor (hedge); si falla o su respuesta no es válida,
+   el siguiente sale de inmediato
+3. Gana la primera respuesta que pasa la validación del nodo (ej: que
+   sea una QuoteRequest); las demás terminan en segundo plano y solo
+   alimentan las estadísticas
+
+Como el hedge sale solo en el ~5% más lento de las llamadas, el costo
+extra esperado es ~5% de las llamadas, no el doble.
+
+Cada proveedor tiene un circuit breaker: LLM_BREAKER_FAILURES errores en
+LLM_BREAKER_WINDOW_SECONDS lo abren y la cadena lo salta; tras
+LLM_BREAKER_COOLDOWN_SECONDS deja pasar una llamada de prueba
+(half-open) que lo cierra o lo vuelve a abrir.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+
+from .llm_validation import is_valid_answer
+from .tracing import get_tracer
+
+# Muestras mínimas antes de usar el percentil observado como umbral de hedge
+MIN_LATENCY_SAMPLES = 20
+
+# Hilos para las llamadas síncronas de la cadena (se crean a demanda)
+_MAX_WORKERS = 64
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Tareas perdedoras que siguen corriendo (referencia fuerte hasta que terminan)
+_background: set = set()
+
+
+class CircuitOpenError(RuntimeError):
+    """Todos los proveedores de la cadena tienen el circuito abierto"""
+
+
+# ============================================================================
+# Circuit breaker
+# ============================================================================
+
+class CircuitBreaker:
+    """Breaker closed → open → half_open por ráfagas de errores"""
+    
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        window_seconds: float = 30.0,
+        cooldown_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            failure_threshold: Errores dentro de la ventana que abren el circuito
+            window_seconds: Ventana en la que se cuentan los errores
+            cooldown_seconds: Tiempo abierto antes de la llamada de prueba
+            clock: Reloj (inyectable en tests)
+        """
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._failures: Deque[float] = deque()
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._opens = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(self._clock())
+    
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+    
+    def allow(self) -> bool:
+        """True si la llamada puede salir (en half_open, solo una a la vez)"""
+        with self._lock:
+            state = self._state(self._clock())
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self._opened_at = None
+            self._trial_in_flight = False
+            self._failures.clear()
+    
+    def record_failure(self) -> None:
+        now = self._clock()
+        with self._lock:
+            if self._opened_at is not None:
+                # Falló la llamada de prueba: otro período abierto
+                self._opened_at = now
+                self._trial_in_flight = False
+                return
+            
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window_seconds:
+                self._failures.popleft()
+            if len(self._failures) >= self.failure_threshold:
+                self._opened_at = now
+                self._failures.clear()
+                self._opens += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._state(self._clock()), "opens": self._opens}
+
+
+# ============================================================================
+# Latencia observada
+# ============================================================================
+
+class LatencyWindow:
+    """Últimas N latencias exitosas de un proveedor"""
+    
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+    
+    def add(self, latency_ms: float) -> None:
+        with self._lock:
+            self._samples.append(latency_ms)
+    
+    def percentile(self, percent: float) -> Optional[float]:
+        """Percentil en ms, o None con menos de MIN_LATENCY_SAMPLES muestras"""
+        with self._lock:
+            if len(self._samples) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+class _Provider:
+    """Un proveedor de la cadena con su breaker, latencias y contadores"""
+    
+    def __init__(self, name: str, llm: BaseChatModel, breaker: CircuitBreaker):
+        self.name = name
+        self.llm = llm
+        self.breaker = breaker
+        self.latency = LatencyWindow()
+        self.counts = {"calls": 0, "hedges": 0, "errors": 0, "invalid": 0, "wins": 0}
+        self._lock = threading.Lock()
+    
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+    
+    def stats(self, percent: float) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        return {**counts, **self.breaker.stats(), f"p{percent:g}_ms": self.latency.percentile(percent)}
+
+
+# ============================================================================
+# Cadena de proveedores
+# ============================================================================
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix="llm-chain")
+    return _executor
+
+
+def _forget(task: asyncio.Task) -> None:
+    """Suelta una tarea terminada (y marca su excepción como vista)"""
+    _background.discard(task)
+    if not task.cancelled():
+        task.exception()
+
+
+class ProviderChain:
+    """
+    Proveedores LLM en orden de preferencia, con hedging y failover.
+    
+    Expone invoke/ainvoke como un chat model; con validate, una respuesta
+    que no pasa la validación cuenta como fallida y la llamada sigue con
+    el siguiente proveedor.
+    """
+    
+    def __init__(
+        self,
+        providers: List[Tuple[str, BaseChatModel]],
+        hedge_enabled: bool = True,
+        hedge_percentile: float = 95.0,
+        hedge_initial_delay_ms: float = 2000.0,
+        hedge_min_delay_ms: float = 100.0,
+        breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker
+    ):
+        """
+        Args:
+            providers: (nombre, cliente) en orden de preferencia
+            hedge_enabled: Lanzar el siguiente proveedor al pasar el percentil
+            hedge_percentile: Percentil de latencia que dispara el hedge
+            hedge_initial_delay_ms: Umbral mientras no hay muestras suficientes
+            hedge_min_delay_ms: Umbral mínimo (evita hedgear todo con un p95 bajo)
+            breaker_factory: Crea el breaker de cada proveedor
+        """
+        if not providers:
+            raise ValueError("La cadena necesita al menos un proveedor")
+        self.providers = [_Provider(name, llm, breaker_factory()) for name, llm in providers]
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_initial_delay_ms = hedge_initial_delay_ms
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+    
+    def hedge_delay(self, provider: _Provider) -> float:
+        """Segundos a esperar al proveedor antes de lanzar el siguiente"""
+        observed = provider.latency.percentile(self.hedge_percentile)
+        delay_ms = self.hedge_initial_delay_ms if observed is None else observed
+        return max(delay_ms, self.hedge_min_delay_ms) / 1000
+    
+    def _candidates(self) -> Iterator[_Provider]:
+        """Proveedores en orden cuyo breaker deja pasar la llamada (se consulta al lanzar)"""
+        for provider in self.providers:
+            if provider.breaker.allow():
+                yield provider
+    
+    def _is_valid(self, provider: _Provider, message: AIMessage, validate: Optional[Callable[[str], Any]]) -> bool:
+        if is_valid_answer(message.content, validate):
+            return True
+        provider.count("invalid")
+        return False
+    
+    @staticmethod
+    def _won(provider: _Provider, message: AIMessage) -> AIMessage:
+        """Cuenta la victoria y anota qué proveedor respondió (clave de la caché)"""
+        provider.count("wins")
+        message.response_metadata["llm_provider"] = provider.name
+        return message
+    
+    # ------------------------------------------------------------------------
+    # Llamada a un proveedor
+    # ------------------------------------------------------------------------
+    
+    def _start(self, provider: _Provider, hedge: bool) -> float:
+        provider.count("calls")
+        if hedge:
+            provider.count("hedges")
+        return time.perf_counter()
+    
+    def _finish(self, provider: _Provider, start: float, error: Optional[BaseException]) -> None:
+        if error is None:
+            provider.latency.add((time.perf_counter() - start) * 1000)
+            provider.breaker.record_success()
+        else:
+            provider.count("errors")
+            provider.breaker.record_failure()
+    
+    def _call(self, provider: _Provider, messages: List[BaseMessage], hedge: bool) -> AIMessage:
+        with get_tracer().span("llm_provider", provider.name, hedge=hedge):
+            start = self._start(provider, hedge)
+            try:
+                message = provider.llm.invoke(messages)
+            except Exception as e:
+                self._finish(provider, start, e)
+                raise
+            self._finish(provider, start, None)
+            return message
+    
+    async def _acall(self, provider: _Provider, messages: List[BaseMessage], hedge: bool) -> AIMessage:
+        with get_tracer().span("llm_provider", provider.name, hedge=hedge):
+            start = self._start(provider, hedge)
+            try:
+                message = await provider.llm.ainvoke(messages)
+            except Exception as e:
+                self._finish(provider, start, e)
+                raise
+            self._finish(provider, start, None)
+            return message
+    
+    # ------------------------------------------------------------------------
+    # Hedging
+    # ------------------------------------------------------------------------
+    
+    def invoke(self, messages: List[BaseMessage], validate: Optional[Callable[[str], Any]] = None) -> AIMessage:
+        """
+        Primera respuesta válida de la cadena.
+        
+        Args:
+            messages: Historial enviado al modelo
+            validate: Función que lanza excepción si la respuesta no sirve
+        
+        Returns:
+            Mensaje del proveedor ganador (o la primera respuesta inválida
+            si ninguna pasó la validación, para que el nodo pida aclaración)
+        
+        Raises:
+            CircuitOpenError: Si todos los circuitos están abiertos
+            Exception: El último error si todos los proveedores fallaron
+        """
+        candidates = self._candidates()
+        pending: Dict[Future, _Provider] = {}
+        latest: Optional[_Provider] = None
+        exhausted = False
+        invalid: Optional[AIMessage] = None
+        last_error: Optional[BaseException] = None
+        
+        def launch(hedge: bool) -> None:
+            nonlocal latest, exhausted
+            provider = next(candidates, None)
+            if provider is None:
+                exhausted = True
+                return
+            latest = provider
+            context = copy_context()
+            pending[_get_executor().submit(context.run, self._call, provider, messages, hedge)] = provider
+        
+        launch(False)
+        if not pending:
+            raise CircuitOpenError("Todos los proveedores LLM tienen el circuito abierto")
+        
+        while pending:
+            timeout = self.hedge_delay(latest) if self.hedge_enabled and not exhausted else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                launch(True)
+                continue
+            
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    message = future.result()
+                except Exception as e:
+                    last_error = e
+                    launch(False)
+                    continue
+                if self._is_valid(provider, message, validate):
+                    return self._won(provider, message)
+                invalid = invalid or message
+                launch(False)
+        
+        if invalid is not None:
+            return invalid
+        raise last_error
+    
+    async def ainvoke(self, messages: List[BaseMessage], validate: Optional[Callable[[str], Any]] = None) -> AIMessage:
+        """Versión asíncrona de invoke (las perdedoras siguen como tareas)"""
+        candidates = self._candidates()
+        pending: Dict[asyncio.Task, _Provider] = {}
+        latest: Optional[_Provider] = None
+        exhausted = False
+        invalid: Optional[AIMessage] = None
+        last_error: Optional[BaseException] = None
+        
+        def launch(hedge: bool) -> None:
+            nonlocal latest, exhausted
+            provider = next(candidates, None)
+            if provider is None:
+                exhausted = True
+                return
+            latest = provider
+            task = asyncio.ensure_future(self._acall(provider, messages, hedge))
+            _background.add(task)
+            task.add_done_callback(_forget)
+            pending[task] = provider
+        
+        launch(False)
+        if not pending:
+            raise CircuitOpenError("Todos los proveedores LLM tienen el circuito abierto")
+        
+        while pending:
+            timeout = self.hedge_delay(latest) if self.hedge_enabled and not exhausted else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch(True)
+                continue
+            
+            for task in done:
+                provider = pending.pop(task)
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    launch(False)
+                    continue
+                message = task.result()
+                if self._is_valid(provider, message, validate):
+                    return self._won(provider, message)
+                invalid = invalid or message
+                launch(False)
+        
+        if invalid is not None:
+            return invalid
+        raise last_error
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Estadísticas por proveedor.
+        
+        Returns:
+            {proveedor: {calls, hedges, errors, invalid, wins, state, opens, pNN_ms}}
+        """
+        return {provider.name: provider.stats(self.hedge_percentile) for provider in self.providers}
@@ -0,0 +1,563 @@
+"""
+Rate limiting del lado del cliente para las llamadas al LLM
+
+Cada proveedor/modelo tiene dos token buckets, uno de requests y otro de
+tokens por minuto (LLM_RPM_LIMIT, LLM_TPM_LIMIT), llenados al
+LLM_RATE_LIMIT_TARGET de la cuota para quedar justo por debajo. Con
+LLM_RATE_LIMIT_PATH los buckets viven en SQLite y los comparten todos los
+workers de la máquina; vacío = por proceso.
+
+Encima, la concurrencia se ajusta con AIMD:
+- cada llamada exitosa suma 1/límite (≈ +1 por ventana)
+- un 429 divide el límite a la mitad y pausa a todos los workers
+  (enfriamiento compartido en el mismo store)
+- una latencia por encima de LLM_LATENCY_TARGET_MS lo reduce un 10%
+
+Quien no consigue cupo espera en cola hasta LLM_QUEUE_TIMEOUT_SECONDS
+(RateLimitTimeout al vencer) en lugar de fallar; un 429 del proveedor se
+reintenta dentro del mismo plazo. Los tokens se reservan con una
+estimación (~4 caracteres por token + la salida esperada) y se ajustan
+con el usage_metadata real de la respuesta.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from .config import config
+
+# Ráfaga máxima de cada bucket, en segundos de cuota
+BURST_SECONDS = 10
+
+# Tokens de salida que se reservan por llamada (el JSON de una solicitud)
+EXPECTED_OUTPUT_TOKENS = 100
+
+# Espera ante un 429 sin Retry-After
+DEFAULT_COOLDOWN_SECONDS = 1.0
+
+# Sondeo mientras no hay cupo de concurrencia
+_SLOT_POLL_SECONDS = 0.01
+
+
+class RateLimitTimeout(TimeoutError):
+    """La llamada no consiguió cupo antes de su plazo"""
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True para el 429 / cuota agotada de cualquier proveedor"""
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    name = type(error).__name__
+    if name in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+        return True
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text or "resource exhausted" in text
+
+
+def _retry_after(error: BaseException) -> float:
+    """Segundos de Retry-After si el error trae la respuesta HTTP"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", DEFAULT_COOLDOWN_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_COOLDOWN_SECONDS
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """Tokens a reservar: prompt (~4 caracteres por token) + salida esperada"""
+    return sum(len(str(message.content)) for message in messages) // 4 + EXPECTED_OUTPUT_TOKENS
+
+
+# ============================================================================
+# Stores de buckets
+# ============================================================================
+
+class MemoryBucketStore:
+    """Buckets del proceso"""
+    
+    def __init__(self):
+        # nombre → (nivel, actualizado)
+        self._levels: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+    
+    def take(self, key: str, needs: Dict[str, Tuple[float, float, float]]) -> float:
+        """
+        Descuenta de los buckets si todos alcanzan.
+        
+        Args:
+            key: Proveedor/modelo
+            needs: bucket → (cantidad, capacidad, recarga por segundo)
+        
+        Returns:
+            0 si se descontó; si no, segundos hasta que alcance
+        """
+        now = time.time()
+        with self._lock:
+            cooldown = self._levels.get(f"{key}:cooldown", (0.0, now))[0]
+            if cooldown > now:
+                return cooldown - now
+            
+            levels = {}
+            wait = 0.0
+            for bucket, (amount, capacity, rate) in needs.items():
+                level, updated = self._levels.get(f"{key}:{bucket}", (capacity, now))
+                level = min(capacity, level + (now - updated) * rate)
+                levels[bucket] = level
+                if level < amount:
+                    wait = max(wait, (amount - level) / rate)
+            
+            if wait > 0:
+                return wait
+            for bucket, (amount, _, _) in needs.items():
+                self._levels[f"{key}:{bucket}"] = (levels[bucket] - amount, now)
+            return 0.0
+    
+    def adjust(self, key: str, bucket: str, amount: float) -> None:
+        """Descuenta (o devuelve, si es negativo) sin esperar; el nivel puede quedar en deuda"""
+        with self._lock:
+            name = f"{key}:{bucket}"
+            if name in self._levels:
+                level, updated = self._levels[name]
+                self._levels[name] = (level - amount, updated)
+    
+    def cooldown(self, key: str, seconds: float) -> None:
+        """Pausa todas las llamadas del proveedor durante seconds"""
+        until = time.time() + seconds
+        with self._lock:
+            current = self._levels.get(f"{key}:cooldown", (0.0, 0.0))[0]
+            self._levels[f"{key}:cooldown"] = (max(current, until), until)
+
+
+class SQLiteBucketStore:
+    """Buckets compartidos entre procesos (una transacción IMMEDIATE por intento)"""
+    
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            " name TEXT PRIMARY KEY,"
+            " level REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+    
+    def _level(self, name: str, default: float, now: float) -> Tuple[float, float]:
+        row = self._conn.execute("SELECT level, updated_at FROM rate_buckets WHERE name = ?", (name,)).fetchone()
+        return row if row is not None else (default, now)
+    
+    def _put(self, name: str, level: float, updated: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rate_buckets (name, level, updated_at) VALUES (?, ?, ?)",
+            (name, level, updated)
+        )
+    
+    def take(self, key: str, needs: Dict[str, Tuple[float, float, float]]) -> float:
+        """Igual que MemoryBucketStore.take, visible para todos los workers"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                cooldown = self._level(f"{key}:cooldown", 0.0, now)[0]
+                if cooldown > now:
+                    return cooldown - now
+                
+                levels = {}
+                wait = 0.0
+                for bucket, (amount, capacity, rate) in needs.items():
+                    level, updated = self._level(f"{key}:{bucket}", capacity, now)
+                    level = min(capacity, level + (now - updated) * rate)
+                    levels[bucket] = level
+                    if level < amount:
+                        wait = max(wait, (amount - level) / rate)
+                
+                if wait > 0:
+                    return wait
+                for bucket, (amount, _, _) in needs.items():
+                    self._put(f"{key}:{bucket}", levels[bucket] - amount, now)
+                return 0.0
+            finally:
+                self._conn.execute("COMMIT")
+    
+    def adjust(self, key: str, bucket: str, amount: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE rate_buckets SET level = level - ? WHERE name = ?", (amount, f"{key}:{bucket}")
+            )
+    
+    def cooldown(self, key: str, seconds: float) -> None:
+        until = time.time() + seconds
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO rate_buckets (name, level, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET level = MAX(level, excluded.level), updated_at = excluded.updated_at",
+                (f"{key}:cooldown", until, until)
+            )
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ============================================================================
+# Concurrencia adaptativa (AIMD)
+# ============================================================================
+
+class AdaptiveConcurrency:
+    """Límite de llamadas en vuelo: suma en el éxito, multiplica en la saturación"""
+    
+    def __init__(self, max_limit: int = 16, min_limit: int = 1, latency_target_ms: float = 0.0):
+        """
+        Args:
+            max_limit: Techo (y valor inicial) del límite
+            min_limit: Piso del límite
+            latency_target_ms: Latencia que se considera saturación (0 = no se usa)
+        """
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency_target_ms = latency_target_ms
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+    
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+    
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+    
+    def on_success(self, latency_ms: float) -> None:
+        with self._lock:
+            if self.latency_target_ms and latency_ms > self.latency_target_ms:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+    
+    def on_overload(self) -> None:
+        with self._lock:
+            self.limit = max(self.min_limit, self.limit / 2)
+
+
+# ============================================================================
+# Limitador
+# ============================================================================
+
+class LLMRateLimiter:
+    """Buckets de RPM/TPM compartidos + concurrencia AIMD de un proveedor/modelo"""
+    
+    def __init__(
+        self,
+        key: str,
+        store,
+        rpm: float,
+        tpm: float,
+        target: float = 0.9,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+        queue_timeout: float = 30.0
+    ):
+        """
+        Args:
+            key: Proveedor/modelo (cuota independiente)
+            store: MemoryBucketStore o SQLiteBucketStore
+            rpm: Requests por minuto de la cuota (0 = sin límite)
+            tpm: Tokens por minuto de la cuota (0 = sin límite)
+            target: Fracción de la cuota a usar
+            concurrency: Límite AIMD de llamadas en vuelo
+            queue_timeout: Segundos que una llamada espera cupo
+        """
+        self.key = key
+        self.store = store
+        self.queue_timeout = queue_timeout
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        # bucket → (capacidad, recarga por segundo)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        for bucket, per_minute in (("requests", rpm), ("tokens", tpm)):
+            if per_minute > 0:
+                rate = per_minute * target / 60
+                self._buckets[bucket] = (max(rate * BURST_SECONDS, 1.0), rate)
+        self._stats = {"calls": 0, "queued": 0, "wait_seconds": 0.0, "rate_limited": 0, "timeouts": 0}
+        self._stats_lock = threading.Lock()
+    
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+    
+    def _try_acquire(self, tokens: int) -> float:
+        """0 si tomó cupo (concurrencia + buckets); si no, segundos a esperar"""
+        if not self.concurrency.try_acquire():
+            return _SLOT_POLL_SECONDS
+        needs = {
+            bucket: (min(amount, capacity), capacity, rate)
+            for bucket, amount in (("requests", 1), ("tokens", tokens))
+            if bucket in self._buckets
+            for capacity, rate in [self._buckets[bucket]]
+        }
+        wait = self.store.take(self.key, needs) if needs else 0.0
+        if wait > 0:
+            self.concurrency.release()
+        return wait
+    
+    def _check_deadline(self, wait: float, deadline: float) -> None:
+        if time.monotonic() + wait > deadline:
+            self._count("timeouts")
+            raise RateLimitTimeout(
+                f"Sin cupo para {self.key} en {self.queue_timeout:g}s (cuota del proveedor)"
+            )
+    
+    def acquire(self, tokens: int, deadline: float) -> None:
+        """Espera cupo hasta deadline (time.monotonic)"""
+        start = time.monotonic()
+        queued = False
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                break
+            self._check_deadline(wait, deadline)
+            queued = True
+            time.sleep(wait)
+        self._acquired(time.monotonic() - start if queued else 0.0)
+    
+    async def aacquire(self, tokens: int, deadline: float) -> None:
+        """Versión asíncrona de acquire (no bloquea el event loop)"""
+        start = time.monotonic()
+        queued = False
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                break
+            self._check_deadline(wait, deadline)
+            queued = True
+            await asyncio.sleep(wait)
+        self._acquired(time.monotonic() - start if queued else 0.0)
+    
+    def _acquired(self, waited: float) -> None:
+        with self._stats_lock:
+            self._stats["calls"] += 1
+            if waited > 0:
+                self._stats["queued"] += 1
+                self._stats["wait_seconds"] += waited
+    
+    def release(self, start: float, error: Optional[BaseException], tokens: int, message: Optional[AIMessage]) -> None:
+        """
+        Libera el cupo y alimenta AIMD y el bucket de tokens con el resultado.
+        
+        Sin error ni mensaje la llamada se canceló (CancelledError, stream
+        cerrado antes de tiempo): solo se libera el cupo, sin contarla como
+        éxito ni como error.
+        """
+        self.concurrency.release()
+        if error is None and message is None:
+            return
+        if error is not None:
+            if is_rate_limit_error(error):
+                self._count("rate_limited")
+                self.concurrency.on_overload()
+                self.store.cooldown(self.key, _retry_after(error))
+            return
+        
+        self.concurrency.on_success((time.perf_counter() - start) * 1000)
+        usage = getattr(message, "usage_metadata", None)
+        if usage and "tokens" in self._buckets:
+            actual = usage.get("total_tokens") or usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+            self.store.adjust(self.key, "tokens", actual - tokens)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            calls, queued, wait_seconds, rate_limited (429 vistos), timeouts,
+            concurrency_limit e in_flight
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["concurrency_limit"] = round(self.concurrency.limit, 2)
+        stats["in_flight"] = self.concurrency.in_flight
+        return stats
+
+
+# ============================================================================
+# Cliente limitado
+# ============================================================================
+
+def _as_chunk(message: BaseMessage) -> AIMessageChunk:
+    """Los clientes sin streaming nativo devuelven el mensaje completo"""
+    if isinstance(message, AIMessageChunk):
+        return message
+    return AIMessageChunk(content=message.content, usage_metadata=getattr(message, "usage_metadata", None))
+
+
+class RateLimitedLLM(BaseChatModel):
+    """Envuelve un cliente y pasa cada llamada por su LLMRateLimiter"""
+    
+    inner: BaseChatModel
+    limiter: LLMRateLimiter
+    
+    @property
+    def _llm_type(self) -> str:
+        return "rate-limited"
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        tokens = estimate_tokens(messages)
+        deadline = time.monotonic() + self.limiter.queue_timeout
+        while True:
+            self.limiter.acquire(tokens, deadline)
+            start = time.perf_counter()
+            message, error = None, None
+            try:
+                message = self.inner.invoke(messages, stop=stop, **kwargs)
+            except Exception as e:
+                error = e
+                if not is_rate_limit_error(e):
+                    raise
+            finally:
+                # También si la llamada se cancela: el cupo no se pierde
+                self.limiter.release(start, error, tokens, message)
+            if message is not None:
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            # 429: de vuelta a la cola (tras el enfriamiento) dentro del plazo
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        tokens = estimate_tokens(messages)
+        deadline = time.monotonic() + self.limiter.queue_timeout
+        while True:
+            await self.limiter.aacquire(tokens, deadline)
+            start = time.perf_counter()
+            message, error = None, None
+            try:
+                message = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+            except Exception as e:
+                error = e
+                if not is_rate_limit_error(e):
+                    raise
+            finally:
+                self.limiter.release(start, error, tokens, message)
+            if message is not None:
+                return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        tokens = estimate_tokens(messages)
+        self.limiter.acquire(tokens, time.monotonic() + self.limiter.queue_timeout)
+        start = time.perf_counter()
+        message = AIMessageChunk(content="")
+        error, completed = None, False
+        try:
+            for chunk in self.inner.stream(messages, stop=stop, **kwargs):
+                chunk = _as_chunk(chunk)
+                message += chunk
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+                yield ChatGenerationChunk(message=chunk)
+            completed = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Un stream cerrado antes de tiempo (GeneratorExit) solo libera el cupo
+            self.limiter.release(start, error, tokens, message if completed else None)
+    
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = estimate_tokens(messages)
+        await self.limiter.aacquire(tokens, time.monotonic() + self.limiter.queue_timeout)
+        start = time.perf_counter()
+        message = AIMessageChunk(content="")
+        error, completed = None, False
+        try:
+            async for chunk in self.inner.astream(messages, stop=stop, **kwargs):
+                chunk = _as_chunk(chunk)
+                message += chunk
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+                yield ChatGenerationChunk(message=chunk)
+            completed = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Un stream cerrado antes de tiempo (GeneratorExit) solo libera el cupo
+            self.limiter.release(start, error, tokens, message if completed else None)
+
+
+# ============================================================================
+# Instancias globales
+# ============================================================================
+
+_store = None
+_limiters: Dict[str, LLMRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_store():
+    """Store compartido (SQLite con LLM_RATE_LIMIT_PATH, memoria si está vacío)"""
+    global _store
+    if _store is None:
+        _store = SQLiteBucketStore(config.LLM_RATE_LIMIT_PATH) if config.LLM_RATE_LIMIT_PATH else MemoryBucketStore()
+    return _store
+
+
+def get_rate_limiter(key: str) -> LLMRateLimiter:
+    """Limitador del proceso para un proveedor/modelo (se crea en el primer uso)"""
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = _limiters[key] = LLMRateLimiter(
+                    key,
+                    _get_store(),
+                    rpm=config.LLM_RPM_LIMIT,
+                    tpm=config.LLM_TPM_LIMIT,
+                    target=config.LLM_RATE_LIMIT_TARGET,
+                    concurrency=AdaptiveConcurrency(
+                        max_limit=config.LLM_MAX_CONCURRENCY,
+                        latency_target_ms=config.LLM_LATENCY_TARGET_MS
+                    ),
+                    queue_timeout=config.LLM_QUEUE_TIMEOUT_SECONDS
+                )
+    return limiter
+
+
+def get_rate_limit_stats() -> Optional[Dict[str, Dict[str, Any]]]:
+    """Estadísticas por proveedor/modelo (None si el limitador está apagado)"""
+    if not config.LLM_RATE_LIMIT_ENABLED:
+        return None
+    return {key: limiter.stats() for key, limiter in list(_limiters.items())}
@@ -0,0 +1,38 @@
+"""
+Validación de las respuestas del LLM antes de aceptarlas
+
+La cadena de proveedores, el router y la caché reciben el mismo validate
+(el parse del nodo) y deciden con él si una respuesta sirve: si no sirve
+se prueba otro proveedor, se escala al modelo fuerte o no se cachea.
+
+Un {} (saludo, "gracias", mensaje sin partes) es una respuesta correcta
+aunque el parse no produzca una solicitud: lanza EmptyExtractionError y
+cuenta como válida. Solo el JSON mal formado o fuera del esquema es una
+respuesta inválida.
+"""
+
+from typing import Any, Callable, Optional
+
+
+class EmptyExtractionError(ValueError):
+    """El modelo no encontró partes con cantidad en el mensaje (no es un error de formato)"""
+
+
+def is_valid_answer(content: str, validate: Optional[Callable[[str], Any]]) -> bool:
+    """
+    Args:
+        content: Texto de la respuesta
+        validate: Parse que lanza si la respuesta no sirve (None: todo sirve)
+    
+    Returns:
+        True si validate la acepta o si la extracción vino vacía
+    """
+    if validate is None:
+        return True
+    try:
+        validate(content)
+    except EmptyExtractionError:
+        return True
+    except Exception:
+        return False
+    return True
@@ -0,0 +1,355 @@
+"""
+Router de modelos: modelo rápido para mensajes simples, fuerte para el resto
+
+Con LLM_ROUTER_ENABLED, get_llm() retorna un ModelRouter que, en cada
+llamada, puntúa el mensaje del cliente (0 = trivial, 1 = difícil):
+
+- Largo del mensaje
+- Renglones / números de parte distintos
+- Idioma (el prompt está en español; inglés suma poco, otro idioma mucho)
+- Confianza del fast path (qué tan cerca estuvo de resolverse con reglas)
+
+Por debajo de LLM_ROUTER_THRESHOLD va a LLM_ROUTER_FAST_MODEL; por encima,
+a LLM_ROUTER_STRONG_MODEL. La tabla de latencia y precisión por modelo
+(ventana de LLM_ROUTER_WINDOW llamadas) corrige la decisión:
+
+- Precisión: por franja de complejidad, si el modelo rápido produce menos
+  de LLM_ROUTER_MIN_ACCURACY respuestas válidas, esa franja pasa al fuerte
+  (1 de cada EXPLORE_EVERY llamadas sigue yendo al rápido para detectar
+  cuando se recupera)
+- Latencia: si el p95 del rápido supera al del fuerte, no vale la pena
+- Una respuesta inválida del modelo rápido se reintenta en el fuerte
+
+Las decisiones por modelo y motivo se exportan en stats() (/health) y,
+con tracing, como spans "llm_route" en /metrics.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from .fast_parser import SKU_PATTERN, fast_path_confidence
+from .llm_failover import ProviderChain
+from .llm_validation import is_valid_answer
+from .tracing import get_tracer
+
+# Franjas de complejidad con precisión propia
+BANDS = 4
+
+# Muestras mínimas antes de confiar en la precisión o la latencia medidas
+MIN_SAMPLES = 20
+
+# En una franja degradada, 1 de cada N llamadas sigue yendo al modelo rápido
+EXPLORE_EVERY = 20
+
+# El prompt de cambios (update_request) trae la solicitud en curso antes
+# del mensaje; solo se puntúa el mensaje (ver nodes._delta_prompt)
+_CLIENT_MESSAGE_MARKER = "Mensaje del cliente:"
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+# Sin palabras compartidas con francés/portugués/italiano ("de", "la", "un")
+SPANISH_WORDS = {
+    "el", "los", "las", "que", "y", "por", "para", "con", "una", "del", "al",
+    "necesito", "quiero", "cotizar", "cotiza", "cotizas", "cotizacion", "unidades",
+    "piezas", "pzas", "hola", "gracias", "favor", "cuanto", "precio", "entrega", "mejor", "sean",
+}
+
+ENGLISH_WORDS = {
+    "the", "of", "and", "to", "for", "with", "a", "i", "we", "need", "quote", "please",
+    "units", "pieces", "would", "like", "price", "delivery", "hello", "thanks", "how", "much",
+}
+
+# Penalización por idioma (el prompt y los ejemplos están en español)
+LANGUAGE_PENALTY = {"es": 0.0, "en": 0.25, "other": 1.0}
+
+
+# ============================================================================
+# Puntaje de complejidad
+# ============================================================================
+
+@dataclass
+class MessageFeatures:
+    """Señales del mensaje que decide el router"""
+    
+    chars: int
+    lines: int
+    parts: int
+    language: str
+    fast_path_confidence: float
+
+
+def detect_language(text: str) -> str:
+    """'es', 'en' u 'other' por palabras frecuentes (mensajes muy cortos = 'es')"""
+    words = [word.lower() for word in _WORD_PATTERN.findall(SKU_PATTERN.sub(" ", text))]
+    spanish = sum(word in SPANISH_WORDS for word in words)
+    english = sum(word in ENGLISH_WORDS for word in words)
+    if not spanish and not english:
+        return "other" if len(words) >= 3 else "es"
+    return "es" if spanish >= english else "en"
+
+
+def message_features(text: str) -> MessageFeatures:
+    return MessageFeatures(
+        chars=len(text),
+        lines=sum(1 for row in text.splitlines() if row.strip()),
+        parts=len({match.upper() for match in SKU_PATTERN.findall(text)}),
+        language=detect_language(text),
+        fast_path_confidence=fast_path_confidence(text)
+    )
+
+
+def complexity(features: MessageFeatures) -> float:
+    """Puntaje 0 (trivial) a 1 (difícil) del mensaje"""
+    length = min(features.chars / 300, 1.0)
+    lines = min(max(features.lines - 1, features.parts - 1, 0) / 4, 1.0)
+    return (
+        0.25 * length
+        + 0.25 * lines
+        + 0.2 * LANGUAGE_PENALTY[features.language]
+        + 0.3 * (1 - features.fast_path_confidence)
+    )
+
+
+def routing_text(messages: List[BaseMessage]) -> str:
+    """Último mensaje del cliente dentro del prompt"""
+    text = next((str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+    return text.split(_CLIENT_MESSAGE_MARKER, 1)[-1].strip()
+
+
+# ============================================================================
+# Tabla de latencia y precisión
+# ============================================================================
+
+class _ModelTable:
+    """Últimas llamadas de un modelo: (latencia ms, respuesta válida)"""
+    
+    def __init__(self, window: int):
+        self.calls: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        # Precisión por franja de complejidad
+        self.bands: List[Deque[bool]] = [deque(maxlen=window) for _ in range(BANDS)]
+    
+    def add(self, band: int, latency_ms: float, valid: bool) -> None:
+        self.calls.append((latency_ms, valid))
+        self.bands[band].append(valid)
+    
+    def p95(self) -> Optional[float]:
+        if len(self.calls) < MIN_SAMPLES:
+            return None
+        ordered = sorted(latency for latency, _ in self.calls)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    
+    def accuracy(self, band: Optional[int] = None) -> Optional[float]:
+        samples = [valid for _, valid in self.calls] if band is None else list(self.bands[band])
+        if not samples:
+            return None
+        return sum(samples) / len(samples)
+    
+    def band_samples(self, band: int) -> int:
+        return len(self.bands[band])
+
+
+class ModelRouter:
+    """
+    Elige modelo rápido o fuerte por llamada.
+    
+    Expone invoke/ainvoke como ProviderChain (acepta validate).
+    """
+    
+    def __init__(
+        self,
+        fast: Tuple[str, BaseChatModel],
+        strong: Tuple[str, BaseChatModel],
+        threshold: float = 0.5,
+        min_accuracy: float = 0.9,
+        window: int = 200
+    ):
+        """
+        Args:
+            fast: (modelo, cliente) rápido/barato
+            strong: (modelo, cliente) fuerte
+            threshold: Complejidad desde la que se usa el modelo fuerte
+            min_accuracy: Precisión mínima del rápido en una franja
+            window: Llamadas recordadas por modelo
+        """
+        self.fast_model, self.fast_llm = fast
+        self.strong_model, self.strong_llm = strong
+        self.threshold = threshold
+        self.min_accuracy = min_accuracy
+        self._tables = {self.fast_model: _ModelTable(window), self.strong_model: _ModelTable(window)}
+        self._decisions: Dict[str, int] = {self.fast_model: 0, self.strong_model: 0}
+        self._reasons: Dict[str, int] = {
+            "complexity": 0, "simple": 0, "accuracy": 0, "latency": 0, "explore": 0, "escalated": 0,
+        }
+        self._demoted = [0] * BANDS
+        self._lock = threading.Lock()
+    
+    def route(self, messages: List[BaseMessage]) -> Tuple[bool, int, str]:
+        """
+        Decide el modelo para el prompt.
+        
+        Returns:
+            (usar_rápido, franja, motivo)
+        """
+        score = complexity(message_features(routing_text(messages)))
+        band = min(int(score * BANDS), BANDS - 1)
+        
+        with self._lock:
+            if score >= self.threshold:
+                return False, band, "complexity"
+            
+            fast_table = self._tables[self.fast_model]
+            accuracy = fast_table.accuracy(band)
+            if fast_table.band_samples(band) >= MIN_SAMPLES and accuracy < self.min_accuracy:
+                self._demoted[band] += 1
+                if self._demoted[band] % EXPLORE_EVERY:
+                    return False, band, "accuracy"
+                return True, band, "explore"
+            
+            fast_p95 = fast_table.p95()
+            strong_p95 = self._tables[self.strong_model].p95()
+            if fast_p95 is not None and strong_p95 is not None and fast_p95 > strong_p95:
+                return False, band, "latency"
+            
+            return True, band, "simple"
+    
+    def _count(self, model: str, reason: str) -> None:
+        with self._lock:
+            self._decisions[model] += 1
+            self._reasons[reason] += 1
+    
+    def _record(self, model: str, band: int, start: float, valid: bool) -> None:
+        with self._lock:
+            self._tables[model].add(band, (time.perf_counter() - start) * 1000, valid)
+    
+    @staticmethod
+    def _is_valid(message: AIMessage, validate: Optional[Callable[[str], Any]]) -> bool:
+        return is_valid_answer(message.content, validate)
+    
+    # ------------------------------------------------------------------------
+    # Llamadas
+    # ------------------------------------------------------------------------
+    
+    def _call(
+        self,
+        model: str,
+        llm: BaseChatModel,
+        band: int,
+        messages: List[BaseMessage],
+        validate: Optional[Callable[[str], Any]]
+    ) -> Tuple[Optional[AIMessage], Optional[BaseException]]:
+        start = time.perf_counter()
+        try:
+            if isinstance(llm, ProviderChain):
+                message = llm.invoke(messages, validate=validate)
+            else:
+                message = llm.invoke(messages)
+        except Exception as e:
+            self._record(model, band, start, False)
+            return None, e
+        self._record(model, band, start, self._is_valid(message, validate))
+        return message, None
+    
+    async def _acall(
+        self,
+        model: str,
+        llm: BaseChatModel,
+        band: int,
+        messages: List[BaseMessage],
+        validate: Optional[Callable[[str], Any]]
+    ) -> Tuple[Optional[AIMessage], Optional[BaseException]]:
+        start = time.perf_counter()
+        try:
+            if isinstance(llm, ProviderChain):
+                message = await llm.ainvoke(messages, validate=validate)
+            else:
+                message = await llm.ainvoke(messages)
+        except Exception as e:
+            self._record(model, band, start, False)
+            return None, e
+        self._record(model, band, start, self._is_valid(message, validate))
+        return message, None
+    
+    def _needs_escalation(self, message: Optional[AIMessage], validate: Optional[Callable[[str], Any]]) -> bool:
+        return message is None or not self._is_valid(message, validate)
+    
+    @staticmethod
+    def _answered(model: str, message: AIMessage) -> AIMessage:
+        """Anota qué modelo respondió (clave de la caché)"""
+        message.response_metadata["llm_model"] = model
+        return message
+    
+    def invoke(self, messages: List[BaseMessage], validate: Optional[Callable[[str], Any]] = None) -> AIMessage:
+        """
+        Respuesta del modelo elegido (el fuerte si el rápido no sirvió).
+        
+        Raises:
+            Exception: El error del modelo fuerte
+        """
+        use_fast, band, reason = self.route(messages)
+        
+        if use_fast:
+            with get_tracer().span("llm_route", self.fast_model, reason=reason, band=band):
+                self._count(self.fast_model, reason)
+                message, error = self._call(self.fast_model, self.fast_llm, band, messages, validate)
+            if not self._needs_escalation(message, validate):
+                return self._answered(self.fast_model, message)
+            reason = "escalated"
+        
+        with get_tracer().span("llm_route", self.strong_model, reason=reason, band=band):
+            self._count(self.strong_model, reason)
+            message, error = self._call(self.strong_model, self.strong_llm, band, messages, validate)
+        if error is not None:
+            raise error
+        return self._answered(self.strong_model, message)
+    
+    async def ainvoke(self, messages: List[BaseMessage], validate: Optional[Callable[[str], Any]] = None) -> AIMessage:
+        """Versión asíncrona de invoke"""
+        use_fast, band, reason = self.route(messages)
+        
+        if use_fast:
+            with get_tracer().span("llm_route", self.fast_model, reason=reason, band=band):
+                self._count(self.fast_model, reason)
+                message, error = await self._acall(self.fast_model, self.fast_llm, band, messages, validate)
+            if not self._needs_escalation(message, validate):
+                return self._answered(self.fast_model, message)
+            reason = "escalated"
+        
+        with get_tracer().span("llm_route", self.strong_model, reason=reason, band=band):
+            self._count(self.strong_model, reason)
+            message, error = await self._acall(self.strong_model, self.strong_llm, band, messages, validate)
+        if error is not None:
+            raise error
+        return self._answered(self.strong_model, message)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Reparto de decisiones y tabla por modelo.
+        
+        Returns:
+            Diccionario con:
+            - decisions: Llamadas por modelo
+            - reasons: Llamadas por motivo (complexity, simple, accuracy,
+              latency, explore, escalated)
+            - models: samples, p95_ms, accuracy y precisión por franja de cada modelo
+        """
+        with self._lock:
+            return {
+                "decisions": dict(self._decisions),
+                "reasons": dict(self._reasons),
+                "models": {
+                    model: {
+                        "samples": len(table.calls),
+                        "p95_ms": table.p95(),
+                        "accuracy": table.accuracy(),
+                        "band_accuracy": [table.accuracy(band) for band in range(BANDS)],
+                    }
+                    for model, table in self._tables.items()
+                },
+            }
@@ -3,17 +3,49 @@ Modelos Pydantic para validación de datos
 """
 
 from datetime import datetime, timedelta
-from typing import Optional, List
-from pydantic import BaseModel, Field, field_validator
+from decimal import Decimal
+from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+
+class QuoteLineItem(BaseModel):
+    """Línea de una solicitud de cotización (parte y cantidad)"""
+    
+    part_number: str = Field(..., description="Número de parte o SKU")
+    quantity: int = Field(..., gt=0, description="Cantidad solicitada")
+    
+    @field_validator('part_number')
+    @classmethod
+    def normalize_part_number(cls, v: str) -> str:
+        """Normaliza el número de parte a mayúsculas"""
+        return v.strip().upper()
 
 
 class QuoteRequest(BaseModel):
-    """Solicitud de cotización del cliente"""
+    """
+    Solicitud de cotización del cliente.
+    
+    Una solicitud tiene una o más líneas (line_items). part_number y
+    quantity corresponden siempre a la primera línea, de modo que una
+    solicitud de una sola parte se sigue construyendo como antes.
+    """
     
     part_number: str = Field(..., description="Número de parte o SKU")
     quantity: int = Field(..., gt=0, description="Cantidad solicitada")
     customer_id: Optional[str] = Field(None, description="ID del cliente")
     notes: Optional[str] = Field(None, description="Notas adicionales")
+    line_items: List[QuoteLineItem] = Field(default_factory=list, description="Líneas de la solicitud")
+    
+    @model_validator(mode='before')
+    @classmethod
+    def fill_first_line(cls, data: Any) -> Any:
+        """Permite construir la solicitud solo con line_items"""
+        if isinstance(data, dict) and data.get("line_items") and "part_number" not in data:
+            first = data["line_items"][0]
+            if isinstance(first, QuoteLineItem):
+                first = first.model_dump()
+            data = {**data, "part_number": first["part_number"], "quantity": first["quantity"]}
+        return data
     
     @field_validator('part_number')
     @classmethod
@@ -28,6 +60,32 @@ class QuoteRequest(BaseModel):
         if v <= 0:
             raise ValueError("La cantidad debe ser mayor a 0")
         return v
+    
+    @model_validator(mode='after')
+    def merge_line_items(self) -> "QuoteRequest":
+        """Completa line_items y suma las cantidades de partes repetidas"""
+        if not self.line_items:
+            self.line_items = [QuoteLineItem(part_number=self.part_number, quantity=self.quantity)]
+            return self
+        
+        merged: Dict[str, int] = {}
+        for item in self.line_items:
+            merged[item.part_number] = merged.get(item.part_number, 0) + item.quantity
+        
+        if len(merged) != len(self.line_items):
+            self.line_items = [
+                QuoteLineItem(part_number=part_number, quantity=quantity)
+                for part_number, quantity in merged.items()
+            ]
+        
+        first = self.line_items[0]
+        self.part_number, self.quantity = first.part_number, first.quantity
+        return self
+    
+    @property
+    def is_multi_line(self) -> bool:
+        """True si la solicitud tiene más de una parte"""
+        return len(self.line_items) > 1
 
 
 class InventoryResult(BaseModel):
@@ -39,6 +97,18 @@ class InventoryResult(BaseModel):
     unit_price: Optional[float] = Field(None, ge=0)
     lead_time_days: Optional[int] = Field(None, ge=0)
     suggested_alternatives: List[str] = Field(default_factory=list)
+    did_you_mean: List[str] = Field(
+        default_factory=list,
+        description="SKUs del catálogo parecidos a una parte no encontrada"
+    )
+    corrected_from: Optional[str] = Field(
+        None,
+        description="Part number tal como lo escribió el cliente, si se corrigió"
+    )
+    line_results: List["InventoryResult"] = Field(
+        default_factory=list,
+        description="Resultado por línea en solicitudes de varias partes"
+    )
     
     @field_validator('status')
     @classmethod
@@ -48,31 +118,133 @@ class InventoryResult(BaseModel):
         if v not in valid_statuses:
             raise ValueError(f"Status debe ser uno de: {valid_statuses}")
         return v
+    
+    @classmethod
+    def from_record(
+        cls,
+        part_number: str,
+        record: Optional[Dict[str, Any]],
+        quantity: int
+    ) -> "InventoryResult":
+        """
+        Construye el resultado a partir del registro crudo de inventario.
+        
+        Args:
+            part_number: Número de parte consultado
+            record: Registro con stock, unit_price, lead_time_days y
+                    alternatives (None si la parte no existe)
+            quantity: Cantidad solicitada
+        """
+        if record is None:
+            return cls(
+                part_number=part_number,
+                status="unavailable",
+                available_stock=0,
+                unit_price=None,
+                lead_time_days=None,
+                suggested_alternatives=[]
+            )
+        
+        available_stock = record["stock"]
+        unit_price = record["unit_price"]
+        
+        # Determinar status
+        if unit_price is None:
+            status = "no_price"
+        elif available_stock >= quantity:
+            status = "available"
+        elif available_stock > 0:
+            status = "insufficient"
+        else:
+            status = "unavailable"
+        
+        return cls(
+            part_number=part_number,
+            status=status,
+            available_stock=available_stock,
+            unit_price=unit_price,
+            lead_time_days=record.get("lead_time_days"),
+            suggested_alternatives=list(record.get("alternatives") or [])
+        )
+    
+    @classmethod
+    def combine(cls, results: List["InventoryResult"]) -> "InventoryResult":
+        """
+        Agrupa los resultados de varias líneas en uno solo.
+        
+        El status agregado es "available" solo si todas las líneas lo son;
+        si no, el de la primera línea con problemas. El detalle por línea
+        queda en line_results.
+        
+        Args:
+            results: Resultado de cada línea, en el orden de la solicitud
+        """
+        problems = [result for result in results if result.status != "available"]
+        lead_times = [result.lead_time_days for result in results if result.lead_time_days is not None]
+        
+        return cls(
+            part_number=", ".join(result.part_number for result in results),
+            status=problems[0].status if problems else "available",
+            available_stock=0,
+            unit_price=None,
+            lead_time_days=max(lead_times) if lead_times else None,
+            suggested_alternatives=[],
+            line_results=results
+        )
+
+
+class QuoteLine(BaseModel):
+    """Línea cotizada (montos en Decimal, como los calcula el motor de precios)"""
+    
+    part_number: str
+    quantity: int
+    unit_price: Decimal
+    subtotal: Decimal
+    list_price: Optional[Decimal] = None
+    discount_percent: float = 0
 
 
 class Quote(BaseModel):
-    """Cotización generada"""
+    """
+    Cotización generada.
+    
+    part_number, quantity y unit_price corresponden a la primera línea;
+    subtotal, tax y total son los de la cotización completa, en currency.
+    Los montos son Decimal exactos (en JSON se serializan como texto,
+    "2550.00") desde el motor de precios hasta el store y la orden.
+    """
     
     quote_id: str
     part_number: str
     quantity: int
-    unit_price: float
-    subtotal: float
-    tax: float
-    total: float
+    unit_price: Decimal
+    subtotal: Decimal
+    tax: Decimal
+    total: Decimal
     valid_until: datetime
+    customer_id: Optional[str] = None
+    currency: str = "USD"
+    tax_percent: float = 19
     notes: Optional[str] = None
+    line_items: List[QuoteLine] = Field(default_factory=list)
     
     @field_validator('unit_price', 'subtotal', 'tax', 'total')
     @classmethod
-    def validate_positive(cls, v: float) -> float:
+    def validate_positive(cls, v: Decimal) -> Decimal:
         """Valida que los montos sean positivos"""
         if v < 0:
             raise ValueError("Los montos deben ser positivos")
         return v
     
+    def _money(self, amount: Decimal) -> str:
+        """Monto en la moneda de la cotización (no siempre es USD)"""
+        return f"{amount:,.2f} {self.currency}"
+    
     def format_for_display(self) -> str:
         """Formatea la cotización para mostrar al usuario"""
+        if len(self.line_items) > 1:
+            return self._format_table()
+        
         return f"""
 ╔══════════════════════════════════════════════════════════╗
 ║                    COTIZACIÓN                            ║
@@ -83,12 +255,63 @@ class Quote(BaseModel):
 🔢 Cantidad: {self.quantity:,} unidades
 
 💰 DESGLOSE:
-   Precio unitario:  ${self.unit_price:,.2f}
-   Subtotal:         ${self.subtotal:,.2f}
-   IVA (19%):        ${self.tax:,.2f}
+   Precio unitario:  {self._money(self.unit_price)}
+   Subtotal:         {self._money(self.subtotal)}
+   IVA ({self.tax_percent:g}%):        {self._money(self.tax)}
    ─────────────────────────────────
-   TOTAL:            ${self.total:,.2f}
+   TOTAL:            {self._money(self.total)}
 
 📅 Válida hasta: {self.valid_until.strftime('%d/%m/%Y')}
 {f'📝 Notas: {self.notes}' if self.notes else ''}
-"""
\ No newline at end of file
+"""
+    
+    def _format_table(self) -> str:
+        """Formato compacto en tabla para cotizaciones de varias líneas"""
+        rows = "\n".join(
+            f"  {i:>3}  {line.part_number:<14} {line.quantity:>9,} {line.unit_price:>12,.2f} {line.subtotal:>14,.2f}"
+            for i, line in enumerate(self.line_items, start=1)
+        )
+        units = sum(line.quantity for line in self.line_items)
+        
+        return f"""
+╔══════════════════════════════════════════════════════════╗
+║                    COTIZACIÓN                            ║
+╚══════════════════════════════════════════════════════════╝
+
+📋 ID Cotización: {self.quote_id}
+📦 {len(self.line_items)} líneas, {units:,} unidades
+
+    #  Parte              Cant.  P. unitario       Subtotal
+  ───  ────────────── ───────── ──────────── ──────────────
+{rows}
+
+💰 DESGLOSE:
+   Subtotal:         {self._money(self.subtotal)}
+   IVA ({self.tax_percent:g}%):        {self._money(self.tax)}
+   ─────────────────────────────────
+   TOTAL:            {self._money(self.total)}
+
+📅 Válida hasta: {self.valid_until.strftime('%d/%m/%Y')}
+{f'📝 Notas: {self.notes}' if self.notes else ''}
+"""
+
+
+class OrderStatus(BaseModel):
+    """Estado de una orden en la cola de envío al ERP"""
+    
+    idempotency_key: str = Field(..., description="Derivada del quote_id")
+    quote_id: str
+    status: str = Field(..., description="pending | sent | failed")
+    order_id: Optional[str] = Field(None, description="Número de orden asignado por el ERP")
+    attempts: int = Field(0, ge=0)
+    last_error: Optional[str] = None
+    created_at: datetime
+    
+    @field_validator('status')
+    @classmethod
+    def validate_status(cls, v: str) -> str:
+        """Valida que el status sea uno de los permitidos"""
+        valid_statuses = {"pending", "sent", "failed"}
+        if v not in valid_statuses:
+            raise ValueError(f"Status debe ser uno de: {valid_statuses}")
+        return v
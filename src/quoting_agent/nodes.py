@@ -2,33 +2,65 @@
 Nodos del grafo LangGraph - cada nodo representa una etapa del proceso
 """
 
+import asyncio
 import json
-from langchain_core.messages import AIMessage, SystemMessage
+from typing import Dict, List, Optional, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 
 from .state import AgentState
-from .models import QuoteRequest
-from .tools import check_inventory_tool, generate_quote_tool
-from .llm_factory import create_llm
+from .models import QuoteRequest, QuoteLineItem, InventoryResult, OrderStatus
+from .tools import (
+    check_inventory_tool,
+    acheck_inventory_tool,
+    check_inventory_lines_tool,
+    acheck_inventory_lines_tool,
+    generate_quote_tool,
+    submit_order_tool,
+)
+from .erp_client import ERPError
+from .llm_factory import get_llm
+from .json_repair import loads_lenient
+from .llm_extraction import EmptyExtractionError, aextract, extract, structured_output_active
+from .llm_limiter import RateLimitTimeout, is_rate_limit_error
+from .fast_parser import fast_parse, fast_parse_delta
+from .part_resolver import resolve_part_number
+from .quote_store import get_quote_store
+from .config import config
 
 
 # ============================================================================
 # NODO 1: Parse Request
 # ============================================================================
 
-def parse_request_node(state: AgentState) -> dict:
-    """
-    Extrae información estructurada del mensaje del usuario usando LLM.
-    
-    Usa el LLM para interpretar lenguaje natural y extraer:
-    - Número de parte
-    - Cantidad solicitada
-    
-    Returns:
-        Estado actualizado con quote_request o needs_clarification
-    """
-    llm = create_llm()
-    
-    system_prompt = """Eres un asistente de ventas experto. 
+def _last_user_message(messages: List[BaseMessage]) -> str:
+    """Retorna el contenido del último mensaje del usuario"""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message.content
+    return ""
+
+
+def _request_summary(quote_request: QuoteRequest) -> str:
+    if quote_request.is_multi_line:
+        units = sum(item.quantity for item in quote_request.line_items)
+        return f"{len(quote_request.line_items)} líneas ({units:,} unidades en total)"
+    return f"{quote_request.quantity} unidades de **{quote_request.part_number}**"
+
+
+def _parsed_request_update(quote_request: QuoteRequest) -> dict:
+    """Actualización de estado para una solicitud parseada correctamente"""
+    return {
+        "quote_request": quote_request,
+        # Una solicitud nueva deja sin efecto la cotización anterior de la sesión
+        "quote": None,
+        "messages": [AIMessage(
+            content=f"✓ Entendido: {_request_summary(quote_request)}. Verificando disponibilidad..."
+        )],
+        "needs_clarification": False
+    }
+
+
+PARSE_SYSTEM_PROMPT = """Eres un asistente de ventas experto. 
     
 Extrae información de cotización del mensaje del cliente.
 
@@ -41,40 +73,71 @@ IMPORTANTE: Responde SOLO con JSON válido, sin texto adicional.
 Formato exacto:
 {"part_number": "ABC-45", "quantity": 100}
 
+Si el cliente pide varias partes, usa una lista de líneas:
+{"line_items": [{"part_number": "ABC-45", "quantity": 100}, {"part_number": "XYZ-100", "quantity": 20}]}
+
 Ejemplos:
 - "Necesito 100 unidades de ABC-45" → {"part_number": "ABC-45", "quantity": 100}
 - "Quiero cotizar 50 piezas XYZ-100" → {"part_number": "XYZ-100", "quantity": 50}
 - "Me interesan 25 del producto DEF-200" → {"part_number": "DEF-200", "quantity": 25}
+- "100 de ABC-45 y 20 de XYZ-100" → {"line_items": [{"part_number": "ABC-45", "quantity": 100}, {"part_number": "XYZ-100", "quantity": 20}]}
+
+Si el mensaje no trae número de parte y cantidad, responde: {}
+"""
+
+# Con structured output el formato lo fija el esquema (llm_extraction):
+# el prompt no necesita instrucciones ni ejemplos en JSON
+STRUCTURED_PARSE_PROMPT = """Eres un asistente de ventas experto.
+
+Extrae las partes (número de parte o producto, ej: ABC-45) y las cantidades
+que pide el cliente. Si el mensaje no trae número de parte y cantidad, deja
+line_items vacío.
 """
+
+
+def _parse_system_prompt() -> str:
+    return STRUCTURED_PARSE_PROMPT if structured_output_active() else PARSE_SYSTEM_PROMPT
+
+
+def _fast_path_update(state: AgentState) -> Optional[dict]:
+    """Fast path: mensajes inequívocos no necesitan LLM"""
+    if not config.FAST_PARSE_ENABLED:
+        return None
     
-    messages = [SystemMessage(content=system_prompt)] + state["messages"]
+    quote_request = fast_parse(_last_user_message(state["messages"]))
+    if quote_request is None:
+        return None
     
-    try:
-        response = llm.invoke(messages)
-        
-        # Parsear JSON
-        # Limpiar respuesta por si tiene markdown
-        content = response.content.strip()
-        if content.startswith("```json"):
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif content.startswith("```"):
-            content = content.split("```")[1].split("```")[0].strip()
-            
-        data = json.loads(content)
-        
-        # Validar con Pydantic
-        quote_request = QuoteRequest(**data)
-        
-        return {
-            "quote_request": quote_request,
-            "messages": [AIMessage(
-                content=f"✓ Entendido: {quote_request.quantity} unidades de **{quote_request.part_number}**. "
-                        f"Verificando disponibilidad..."
-            )],
-            "needs_clarification": False
-        }
-        
-    except json.JSONDecodeError as e:
+    return _parsed_request_update(quote_request)
+
+
+def _load_llm_json(content: str) -> dict:
+    """JSON de la respuesta del LLM, reparado localmente si hace falta (markdown, comas, truncado)"""
+    return loads_lenient(content)
+
+
+def _parse_llm_content(content: str) -> dict:
+    """
+    Convierte la respuesta del LLM en actualización de estado.
+    
+    Raises:
+        json.JSONDecodeError: Si la respuesta no es JSON
+        EmptyExtractionError: Si el mensaje no trae partes con cantidad ({})
+        ValidationError: Si el JSON no cumple QuoteRequest
+    """
+    data = _load_llm_json(content)
+    if not data:
+        raise EmptyExtractionError("El mensaje no trae número de parte y cantidad")
+    
+    # Validar con Pydantic
+    quote_request = QuoteRequest(**data)
+    
+    return _parsed_request_update(quote_request)
+
+
+def _parse_error_update(error: Exception) -> dict:
+    """Actualización de estado cuando el LLM no produjo una solicitud válida"""
+    if isinstance(error, (json.JSONDecodeError, EmptyExtractionError)):
         return {
             "messages": [AIMessage(
                 content=f"❌ No pude interpretar tu solicitud correctamente.\n\n"
@@ -84,31 +147,397 @@ Ejemplos:
                         f"Ejemplo: 'Necesito 100 unidades de ABC-45'"
             )],
             "needs_clarification": True,
-            "error_message": f"JSON parse error: {str(e)}"
+            "error_message": f"JSON parse error: {str(error)}"
         }
-        
-    except Exception as e:
+    
+    if isinstance(error, RateLimitTimeout) or is_rate_limit_error(error):
+        # Cuota del proveedor agotada: el mensaje del cliente está bien
         return {
             "messages": [AIMessage(
-                content=f"❌ Error al procesar solicitud: {str(e)}\n\n"
-                        f"Intenta reformular tu mensaje con el formato:\n"
-                        f"'Necesito [cantidad] unidades de [parte]'"
+                content="⏳ Estamos recibiendo muchas solicitudes en este momento.\n\n"
+                        "Tu mensaje no necesita cambios: envíalo de nuevo en unos segundos."
             )],
             "needs_clarification": True,
-            "error_message": str(e)
+            "error_message": f"LLM rate limit: {str(error)}"
         }
+    
+    return {
+        "messages": [AIMessage(
+            content=f"❌ Error al procesar solicitud: {str(error)}\n\n"
+                    f"Intenta reformular tu mensaje con el formato:\n"
+                    f"'Necesito [cantidad] unidades de [parte]'"
+        )],
+        "needs_clarification": True,
+        "error_message": str(error)
+    }
+
+
+def parse_request_node(state: AgentState) -> dict:
+    """
+    Extrae información estructurada del mensaje del usuario usando LLM.
+    
+    Primero intenta el fast path determinista (fast_parser); solo los
+    mensajes ambiguos llegan al LLM, que extrae:
+    - Número de parte
+    - Cantidad solicitada
+    
+    Returns:
+        Estado actualizado con quote_request o needs_clarification
+    """
+    update = _fast_path_update(state)
+    if update is not None:
+        return update
+    
+    messages = [SystemMessage(content=_parse_system_prompt())] + state["messages"]
+    
+    llm = get_llm()
+    
+    try:
+        # Respuestas repetidas se sirven desde la caché; una respuesta que
+        # ni reparada sirve se reintenta una vez con un prompt corto
+        return extract(llm, messages, _parse_llm_content)
+        
+    except Exception as e:
+        return _parse_error_update(e)
+
+
+async def aparse_request_node(state: AgentState) -> dict:
+    """Versión asíncrona de parse_request_node (usa llm.ainvoke)"""
+    update = _fast_path_update(state)
+    if update is not None:
+        return update
+    
+    messages = [SystemMessage(content=_parse_system_prompt())] + state["messages"]
+    
+    llm = get_llm()
+    
+    try:
+        return await aextract(llm, messages, _parse_llm_content)
+        
+    except Exception as e:
+        return _parse_error_update(e)
+
+
+# ============================================================================
+# NODO 1b: Update Request (turnos siguientes de una sesión)
+# ============================================================================
+
+DELTA_SYSTEM_PROMPT = """Eres un asistente de ventas experto.
+
+El cliente ya tiene una solicitud de cotización en curso y su nuevo mensaje
+puede modificarla (otra cantidad, otro número de parte, agregar o quitar partes).
+
+IMPORTANTE: Responde SOLO con JSON válido, sin texto adicional.
+
+Si el mensaje modifica la solicitud, responde con la solicitud completa actualizada:
+{"line_items": [{"part_number": "ABC-45", "quantity": 80}]}
+
+Si el mensaje no modifica la solicitud, responde: {}
+
+Ejemplos (solicitud en curso: 100 de ABC-45):
+- "que sean 80" → {"line_items": [{"part_number": "ABC-45", "quantity": 80}]}
+- "mejor ABC-46" → {"line_items": [{"part_number": "ABC-46", "quantity": 100}]}
+- "agrega 20 de XYZ-100" → {"line_items": [{"part_number": "ABC-45", "quantity": 100}, {"part_number": "XYZ-100", "quantity": 20}]}
+- "gracias" → {}
+"""
+
+STRUCTURED_DELTA_PROMPT = """Eres un asistente de ventas experto.
+
+El cliente ya tiene una solicitud de cotización en curso y su nuevo mensaje
+puede modificarla (otra cantidad, otro número de parte, agregar o quitar partes).
+
+Si el mensaje la modifica, devuelve en line_items la solicitud completa
+actualizada; si no la modifica, deja line_items vacío.
+"""
+
+
+def _previous_stock(inventory: Optional[InventoryResult]) -> Optional[int]:
+    """Stock visto en el turno anterior (solo solicitudes de una parte)"""
+    if inventory is None or inventory.line_results:
+        return None
+    return inventory.available_stock
+
+
+def _fast_delta(state: AgentState) -> Optional[QuoteRequest]:
+    """Fast path del cambio: reglas sobre el último mensaje, sin LLM"""
+    if not config.FAST_PARSE_ENABLED:
+        return None
+    
+    return fast_parse_delta(
+        _last_user_message(state["messages"]),
+        state["quote_request"],
+        _previous_stock(state.get("inventory_result"))
+    )
+
+
+def _delta_prompt(state: AgentState) -> List[BaseMessage]:
+    """Prompt del cambio: solo la solicitud vigente y el último mensaje, no el historial"""
+    request = state["quote_request"]
+    current = json.dumps(
+        {"line_items": [item.model_dump() for item in request.line_items]},
+        ensure_ascii=False
+    )
+    context = f"Solicitud en curso: {current}\n"
+    
+    stock = _previous_stock(state.get("inventory_result"))
+    if stock is not None and stock < request.quantity:
+        context += f"Stock disponible de {request.part_number}: {stock}\n"
+    
+    return [
+        SystemMessage(content=STRUCTURED_DELTA_PROMPT if structured_output_active() else DELTA_SYSTEM_PROMPT),
+        HumanMessage(content=context + f"Mensaje del cliente: {_last_user_message(state['messages'])}")
+    ]
+
+
+def _parse_delta_content(content: str, request: QuoteRequest) -> Optional[QuoteRequest]:
+    """
+    Solicitud actualizada según el LLM, o None si el mensaje no la modifica.
+    
+    Raises:
+        json.JSONDecodeError: Si la respuesta no es JSON
+        ValidationError: Si el JSON no cumple QuoteRequest
+    """
+    data = _load_llm_json(content)
+    if not data:
+        return None
+    
+    return QuoteRequest(**data, customer_id=request.customer_id, notes=request.notes)
+
+
+def _reusable_inventory(request: QuoteRequest, inventory: Optional[InventoryResult]) -> Optional[InventoryResult]:
+    """
+    Inventario del turno anterior, si ya cubre la solicitud actualizada.
+    
+    Al bajar la cantidad (o pedir "las disponibles") el stock y el precio
+    ya consultados alcanzan y no hace falta volver a check_inventory.
+    """
+    if inventory is None:
+        return None
+    
+    previous = {result.part_number: result for result in inventory.line_results or [inventory]}
+    results = []
+    for item in request.line_items:
+        result = previous.get(item.part_number)
+        if result is None or result.unit_price is None or result.available_stock < item.quantity:
+            return None
+        results.append(result.model_copy(update={"status": "available", "corrected_from": None, "did_you_mean": []}))
+    
+    return InventoryResult.combine(results) if len(results) > 1 else results[0]
+
+
+def _delta_update(request: QuoteRequest, inventory: Optional[InventoryResult]) -> dict:
+    """Actualización de estado tras aplicar el cambio a la solicitud"""
+    reused = _reusable_inventory(request, inventory)
+    
+    content = f"✓ Actualizado: {_request_summary(request)}."
+    if reused is None:
+        content += " Verificando disponibilidad..."
+    
+    return {
+        "quote_request": request,
+        # None obliga a consultar inventario de nuevo
+        "inventory_result": reused,
+        "quote": None,
+        "messages": [AIMessage(content=content)],
+        "needs_clarification": False
+    }
+
+
+def update_request_node(state: AgentState) -> dict:
+    """
+    Aplica el mensaje de un turno siguiente a la solicitud de la sesión.
+    
+    En vez de volver a parsear todo el historial, interpreta solo el
+    último mensaje contra la solicitud vigente: primero con reglas
+    ("que sean 80", "mejor ABC-46") y si no con el LLM, cuyo prompt lleva
+    solo la solicitud y el mensaje. Si el mensaje no cambia la solicitud,
+    se parsea completo como en el primer turno.
+    
+    Returns:
+        Estado con quote_request actualizado e inventory_result reutilizado
+        (salta a generate_quote) o None (vuelve a consultar inventario)
+    """
+    request = state["quote_request"]
+    
+    updated = _fast_delta(state)
+    if updated is None:
+        llm = get_llm()
+        try:
+            updated = extract(llm, _delta_prompt(state), lambda c: _parse_delta_content(c, request))
+        except Exception as e:
+            return _parse_error_update(e)
+        
+        if updated is None:
+            return {**parse_request_node(state), "inventory_result": None}
+    
+    return _delta_update(updated, state.get("inventory_result"))
+
+
+async def aupdate_request_node(state: AgentState) -> dict:
+    """Versión asíncrona de update_request_node (usa llm.ainvoke)"""
+    request = state["quote_request"]
+    
+    updated = _fast_delta(state)
+    if updated is None:
+        llm = get_llm()
+        try:
+            updated = await aextract(llm, _delta_prompt(state), lambda c: _parse_delta_content(c, request))
+        except Exception as e:
+            return _parse_error_update(e)
+        
+        if updated is None:
+            return {**await aparse_request_node(state), "inventory_result": None}
+    
+    return _delta_update(updated, state.get("inventory_result"))
 
 
 # ============================================================================
 # NODO 2: Check Inventory
 # ============================================================================
 
+def _inventory_update(request: QuoteRequest, inventory_result: InventoryResult) -> dict:
+    """Actualización de estado tras consultar inventario"""
+    if request.is_multi_line:
+        consulted = f"{len(request.line_items)} líneas"
+    else:
+        consulted = request.part_number
+    
+    return {
+        # Si se corrigió algún part number, la solicitud corregida es la que se cotiza
+        "quote_request": request,
+        "inventory_result": inventory_result,
+        "messages": [AIMessage(
+            content=_corrections_note(inventory_result) + f"📊 Inventario consultado para {consulted}..."
+        )]
+    }
+
+
+def _resolve_unknown_parts(
+    inventory: InventoryResult
+) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Busca en el catálogo las partes que no se encontraron.
+    
+    Solo con inventario local (ENABLE_MOCK_DATA): el catálogo es el que
+    respalda el inventario. Con el ERP el catálogo local no refleja sus
+    partes y un SKU real podría "corregirse" a otro.
+    
+    Returns:
+        (correcciones, sugerencias): el SKU a usar cuando hay un candidato
+        claro, y los candidatos a ofrecer cuando no lo hay
+    """
+    corrections: Dict[str, str] = {}
+    suggestions: Dict[str, List[str]] = {}
+    
+    if not config.FUZZY_MATCH_ENABLED or not config.ENABLE_MOCK_DATA:
+        return corrections, suggestions
+    
+    for result in inventory.line_results or [inventory]:
+        # Sin registro: "unavailable" sin precio (una parte real sin stock
+        # conserva su precio)
+        if result.status != "unavailable" or result.unit_price is not None:
+            continue
+        resolution = resolve_part_number(result.part_number)
+        if resolution is None:
+            continue
+        corrected = resolution.autocorrection()
+        if corrected:
+            corrections[result.part_number] = corrected
+        elif resolution.candidates:
+            suggestions[result.part_number] = resolution.suggestions()
+    
+    return corrections, suggestions
+
+
+def _corrected_request(request: QuoteRequest, corrections: Dict[str, str]) -> QuoteRequest:
+    """Solicitud con los part numbers corregidos (las líneas repetidas se suman)"""
+    return QuoteRequest(
+        line_items=[
+            QuoteLineItem(
+                part_number=corrections.get(item.part_number, item.part_number),
+                quantity=item.quantity
+            )
+            for item in request.line_items
+        ],
+        customer_id=request.customer_id,
+        notes=request.notes
+    )
+
+
+def _annotate(
+    inventory: InventoryResult,
+    corrections: Dict[str, str],
+    suggestions: Dict[str, List[str]]
+) -> InventoryResult:
+    """Marca las partes corregidas y agrega los candidatos "¿quisiste decir?" """
+    if not corrections and not suggestions:
+        return inventory
+    
+    typed_as: Dict[str, List[str]] = {}
+    for typed, corrected in corrections.items():
+        typed_as.setdefault(corrected, []).append(typed)
+    
+    def annotate(result: InventoryResult) -> InventoryResult:
+        update = {}
+        if result.part_number in typed_as:
+            update["corrected_from"] = ", ".join(typed_as[result.part_number])
+        if result.status == "unavailable" and result.part_number in suggestions:
+            update["did_you_mean"] = suggestions[result.part_number]
+        return result.model_copy(update=update) if update else result
+    
+    if inventory.line_results:
+        return InventoryResult.combine([annotate(result) for result in inventory.line_results])
+    return annotate(inventory)
+
+
+def _corrections_note(inventory: InventoryResult) -> str:
+    """Aviso de los part numbers que se corrigieron automáticamente"""
+    return "".join(
+        f"🔎 Interpreté **{result.corrected_from}** como **{result.part_number}**\n"
+        for result in inventory.line_results or [inventory]
+        if result.corrected_from
+    )
+
+
+def _check_request(request: QuoteRequest) -> InventoryResult:
+    # Todas las líneas en una sola consulta
+    if request.is_multi_line:
+        return check_inventory_lines_tool(request.line_items)
+    return check_inventory_tool(part_number=request.part_number, quantity=request.quantity)
+
+
+async def _acheck_request(request: QuoteRequest) -> InventoryResult:
+    if request.is_multi_line:
+        return await acheck_inventory_lines_tool(request.line_items)
+    return await acheck_inventory_tool(part_number=request.part_number, quantity=request.quantity)
+
+
+def _erp_unavailable_update(error: ERPError) -> dict:
+    """Actualización de estado cuando el ERP no respondió tras los reintentos"""
+    return {
+        "messages": [AIMessage(
+            content="⚠️ No pudimos consultar el inventario: nuestro sistema (ERP) no está disponible "
+                    "en este momento.\n\n"
+                    "Tu solicitud no necesita cambios: envíala de nuevo en unos minutos o contacta a ventas:\n"
+                    "📧 ventas@tuempresa.com\n"
+                    "📞 +1 (555) 123-4567"
+        )],
+        "needs_clarification": True,
+        "error_message": f"ERP error: {str(error)}"
+    }
+
+
 def check_inventory_node(state: AgentState) -> dict:
     """
     Consulta el inventario usando la herramienta check_inventory_tool.
     
+    Si una parte no existe y el catálogo tiene un candidato claro (p. ej.
+    "ABC-54" → ABC-45) se corrige y se vuelve a consultar; si hay varios
+    candidatos se guardan para ofrecerlos al cliente. Si el ERP no
+    responde, se avisa al cliente en vez de fallar el turno.
+    
     Returns:
-        Estado actualizado con inventory_result
+        Estado actualizado con inventory_result (o needs_clarification)
     """
     request = state["quote_request"]
     
@@ -118,18 +547,40 @@ def check_inventory_node(state: AgentState) -> dict:
             "needs_clarification": True
         }
     
-    # Llamar a la herramienta
-    inventory_result = check_inventory_tool(
-        part_number=request.part_number,
-        quantity=request.quantity
-    )
+    try:
+        inventory_result = _check_request(request)
+        
+        corrections, suggestions = _resolve_unknown_parts(inventory_result)
+        if corrections:
+            request = _corrected_request(request, corrections)
+            inventory_result = _check_request(request)
+    except ERPError as e:
+        return _erp_unavailable_update(e)
     
-    return {
-        "inventory_result": inventory_result,
-        "messages": [AIMessage(
-            content=f"📊 Inventario consultado para {request.part_number}..."
-        )]
-    }
+    return _inventory_update(request, _annotate(inventory_result, corrections, suggestions))
+
+
+async def acheck_inventory_node(state: AgentState) -> dict:
+    """Versión asíncrona de check_inventory_node (usa acheck_inventory_tool)"""
+    request = state["quote_request"]
+    
+    if request is None:
+        return {
+            "error_message": "No hay solicitud de cotización",
+            "needs_clarification": True
+        }
+    
+    try:
+        inventory_result = await _acheck_request(request)
+        
+        corrections, suggestions = _resolve_unknown_parts(inventory_result)
+        if corrections:
+            request = _corrected_request(request, corrections)
+            inventory_result = await _acheck_request(request)
+    except ERPError as e:
+        return _erp_unavailable_update(e)
+    
+    return _inventory_update(request, _annotate(inventory_result, corrections, suggestions))
 
 
 # ============================================================================
@@ -154,9 +605,21 @@ def handle_insufficient_stock_node(state: AgentState) -> dict:
     if inventory is None or request is None:
         return {"error_message": "Estado inválido en handle_insufficient"}
     
+    if inventory.line_results:
+        return {
+            "messages": [AIMessage(
+                content=_corrections_note(inventory) + _insufficient_lines_message(inventory.line_results)
+            )],
+            "needs_clarification": True
+        }
+    
     # Construir mensaje según el problema
     if inventory.status == "unavailable":
         msg = f"❌ Lo siento, **{request.part_number}** no está disponible en nuestro catálogo."
+        if inventory.did_you_mean:
+            msg += f"\n\n🔎 ¿Quisiste decir?\n"
+            for candidate in inventory.did_you_mean:
+                msg += f"  • {candidate}\n"
         if inventory.suggested_alternatives:
             msg += f"\n\n💡 ¿Te interesan estas alternativas?\n"
             for alt in inventory.suggested_alternatives:
@@ -184,18 +647,44 @@ def handle_insufficient_stock_node(state: AgentState) -> dict:
         msg = f"❌ No se puede procesar la cotización en este momento."
     
     return {
-        "messages": [AIMessage(content=msg)],
+        "messages": [AIMessage(content=_corrections_note(inventory) + msg)],
         "needs_clarification": True
     }
 
 
+def _insufficient_lines_message(line_results: List[InventoryResult]) -> str:
+    """Resumen de las líneas que impiden cotizar una solicitud de varias partes"""
+    problems = [result for result in line_results if result.status != "available"]
+    
+    msg = f"⚠️ No puedo cotizar {len(problems)} de {len(line_results)} líneas:\n\n"
+    for result in problems:
+        if result.status == "insufficient":
+            detail = f"solo {result.available_stock:,} unidades en stock"
+            if result.lead_time_days:
+                detail += f" (reabastecimiento aprox. {result.lead_time_days} días)"
+        elif result.status == "no_price":
+            detail = "precio no disponible, contacta a ventas@tuempresa.com"
+        else:
+            detail = "no disponible en catálogo"
+            if result.did_you_mean:
+                detail += f" (¿quisiste decir {' o '.join(result.did_you_mean)}?)"
+        if result.suggested_alternatives:
+            detail += f"; alternativas: {', '.join(result.suggested_alternatives)}"
+        msg += f"  • **{result.part_number}**: {detail}\n"
+    
+    msg += f"\nLas otras {len(line_results) - len(problems)} líneas están disponibles. "
+    msg += "¿Quieres que cotice solo esas, o ajustar las cantidades?"
+    return msg
+
+
 # ============================================================================
 # NODO 4: Generate Quote
 # ============================================================================
 
 def generate_quote_node(state: AgentState) -> dict:
     """
-    Genera la cotización final usando generate_quote_tool.
+    Genera la cotización final usando generate_quote_tool y la guarda en
+    el repositorio de cotizaciones.
     
     Returns:
         Estado con cotización completa formateada
@@ -206,12 +695,19 @@ def generate_quote_node(state: AgentState) -> dict:
     if request is None or inventory is None:
         return {"error_message": "Estado inválido en generate_quote"}
     
+    if request.customer_id is None and state.get("customer_id"):
+        request = request.model_copy(update={"customer_id": state["customer_id"]})
+    
     try:
         # Generar cotización
         quote = generate_quote_tool(request, inventory)
         
+        # Persistir para búsquedas y auditoría (solo se encola, no espera al disco)
+        if config.QUOTE_STORE_ENABLED:
+            get_quote_store().save(quote)
+        
         # Formatear para display
-        formatted_msg = quote.format_for_display()
+        formatted_msg = _corrections_note(inventory) + quote.format_for_display()
         formatted_msg += "\n¿Deseas proceder con esta orden?"
         
         return {
@@ -258,4 +754,87 @@ def clarification_node(state: AgentState) -> dict:
     
     return {
         "iteration_count": iteration_count
-    }
\ No newline at end of file
+    }
+
+
+# ============================================================================
+# NODO 6: Submit Order
+# ============================================================================
+
+def _order_message(order: OrderStatus) -> str:
+    if order.status == "sent":
+        return (f"✅ La orden de la cotización **{order.quote_id}** ya fue enviada: "
+                f"número de orden **{order.order_id}**.")
+    
+    if order.status == "failed":
+        return (f"❌ No pudimos enviar la orden de la cotización **{order.quote_id}**: {order.last_error}\n\n"
+                f"Por favor contacta a nuestro equipo de ventas:\n"
+                f"📧 ventas@tuempresa.com\n"
+                f"📞 +1 (555) 123-4567")
+    
+    return (f"✅ Orden registrada para la cotización **{order.quote_id}**.\n"
+            f"La estamos enviando al ERP; te confirmaremos el número de orden en breve.")
+
+
+def submit_order_node(state: AgentState) -> dict:
+    """
+    Registra la orden cuando el cliente acepta la cotización.
+    
+    No espera al ERP: la orden queda en la outbox y el despachador la
+    envía en segundo plano. Aceptar de nuevo la misma cotización informa
+    el estado de la orden ya registrada.
+    
+    Returns:
+        Estado con la orden y el acuse para el cliente
+    """
+    quote = state.get("quote")
+    
+    if quote is None:
+        return {"error_message": "No hay cotización para ordenar", "needs_clarification": True}
+    
+    try:
+        order = submit_order_tool(quote)
+    except Exception as e:
+        return {
+            "messages": [AIMessage(content=f"❌ No pude registrar la orden: {str(e)}")],
+            "needs_clarification": True,
+            "error_message": str(e)
+        }
+    
+    return {
+        "order": order,
+        "messages": [AIMessage(content=_order_message(order))],
+        "needs_clarification": False
+    }
+
+
+async def asubmit_order_node(state: AgentState) -> dict:
+    """
+    Versión asíncrona de submit_order_node.
+    
+    La escritura en la outbox (SQLite, con fsync) va a un hilo para no
+    bloquear el event loop.
+    """
+    return await asyncio.to_thread(submit_order_node, state)
+
+
+# ============================================================================
+# Versiones asíncronas de los nodos sin I/O
+# ============================================================================
+# Evitan que el grafo despache nodos puramente de CPU a un thread pool
+# cuando se ejecuta con ainvoke/astream.
+
+async def ahandle_insufficient_stock_node(state: AgentState) -> dict:
+    """Versión asíncrona de handle_insufficient_stock_node"""
+    return handle_insufficient_stock_node(state)
+
+
+async def agenerate_quote_node(state: AgentState) -> dict:
+    """Versión asíncrona de generate_quote_node"""
+    return generate_quote_node(state)
+
+
+async def aclarification_node(state: AgentState) -> dict:
+    """Versión asíncrona de clarification_node"""
+    return clarification_node(state)
+
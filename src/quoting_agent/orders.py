@@ -0,0 +1,437 @@
+"""
+Envío de órdenes al ERP: outbox durable (SQLite) y despachador en segundo plano
+
+Aceptar una cotización solo registra la orden en la outbox y responde de
+inmediato; un hilo despachador envía las órdenes pendientes al ERP en
+lotes, con concurrencia acotada y reintentos con backoff. Las demoras o
+caídas del ERP no se sienten en la respuesta al cliente.
+
+- Idempotencia: la clave se deriva del quote_id. Aceptar dos veces la
+  misma cotización no crea otra orden, y el ERP recibe la clave para no
+  duplicar un envío reintentado.
+- Durable: lo pendiente sobrevive a un reinicio y se despacha al arrancar.
+- Varios workers pueden compartir la outbox: cada envío se reclama con un
+  lease; si el proceso que lo reclamó muere, se reintenta al vencer.
+"""
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import config
+from .models import OrderStatus, Quote
+
+
+OrderPayload = Dict[str, Any]
+# Recibe un lote de órdenes y retorna el resultado por idempotency_key:
+# {"status": "accepted", "order_id": ...} o {"status": "rejected", "detail": ...}
+SubmitFn = Callable[[List[OrderPayload]], Dict[str, Dict[str, Any]]]
+
+
+def idempotency_key(quote_id: str) -> str:
+    """Clave de idempotencia de la orden de una cotización"""
+    return f"order:{quote_id}"
+
+
+def order_payload(quote: Quote) -> OrderPayload:
+    """Cuerpo de la orden que se envía al ERP (montos como texto decimal exacto)"""
+    return {
+        "idempotency_key": idempotency_key(quote.quote_id),
+        "quote_id": quote.quote_id,
+        "line_items": [
+            {"part_number": line.part_number, "quantity": line.quantity, "unit_price": str(line.unit_price)}
+            for line in quote.line_items
+        ],
+        "subtotal": str(quote.subtotal),
+        "tax": str(quote.tax),
+        "total": str(quote.total),
+    }
+
+
+# ============================================================================
+# Outbox
+# ============================================================================
+
+class OrderOutbox:
+    """
+    Cola durable de órdenes por enviar.
+    
+    Cada orden pasa de pending a sent (con el order_id del ERP) o, tras
+    agotar los intentos o si el ERP la rechaza, a failed.
+    """
+    
+    def __init__(self, path: str = ":memory:", lease_seconds: float = 60.0):
+        """
+        Args:
+            path: Archivo SQLite (":memory:" para pruebas)
+            lease_seconds: Tiempo que un envío reclamado queda reservado
+                           antes de poder reintentarse
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit: las transacciones se abren explícitamente
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS order_outbox ("
+            " idempotency_key TEXT PRIMARY KEY,"
+            " quote_id TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " order_id TEXT,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_order_outbox_due ON order_outbox(status, next_attempt_at)"
+        )
+    
+    @staticmethod
+    def _to_status(row: Tuple) -> OrderStatus:
+        key, quote_id, status, order_id, attempts, last_error, created_at = row
+        return OrderStatus(
+            idempotency_key=key,
+            quote_id=quote_id,
+            status=status,
+            order_id=order_id,
+            attempts=attempts,
+            last_error=last_error,
+            created_at=datetime.fromtimestamp(created_at)
+        )
+    
+    def _get(self, key: str) -> Optional[OrderStatus]:
+        row = self._conn.execute(
+            "SELECT idempotency_key, quote_id, status, order_id, attempts, last_error, created_at "
+            "FROM order_outbox WHERE idempotency_key = ?",
+            (key,)
+        ).fetchone()
+        return self._to_status(row) if row else None
+    
+    def enqueue(self, quote: Quote) -> Tuple[OrderStatus, bool]:
+        """
+        Registra la orden de una cotización aceptada.
+        
+        Returns:
+            (estado, creada): si ya estaba registrada, su estado actual
+            y creada=False
+        """
+        payload = order_payload(quote)
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO order_outbox "
+                "(idempotency_key, quote_id, payload, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                (payload["idempotency_key"], quote.quote_id, json.dumps(payload), now, now, now)
+            )
+            return self._get(payload["idempotency_key"]), cursor.rowcount == 1
+    
+    def get(self, quote_id: str) -> Optional[OrderStatus]:
+        """Estado de la orden de una cotización (None si no se aceptó)"""
+        with self._lock:
+            return self._get(idempotency_key(quote_id))
+    
+    def claim(self, limit: int) -> List[Tuple[OrderPayload, int]]:
+        """
+        Reserva hasta limit órdenes pendientes cuyo próximo intento ya venció.
+        
+        Returns:
+            Lista de (payload, intento) con el número de este intento
+        """
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE: dos procesos no reclaman la misma orden
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT idempotency_key, payload, attempts FROM order_outbox "
+                    "WHERE status = 'pending' AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT ?",
+                    (now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE order_outbox SET attempts = attempts + 1, next_attempt_at = ?, updated_at = ? "
+                    "WHERE idempotency_key = ?",
+                    [(now + self.lease_seconds, now, key) for key, _, _ in rows]
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(json.loads(payload), attempts + 1) for _, payload, attempts in rows]
+    
+    def mark_sent(self, key: str, order_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE order_outbox SET status = 'sent', order_id = ?, last_error = NULL, updated_at = ? "
+                "WHERE idempotency_key = ?",
+                (order_id, time.time(), key)
+            )
+    
+    def mark_retry(self, key: str, error: str, delay_seconds: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE order_outbox SET last_error = ?, next_attempt_at = ?, updated_at = ? "
+                "WHERE idempotency_key = ? AND status = 'pending'",
+                (error, now + delay_seconds, now, key)
+            )
+    
+    def mark_failed(self, key: str, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE order_outbox SET status = 'failed', last_error = ?, updated_at = ? "
+                "WHERE idempotency_key = ?",
+                (error, time.time(), key)
+            )
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Órdenes por estado.
+        
+        Returns:
+            Diccionario con pending, sent, failed y la antigüedad en
+            segundos de la orden pendiente más vieja
+        """
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM order_outbox GROUP BY status"
+            ).fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM order_outbox WHERE status = 'pending'"
+            ).fetchone()[0]
+        return {
+            "pending": counts.get("pending", 0),
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+        }
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ============================================================================
+# Despachador
+# ============================================================================
+
+class OrderDispatcher:
+    """
+    Hilo que vacía la outbox enviando lotes de órdenes al ERP.
+    
+    Cada vuelta reclama hasta batch_size * concurrency órdenes y envía
+    hasta concurrency lotes a la vez. Un fallo del lote completo (ERP
+    caído, timeout) se reintenta con backoff exponencial con jitter; una
+    orden rechazada por el ERP no se reintenta.
+    """
+    
+    def __init__(
+        self,
+        outbox: OrderOutbox,
+        submit_fn: SubmitFn,
+        batch_size: int = 50,
+        concurrency: int = 4,
+        max_attempts: int = 8,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 300.0,
+        poll_seconds: float = 1.0
+    ):
+        """
+        Args:
+            outbox: Cola de órdenes
+            submit_fn: Envía un lote al ERP (ver SubmitFn)
+            batch_size: Órdenes por llamada al ERP
+            concurrency: Llamadas al ERP en paralelo
+            max_attempts: Intentos antes de marcar la orden como failed
+            retry_base_seconds: Espera tras el primer fallo (se duplica)
+            retry_max_seconds: Espera máxima entre intentos
+            poll_seconds: Cada cuánto revisar la outbox sin notificaciones
+        """
+        self.outbox = outbox
+        self.submit_fn = submit_fn
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_seconds = poll_seconds
+        
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="order-dispatch")
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "sent": 0, "retries": 0, "failed": 0}
+    
+    # ------------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------------
+    
+    def start(self) -> None:
+        """Arranca el hilo (no hace nada si ya está corriendo)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="order-dispatcher", daemon=True)
+            self._thread.start()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo; lo pendiente queda en la outbox"""
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+    
+    def notify(self) -> None:
+        """Avisa que hay órdenes nuevas (despacha sin esperar el poll)"""
+        self._wake.set()
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                dispatched = self.run_once()
+            except sqlite3.Error:
+                dispatched = 0  # Base bloqueada por otro worker: se reintenta en el próximo poll
+            if not dispatched:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+    
+    # ------------------------------------------------------------------------
+    # Envío
+    # ------------------------------------------------------------------------
+    
+    def run_once(self) -> int:
+        """
+        Envía una tanda de órdenes pendientes.
+        
+        Returns:
+            Cantidad de órdenes procesadas (enviadas, reprogramadas o fallidas)
+        """
+        claimed = self.outbox.claim(self.batch_size * self.concurrency)
+        if not claimed:
+            return 0
+        
+        batches = [claimed[i:i + self.batch_size] for i in range(0, len(claimed), self.batch_size)]
+        list(self._executor.map(self._send, batches))
+        return len(claimed)
+    
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+    
+    def _send(self, batch: List[Tuple[OrderPayload, int]]) -> None:
+        with self._lock:
+            self._stats["batches"] += 1
+        
+        try:
+            results = self.submit_fn([payload for payload, _ in batch])
+            error = None
+        except Exception as e:
+            results = {}
+            error = f"{type(e).__name__}: {e}"
+        
+        for payload, attempt in batch:
+            key = payload["idempotency_key"]
+            result = results.get(key)
+            
+            if result is not None and result.get("status") == "accepted":
+                self.outbox.mark_sent(key, result["order_id"])
+                outcome = "sent"
+            elif result is not None:
+                self.outbox.mark_failed(key, result.get("detail") or "Orden rechazada por el ERP")
+                outcome = "failed"
+            elif attempt >= self.max_attempts:
+                self.outbox.mark_failed(key, error or "Sin respuesta del ERP")
+                outcome = "failed"
+            else:
+                self.outbox.mark_retry(key, error or "Sin respuesta del ERP", self._backoff(attempt))
+                outcome = "retries"
+            
+            with self._lock:
+                self._stats[outcome] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Lotes enviados y órdenes enviadas, reprogramadas y fallidas"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["running"] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+
+def submit_orders_to_erp(orders: List[OrderPayload]) -> Dict[str, Dict[str, Any]]:
+    """
+    Envía un lote de órdenes al ERP (o al mock local con ENABLE_MOCK_DATA).
+    
+    Raises:
+        ERPError: Si el ERP no responde tras los reintentos
+    """
+    if config.ENABLE_MOCK_DATA:
+        # Mismo order_id para la misma clave, como haría el ERP
+        return {
+            order["idempotency_key"]: {
+                "status": "accepted",
+                "order_id": "ORD-" + hashlib.sha1(order["idempotency_key"].encode()).hexdigest()[:8].upper(),
+            }
+            for order in orders
+        }
+    
+    from .erp_client import get_erp_client
+    return get_erp_client().submit_orders(orders)
+
+
+# ============================================================================
+# Instancias globales
+# ============================================================================
+
+_outbox: Optional[OrderOutbox] = None
+_dispatcher: Optional[OrderDispatcher] = None
+_orders_lock = threading.Lock()
+
+
+def get_order_outbox() -> OrderOutbox:
+    """Outbox compartida del proceso (ORDER_OUTBOX_PATH)"""
+    global _outbox
+    if _outbox is None:
+        with _orders_lock:
+            if _outbox is None:
+                _outbox = OrderOutbox(config.ORDER_OUTBOX_PATH, lease_seconds=config.ORDER_LEASE_SECONDS)
+    return _outbox
+
+
+def get_order_dispatcher() -> OrderDispatcher:
+    """Despachador compartido del proceso (se arranca con start())"""
+    global _dispatcher
+    if _dispatcher is None:
+        outbox = get_order_outbox()
+        with _orders_lock:
+            if _dispatcher is None:
+                _dispatcher = OrderDispatcher(
+                    outbox,
+                    submit_fn=submit_orders_to_erp,
+                    batch_size=config.ORDER_BATCH_SIZE,
+                    concurrency=config.ORDER_DISPATCH_CONCURRENCY,
+                    max_attempts=config.ORDER_MAX_ATTEMPTS,
+                    retry_base_seconds=config.ORDER_RETRY_BASE_SECONDS,
+                    retry_max_seconds=config.ORDER_RETRY_MAX_SECONDS,
+                    poll_seconds=config.ORDER_POLL_SECONDS
+                )
+    return _dispatcher
@@ -0,0 +1,292 @@
+"""
+Resolución aproximada de números de parte ("¿quisiste decir?")
+
+Cubre los errores típicos al escribir un SKU:
+- Formato: "ABC45", "abc 45", "ABC_45" → ABC-45
+- Una edición: transposición ("ABC-54"), sustitución ("ABC-4S"),
+  letra de más o de menos
+
+El índice guarda el hash de la forma canónica (solo letras y dígitos)
+de cada SKU del catálogo, ordenado. Una consulta genera todas las
+variantes a distancia 1 de la forma canónica (unas cientos), las hashea
+en bloque con numpy y las busca con searchsorted: no depende del tamaño
+del catálogo y responde en menos de un milisegundo.
+"""
+
+import re
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .catalog import Catalog, get_catalog, hash_keys, normalize_part_number
+from .config import config
+
+
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+# Caracteres que se confunden al escribir o al leer un documento escaneado
+CONFUSABLE = {
+    frozenset(pair) for pair in [("0", "O"), ("1", "I"), ("1", "L"), ("5", "S"), ("8", "B"), ("2", "Z")]
+}
+
+_ALPHABET_CODES = np.frombuffer(ALPHABET.encode("ascii"), dtype=np.uint8)
+_CONFUSABLE_CODES: Dict[int, List[int]] = {}
+for _pair in CONFUSABLE:
+    for _char in _pair:
+        _CONFUSABLE_CODES.setdefault(ord(_char), []).extend(ord(other) for other in _pair if other != _char)
+
+SCORE_FORMAT = 1.0
+SCORE_TRANSPOSITION = 0.9
+SCORE_CONFUSABLE = 0.9
+SCORE_EDIT = 0.75
+
+# Tipos de variante, en orden de puntaje
+_KINDS = (
+    (SCORE_FORMAT, "formato"),
+    (SCORE_TRANSPOSITION, "transposición"),
+    (SCORE_CONFUSABLE, "carácter confundible"),
+    (SCORE_EDIT, "carácter faltante"),
+    (SCORE_EDIT, "carácter distinto"),
+    (SCORE_EDIT, "carácter de más"),
+)
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]")
+
+
+def canonical_part_number(part_number: str) -> str:
+    """Forma canónica: mayúsculas, solo letras y dígitos ("abc-45" → "ABC45")"""
+    return _NON_ALNUM.sub("", normalize_part_number(part_number))
+
+
+@dataclass
+class PartCandidate:
+    """SKU del catálogo que puede corresponder a lo escrito"""
+    
+    part_number: str
+    score: float
+    reason: str
+
+
+@dataclass
+class PartResolution:
+    """Resultado de resolver un número de parte desconocido"""
+    
+    query: str
+    candidates: List[PartCandidate] = field(default_factory=list)
+    
+    def autocorrection(self, min_score: Optional[float] = None) -> Optional[str]:
+        """
+        SKU a usar sin preguntar, si hay uno solo claramente mejor.
+        
+        Args:
+            min_score: Puntaje mínimo (por defecto FUZZY_AUTOCORRECT_SCORE)
+        """
+        min_score = config.FUZZY_AUTOCORRECT_SCORE if min_score is None else min_score
+        if not self.candidates or self.candidates[0].score < min_score:
+            return None
+        if len(self.candidates) > 1 and self.candidates[1].score >= self.candidates[0].score:
+            return None
+        return self.candidates[0].part_number
+    
+    def suggestions(self) -> List[str]:
+        """Part numbers candidatos, del más al menos probable"""
+        return [candidate.part_number for candidate in self.candidates]
+
+
+def _canonical_keys(keys: np.ndarray, chunk_size: int = 1_000_000) -> np.ndarray:
+    """Forma canónica de todas las claves ('S' de ancho fijo), por bloques"""
+    width = keys.dtype.itemsize
+    canonical = np.zeros(len(keys), dtype=f"S{width}")
+    
+    for start in range(0, len(keys), chunk_size):
+        block = np.ascontiguousarray(keys[start:start + chunk_size])
+        chars = block.view(np.uint8).reshape(len(block), width)
+        alnum = ((chars >= ord("0")) & (chars <= ord("9"))) | ((chars >= ord("A")) & (chars <= ord("Z")))
+        # Compacta los caracteres alfanuméricos al inicio de cada fila
+        order = np.argsort(~alnum, axis=1, kind="stable")
+        compact = np.take_along_axis(chars, order, axis=1)
+        compact[~np.take_along_axis(alnum, order, axis=1)] = 0
+        canonical[start:start + len(block)] = compact.view(f"S{width}").ravel()
+    
+    return canonical
+
+
+def _edits(canonical: bytes, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    La forma canónica y sus variantes a distancia 1 (Damerau), como
+    claves 'S' de ancho fijo.
+    
+    Las filas se arman con índices sobre la clave (sin concatenar strings)
+    y quedan ordenadas de mayor a menor puntaje.
+    
+    Returns:
+        (variantes, tipo de cada variante: índice en _KINDS)
+    """
+    chars = np.frombuffer(canonical, dtype=np.uint8)
+    length = len(chars)
+    padded = np.zeros(width + 2, dtype=np.uint8)
+    padded[:length] = chars
+    cols = np.arange(width)[None, :]
+    
+    def substitutions(positions: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return np.where(cols == positions[:, None], codes[:, None], padded[cols])
+    
+    blocks = [padded[None, :width]]
+    
+    # Transposición de dos caracteres vecinos distintos
+    pos = np.nonzero(chars[:-1] != chars[1:])[0][:, None]
+    blocks.append(np.where(cols == pos, padded[pos + 1], np.where(cols == pos + 1, padded[pos], padded[cols])))
+    
+    # Caracteres que se confunden (0/O, 5/S...)
+    pairs = [(i, code) for i, char in enumerate(chars.tolist()) for code in _CONFUSABLE_CODES.get(char, ())]
+    pos = np.array([i for i, _ in pairs], dtype=np.int64)
+    codes = np.array([code for _, code in pairs], dtype=np.uint8)
+    blocks.append(substitutions(pos, codes))
+    
+    # Un carácter faltante
+    pos = np.repeat(np.arange(length + 1), len(_ALPHABET_CODES))[:, None]
+    codes = np.tile(_ALPHABET_CODES, length + 1)[:, None]
+    blocks.append(np.where(cols < pos, padded[cols], np.where(cols == pos, codes, padded[cols - 1])))
+    
+    # Un carácter distinto
+    pos = np.repeat(np.arange(length), len(_ALPHABET_CODES))
+    codes = np.tile(_ALPHABET_CODES, length)
+    differs = codes != chars[pos]
+    blocks.append(substitutions(pos[differs], codes[differs]))
+    
+    # Un carácter de más
+    pos = np.arange(length)[:, None] if length > 1 else np.zeros((0, 1), dtype=np.int64)
+    blocks.append(np.where(cols < pos, padded[cols], padded[cols + 1]))
+    
+    # Solo las variantes que caben en el ancho del índice
+    lengths = [length, length, length, length + 1, length, length - 1]
+    blocks = [block if size <= width else block[:0] for block, size in zip(blocks, lengths)]
+    
+    kinds = np.repeat(np.arange(len(_KINDS)), [len(block) for block in blocks])
+    variants = np.ascontiguousarray(np.concatenate(blocks).astype(np.uint8)).view(f"S{width}").ravel()
+    return variants, kinds
+
+
+class FuzzyPartIndex:
+    """Índice de formas canónicas de un catálogo (una versión)"""
+    
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self._width = catalog.keys.dtype.itemsize
+        
+        canonical = _canonical_keys(catalog.keys)
+        hashes = hash_keys(canonical)
+        self._order = np.argsort(hashes, kind="stable").astype(np.int64)
+        self._hashes = hashes[self._order]
+        
+        # Directorio de buckets por los bits altos (como el índice del catálogo):
+        # cada consulta toca un par de líneas de caché en vez de una búsqueda binaria
+        count = len(hashes)
+        self._bits = max(1, int(count - 1).bit_length()) if count > 1 else 1
+        buckets = (self._hashes >> np.uint64(64 - self._bits)).astype(np.int64)
+        self._offsets = np.searchsorted(buckets, np.arange((1 << self._bits) + 1))
+    
+    def _lookup(self, hashes: np.ndarray):
+        """Rango [start, end) de cada hash en el índice (vacío si no está)"""
+        bucket = (hashes >> np.uint64(64 - self._bits)).astype(np.int64)
+        start = self._offsets[bucket]
+        end = self._offsets[bucket + 1]
+        
+        # Avanza dentro de cada bucket (unas pocas claves) hasta el hash buscado
+        pending = np.nonzero(start < end)[0]
+        while len(pending):
+            pending = pending[self._hashes[start[pending]] < hashes[pending]]
+            start[pending] += 1
+            pending = pending[start[pending] < end[pending]]
+        
+        stop = start.copy()
+        pending = np.nonzero(stop < end)[0]
+        while len(pending):
+            pending = pending[self._hashes[stop[pending]] == hashes[pending]]
+            stop[pending] += 1
+            pending = pending[stop[pending] < end[pending]]
+        
+        return start, stop
+    
+    def resolve(self, part_number: str, limit: Optional[int] = None) -> PartResolution:
+        """
+        Candidatos del catálogo para un número de parte.
+        
+        Args:
+            part_number: Lo que escribió el cliente
+            limit: Máximo de candidatos (por defecto FUZZY_MAX_CANDIDATES)
+        
+        Returns:
+            PartResolution con candidatos ordenados por puntaje
+        """
+        limit = config.FUZZY_MAX_CANDIDATES if limit is None else limit
+        query = normalize_part_number(part_number)
+        canonical = canonical_part_number(query)
+        if not canonical or len(canonical) > self._width + 1:
+            return PartResolution(query=query)
+        
+        variants, kinds = _edits(canonical.encode("ascii"), self._width)
+        start, stop = self._lookup(hash_keys(variants))
+        
+        # Las variantes vienen de mayor a menor puntaje: con `limit`
+        # candidatos ya no entra uno de puntaje menor
+        best: Dict[str, PartCandidate] = {}
+        floor = SCORE_FORMAT
+        for i in np.nonzero(stop > start)[0].tolist():
+            score, reason = _KINDS[kinds[i]]
+            if len(best) >= limit and score < floor:
+                break
+            floor = score
+            text = variants[i]
+            for j in range(int(start[i]), int(stop[i])):
+                candidate = self.catalog.part_number_at(int(self._order[j]))
+                # El hash coincide; se confirma con la forma canónica real
+                if candidate == query or candidate in best:
+                    continue
+                if canonical_part_number(candidate).encode("ascii") == text:
+                    best[candidate] = PartCandidate(part_number=candidate, score=score, reason=reason)
+        
+        ranked = sorted(best.values(), key=lambda c: (-c.score, c.part_number))
+        return PartResolution(query=query, candidates=ranked[:limit])
+
+
+# ============================================================================
+# Índice del catálogo vigente
+# ============================================================================
+
+_indexes: "weakref.WeakKeyDictionary[Catalog, FuzzyPartIndex]" = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def get_fuzzy_index(catalog: Optional[Catalog] = None) -> FuzzyPartIndex:
+    """
+    Índice de una versión del catálogo (por defecto la vigente).
+    
+    Se construye la primera vez que se necesita; al recargar el catálogo
+    la versión nueva tiene su propio índice y el viejo se libera con ella.
+    """
+    catalog = catalog or get_catalog()
+    index = _indexes.get(catalog)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(catalog)
+            if index is None:
+                index = _indexes[catalog] = FuzzyPartIndex(catalog)
+    return index
+
+
+def resolve_part_number(part_number: str) -> Optional[PartResolution]:
+    """
+    Resuelve un número de parte contra el catálogo vigente.
+    
+    Returns:
+        None si la parte existe tal cual; si no, PartResolution (puede no
+        tener candidatos)
+    """
+    catalog = get_catalog()
+    if part_number in catalog:
+        return None
+    return get_fuzzy_index(catalog).resolve(part_number)
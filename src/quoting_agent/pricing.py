@@ -0,0 +1,286 @@
+"""
+Motor de precios con tablas de reglas precompiladas
+
+Las reglas (descuentos por volumen, contratos por cliente, IVA por región
+y moneda) se compilan una vez al cargar: los tramos de volumen quedan como
+listas ordenadas de límites y cada línea encuentra su tramo con bisect
+(O(log n)); contratos, regiones y monedas son diccionarios.
+
+Todos los montos se calculan con Decimal y se redondean al centavo
+(half-up) en tres puntos: precio unitario, IVA y conversión de moneda.
+
+Orden de aplicación por línea:
+1. Precio de contrato del cliente para la parte (reemplaza al de lista y
+   no recibe descuento por volumen)
+2. Si no hay contrato: precio de lista menos el descuento del tramo de
+   volumen (tramos de la parte o, si no tiene, los generales "*") y menos
+   el descuento general del cliente
+3. Conversión a la moneda del cliente (los precios de contrato ya están
+   en esa moneda)
+
+Formato del archivo de reglas (PRICING_RULES_PATH, JSON):
+    {
+      "base_currency": "USD",
+      "default_region": "CO",
+      "tax_rates": {"CO": 19, "MX": 16},
+      "currencies": {"USD": 1, "MXN": 17.05},
+      "volume_tiers": {"*": [[100, 2], [1000, 5]], "ABC-45": [[500, 3]]},
+      "customers": {
+        "C-77": {"region": "MX", "currency": "MXN", "discount_percent": 1.5,
+                 "prices": {"ABC-45": 22.10}}
+      }
+    }
+Los tramos son [cantidad mínima, % de descuento].
+"""
+
+import json
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import config
+
+CENT = Decimal("0.01")
+ONE = Decimal(1)
+HUNDRED = Decimal(100)
+
+# Reglas por defecto: sin descuentos, IVA 19%, precios en la moneda del catálogo
+DEFAULT_PRICING_RULES: Dict[str, Any] = {
+    "base_currency": "USD",
+    "default_region": "CO",
+    "tax_rates": {"CO": 19},
+    "currencies": {"USD": 1},
+    "volume_tiers": {},
+    "customers": {},
+}
+
+
+@lru_cache(maxsize=65536)
+def to_decimal(value: float) -> Decimal:
+    """Float del catálogo a Decimal (por su representación corta, sin ruido binario)"""
+    return Decimal(repr(value))
+
+
+def _percent(value: Any) -> Decimal:
+    return Decimal(str(value))
+
+
+@dataclass
+class PricedLine:
+    """Precio de una línea"""
+    
+    part_number: str
+    quantity: int
+    list_price: Decimal
+    unit_price: Decimal
+    subtotal: Decimal
+    discount_percent: Decimal
+    source: str  # "list" | "volume" | "contract"
+
+
+@dataclass
+class PricedQuote:
+    """Resultado de PricingEngine.price (montos en la moneda del cliente)"""
+    
+    lines: List[PricedLine]
+    subtotal: Decimal
+    tax: Decimal
+    total: Decimal
+    tax_percent: Decimal
+    region: str
+    currency: str
+
+
+class TierTable:
+    """Tramos de volumen: límites ordenados y el factor (1 - descuento) de cada tramo"""
+    
+    __slots__ = ("bounds", "discounts", "factors")
+    
+    def __init__(self, tiers: Iterable[Sequence[Any]]):
+        ordered = sorted((int(min_quantity), _percent(discount)) for min_quantity, discount in tiers)
+        self.bounds: List[int] = [min_quantity for min_quantity, _ in ordered]
+        self.discounts: List[Decimal] = [discount for _, discount in ordered]
+        self.factors: List[Decimal] = [ONE - discount / HUNDRED for discount in self.discounts]
+    
+    def lookup(self, quantity: int) -> int:
+        """Índice del tramo que corresponde a la cantidad (-1 si no alcanza el primero)"""
+        return bisect_right(self.bounds, quantity) - 1
+
+
+@dataclass
+class CustomerTerms:
+    """Condiciones compiladas de un cliente"""
+    
+    region: str
+    currency: str
+    tax_percent: Decimal
+    rate: Decimal
+    factor: Decimal
+    discount_percent: Decimal
+    prices: Dict[str, Decimal]
+
+
+class PricingEngine:
+    """Calcula precios de líneas con las reglas compiladas"""
+    
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            rules: Reglas con el formato del archivo (None = DEFAULT_PRICING_RULES)
+        """
+        rules = {**DEFAULT_PRICING_RULES, **(rules or {})}
+        
+        self.base_currency: str = rules["base_currency"].upper()
+        self.default_region: str = rules["default_region"].upper()
+        self.tax_rates: Dict[str, Decimal] = {
+            region.upper(): _percent(rate) for region, rate in rules["tax_rates"].items()
+        }
+        self.rates: Dict[str, Decimal] = {
+            currency.upper(): _percent(rate) for currency, rate in rules["currencies"].items()
+        }
+        self.rates.setdefault(self.base_currency, ONE)
+        
+        tiers = {part.upper(): TierTable(table) for part, table in rules["volume_tiers"].items()}
+        self.default_tiers: Optional[TierTable] = tiers.pop("*", None)
+        self.part_tiers: Dict[str, TierTable] = tiers
+        
+        self.default_terms = self._compile_customer({})
+        self.customers: Dict[str, CustomerTerms] = {
+            customer_id: self._compile_customer(terms) for customer_id, terms in rules["customers"].items()
+        }
+    
+    @classmethod
+    def from_file(cls, path: str) -> "PricingEngine":
+        """Carga las reglas desde un archivo JSON"""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+    
+    def _compile_customer(self, terms: Dict[str, Any]) -> CustomerTerms:
+        region = terms.get("region", self.default_region).upper()
+        currency = terms.get("currency", self.base_currency).upper()
+        if region not in self.tax_rates:
+            raise ValueError(f"Región sin IVA configurado: {region}")
+        if currency not in self.rates:
+            raise ValueError(f"Moneda sin tipo de cambio: {currency}")
+        
+        discount = _percent(terms.get("discount_percent", 0))
+        return CustomerTerms(
+            region=region,
+            currency=currency,
+            tax_percent=self.tax_rates[region],
+            rate=self.rates[currency],
+            factor=ONE - discount / HUNDRED,
+            discount_percent=discount,
+            prices={part.upper(): _percent(price) for part, price in terms.get("prices", {}).items()}
+        )
+    
+    def terms_for(self, customer_id: Optional[str]) -> CustomerTerms:
+        """Condiciones del cliente (las generales si no tiene contrato)"""
+        if customer_id is None:
+            return self.default_terms
+        return self.customers.get(customer_id, self.default_terms)
+    
+    def price(
+        self,
+        lines: Iterable[Tuple[str, int, float]],
+        customer_id: Optional[str] = None
+    ) -> PricedQuote:
+        """
+        Calcula el precio de todas las líneas de una cotización.
+        
+        Args:
+            lines: (part_number, cantidad, precio de lista en la moneda base)
+            customer_id: Cliente (contrato, región y moneda)
+        
+        Returns:
+            PricedQuote con cada línea y los totales
+        """
+        terms = self.terms_for(customer_id)
+        contract = terms.prices
+        rate = terms.rate
+        convert = rate != ONE
+        default_tiers = self.default_tiers
+        part_tiers = self.part_tiers
+        
+        priced: List[PricedLine] = []
+        subtotal = Decimal(0)
+        for part_number, quantity, list_price in lines:
+            base = to_decimal(list_price)
+            contract_price = contract.get(part_number)
+            
+            if contract_price is not None:
+                unit = contract_price
+                discount = Decimal(0)
+                source = "contract"
+            else:
+                unit = base
+                discount = Decimal(0)
+                source = "list"
+                tiers = part_tiers.get(part_number, default_tiers)
+                if tiers is not None:
+                    index = tiers.lookup(quantity)
+                    if index >= 0:
+                        unit = unit * tiers.factors[index]
+                        discount = tiers.discounts[index]
+                        source = "volume"
+                if terms.discount_percent:
+                    unit = unit * terms.factor
+                    # Descuentos encadenados: 1 - (1 - a)(1 - b)
+                    discount = HUNDRED - (HUNDRED - discount) * terms.factor
+            
+            if convert:
+                base = (base * rate).quantize(CENT, ROUND_HALF_UP)
+                if contract_price is None:
+                    unit = unit * rate
+            unit = unit.quantize(CENT, ROUND_HALF_UP)
+            line_subtotal = unit * quantity
+            subtotal += line_subtotal
+            priced.append(PricedLine(part_number, quantity, base, unit, line_subtotal, discount, source))
+        
+        tax = (subtotal * terms.tax_percent / HUNDRED).quantize(CENT, ROUND_HALF_UP)
+        return PricedQuote(
+            lines=priced,
+            subtotal=subtotal,
+            tax=tax,
+            total=subtotal + tax,
+            tax_percent=terms.tax_percent,
+            region=terms.region,
+            currency=terms.currency
+        )
+
+
+# ============================================================================
+# Instancia global
+# ============================================================================
+
+_engine: Optional[PricingEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_pricing_engine() -> PricingEngine:
+    """Motor compartido (PRICING_RULES_PATH o, si no hay, las reglas por defecto)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = PricingEngine.from_file(config.PRICING_RULES_PATH) if config.PRICING_RULES_PATH else PricingEngine()
+    return _engine
+
+
+def reload_pricing(path: Optional[str] = None) -> PricingEngine:
+    """
+    Recarga las reglas compartidas (por defecto PRICING_RULES_PATH).
+    
+    El motor nuevo se compila completo antes de reemplazar al vigente.
+    """
+    global _engine
+    path = path or config.PRICING_RULES_PATH
+    if not path:
+        raise ValueError("No hay PRICING_RULES_PATH configurado")
+    engine = PricingEngine.from_file(path)
+    with _engine_lock:
+        _engine = engine
+    return engine
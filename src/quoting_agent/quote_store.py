@@ -0,0 +1,288 @@
+"""
+Repositorio de cotizaciones generadas (SQLite WAL con índices)
+
+Cada cotización de generate_quote_node se guarda para poder buscarla,
+re-emitirla o auditarla después. Guardar no escribe en disco: la
+cotización queda en un buffer en memoria y un hilo escritor la confirma
+en lotes (una transacción por lote), así el camino de la cotización no
+paga ni el JSON ni el fsync.
+
+Consultas indexadas:
+- get(quote_id): clave primaria (ve también lo que aún está en el buffer)
+- by_customer(customer_id): índice (customer_id, created_at)
+- by_part(part_number): tabla quote_parts (una fila por línea), sin rowid
+- expiring_between(start, end): índice sobre valid_until
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import config
+from .models import Quote
+
+
+class QuoteStore:
+    """
+    Cotizaciones persistidas con escritura en lotes.
+    
+    Lo que está en el buffer se pierde si el proceso muere antes del
+    siguiente flush (a lo sumo flush_interval_seconds de cotizaciones).
+    """
+    
+    def __init__(
+        self,
+        path: str = ":memory:",
+        batch_size: int = 1000,
+        flush_interval_seconds: float = 0.05
+    ):
+        """
+        Args:
+            path: Archivo SQLite (":memory:" para pruebas)
+            batch_size: Cotizaciones por transacción (y umbral para
+                        despertar al escritor antes del intervalo)
+            flush_interval_seconds: Espera máxima de una cotización en el buffer
+        """
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_seconds = flush_interval_seconds
+        
+        self._pending: Dict[str, Tuple[Quote, float]] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # Un flush a la vez (escritor y consultas no escriben el mismo lote dos veces)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._stats = {"saved": 0, "written": 0, "batches": 0, "errors": 0}
+        
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit: cada lote abre su propia transacción
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS quotes (
+                quote_id TEXT PRIMARY KEY,
+                customer_id TEXT,
+                created_at REAL NOT NULL,
+                valid_until REAL NOT NULL,
+                total REAL NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_quotes_customer
+                ON quotes(customer_id, created_at) WHERE customer_id IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS idx_quotes_valid_until ON quotes(valid_until);
+            CREATE TABLE IF NOT EXISTS quote_parts (
+                part_number TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                quote_id TEXT NOT NULL,
+                PRIMARY KEY (part_number, created_at, quote_id)
+            ) WITHOUT ROWID;
+            """
+        )
+    
+    # ------------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------------
+    
+    def save(self, quote: Quote) -> None:
+        """Encola la cotización; el escritor la confirma en el próximo lote"""
+        with self._lock:
+            self._pending[quote.quote_id] = (quote, time.time())
+            self._stats["saved"] += 1
+            full = len(self._pending) >= self.batch_size
+        
+        self._ensure_writer()
+        if full:
+            self._wake.set()
+    
+    def save_many(self, quotes: Iterable[Quote]) -> int:
+        """
+        Escribe muchas cotizaciones de una vez (importaciones, re-proceso).
+        
+        Confirma una transacción cada batch_size cotizaciones, sin pasar
+        por el buffer.
+        
+        Returns:
+            Cantidad de cotizaciones escritas
+        """
+        now = time.time()
+        batch: List[Tuple[Quote, float]] = []
+        written = 0
+        for quote in quotes:
+            batch.append((quote, now))
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+            written += len(batch)
+        return written
+    
+    def flush(self) -> int:
+        """
+        Confirma lo que está en el buffer.
+        
+        Returns:
+            Cantidad de cotizaciones escritas
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                items = list(self._pending.values())
+            
+            for start in range(0, len(items), self.batch_size):
+                self._write(items[start:start + self.batch_size])
+            
+            with self._lock:
+                for quote, _ in items:
+                    self._pending.pop(quote.quote_id, None)
+            return len(items)
+    
+    def _write(self, items: List[Tuple[Quote, float]]) -> None:
+        quotes = []
+        parts = []
+        for quote, created_at in items:
+            quotes.append((
+                quote.quote_id,
+                quote.customer_id,
+                created_at,
+                quote.valid_until.timestamp(),
+                float(quote.total),  # Columna de consulta; el monto exacto va en el JSON
+                quote.model_dump_json()
+            ))
+            part_numbers = {line.part_number for line in quote.line_items} or {quote.part_number}
+            parts.extend((part_number, created_at, quote.quote_id) for part_number in part_numbers)
+        
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO quotes VALUES (?, ?, ?, ?, ?, ?)", quotes)
+                self._conn.executemany("INSERT OR IGNORE INTO quote_parts VALUES (?, ?, ?)", parts)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        
+        with self._lock:
+            self._stats["written"] += len(items)
+            self._stats["batches"] += 1
+    
+    # ------------------------------------------------------------------------
+    # Escritor en segundo plano
+    # ------------------------------------------------------------------------
+    
+    def _ensure_writer(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._stop.clear()
+                self._writer = threading.Thread(target=self._run, name="quote-store-writer", daemon=True)
+                self._writer.start()
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Lo no escrito sigue en el buffer y se reintenta en el próximo ciclo
+                with self._lock:
+                    self._stats["errors"] += 1
+    
+    def close(self) -> None:
+        """Detiene el escritor y confirma lo pendiente"""
+        self._stop.set()
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(5.0)
+        self.flush()
+    
+    # ------------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------------
+    
+    def _query(self, sql: str, params: Tuple[Any, ...]) -> List[Quote]:
+        # Que las consultas vean también lo recién guardado
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [Quote.model_validate_json(row[0]) for row in rows]
+    
+    def get(self, quote_id: str) -> Optional[Quote]:
+        """Cotización por ID (None si no existe)"""
+        with self._lock:
+            pending = self._pending.get(quote_id)
+        if pending is not None:
+            return pending[0]
+        
+        with self._db_lock:
+            row = self._conn.execute("SELECT payload FROM quotes WHERE quote_id = ?", (quote_id,)).fetchone()
+        return Quote.model_validate_json(row[0]) if row else None
+    
+    def by_customer(self, customer_id: str, limit: int = 100) -> List[Quote]:
+        """Cotizaciones de un cliente, de la más reciente a la más antigua"""
+        return self._query(
+            "SELECT payload FROM quotes WHERE customer_id = ? ORDER BY created_at DESC LIMIT ?",
+            (customer_id, limit)
+        )
+    
+    def by_part(self, part_number: str, limit: int = 100) -> List[Quote]:
+        """Cotizaciones que incluyen una parte (en cualquier línea), más recientes primero"""
+        return self._query(
+            "SELECT q.payload FROM quote_parts p JOIN quotes q ON q.quote_id = p.quote_id "
+            "WHERE p.part_number = ? ORDER BY p.created_at DESC LIMIT ?",
+            (part_number.strip().upper(), limit)
+        )
+    
+    def expiring_between(self, start: datetime, end: datetime, limit: int = 1000) -> List[Quote]:
+        """Cotizaciones con valid_until en [start, end), por vencimiento"""
+        return self._query(
+            "SELECT payload FROM quotes WHERE valid_until >= ? AND valid_until < ? "
+            "ORDER BY valid_until LIMIT ?",
+            (start.timestamp(), end.timestamp(), limit)
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cotizaciones guardadas, escritas, en buffer, lotes y errores de escritura"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
+
+
+# ============================================================================
+# Instancia global
+# ============================================================================
+
+_store: Optional[QuoteStore] = None
+_store_lock = threading.Lock()
+
+
+def get_quote_store() -> QuoteStore:
+    """Repositorio compartido del proceso (QUOTE_STORE_PATH)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = QuoteStore(
+                    config.QUOTE_STORE_PATH,
+                    batch_size=config.QUOTE_STORE_BATCH_SIZE,
+                    flush_interval_seconds=config.QUOTE_STORE_FLUSH_MS / 1000
+                )
+                # Confirmar el buffer al salir
+                atexit.register(_store.close)
+    return _store
@@ -0,0 +1,203 @@
+"""
+Runtime del agente - grafo compilado y clientes LLM compartidos por proceso
+"""
+
+import threading
+import time
+import warnings
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from langchain_core._api.beta_decorator import LangChainBetaWarning
+
+from .state import AgentState
+from .llm_factory import get_llm, get_llm_pool_stats
+from .tracing import get_tracer
+
+
+class AgentRuntime:
+    """
+    Mantiene el grafo compilado una sola vez y lo reutiliza en cada ejecución.
+    
+    Compilar el grafo y crear el cliente LLM son costos fijos; el runtime
+    los paga una vez (idealmente en warmup() al arrancar) y reporta cuánto
+    tiempo ahorra cada solicitud posterior.
+    
+    Las ejecuciones con thread_id en config usan una segunda compilación
+    con checkpointer (sesiones); las de un solo turno no pagan la escritura
+    de checkpoints.
+    """
+    
+    def __init__(
+        self,
+        builder: Optional[Callable[..., Any]] = None,
+        checkpointer: Optional[Any] = None
+    ):
+        """
+        Args:
+            builder: Función que construye el grafo compilado
+                     (por defecto create_quoting_agent)
+            checkpointer: Persistencia de sesiones (por defecto el
+                          checkpointer SQLite de sessions.py)
+        """
+        self._builder = builder
+        self._checkpointer = checkpointer
+        self._graph = None
+        self._session_graph = None
+        self._lock = threading.Lock()
+        self._compile_seconds = 0.0
+        self._requests = 0
+    
+    @property
+    def graph(self):
+        """Grafo compilado (se construye en el primer acceso)"""
+        if self._graph is None:
+            with self._lock:
+                if self._graph is None:
+                    start = time.perf_counter()
+                    self._graph = self._get_builder()()
+                    self._compile_seconds = time.perf_counter() - start
+        return self._graph
+    
+    @property
+    def session_graph(self):
+        """Grafo compilado con checkpointer (se construye en el primer acceso)"""
+        if self._session_graph is None:
+            with self._lock:
+                if self._session_graph is None:
+                    if self._checkpointer is None:
+                        from .sessions import get_checkpointer
+                        self._checkpointer = get_checkpointer()
+                    self._session_graph = self._get_builder()(checkpointer=self._checkpointer)
+        return self._session_graph
+    
+    def _get_builder(self) -> Callable[..., Any]:
+        if self._builder is None:
+            from .agent import create_quoting_agent
+            return create_quoting_agent
+        return self._builder
+    
+    def _graph_for(self, config: Optional[Dict[str, Any]]):
+        """Grafo con sesiones si config trae thread_id"""
+        if config and config.get("configurable", {}).get("thread_id"):
+            return self.session_graph
+        return self.graph
+    
+    def has_session(self, thread_id: str) -> bool:
+        """True si hay estado guardado para la sesión"""
+        graph = self.session_graph
+        return graph.checkpointer.get_tuple({"configurable": {"thread_id": thread_id}}) is not None
+    
+    def delete_session(self, thread_id: str) -> None:
+        """Descarta el estado guardado de la sesión"""
+        self.session_graph.checkpointer.delete_session(thread_id)
+    
+    def warmup(self, llm: bool = True) -> Dict[str, Any]:
+        """
+        Compila el grafo y crea el cliente LLM por adelantado.
+        
+        Args:
+            llm: Si también debe crear el cliente LLM configurado
+        
+        Returns:
+            Estadísticas del runtime tras el warmup
+        """
+        self.graph
+        if llm:
+            get_llm()
+        return self.stats()
+    
+    def invoke(self, state: AgentState, config: Optional[Dict[str, Any]] = None) -> AgentState:
+        """Ejecuta el grafo compilado con el estado dado"""
+        graph = self._graph_for(config)
+        self._requests += 1
+        with get_tracer().span("graph", "agent"):
+            return graph.invoke(state, config=config)
+    
+    async def ainvoke(self, state: AgentState, config: Optional[Dict[str, Any]] = None) -> AgentState:
+        """Ejecuta el grafo compilado de forma asíncrona"""
+        graph = self._graph_for(config)
+        self._requests += 1
+        with get_tracer().span("graph", "agent"):
+            return await graph.ainvoke(state, config=config)
+    
+    def stream(
+        self,
+        state: AgentState,
+        config: Optional[Dict[str, Any]] = None,
+        stream_mode: Any = "updates"
+    ) -> Iterator[Any]:
+        """Ejecuta el grafo compilado emitiendo el avance de cada nodo"""
+        graph = self._graph_for(config)
+        self._requests += 1
+        with get_tracer().span("graph", "agent"):
+            yield from graph.stream(state, config=config, stream_mode=stream_mode)
+    
+    async def astream_events(
+        self,
+        state: AgentState,
+        config: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Ejecuta el grafo compilado emitiendo eventos de nodos y tokens del LLM"""
+        graph = self._graph_for(config)
+        self._requests += 1
+        with warnings.catch_warnings():
+            # astream_events está marcado como beta en langchain-core 0.2
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            events = graph.astream_events(state, config=config, version="v2")
+        with get_tracer().span("graph", "agent"):
+            async for event in events:
+                yield event
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Reporta el ahorro de reutilizar grafo y clientes.
+        
+        Returns:
+            Diccionario con:
+            - requests: Ejecuciones servidas por el runtime
+            - compile_seconds: Costo de compilar el grafo (pagado una vez)
+            - llm_init_seconds: Costo de crear clientes LLM (pagado una vez)
+            - saved_seconds_per_request: Costo fijo evitado en cada solicitud
+            - saved_seconds_total: Ahorro acumulado frente a reconstruir todo
+            - sessions: Estadísticas del checkpointer (None si no se usó)
+        """
+        pool = get_llm_pool_stats()
+        llm_init = pool["init_seconds"] / pool["misses"] if pool["misses"] else 0.0
+        per_request = self._compile_seconds + llm_init
+        reused = max(self._requests - 1, 0)
+        
+        return {
+            "requests": self._requests,
+            "compiled": self._graph is not None,
+            "compile_seconds": self._compile_seconds,
+            "llm_clients": pool["clients"],
+            "llm_init_seconds": llm_init,
+            "saved_seconds_per_request": per_request,
+            "saved_seconds_total": per_request * reused,
+            "sessions": (
+                self._checkpointer.stats()
+                if self._session_graph is not None and hasattr(self._checkpointer, "stats") else None
+            ),
+        }
+    
+    def reset(self) -> None:
+        """Descarta el grafo compilado (se recompila en el próximo uso)"""
+        with self._lock:
+            self._graph = None
+            self._session_graph = None
+            self._compile_seconds = 0.0
+            self._requests = 0
+
+
+# Instancia global
+_runtime = AgentRuntime()
+
+
+def get_runtime() -> AgentRuntime:
+    """Retorna el runtime compartido del proceso"""
+    return _runtime
+
+
+def warmup() -> Dict[str, Any]:
+    """Precalienta el runtime global (llamar al arrancar el proceso)"""
+    return _runtime.warmup()
@@ -0,0 +1,221 @@
+"""
+Sesiones de varios turnos: checkpointer SQLite para el grafo
+
+Con un thread_id, cada turno retoma el estado guardado del anterior
+(quote_request, inventory_result, iteration_count, historial) en vez de
+empezar un grafo desde cero.
+
+- Guarda solo el último checkpoint de cada sesión (el historial de pasos
+  no se usa para retomar) comprimido con zlib: ~3x más chico que el JSON
+- Expulsa las sesiones inactivas más de SESSION_IDLE_TTL_SECONDS
+- Implementa los métodos async sobre la misma conexión (el SqliteSaver de
+  langgraph solo es sync y el AsyncSqliteSaver requiere aiosqlite)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import JsonPlusSerializerCompat, SqliteSaver
+
+from .config import config
+
+
+_COMPRESSED = b"Z"
+
+
+class CompactSerializer(JsonPlusSerializerCompat):
+    """JSON de langgraph (mensajes y modelos Pydantic incluidos) comprimido con zlib"""
+    
+    def _default(self, obj: Any) -> Any:
+        # Montos de la cotización: Decimal exacto (langgraph no lo serializa)
+        if isinstance(obj, Decimal):
+            return self._encode_constructor_args(Decimal, args=[str(obj)])
+        return super()._default(obj)
+    
+    def dumps(self, obj: Any) -> bytes:
+        return _COMPRESSED + zlib.compress(super().dumps(obj), 6)
+    
+    def loads(self, data: bytes) -> Any:
+        # Lo que no tiene el prefijo se escribió sin comprimir
+        if data[:1] == _COMPRESSED:
+            data = zlib.decompress(data[1:])
+        return super().loads(data)
+
+
+class SessionCheckpointer(SqliteSaver):
+    """Checkpointer SQLite con compactación, expulsión de sesiones inactivas y API async"""
+    
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        idle_ttl_seconds: Optional[float] = None,
+        evict_interval_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            conn: Conexión SQLite (check_same_thread=False)
+            idle_ttl_seconds: Inactividad tras la cual se expulsa una sesión
+                              (default: SESSION_IDLE_TTL_SECONDS)
+            evict_interval_seconds: Cada cuánto buscar sesiones inactivas
+                                    al guardar (default: SESSION_EVICT_INTERVAL_SECONDS)
+        """
+        super().__init__(conn, serde=CompactSerializer())
+        # Reentrante: put() toma el lock y luego abre un cursor
+        self.lock = threading.RLock()
+        self.idle_ttl_seconds = (
+            config.SESSION_IDLE_TTL_SECONDS if idle_ttl_seconds is None else idle_ttl_seconds
+        )
+        self.evict_interval_seconds = (
+            config.SESSION_EVICT_INTERVAL_SECONDS if evict_interval_seconds is None else evict_interval_seconds
+        )
+        self._last_eviction = time.time()
+        self._evicted = 0
+    
+    @classmethod
+    def from_path(cls, path: str, **kwargs) -> "SessionCheckpointer":
+        """Abre (o crea) la base de sesiones en path (":memory:" para pruebas)"""
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return cls(sqlite3.connect(path, check_same_thread=False), **kwargs)
+    
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS sessions (
+                thread_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+            """
+        )
+    
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        # Una sola conexión compartida: las transacciones no se intercalan entre hilos
+        with self.lock, super().cursor(transaction) as cur:
+            yield cur
+    
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata
+    ) -> RunnableConfig:
+        thread_id = str(config["configurable"]["thread_id"])
+        now = time.time()
+        
+        with self.lock, self.cursor() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, thread_ts, parent_ts, checkpoint, metadata) "
+                "VALUES (?, ?, NULL, ?, ?)",
+                (thread_id, checkpoint["id"], self.serde.dumps(checkpoint), self.serde.dumps(metadata))
+            )
+            # Compactación: para retomar basta el último checkpoint
+            cur.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND thread_ts != ?",
+                (thread_id, checkpoint["id"])
+            )
+            cur.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND thread_ts != ?",
+                (thread_id, checkpoint["id"])
+            )
+            cur.execute(
+                "INSERT OR REPLACE INTO sessions (thread_id, updated_at) VALUES (?, ?)",
+                (thread_id, now)
+            )
+        
+        if now - self._last_eviction >= self.evict_interval_seconds:
+            self.evict_idle()
+        
+        return {"configurable": {"thread_id": thread_id, "thread_ts": checkpoint["id"]}}
+    
+    def evict_idle(self, idle_ttl_seconds: Optional[float] = None) -> int:
+        """
+        Borra las sesiones sin actividad reciente.
+        
+        Args:
+            idle_ttl_seconds: Inactividad máxima (default: la del checkpointer)
+        
+        Returns:
+            Cantidad de sesiones expulsadas
+        """
+        ttl = self.idle_ttl_seconds if idle_ttl_seconds is None else idle_ttl_seconds
+        cutoff = time.time() - ttl
+        
+        with self.lock, self.cursor() as cur:
+            cur.execute("SELECT thread_id FROM sessions WHERE updated_at < ?", (cutoff,))
+            stale = [(row[0],) for row in cur.fetchall()]
+            cur.executemany("DELETE FROM checkpoints WHERE thread_id = ?", stale)
+            cur.executemany("DELETE FROM writes WHERE thread_id = ?", stale)
+            cur.executemany("DELETE FROM sessions WHERE thread_id = ?", stale)
+        
+        self._last_eviction = time.time()
+        self._evicted += len(stale)
+        return len(stale)
+    
+    def delete_session(self, thread_id: str) -> None:
+        """Descarta una sesión (p. ej. cuando el cliente empieza de nuevo)"""
+        with self.lock, self.cursor() as cur:
+            for table in ("checkpoints", "writes", "sessions"):
+                cur.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Sesiones activas, tamaño guardado y sesiones expulsadas"""
+        with self.cursor(transaction=False) as cur:
+            sessions = cur.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            size = cur.execute("SELECT COALESCE(SUM(LENGTH(checkpoint)), 0) FROM checkpoints").fetchone()[0]
+        return {"sessions": sessions, "checkpoint_bytes": size, "evicted": self._evicted}
+    
+    # ------------------------------------------------------------------------
+    # API async: SQLite local responde en microsegundos, se llama directo
+    # ------------------------------------------------------------------------
+    
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+    
+    async def alist(self, config: Optional[RunnableConfig], *, filter=None, before=None, limit=None):
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+    
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata)
+    
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: List[Tuple[str, Any]],
+        task_id: str
+    ) -> None:
+        return self.put_writes(config, writes, task_id)
+
+
+# Instancia global
+_checkpointer: Optional[SessionCheckpointer] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> SessionCheckpointer:
+    """Checkpointer compartido del proceso (SESSION_DB_PATH)"""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = SessionCheckpointer.from_path(config.SESSION_DB_PATH)
+    return _checkpointer
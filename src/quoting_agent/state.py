@@ -2,10 +2,11 @@
 Estado del grafo LangGraph
 """
 
-from typing import TypedDict, Optional, List
+from typing import Annotated, Any, Dict, TypedDict, Optional, List
 from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
 
-from .models import QuoteRequest, InventoryResult, Quote
+from .models import QuoteRequest, InventoryResult, Quote, OrderStatus
 
 
 class AgentState(TypedDict):
@@ -16,13 +17,17 @@ class AgentState(TypedDict):
     entre nodos. Cada nodo puede leer y actualizar este estado.
     """
     
-    # Mensajes de conversación
-    messages: List[BaseMessage]
+    # Mensajes de conversación (los nodos agregan, no reemplazan)
+    messages: Annotated[List[BaseMessage], add_messages]
+    
+    # Cliente que cotiza (se copia a la cotización si el mensaje no lo trae)
+    customer_id: Optional[str]
     
     # Datos del proceso
     quote_request: Optional[QuoteRequest]
     inventory_result: Optional[InventoryResult]
     quote: Optional[Quote]
+    order: Optional[OrderStatus]
     
     # Control de flujo
     needs_clarification: bool
@@ -30,12 +35,13 @@ class AgentState(TypedDict):
     iteration_count: int
 
 
-def create_initial_state(user_message: str) -> AgentState:
+def create_initial_state(user_message: str, customer_id: Optional[str] = None) -> AgentState:
     """
     Crea el estado inicial del agente con el mensaje del usuario.
     
     Args:
         user_message: Mensaje inicial del usuario
+        customer_id: Cliente que cotiza (opcional)
         
     Returns:
         Estado inicial del agente
@@ -44,10 +50,34 @@ def create_initial_state(user_message: str) -> AgentState:
     
     return AgentState(
         messages=[HumanMessage(content=user_message)],
+        customer_id=customer_id,
         quote_request=None,
         inventory_result=None,
         quote=None,
+        order=None,
         needs_clarification=False,
         error_message=None,
         iteration_count=0
-    )
\ No newline at end of file
+    )
+
+
+def create_turn_input(user_message: str) -> Dict[str, Any]:
+    """
+    Entrada de un turno siguiente dentro de una sesión.
+    
+    Agrega el mensaje al historial y limpia el resultado del turno
+    anterior; quote_request, inventory_result, quote (la cotización que
+    el cliente puede aceptar) e iteration_count se conservan del
+    checkpoint.
+    
+    Args:
+        user_message: Mensaje del usuario en este turno
+    """
+    from langchain_core.messages import HumanMessage
+    
+    return {
+        "messages": [HumanMessage(content=user_message)],
+        "order": None,
+        "needs_clarification": False,
+        "error_message": None
+    }
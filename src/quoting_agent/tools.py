@@ -2,17 +2,26 @@
 Herramientas del agente - Funciones que interactúan con sistemas externos
 """
 
+import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import uuid
 
-from .models import QuoteRequest, InventoryResult, Quote
+from .models import QuoteRequest, QuoteLineItem, InventoryResult, Quote, QuoteLine, OrderStatus
 from .config import config
+from .catalog import get_catalog
+from .erp_client import get_erp_client
+from .inventory_cache import get_inventory_cache
+from .inventory_loader import get_inventory_loader
+from .orders import get_order_dispatcher, get_order_outbox
+from .pricing import get_pricing_engine
+from .tracing import traced
 
 
 # ============================================================================
 # Mock Data - Inventario simulado
 # ============================================================================
+# Catálogo por defecto cuando no hay CATALOG_PATH (ver catalog.py)
 
 MOCK_INVENTORY: Dict[str, Dict[str, Any]] = {
     "ABC-45": {
@@ -52,11 +61,12 @@ MOCK_INVENTORY: Dict[str, Dict[str, Any]] = {
 # Tool 1: Check Inventory
 # ============================================================================
 
+@traced("tool", "check_inventory_tool")
 def check_inventory_tool(part_number: str, quantity: int) -> InventoryResult:
     """
     Consulta el inventario para una parte específica.
     
-    En producción, esto haría una llamada a la API del ERP.
+    En producción, consulta la API del ERP (ver erp_client.py).
     En desarrollo, usa datos mock.
     
     Args:
@@ -65,6 +75,9 @@ def check_inventory_tool(part_number: str, quantity: int) -> InventoryResult:
         
     Returns:
         InventoryResult con disponibilidad y precio
+        
+    Raises:
+        ERPError: Si el ERP no responde tras los reintentos
     """
     
     # Normalizar número de parte
@@ -74,68 +87,195 @@ def check_inventory_tool(part_number: str, quantity: int) -> InventoryResult:
     if config.ENABLE_MOCK_DATA:
         return _check_mock_inventory(part_number, quantity)
     
-    # TODO: Implementar llamada real a ERP
-    # response = requests.get(
-    #     f"{config.ERP_API_URL}/inventory/{part_number}",
-    #     headers={"Authorization": f"Bearer {config.ERP_API_KEY}"}
-    # )
-    # return InventoryResult(**response.json())
+    record = get_inventory_record(part_number)
+    return InventoryResult.from_record(part_number, record, quantity)
+
+
+@traced("tool", "check_inventory_tool")
+async def acheck_inventory_tool(part_number: str, quantity: int) -> InventoryResult:
+    """
+    Versión asíncrona de check_inventory_tool.
+    
+    Args:
+        part_number: Número de parte a consultar
+        quantity: Cantidad solicitada
+        
+    Returns:
+        InventoryResult con disponibilidad y precio
+    """
+    part_number = part_number.strip().upper()
+    
+    # El inventario mock es local: no hay I/O que esperar
+    if config.ENABLE_MOCK_DATA:
+        return _check_mock_inventory(part_number, quantity)
     
-    # Por ahora, fallback a mock
-    return _check_mock_inventory(part_number, quantity)
+    record = await aget_inventory_record(part_number)
+    return InventoryResult.from_record(part_number, record, quantity)
 
 
-def _check_mock_inventory(part_number: str, quantity: int) -> InventoryResult:
-    """Consulta inventario mock"""
-    
-    # Verificar si existe la parte
-    if part_number not in MOCK_INVENTORY:
-        return InventoryResult(
-            part_number=part_number,
-            status="unavailable",
-            available_stock=0,
-            unit_price=None,
-            lead_time_days=None,
-            suggested_alternatives=[]
-        )
+def get_inventory_record(part_number: str) -> Optional[Dict[str, Any]]:
+    """
+    Registro crudo de inventario del ERP.
+    
+    Pasa por la caché read-through y, en un miss, por el loader que agrupa
+    las partes pedidas por conversaciones concurrentes en una llamada bulk.
     
-    item = MOCK_INVENTORY[part_number]
-    available_stock = item["stock"]
-    unit_price = item["unit_price"]
-    lead_time_days = item["lead_time_days"]
-    alternatives = item["alternatives"]
-    
-    # Determinar status
-    if unit_price is None:
-        status = "no_price"
-    elif available_stock >= quantity:
-        status = "available"
-    elif available_stock > 0:
-        status = "insufficient"
+    Args:
+        part_number: Número de parte normalizado
+        
+    Returns:
+        Registro con stock, unit_price, lead_time_days y alternatives,
+        o None si la parte no existe
+    """
+    if config.INVENTORY_BATCH_ENABLED:
+        loader = get_inventory_loader().load
     else:
-        status = "unavailable"
-    
-    return InventoryResult(
-        part_number=part_number,
-        status=status,
-        available_stock=available_stock,
-        unit_price=unit_price,
-        lead_time_days=lead_time_days,
-        suggested_alternatives=alternatives
-    )
+        loader = get_erp_client().get_inventory
+    
+    if not config.INVENTORY_CACHE_ENABLED:
+        return loader(part_number)
+    
+    return get_inventory_cache().get_or_load(part_number, loader)
+
+
+async def aget_inventory_record(part_number: str) -> Optional[Dict[str, Any]]:
+    """Versión asíncrona de get_inventory_record"""
+    if config.INVENTORY_BATCH_ENABLED:
+        loader = get_inventory_loader().aload
+    else:
+        loader = get_erp_client().aget_inventory
+    
+    if not config.INVENTORY_CACHE_ENABLED:
+        return await loader(part_number)
+    
+    return await get_inventory_cache().aget_or_load(part_number, loader)
+
+
+def check_inventory_many(part_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Consulta los registros crudos de varias partes en una sola llamada.
+    
+    Args:
+        part_numbers: Números de parte normalizados
+        
+    Returns:
+        Registro por parte (None si no existe)
+        
+    Raises:
+        ERPError: Si el ERP no responde tras los reintentos
+    """
+    if config.ENABLE_MOCK_DATA:
+        return get_catalog().get_many(part_numbers)
+    
+    return get_erp_client().get_inventory_many(part_numbers)
+
+
+async def acheck_inventory_many(part_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Versión asíncrona de check_inventory_many"""
+    if config.ENABLE_MOCK_DATA:
+        return get_catalog().get_many(part_numbers)
+    
+    return await get_erp_client().aget_inventory_many(part_numbers)
+
+
+def _chunks(part_numbers: List[str]) -> List[List[str]]:
+    """Parte la lista en bloques de INVENTORY_BATCH_MAX_SIZE para el endpoint bulk"""
+    size = max(1, config.INVENTORY_BATCH_MAX_SIZE)
+    return [part_numbers[i:i + size] for i in range(0, len(part_numbers), size)]
+
+
+def load_inventory_many(part_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """check_inventory_many en bloques acotados (para solicitudes de cientos de líneas)"""
+    records: Dict[str, Optional[Dict[str, Any]]] = {}
+    for chunk in _chunks(part_numbers):
+        records.update(check_inventory_many(chunk))
+    return records
+
+
+async def aload_inventory_many(part_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Versión asíncrona de load_inventory_many (los bloques se piden en paralelo)"""
+    records: Dict[str, Optional[Dict[str, Any]]] = {}
+    for chunk_records in await asyncio.gather(*[acheck_inventory_many(chunk) for chunk in _chunks(part_numbers)]):
+        records.update(chunk_records)
+    return records
+
+
+def get_inventory_records(part_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Registros crudos de varias partes: hits desde la caché y el resto en bulk.
+    
+    Args:
+        part_numbers: Números de parte normalizados
+        
+    Returns:
+        Registro por parte (None si no existe)
+    """
+    if config.ENABLE_MOCK_DATA or not config.INVENTORY_CACHE_ENABLED:
+        return load_inventory_many(part_numbers)
+    
+    return get_inventory_cache().get_many_or_load(part_numbers, load_inventory_many)
+
+
+async def aget_inventory_records(part_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Versión asíncrona de get_inventory_records"""
+    if config.ENABLE_MOCK_DATA or not config.INVENTORY_CACHE_ENABLED:
+        return await aload_inventory_many(part_numbers)
+    
+    return await get_inventory_cache().aget_many_or_load(part_numbers, aload_inventory_many)
+
+
+@traced("tool", "check_inventory_lines_tool")
+def check_inventory_lines_tool(line_items: List[QuoteLineItem]) -> InventoryResult:
+    """
+    Consulta el inventario de todas las líneas de una solicitud a la vez.
+    
+    Args:
+        line_items: Líneas de la solicitud (partes sin repetir)
+        
+    Returns:
+        InventoryResult agregado, con el detalle por línea en line_results
+        
+    Raises:
+        ERPError: Si el ERP no responde tras los reintentos
+    """
+    records = get_inventory_records([item.part_number for item in line_items])
+    return _combine_lines(line_items, records)
+
+
+@traced("tool", "check_inventory_lines_tool")
+async def acheck_inventory_lines_tool(line_items: List[QuoteLineItem]) -> InventoryResult:
+    """Versión asíncrona de check_inventory_lines_tool"""
+    records = await aget_inventory_records([item.part_number for item in line_items])
+    return _combine_lines(line_items, records)
+
+
+def _combine_lines(
+    line_items: List[QuoteLineItem],
+    records: Dict[str, Optional[Dict[str, Any]]]
+) -> InventoryResult:
+    return InventoryResult.combine([
+        InventoryResult.from_record(item.part_number, records.get(item.part_number), item.quantity)
+        for item in line_items
+    ])
+
+
+def _check_mock_inventory(part_number: str, quantity: int) -> InventoryResult:
+    """Consulta el catálogo local (MOCK_INVENTORY o CATALOG_PATH)"""
+    return InventoryResult.from_record(part_number, get_catalog().get(part_number), quantity)
 
 
 # ============================================================================
 # Tool 2: Generate Quote
 # ============================================================================
 
+@traced("tool", "generate_quote_tool")
 def generate_quote_tool(request: QuoteRequest, inventory: InventoryResult) -> Quote:
     """
     Genera una cotización basada en la solicitud y disponibilidad.
     
     Args:
         request: Solicitud de cotización
-        inventory: Resultado de inventario
+        inventory: Resultado de inventario (agregado si hay varias líneas)
         
     Returns:
         Quote con detalles completos
@@ -147,13 +287,31 @@ def generate_quote_tool(request: QuoteRequest, inventory: InventoryResult) -> Qu
     if inventory.status != "available":
         raise ValueError(f"No se puede cotizar: status={inventory.status}")
     
-    if inventory.unit_price is None:
+    line_results = inventory.line_results or [inventory]
+    
+    if len(line_results) != len(request.line_items):
+        raise ValueError("El inventario no corresponde a las líneas de la solicitud")
+    
+    if any(result.unit_price is None for result in line_results):
         raise ValueError("Precio no disponible")
     
-    # Calcular montos
-    subtotal = request.quantity * inventory.unit_price
-    tax = subtotal * 0.19  # IVA 19%
-    total = subtotal + tax
+    # Precios con las reglas vigentes (volumen, contrato, IVA, moneda) en Decimal
+    priced = get_pricing_engine().price(
+        ((item.part_number, item.quantity, result.unit_price) for item, result in zip(request.line_items, line_results)),
+        request.customer_id
+    )
+    
+    lines = [
+        QuoteLine(
+            part_number=line.part_number,
+            quantity=line.quantity,
+            unit_price=line.unit_price,
+            subtotal=line.subtotal,
+            list_price=line.list_price,
+            discount_percent=float(line.discount_percent)
+        )
+        for line in priced.lines
+    ]
     
     # Generar ID único
     quote_id = f"Q-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
@@ -165,41 +323,43 @@ def generate_quote_tool(request: QuoteRequest, inventory: InventoryResult) -> Qu
         quote_id=quote_id,
         part_number=request.part_number,
         quantity=request.quantity,
-        unit_price=inventory.unit_price,
-        subtotal=subtotal,
-        tax=tax,
-        total=total,
+        unit_price=lines[0].unit_price,
+        subtotal=priced.subtotal,
+        tax=priced.tax,
+        total=priced.total,
         valid_until=valid_until,
-        notes=request.notes
+        customer_id=request.customer_id,
+        currency=priced.currency,
+        tax_percent=float(priced.tax_percent),
+        notes=request.notes,
+        line_items=lines
     )
 
 
 # ============================================================================
-# Tool 3: Submit Order (Placeholder)
+# Tool 3: Submit Order
 # ============================================================================
 
-def submit_order_tool(quote: Quote) -> Dict[str, Any]:
+@traced("tool", "submit_order_tool")
+def submit_order_tool(quote: Quote) -> OrderStatus:
     """
-    Envía la orden al sistema ERP.
+    Registra la orden de una cotización aceptada.
+    
+    La orden queda en la outbox y el despachador la envía al ERP en
+    segundo plano; esta función no espera al ERP. Aceptar dos veces la
+    misma cotización retorna la orden ya registrada.
     
     Args:
         quote: Cotización aprobada
         
     Returns:
-        Confirmación de orden
-    """
-    
-    # TODO: Implementar integración con ERP
-    # response = requests.post(
-    #     f"{config.ERP_API_URL}/orders",
-    #     json=quote.model_dump(),
-    #     headers={"Authorization": f"Bearer {config.ERP_API_KEY}"}
-    # )
-    # return response.json()
-    
-    # Mock response
-    return {
-        "order_id": f"ORD-{uuid.uuid4().hex[:8].upper()}",
-        "status": "pending",
-        "message": "Orden recibida y en proceso"
-    }
\ No newline at end of file
+        Estado de la orden (pending hasta que el ERP la confirme)
+    """
+    order, created = get_order_outbox().enqueue(quote)
+    
+    dispatcher = get_order_dispatcher()
+    dispatcher.start()
+    if created:
+        dispatcher.notify()
+    
+    return order
@@ -0,0 +1,359 @@
+"""
+Trazas y métricas de latencia del grafo, el LLM y las tools
+
+Cada ejecución del grafo abre un span raíz ("graph") y dentro quedan los
+spans de cada nodo, de cada llamada al LLM (con tokens y si salió de la
+caché) y de cada tool, con duración y resultado (ok/error). El span
+vigente viaja en un ContextVar, así los spans de los nodos que LangGraph
+corre en otros hilos o tareas quedan colgados del mismo trace.
+
+Salidas:
+- TRACE_PATH: un span por línea (JSON lines)
+- /metrics del servicio HTTP: histogramas de duración por nodo/tool/LLM,
+  conteo por resultado, tokens y aciertos de caché en formato Prometheus
+
+Con TRACING_ENABLED=false span() devuelve un span vacío compartido y los
+decoradores solo agregan una comparación por llamada.
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import config
+
+# Límites de los buckets del histograma, en segundos
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("quoting_agent_span", default=None)
+
+
+@dataclass
+class Span:
+    """Una operación medida dentro de un trace"""
+    
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    kind: str  # "graph" | "node" | "llm" | "tool"
+    name: str
+    start: float
+    duration_ms: float = 0.0
+    outcome: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    
+    def set(self, key: str, value: Any) -> None:
+        """Agrega un atributo (tokens, cache_hit, etc.)"""
+        self.attributes[key] = value
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "outcome": self.outcome,
+            **({"attributes": self.attributes} if self.attributes else {}),
+        }
+
+
+class _NoopSpan:
+    """Span que no registra nada (tracing apagado)"""
+    
+    def set(self, key: str, value: Any) -> None:
+        pass
+    
+    def __enter__(self) -> "_NoopSpan":
+        return self
+    
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _ActiveSpan:
+    """Context manager que abre un Span, lo hace vigente y lo cierra"""
+    
+    __slots__ = ("_tracer", "_span", "_token", "_t0")
+    
+    def __init__(self, tracer: "Tracer", kind: str, name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self._tracer = tracer
+        self._span = Span(
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            kind=kind,
+            name=name,
+            start=time.time(),
+            attributes=attributes
+        )
+    
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self._span)
+        self._t0 = time.perf_counter()
+        return self._span
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        span = self._span
+        span.duration_ms = (time.perf_counter() - self._t0) * 1000
+        if exc_type is not None:
+            span.outcome = "error"
+            span.attributes["error"] = exc_type.__name__
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Cerrado desde otro contexto (generador consumido en otra tarea)
+            pass
+        self._tracer._finish(span)
+        return False
+
+
+# ============================================================================
+# Métricas
+# ============================================================================
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+class SpanMetrics:
+    """Histogramas y contadores agregados de los spans (formato Prometheus)"""
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # (kind, name) → [conteo por bucket..., +Inf], suma
+        self._histograms: Dict[Tuple[str, str], List[int]] = {}
+        self._sums: Dict[Tuple[str, str], float] = {}
+        self._outcomes: Dict[Tuple[str, str, str], int] = {}
+        self._tokens: Dict[Tuple[str, str], int] = {}
+        self._cache: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, span: Span) -> None:
+        """Suma un span terminado a las métricas"""
+        key = (span.kind, span.name)
+        seconds = span.duration_ms / 1000
+        attributes = span.attributes
+        with self._lock:
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[bisect_left(self.buckets, seconds)] += 1
+            self._sums[key] += seconds
+            
+            outcome = (span.kind, span.name, span.outcome)
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+            
+            if attributes:
+                for token_type in ("input_tokens", "output_tokens"):
+                    if attributes.get(token_type):
+                        token_key = (span.name, token_type.split("_")[0])
+                        self._tokens[token_key] = self._tokens.get(token_key, 0) + attributes[token_type]
+                if "cache_hit" in attributes:
+                    cache_key = (span.kind, span.name, "hit" if attributes["cache_hit"] else "miss")
+                    self._cache[cache_key] = self._cache.get(cache_key, 0) + 1
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Duración media por span.
+        
+        Returns:
+            {"kind:name": {count, mean_ms}}
+        """
+        with self._lock:
+            return {
+                f"{kind}:{name}": {
+                    "count": sum(counts),
+                    "mean_ms": self._sums[(kind, name)] / sum(counts) * 1000,
+                }
+                for (kind, name), counts in self._histograms.items()
+            }
+    
+    def render(self) -> str:
+        """Texto de exposición de Prometheus"""
+        with self._lock:
+            histograms = {key: list(counts) for key, counts in self._histograms.items()}
+            sums = dict(self._sums)
+            outcomes = dict(self._outcomes)
+            tokens = dict(self._tokens)
+            cache = dict(self._cache)
+        
+        lines = [
+            "# HELP quoting_agent_span_duration_seconds Duración de nodos, llamadas al LLM y tools",
+            "# TYPE quoting_agent_span_duration_seconds histogram",
+        ]
+        for (kind, name), counts in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"quoting_agent_span_duration_seconds_bucket{{{_labels(kind=kind, name=name, le=le)}}} {cumulative}")
+            lines.append(f"quoting_agent_span_duration_seconds_sum{{{_labels(kind=kind, name=name)}}} {sums[(kind, name)]:.6f}")
+            lines.append(f"quoting_agent_span_duration_seconds_count{{{_labels(kind=kind, name=name)}}} {cumulative}")
+        
+        lines += [
+            "# HELP quoting_agent_spans_total Spans terminados por resultado",
+            "# TYPE quoting_agent_spans_total counter",
+        ]
+        for (kind, name, outcome), count in sorted(outcomes.items()):
+            lines.append(f"quoting_agent_spans_total{{{_labels(kind=kind, name=name, outcome=outcome)}}} {count}")
+        
+        lines += [
+            "# HELP quoting_agent_llm_tokens_total Tokens enviados y recibidos del LLM",
+            "# TYPE quoting_agent_llm_tokens_total counter",
+        ]
+        for (name, token_type), count in sorted(tokens.items()):
+            lines.append(f"quoting_agent_llm_tokens_total{{{_labels(name=name, type=token_type)}}} {count}")
+        
+        lines += [
+            "# HELP quoting_agent_cache_lookups_total Consultas a caché por resultado",
+            "# TYPE quoting_agent_cache_lookups_total counter",
+        ]
+        for (kind, name, result), count in sorted(cache.items()):
+            lines.append(f"quoting_agent_cache_lookups_total{{{_labels(kind=kind, name=name, result=result)}}} {count}")
+        
+        return "\n".join(lines) + "\n"
+    
+    def reset(self) -> None:
+        """Descarta todas las mediciones"""
+        with self._lock:
+            self._histograms.clear()
+            self._sums.clear()
+            self._outcomes.clear()
+            self._tokens.clear()
+            self._cache.clear()
+
+
+# ============================================================================
+# Tracer
+# ============================================================================
+
+class Tracer:
+    """Abre spans y los envía a las métricas y al archivo JSON lines"""
+    
+    def __init__(self, enabled: bool = False, path: Optional[str] = None):
+        """
+        Args:
+            enabled: Registrar spans (False = sin costo más allá de un if)
+            path: Archivo JSON lines de spans (None = solo métricas)
+        """
+        self.enabled = enabled
+        self.path = path
+        self.metrics = SpanMetrics()
+        self._file = None
+        self._file_lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+    
+    def span(self, kind: str, name: str, **attributes: Any):
+        """
+        Context manager que mide una operación.
+        
+        Example:
+            >>> with get_tracer().span("llm", "parse_request") as span:
+            ...     span.set("cache_hit", False)
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return _ActiveSpan(self, kind, name, attributes)
+    
+    def _finish(self, span: Span) -> None:
+        self.metrics.observe(span)
+        if self._file is not None:
+            line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+            with self._file_lock:
+                self._file.write(line + "\n")
+                # Un trace completo queda en disco al cerrar su span raíz
+                if span.parent_id is None:
+                    self._file.flush()
+    
+    def flush(self) -> None:
+        """Escribe a disco los spans pendientes"""
+        if self._file is not None:
+            with self._file_lock:
+                self._file.flush()
+    
+    def close(self) -> None:
+        if self._file is not None:
+            with self._file_lock:
+                self._file.close()
+                self._file = None
+
+
+def current_span():
+    """Span vigente (o el span vacío si no hay ninguno o el tracing está apagado)"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(kind: str, name: Optional[str] = None) -> Callable:
+    """
+    Decorador que mide cada llamada a la función (sync o async) como un span.
+    
+    Args:
+        kind: Tipo de span ("node", "tool", ...)
+        name: Nombre del span (default: nombre de la función)
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+        
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                tracer = get_tracer()
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with _ActiveSpan(tracer, kind, span_name, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = get_tracer()
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with _ActiveSpan(tracer, kind, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    
+    return decorator
+
+
+# ============================================================================
+# Instancia global
+# ============================================================================
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Tracer compartido del proceso (TRACING_ENABLED, TRACE_PATH)"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(
+                    enabled=config.TRACING_ENABLED,
+                    path=(config.TRACE_PATH or None) if config.TRACING_ENABLED else None
+                )
+                atexit.register(_tracer.close)
+    return _tracer
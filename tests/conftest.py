@@ -0,0 +1,37 @@
+"""
+Fixtures compartidas de los tests
+"""
+
+import os
+import sys
+
+import pytest
+
+# Agregar src al path para imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quoting_agent import orders, quote_store
+from quoting_agent.config import config
+from quoting_agent.quote_store import QuoteStore
+
+
+@pytest.fixture(autouse=True)
+def memory_quote_store(monkeypatch):
+    """Cotizaciones guardadas en memoria (no en .cache/) durante cada test"""
+    store = QuoteStore()
+    monkeypatch.setattr(quote_store, "_store", store)
+    yield store
+    store.close()
+
+
+@pytest.fixture(autouse=True)
+def tmp_order_outbox(monkeypatch, tmp_path):
+    """Outbox de órdenes en tmp_path (no en .cache/) y sin despachador compartido"""
+    monkeypatch.setattr(config, "ORDER_OUTBOX_PATH", str(tmp_path / "orders.sqlite3"))
+    monkeypatch.setattr(orders, "_outbox", None)
+    monkeypatch.setattr(orders, "_dispatcher", None)
+    yield
+    if orders._dispatcher is not None:
+        orders._dispatcher.stop()
+    if orders._outbox is not None:
+        orders._outbox.close()
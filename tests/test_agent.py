@@ -7,7 +7,7 @@ from datetime import datetime
 
 from quoting_agent.models import QuoteRequest, InventoryResult, Quote
 from quoting_agent.tools import check_inventory_tool, generate_quote_tool
-from quoting_agent.config import config
+from quoting_agent.config import Config, config
 
 
 # ============================================================================
@@ -157,6 +157,180 @@ class TestTools:
             generate_quote_tool(request, inventory)
 
 
+# ============================================================================
+# Tests del Runtime (no requieren API key)
+# ============================================================================
+
+class TestRuntime:
+    """Tests de reutilización del grafo compilado y del pool de LLM"""
+    
+    def test_graph_compiled_once(self):
+        """El grafo se compila una sola vez y se reutiliza"""
+        from quoting_agent.runtime import AgentRuntime
+        
+        builds = []
+        
+        def builder():
+            builds.append(1)
+            return object()
+        
+        runtime = AgentRuntime(builder)
+        assert runtime.graph is runtime.graph
+        assert len(builds) == 1
+        assert runtime.stats()["compiled"] is True
+    
+    def test_llm_pool_reuses_client(self, monkeypatch):
+        """get_llm reutiliza el cliente mientras no cambie la configuración"""
+        from quoting_agent import llm_factory
+        
+        llm_factory.clear_llm_pool()
+        monkeypatch.setattr(llm_factory, "create_llm", lambda: object())
+        
+        first = llm_factory.get_llm()
+        assert llm_factory.get_llm() is first
+        
+        monkeypatch.setattr(Config, "GEMINI_MODEL", "otro-modelo")
+        monkeypatch.setattr(Config, "OPENAI_MODEL", "otro-modelo")
+        assert llm_factory.get_llm() is not first
+        
+        stats = llm_factory.get_llm_pool_stats()
+        assert stats["misses"] == 2
+        assert stats["hits"] == 1
+        llm_factory.clear_llm_pool()
+
+
+# ============================================================================
+# Tests de ejecución concurrente (fast path, no requieren API key)
+# ============================================================================
+
+class TestBatch:
+    """Tests de run_agent_batch y arun_agent"""
+    
+    def test_batch_preserves_order(self):
+        """Los resultados vuelven en el orden de entrada con su duración"""
+        from quoting_agent import run_agent_batch
+        
+        messages = [
+            "Necesito 100 unidades de ABC-45",
+            "Quiero cotizar 50 piezas XYZ-100",
+            "Necesito 1000 unidades de DEF-200",
+        ]
+        results = run_agent_batch(messages, max_concurrency=2)
+        
+        assert [r.index for r in results] == [0, 1, 2]
+        assert all(r.ok for r in results)
+        assert all(r.elapsed_seconds >= 0 for r in results)
+        assert results[0].state["quote"].part_number == "ABC-45"
+        assert results[1].state["quote"].part_number == "XYZ-100"
+        assert results[2].state["inventory_result"].status == "insufficient"
+    
+    def test_batch_isolates_failures(self, monkeypatch):
+        """Un error en un mensaje no detiene a los demás"""
+        from quoting_agent import nodes, run_agent_batch
+        
+        original = nodes.check_inventory_tool
+        
+        def flaky_inventory(part_number, quantity):
+            if part_number == "XYZ-100":
+                raise RuntimeError("ERP caído")
+            return original(part_number, quantity)
+        
+        monkeypatch.setattr(nodes, "check_inventory_tool", flaky_inventory)
+        results = run_agent_batch([
+            "Quiero cotizar 50 piezas XYZ-100",
+            "Necesito 100 unidades de ABC-45",
+        ])
+        
+        assert not results[0].ok
+        assert "ERP caído" in results[0].error
+        assert results[1].ok
+        assert results[1].state["quote"] is not None
+    
+    def test_arun_agent(self):
+        """arun_agent produce el mismo resultado que run_agent"""
+        import asyncio
+        from quoting_agent import arun_agent
+        
+        result = asyncio.run(arun_agent("Necesito 100 unidades de ABC-45"))
+        assert result["quote"].quantity == 100
+
+
+class TestAsyncNodes:
+    """Tests de los nodos asíncronos (LLM falso, no requieren API key)"""
+    
+    def test_concurrent_conversations_share_event_loop(self, monkeypatch):
+        """Cientos de conversaciones esperan al LLM en paralelo en un solo loop"""
+        import asyncio
+        from langchain_core.messages import AIMessage
+        from quoting_agent import nodes, arun_agent
+        
+        in_flight = {"now": 0, "peak": 0}
+        
+        class SlowAsyncLLM:
+            def invoke(self, messages):
+                raise AssertionError("El camino async no debe usar invoke")
+            
+            async def ainvoke(self, messages):
+                in_flight["now"] += 1
+                in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+                await asyncio.sleep(0.2)
+                in_flight["now"] -= 1
+                return AIMessage(content='{"part_number": "ABC-45", "quantity": 10}')
+        
+        monkeypatch.setattr(nodes, "get_llm", lambda: SlowAsyncLLM())
+        monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+        
+        async def run_many():
+            return await asyncio.gather(*[
+                arun_agent("cotízame ABC-45 por favor") for _ in range(100)
+            ])
+        
+        results = asyncio.run(run_many())
+        
+        assert all(r["quote"].quantity == 10 for r in results)
+        # Las llamadas al LLM se solapan (secuenciales tomarían >= 20s);
+        # se mide el solapamiento y no el tiempo, para no depender de la carga
+        assert in_flight["peak"] >= 10
+
+
+class TestStreaming:
+    """Tests de stream_agent / astream_agent (no requieren API key)"""
+    
+    def test_stream_agent_yields_each_node(self):
+        from quoting_agent.agent import stream_agent
+        
+        events = list(stream_agent("Necesito 100 unidades de ABC-45"))
+        
+        assert [e.node for e in events[:-1]] == ["parse_request", "check_inventory", "generate_quote"]
+        assert events[0].content.startswith("✓ Entendido")
+        assert events[-1].type == "final"
+        assert events[-1].state["quote"].quantity == 100
+    
+    def test_astream_agent_streams_llm_tokens(self, monkeypatch):
+        """Con un LLM que hace streaming, los tokens llegan antes que el nodo"""
+        import asyncio
+        from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+        from quoting_agent import nodes
+        from quoting_agent.agent import astream_agent
+        
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content='{"part_number": "ABC-45", "quantity": 10}')]))
+        monkeypatch.setattr(nodes, "get_llm", lambda: llm)
+        monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+        
+        async def collect():
+            return [event async for event in astream_agent("cotízame ABC-45 por favor")]
+        
+        events = asyncio.run(collect())
+        
+        kinds = [(e.type, e.node) for e in events]
+        tokens = [e.content for e in events if e.type == "token"]
+        assert "".join(tokens) == '{"part_number": "ABC-45", "quantity": 10}'
+        assert kinds.index(("token", "parse_request")) < kinds.index(("node", "parse_request"))
+        assert events[-1].type == "final"
+        assert events[-1].state["quote"].quantity == 10
+
+
 # ============================================================================
 # Tests del Agente (requieren API key)
 # ============================================================================
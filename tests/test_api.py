@@ -0,0 +1,130 @@
+"""
+Tests del servicio HTTP (api/main.py)
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import create_app
+from api.metrics import LatencyRecorder
+from quoting_agent.config import config
+
+
+@pytest.fixture
+def client():
+    with TestClient(create_app()) as client:
+        yield client
+
+
+class TestQuoteAPI:
+    """Tests de los endpoints (fast path, no requieren API key)"""
+    
+    def test_quote(self, client):
+        response = client.post("/api/v1/quote", json={"message": "Necesito 100 unidades de ABC-45"})
+        
+        assert response.status_code == 200
+        body = response.json()
+        # Montos exactos: Decimal serializado como texto
+        assert body["quote"]["total"] == "3034.50"
+        assert body["needs_clarification"] is False
+        assert "X-Response-Time-Ms" in response.headers
+    
+    def test_quote_needs_clarification(self, client):
+        response = client.post("/api/v1/quote", json={"message": "Necesito 1000 unidades de DEF-200"})
+        
+        body = response.json()
+        assert body["quote"] is None
+        assert body["needs_clarification"] is True
+        assert "DEF-200" in body["reply"]
+    
+    def test_empty_message_rejected(self, client):
+        assert client.post("/api/v1/quote", json={"message": ""}).status_code == 422
+    
+    def test_batch_preserves_order(self, client):
+        messages = [f"Necesito {n} unidades de ABC-45" for n in range(1, 21)]
+        
+        response = client.post("/api/v1/quote/batch", json={"messages": messages})
+        
+        results = response.json()["results"]
+        assert [r["quote"]["quantity"] for r in results] == list(range(1, 21))
+    
+    def test_batch_size_limit(self, client, monkeypatch):
+        monkeypatch.setattr(config, "API_MAX_BATCH_SIZE", 2)
+        
+        response = client.post("/api/v1/quote/batch", json={"messages": ["a", "b", "c"]})
+        
+        assert response.status_code == 413
+    
+    def test_quote_stream_sse(self, client):
+        with client.stream("POST", "/api/v1/quote/stream", json={"message": "Necesito 100 unidades de ABC-45"}) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = "".join(response.iter_text())
+        
+        events = [block.split("\n") for block in body.strip().split("\n\n")]
+        names = [lines[0].removeprefix("event: ") for lines in events]
+        assert names == ["node", "node", "node", "final"]
+        final = json.loads(events[-1][1].removeprefix("data: "))
+        assert final["quote"]["total"] == "3034.50"
+    
+    def test_quote_lookup_by_id_and_customer(self, client):
+        quote = client.post(
+            "/api/v1/quote",
+            json={"message": "Necesito 100 unidades de ABC-45", "customer_id": "C-77"}
+        ).json()["quote"]
+        
+        assert client.get(f"/api/v1/quotes/{quote['quote_id']}").json()["customer_id"] == "C-77"
+        found = client.get("/api/v1/quotes", params={"customer_id": "C-77", "part_number": "ABC-45"}).json()
+        assert [q["quote_id"] for q in found] == [quote["quote_id"]]
+        assert client.get("/api/v1/quotes/Q-404").status_code == 404
+        assert client.get("/api/v1/quotes").status_code == 422
+    
+    def test_store_lookups_run_off_the_event_loop(self, client, monkeypatch):
+        from quoting_agent import quote_store
+        
+        loops = []
+        store = quote_store.get_quote_store()
+        search = store.by_customer
+        
+        def record_loop(*args):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return search(*args)
+        
+        monkeypatch.setattr(store, "by_customer", record_loop)
+        
+        assert client.get("/api/v1/quotes", params={"customer_id": "C-77"}).status_code == 200
+        # En el threadpool de FastAPI no hay event loop corriendo
+        assert loops == [None]
+    
+    def test_health_reports_latency_per_endpoint(self, client):
+        for _ in range(3):
+            client.post("/api/v1/quote", json={"message": "Necesito 10 unidades de XYZ-100"})
+        
+        health = client.get("/health").json()
+        
+        assert health["runtime"]["compiled"] is True
+        latency = health["latency"]["POST /api/v1/quote"]
+        assert latency["requests"] == 3
+        assert 0 < latency["p50_ms"] <= latency["p99_ms"] <= latency["max_ms"]
+
+
+class TestLatencyRecorder:
+    """Tests de los percentiles"""
+    
+    def test_percentiles_over_window(self):
+        recorder = LatencyRecorder(window=100)
+        for ms in range(1, 201):
+            recorder.record("GET /x", ms / 1000, error=ms > 198)
+        
+        stats = recorder.stats()["GET /x"]
+        
+        # Solo quedan las últimas 100 (101..200 ms)
+        assert stats["requests"] == 200
+        assert stats["errors"] == 2
+        assert stats["p50_ms"] == pytest.approx(150.5)
+        assert stats["p99_ms"] == pytest.approx(199.01)
@@ -0,0 +1,174 @@
+"""
+Tests del catálogo columnar (carga, snapshots y recarga atómica)
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from quoting_agent import catalog as catalog_module
+from quoting_agent.catalog import Catalog, CatalogStore, get_catalog
+from quoting_agent.tools import MOCK_INVENTORY, check_inventory_tool
+
+
+CSV = """part_number,stock,unit_price,lead_time_days,alternatives
+abc-45,500,25.50,0,ABC-46|ABC-47
+XYZ-100,150,45.00,0,
+JKL-400,200,,0,
+ABC-45,600,26.00,1,ABC-46
+"""
+
+
+class TestCatalog:
+    """Tests del catálogo (no requieren API key)"""
+    
+    def test_matches_mock_inventory(self):
+        catalog = Catalog.from_records(MOCK_INVENTORY)
+        
+        assert len(catalog) == len(MOCK_INVENTORY)
+        for part_number, record in MOCK_INVENTORY.items():
+            assert catalog.get(part_number) == record
+        assert catalog.get(" abc-45 ") == MOCK_INVENTORY["ABC-45"]
+        assert catalog.get("NONEXISTENT-999") is None
+        assert catalog.get("") is None
+    
+    def test_load_csv_last_row_wins(self, tmp_path):
+        path = tmp_path / "catalog.csv"
+        path.write_text(CSV)
+        
+        catalog = Catalog.load(str(path))
+        
+        assert len(catalog) == 3
+        assert catalog.get("ABC-45") == {
+            "stock": 600, "unit_price": 26.00, "lead_time_days": 1, "alternatives": ["ABC-46"]
+        }
+        assert catalog.get("JKL-400")["unit_price"] is None
+    
+    def test_load_jsonl(self, tmp_path):
+        path = tmp_path / "catalog.jsonl"
+        path.write_text("\n".join(
+            json.dumps({"part_number": pn, **record}) for pn, record in MOCK_INVENTORY.items()
+        ))
+        
+        catalog = Catalog.load(str(path))
+        
+        assert catalog.get("GHI-300") == MOCK_INVENTORY["GHI-300"]
+    
+    def test_large_catalog_lookup(self):
+        """100k SKUs: todas las claves se encuentran y los misses no"""
+        size = 100_000
+        part_numbers = np.char.add("SKU-", np.arange(size).astype("U6"))
+        catalog = Catalog.from_arrays(part_numbers, np.arange(size), np.full(size, 1.5))
+        
+        for i in range(0, size, 997):
+            assert catalog.get(f"sku-{i}") == {
+                "stock": i, "unit_price": 1.5, "lead_time_days": None, "alternatives": []
+            }
+        assert catalog.get("SKU-100000") is None
+        assert catalog.get("SKU-1234567890123") is None
+    
+    def test_snapshot_roundtrip_mmap(self, tmp_path):
+        original = Catalog.from_records(MOCK_INVENTORY)
+        
+        original.save_snapshot(str(tmp_path))
+        opened = Catalog.open_snapshot(str(tmp_path))
+        
+        assert isinstance(opened._keys, np.memmap)
+        for part_number, record in MOCK_INVENTORY.items():
+            assert opened.get(part_number) == record
+    
+    def test_snapshot_keeps_recent_versions(self, tmp_path):
+        catalog = Catalog.from_records(MOCK_INVENTORY)
+        
+        for _ in range(4):
+            latest = catalog.save_snapshot(str(tmp_path), keep=2)
+        
+        versions = [p for p in tmp_path.iterdir() if p.is_dir()]
+        assert len(versions) == 2
+        assert (tmp_path / "CURRENT").read_text() in latest
+    
+    def test_versions_sort_by_creation(self, tmp_path):
+        catalog = Catalog.from_records(MOCK_INVENTORY)
+        
+        created = [os.path.basename(catalog.save_snapshot(str(tmp_path), keep=0)) for _ in range(20)]
+        
+        assert created == sorted(created)
+    
+    def test_prune_never_removes_current(self, tmp_path):
+        catalog = Catalog.from_records(MOCK_INVENTORY)
+        oldest = min(os.path.basename(catalog.save_snapshot(str(tmp_path), keep=0)) for _ in range(2))
+        # Otro proceso publicó después la versión anterior en el orden
+        (tmp_path / "CURRENT").write_text(oldest)
+        
+        catalog_module._prune_snapshots(str(tmp_path), keep=1)
+        
+        assert (tmp_path / oldest).is_dir()
+        assert Catalog.open_snapshot(str(tmp_path)).get("ABC-45") == MOCK_INVENTORY["ABC-45"]
+
+
+class TestCatalogStore:
+    """Tests de la recarga copy-on-write"""
+    
+    def test_reload_swaps_whole_version(self, tmp_path):
+        path = tmp_path / "catalog.csv"
+        path.write_text(CSV)
+        store = CatalogStore(Catalog.from_records(MOCK_INVENTORY))
+        
+        before = store.current
+        store.reload(str(path))
+        
+        # Quien tomó la versión anterior la sigue viendo completa
+        assert before.get("DEF-200") is not None
+        assert store.current.get("DEF-200") is None
+        assert store.current.get("ABC-45")["stock"] == 600
+        assert store.version == 2
+    
+    def test_concurrent_readers_see_consistent_versions(self):
+        """Durante recargas, cada lectura ve una versión completa (v1 o v2)"""
+        size = 5_000
+        part_numbers = np.char.add("P-", np.arange(size).astype("U5"))
+        v1 = Catalog.from_arrays(part_numbers, np.full(size, 1), np.full(size, 1.0))
+        v2 = Catalog.from_arrays(part_numbers, np.full(size, 2), np.full(size, 2.0))
+        store = CatalogStore(v1)
+        errors = []
+        stop = threading.Event()
+        
+        def reader():
+            while not stop.is_set():
+                catalog = store.current
+                stocks = {catalog.get(f"P-{i}")["stock"] for i in range(0, size, 500)}
+                if len(stocks) != 1:
+                    errors.append(stocks)
+        
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for i in range(50):
+            store.swap(v2 if i % 2 == 0 else v1)
+        stop.set()
+        for t in threads:
+            t.join()
+        
+        assert errors == []
+    
+    def test_tools_use_configured_catalog(self, tmp_path, monkeypatch):
+        path = tmp_path / "catalog.csv"
+        path.write_text(CSV)
+        monkeypatch.setattr(catalog_module, "_store", CatalogStore(Catalog.from_records(MOCK_INVENTORY)))
+        
+        assert check_inventory_tool("DEF-200", 10).status == "available"
+        
+        catalog_module.reload_catalog(str(path))
+        
+        assert get_catalog().meta["source"] == str(path)
+        assert check_inventory_tool("DEF-200", 10).status == "unavailable"
+        assert check_inventory_tool("ABC-45", 550).status == "available"
+    
+    def test_reload_without_path(self, monkeypatch):
+        monkeypatch.setattr(catalog_module.config, "CATALOG_PATH", "")
+        
+        with pytest.raises(ValueError):
+            catalog_module.reload_catalog()
@@ -0,0 +1,150 @@
+"""
+Tests del cliente ERP y del ERP stand-in
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from integrations.erp_standin import FaultConfig, create_app
+from quoting_agent import erp_client, tools
+from quoting_agent.agent import arun_agent, run_agent
+from quoting_agent.erp_client import ERPClient, ERPError
+
+
+RECORD = {
+    "part_number": "ABC-45",
+    "stock": 500,
+    "unit_price": 25.50,
+    "lead_time_days": 0,
+    "alternatives": ["ABC-46"],
+}
+
+
+def make_handler(responses):
+    """Handler que devuelve las respuestas en orden y registra las llamadas"""
+    calls = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        status, body = responses[min(len(calls), len(responses)) - 1]
+        return httpx.Response(status, json=body)
+    
+    return handler, calls
+
+
+class TestERPClient:
+    """Tests del cliente HTTP con transporte simulado (sin red)"""
+    
+    def test_get_inventory_maps_record(self):
+        """Un 200 devuelve el registro crudo y envía la API key"""
+        handler, calls = make_handler([(200, RECORD)])
+        client = ERPClient(base_url="http://erp", api_key="k", transport=httpx.MockTransport(handler))
+        
+        assert client.get_inventory("ABC-45") == RECORD
+        assert calls[0].url.path == "/inventory/ABC-45"
+        assert calls[0].headers["Authorization"] == "Bearer k"
+    
+    def test_unknown_part_returns_none(self):
+        """Un 404 significa parte inexistente, no error"""
+        handler, calls = make_handler([(404, {"detail": "no"})])
+        client = ERPClient(base_url="http://erp", transport=httpx.MockTransport(handler))
+        
+        assert client.get_inventory("NOPE-1") is None
+        assert len(calls) == 1
+    
+    def test_retries_transient_errors(self):
+        """Los 503 se reintentan hasta obtener respuesta"""
+        handler, calls = make_handler([(503, {}), (503, {}), (200, RECORD)])
+        client = ERPClient(base_url="http://erp", max_retries=3, transport=httpx.MockTransport(handler))
+        
+        assert client.get_inventory("ABC-45") == RECORD
+        assert len(calls) == 3
+        assert client.stats()["retries"] == 2
+    
+    def test_client_errors_are_not_retried(self):
+        """Un 401 falla de inmediato con ERPError"""
+        handler, calls = make_handler([(401, {})])
+        client = ERPClient(base_url="http://erp", max_retries=3, transport=httpx.MockTransport(handler))
+        
+        with pytest.raises(ERPError):
+            client.get_inventory("ABC-45")
+        assert len(calls) == 1
+    
+    def test_async_get_inventory(self):
+        """La versión async usa el mismo mapeo y reintentos"""
+        handler, calls = make_handler([(500, {}), (200, RECORD)])
+        client = ERPClient(base_url="http://erp", async_transport=httpx.MockTransport(handler))
+        
+        assert asyncio.run(client.aget_inventory("ABC-45")) == RECORD
+        assert len(calls) == 2
+    
+    def test_check_inventory_tool_uses_erp(self, monkeypatch):
+        """Con ENABLE_MOCK_DATA=false la herramienta consulta el ERP"""
+        handler, _ = make_handler([(200, RECORD)])
+        monkeypatch.setattr(tools.config, "ENABLE_MOCK_DATA", False)
+        monkeypatch.setattr(tools.config, "INVENTORY_CACHE_ENABLED", False)
+        monkeypatch.setattr(tools.config, "INVENTORY_BATCH_ENABLED", False)
+        monkeypatch.setattr(
+            erp_client, "_erp_client",
+            ERPClient(base_url="http://erp", transport=httpx.MockTransport(handler))
+        )
+        
+        result = tools.check_inventory_tool("abc-45", 600)
+        assert result.status == "insufficient"
+        assert result.available_stock == 500
+        assert result.suggested_alternatives == ["ABC-46"]
+    
+    def test_agent_reports_erp_outage(self, monkeypatch):
+        """Si el ERP no responde, el turno termina con un aviso y no con una excepción"""
+        failing = httpx.MockTransport(lambda request: httpx.Response(503, json={}))
+        monkeypatch.setattr(tools.config, "ENABLE_MOCK_DATA", False)
+        monkeypatch.setattr(tools.config, "INVENTORY_CACHE_ENABLED", False)
+        monkeypatch.setattr(tools.config, "INVENTORY_BATCH_ENABLED", False)
+        monkeypatch.setattr(
+            erp_client, "_erp_client",
+            ERPClient(base_url="http://erp", max_retries=0, transport=failing, async_transport=failing)
+        )
+        
+        for result in (
+            run_agent("Necesito 100 unidades de ABC-45"),
+            asyncio.run(arun_agent("Necesito 100 unidades de ABC-45")),
+        ):
+            assert result["quote"] is None
+            assert result["needs_clarification"] is True
+            assert "ERP" in result["error_message"]
+            assert "no está disponible" in result["messages"][-1].content
+    
+    
+    def test_submit_orders_retries_with_same_keys(self):
+        """Un lote de órdenes se reenvía tal cual (mismas idempotency_key) tras un 503"""
+        results = {"order:Q-1": {"status": "accepted", "order_id": "ORD-000001"}}
+        handler, calls = make_handler([(503, {}), (200, {"results": results})])
+        client = ERPClient(base_url="http://erp", transport=httpx.MockTransport(handler))
+        
+        assert client.submit_orders([{"idempotency_key": "order:Q-1"}]) == results
+        assert calls[0].url.path == "/orders/batch"
+        assert calls[0].content == calls[1].content
+
+
+class TestERPStandin:
+    """Tests del ERP simulado"""
+    
+    def test_serves_mock_inventory(self):
+        """El stand-in expone MOCK_INVENTORY con el contrato del cliente"""
+        client = TestClient(create_app())
+        
+        response = client.get("/inventory/abc-45")
+        assert response.status_code == 200
+        assert response.json()["stock"] == 500
+        assert client.get("/inventory/NOPE-1").status_code == 404
+    
+    def test_error_injection(self):
+        """error_rate=1 hace fallar todas las solicitudes con 503"""
+        client = TestClient(create_app(FaultConfig(error_rate=1.0)))
+        assert client.get("/inventory/ABC-45").status_code == 503
+        
+        client.put("/_admin/faults", json={"error_rate": 0})
+        assert client.get("/inventory/ABC-45").status_code == 200
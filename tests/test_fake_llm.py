@@ -0,0 +1,71 @@
+"""
+Tests del LLM falso (LLM_PROVIDER=fake)
+"""
+
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from quoting_agent.agent import arun_agent, run_agent
+from quoting_agent.config import Config, config
+from quoting_agent.fake_llm import FakeQuotingLLM, fake_response
+from quoting_agent.nodes import DELTA_SYSTEM_PROMPT, PARSE_SYSTEM_PROMPT
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    """Agente con el LLM falso y sin fast path (todo pasa por el LLM)"""
+    monkeypatch.setattr(Config, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(config, "FAST_PARSE_ENABLED", False)
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+
+
+class TestFakeResponse:
+    """Tests de las respuestas deterministas"""
+    
+    def test_parse_prompt(self):
+        messages = [SystemMessage(content=PARSE_SYSTEM_PROMPT), HumanMessage(content="¿me cotizas abc-45? unas 40 piezas")]
+        
+        assert json.loads(fake_response(messages)) == {"part_number": "ABC-45", "quantity": 40}
+    
+    def test_multi_line_prompt(self):
+        messages = [HumanMessage(content="ABC-45: 100, XYZ-100: 1.000")]
+        
+        assert json.loads(fake_response(messages))["line_items"][1] == {"part_number": "XYZ-100", "quantity": 1000}
+    
+    def test_delta_prompt(self):
+        current = 'Solicitud en curso: {"line_items": [{"part_number": "ABC-45", "quantity": 100}]}\\n'
+        
+        def delta(text):
+            return fake_response([SystemMessage(content=DELTA_SYSTEM_PROMPT), HumanMessage(content=current + f"Mensaje del cliente: {text}")])
+        
+        assert json.loads(delta("mejor 60")) == {"line_items": [{"part_number": "ABC-45", "quantity": 60}]}
+        assert delta("gracias") == "{}"
+    
+    def test_unparseable_message_is_not_json(self):
+        with pytest.raises(json.JSONDecodeError):
+            json.loads(fake_response([HumanMessage(content="hola")]))
+    
+    def test_latency_and_usage(self):
+        llm = FakeQuotingLLM(latency_ms=5, jitter_ms=5)
+        messages = [HumanMessage(content="40 de ABC-45")]
+        
+        assert llm._delay(messages) == llm._delay(messages)
+        assert 0.005 <= llm._delay(messages) <= 0.010
+        assert llm.invoke(messages).usage_metadata["output_tokens"] > 0
+
+
+class TestFakeProvider:
+    """Tests del agente completo con LLM_PROVIDER=fake"""
+    
+    def test_run_agent_offline(self, fake_provider):
+        result = run_agent("hola, ¿me cotizas ABC-45? serían unas 40 piezas")
+        
+        assert result["quote"].quantity == 40
+    
+    def test_arun_agent_offline(self, fake_provider):
+        result = asyncio.run(arun_agent("para la planta norte: XYZ-100, 15 pzas"))
+        
+        assert result["quote"].part_number == "XYZ-100"
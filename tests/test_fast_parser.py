@@ -0,0 +1,144 @@
+"""
+Tests del parser determinista (fast path)
+"""
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from quoting_agent.models import QuoteRequest
+
+from quoting_agent.fast_parser import (
+    extract_delta,
+    extract_quote_fields,
+    fast_parse,
+    get_fast_parse_stats,
+    reset_fast_parse_stats,
+)
+
+
+class TestFastParser:
+    """Tests de extracción sin LLM (no requieren API key)"""
+    
+    @pytest.mark.parametrize("text,expected", [
+        ("Necesito 100 unidades de ABC-45", {"part_number": "ABC-45", "quantity": 100}),
+        ("Quiero cotizar 50 piezas XYZ-100", {"part_number": "XYZ-100", "quantity": 50}),
+        ("Me interesan 25 del producto DEF-200", {"part_number": "DEF-200", "quantity": 25}),
+        ("Necesito 1.000 unidades de abc-45", {"part_number": "ABC-45", "quantity": 1000}),
+        ("treinta y cinco pzas de GHI-300", {"part_number": "GHI-300", "quantity": 35}),
+        ("I need one hundred twenty five units of XYZ-100", {"part_number": "XYZ-100", "quantity": 125}),
+        ("una docena de ABC-45", {"part_number": "ABC-45", "quantity": 12}),
+        ("100 ABC-45", {"part_number": "ABC-45", "quantity": 100}),
+        ("Cotízame ABC-45 x 100", {"part_number": "ABC-45", "quantity": 100}),
+    ])
+    def test_extracts_well_formed_requests(self, text, expected):
+        """Mensajes inequívocos se resuelven sin LLM"""
+        assert extract_quote_fields(text) == expected
+    
+    @pytest.mark.parametrize("text", [
+        "Cotízame ABC-45",
+        "100 de ABC-45 y 20 de XYZ-100",
+        "ABC-45 a $25.50, 100 unidades",
+        "Necesito 2 cajas de 50 unidades de ABC-45",
+        "Necesito 2.5 unidades de ABC-45",
+    ])
+    def test_ambiguous_requests_fall_back(self, text):
+        """Mensajes ambiguos se derivan al LLM"""
+        assert extract_quote_fields(text) is None
+    
+    @pytest.mark.parametrize("text", [
+        "Necesito ABC-45 con entrega en 3 dias",
+        "Necesito ABC-45 para el 15 de marzo",
+        "Necesito 100 unidades de ABC-45 modelo 2024",
+        "soy el cliente 4521, necesito ABC-45",
+        "no necesito 100 unidades de ABC-45",
+        "Necesito ABC-45, somos 3 en la planta",
+    ])
+    def test_numbers_that_are_not_quantities_fall_back(self, text):
+        """Plazos, fechas, identificadores, negaciones o números sueltos van al LLM"""
+        assert extract_quote_fields(text) is None
+    
+    def test_stats_count_hits_and_misses(self):
+        """Los contadores reflejan las llamadas LLM ahorradas"""
+        reset_fast_parse_stats()
+        fast_parse("Necesito 100 unidades de ABC-45")
+        fast_parse("Hola, ¿qué productos tienen?")
+        
+        stats = get_fast_parse_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["llm_calls_saved"] == 1
+        assert stats["hit_rate"] == 0.5
+    
+    def test_parse_node_skips_llm(self, monkeypatch):
+        """parse_request_node no crea el LLM cuando el fast path resuelve"""
+        from quoting_agent import nodes
+        
+        def fail():
+            raise AssertionError("No debe usarse el LLM")
+        
+        monkeypatch.setattr(nodes, "get_llm", fail)
+        update = nodes.parse_request_node({
+            "messages": [HumanMessage(content="Necesito 100 unidades de ABC-45")]
+        })
+        
+        assert update["quote_request"].part_number == "ABC-45"
+        assert update["quote_request"].quantity == 100
+        assert update["needs_clarification"] is False
+
+
+class TestDeltaParser:
+    """Tests de cambios sobre una solicitud en curso"""
+    
+    SINGLE = QuoteRequest(part_number="ABC-45", quantity=100)
+    MULTI = QuoteRequest(line_items=[
+        {"part_number": "ABC-45", "quantity": 100},
+        {"part_number": "XYZ-100", "quantity": 20},
+    ])
+    
+    @pytest.mark.parametrize("text,expected", [
+        ("make it 80 units", [("ABC-45", 80)]),
+        ("mejor ochenta", [("ABC-45", 80)]),
+        ("ok, que sean 80", [("ABC-45", 80)]),
+        ("use ABC-46 instead", [("ABC-46", 100)]),
+        ("usa ABC-46 en vez de ABC-45", [("ABC-46", 100)]),
+        ("Necesito 50 unidades de DEF-200", [("DEF-200", 50)]),
+    ])
+    def test_single_line_changes(self, text, expected):
+        updated = extract_delta(text, self.SINGLE)
+        assert [(item.part_number, item.quantity) for item in updated.line_items] == expected
+    
+    def test_changes_one_line_of_many(self):
+        updated = extract_delta("XYZ-100: que sean 35", self.MULTI)
+        assert [(item.part_number, item.quantity) for item in updated.line_items] == [
+            ("ABC-45", 100), ("XYZ-100", 35)
+        ]
+    
+    @pytest.mark.parametrize("text", [
+        "agrega 20 de XYZ-100",
+        "también 20 de XYZ-100",
+        "add 20 units of XYZ-100",
+    ])
+    def test_added_part_keeps_current_lines(self, text):
+        updated = extract_delta(text, self.SINGLE)
+        assert [(item.part_number, item.quantity) for item in updated.line_items] == [
+            ("ABC-45", 100), ("XYZ-100", 20)
+        ]
+    
+    def test_available_quantity(self):
+        updated = extract_delta("ok, cotiza las disponibles", self.SINGLE, available_stock=75)
+        assert updated.quantity == 75
+    
+    @pytest.mark.parametrize("text,request_", [
+        ("gracias", SINGLE),
+        ("opción 1", SINGLE),
+        ("que sean 80", MULTI),
+        ("80 o 90 unidades, y 2 cajas", SINGLE),
+        ("ABC-46 y XYZ-200", SINGLE),
+        ("quiero saber cuanto tarda la entrega en 3 dias", SINGLE),
+        ("somos 3 en compras, ¿se puede?", SINGLE),
+        ("no, 80 unidades no", SINGLE),
+        ("agrega 20 de ABC-45", SINGLE),
+        ("también XYZ-100", SINGLE),
+    ])
+    def test_unclear_changes_fall_back(self, text, request_):
+        assert extract_delta(text, request_) is None
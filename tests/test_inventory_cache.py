@@ -0,0 +1,254 @@
+"""
+Tests de la caché read-through de inventario
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from quoting_agent import inventory_cache, tools
+from quoting_agent.inventory_cache import InventoryCache
+
+
+RECORD = {"stock": 500, "unit_price": 25.50, "lead_time_days": 0, "alternatives": []}
+
+
+class CountingLoader:
+    """Fuente falsa que cuenta llamadas y puede demorar"""
+    
+    def __init__(self, delay: float = 0.0, record=RECORD):
+        self.calls = 0
+        self.delay = delay
+        self.record = record
+    
+    def __call__(self, part_number):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.record
+    
+    async def aload(self, part_number):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.record
+
+
+class TestInventoryCache:
+    """Tests de TTL, invalidación y single-flight (no requieren API key)"""
+    
+    def test_hit_within_ttl(self):
+        """Dentro del TTL no se vuelve a consultar la fuente"""
+        cache = InventoryCache(ttl_seconds=60)
+        loader = CountingLoader()
+        
+        assert cache.get_or_load("ABC-45", loader) == RECORD
+        assert cache.get_or_load("ABC-45", loader) == RECORD
+        assert loader.calls == 1
+        assert cache.stats()["hits"] == 1
+    
+    def test_per_sku_ttl_override(self):
+        """Una parte con TTL 0 siempre se recarga"""
+        cache = InventoryCache(ttl_seconds=60, ttl_overrides={"ABC-45": 0})
+        loader = CountingLoader()
+        
+        cache.get_or_load("ABC-45", loader)
+        cache.get_or_load("ABC-45", loader)
+        cache.get_or_load("XYZ-100", loader)
+        cache.get_or_load("XYZ-100", loader)
+        assert loader.calls == 3
+    
+    def test_invalidate(self):
+        """invalidate fuerza la recarga de la parte"""
+        cache = InventoryCache(ttl_seconds=60)
+        loader = CountingLoader()
+        
+        cache.get_or_load("ABC-45", loader)
+        cache.invalidate("ABC-45")
+        cache.get_or_load("ABC-45", loader)
+        assert loader.calls == 2
+    
+    def test_invalidate_during_load_is_not_cached(self):
+        """Un registro cargado antes de invalidar no queda en caché"""
+        cache = InventoryCache(ttl_seconds=60)
+        
+        def loader(part_number):
+            cache.invalidate()
+            return RECORD
+        
+        cache.get_or_load("ABC-45", loader)
+        assert cache.stats()["size"] == 0
+    
+    def test_stampede_protection_threads(self):
+        """Un miss concurrente dispara una sola carga"""
+        cache = InventoryCache(ttl_seconds=60)
+        loader = CountingLoader(delay=0.1)
+        results = []
+        
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_load("ABC-45", loader)))
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert loader.calls == 1
+        assert results == [RECORD] * 20
+    
+    def test_stampede_protection_async(self):
+        """Las corrutinas que esperan la misma parte comparten la carga"""
+        cache = InventoryCache(ttl_seconds=60)
+        loader = CountingLoader(delay=0.05)
+        
+        async def run():
+            return await asyncio.gather(*[
+                cache.aget_or_load("ABC-45", loader.aload) for _ in range(50)
+            ])
+        
+        assert asyncio.run(run()) == [RECORD] * 50
+        assert loader.calls == 1
+        assert cache.stats()["coalesced"] == 49
+    
+    def test_loader_error_is_not_cached(self):
+        """Un error de la fuente se propaga y no se cachea"""
+        cache = InventoryCache(ttl_seconds=60)
+        
+        def failing(part_number):
+            raise RuntimeError("ERP caído")
+        
+        with pytest.raises(RuntimeError):
+            cache.get_or_load("ABC-45", failing)
+        assert cache.get_or_load("ABC-45", CountingLoader()) == RECORD
+    
+    def test_tool_computes_status_per_quantity(self, monkeypatch):
+        """El registro se cachea una vez; el status depende de cada cantidad"""
+        loader = CountingLoader()
+        
+        class FakeERP:
+            get_inventory = loader
+        
+        monkeypatch.setattr(tools.config, "ENABLE_MOCK_DATA", False)
+        monkeypatch.setattr(tools.config, "INVENTORY_BATCH_ENABLED", False)
+        monkeypatch.setattr(tools, "get_erp_client", lambda: FakeERP())
+        monkeypatch.setattr(inventory_cache, "_cache", InventoryCache(ttl_seconds=60))
+        
+        assert tools.check_inventory_tool("ABC-45", 100).status == "available"
+        assert tools.check_inventory_tool("ABC-45", 1000).status == "insufficient"
+        assert loader.calls == 1
+
+
+class BulkLoader:
+    """Fuente bulk falsa que cuenta llamadas y partes pedidas"""
+    
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.requested = []
+        self.delay = delay
+    
+    def __call__(self, part_numbers):
+        self.calls += 1
+        self.requested.append(sorted(part_numbers))
+        time.sleep(self.delay)
+        return {part_number: RECORD for part_number in part_numbers}
+    
+    async def aload(self, part_numbers):
+        self.calls += 1
+        self.requested.append(sorted(part_numbers))
+        await asyncio.sleep(self.delay)
+        return {part_number: RECORD for part_number in part_numbers}
+
+
+class TestInventoryCacheMany:
+    """Tests de la consulta de varias partes"""
+    
+    PARTS = ["ABC-45", "XYZ-100", "DEF-200"]
+    
+    def test_concurrent_bulk_misses_load_once(self):
+        """Hilos que piden las mismas partes comparten una sola llamada bulk"""
+        cache = InventoryCache(ttl_seconds=60)
+        loader = BulkLoader(delay=0.1)
+        results = []
+        
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_many_or_load(self.PARTS, loader)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert loader.calls == 1
+        assert all(result == dict.fromkeys(self.PARTS, RECORD) for result in results)
+    
+    def test_overlapping_requests_only_load_new_parts(self):
+        """Una parte que ya carga get_or_load no se vuelve a pedir en bulk"""
+        cache = InventoryCache(ttl_seconds=60)
+        single = CountingLoader(delay=0.1)
+        loader = BulkLoader()
+        
+        thread = threading.Thread(target=cache.get_or_load, args=("ABC-45", single))
+        thread.start()
+        time.sleep(0.02)
+        records = cache.get_many_or_load(self.PARTS, loader)
+        thread.join()
+        
+        assert loader.requested == [["DEF-200", "XYZ-100"]]
+        assert records["ABC-45"] == RECORD
+        assert single.calls == 1
+    
+    def test_concurrent_bulk_misses_async(self):
+        """Las corrutinas que piden las mismas partes comparten la carga"""
+        cache = InventoryCache(ttl_seconds=60)
+        loader = BulkLoader(delay=0.05)
+        
+        async def run():
+            return await asyncio.gather(*[
+                cache.aget_many_or_load(self.PARTS, loader.aload) for _ in range(20)
+            ])
+        
+        assert all(result == dict.fromkeys(self.PARTS, RECORD) for result in asyncio.run(run()))
+        assert loader.calls == 1
+    
+    def test_bulk_error_reaches_waiters(self):
+        """Los que esperaban una carga fallida reciben el mismo error"""
+        cache = InventoryCache(ttl_seconds=60)
+        
+        def failing(part_numbers):
+            time.sleep(0.1)
+            raise RuntimeError("ERP caído")
+        
+        errors = []
+        
+        def run():
+            try:
+                cache.get_many_or_load(self.PARTS, failing)
+            except RuntimeError as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(errors) == 3
+        assert cache.get_many_or_load(self.PARTS, BulkLoader()) == dict.fromkeys(self.PARTS, RECORD)
+    
+    def test_invalidations_are_forgotten_when_idle(self):
+        """Las invalidaciones por parte no crecen sin límite"""
+        cache = InventoryCache(ttl_seconds=60)
+        
+        def loader(part_numbers):
+            cache.invalidate("ABC-45")
+            return {part_number: RECORD for part_number in part_numbers}
+        
+        cache.get_many_or_load(self.PARTS, loader)
+        for i in range(1000):
+            cache.invalidate(f"P-{i}")
+        
+        # La parte invalidada durante la carga no quedó en caché
+        assert cache.stats()["size"] == 2
+        assert cache._invalidated == {}
@@ -0,0 +1,207 @@
+"""
+Tests de la agrupación de consultas de inventario en llamadas bulk
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from integrations.erp_standin import create_app
+from quoting_agent import inventory_cache, inventory_loader, tools
+from quoting_agent.erp_client import ERPClient, ERPError
+from quoting_agent.inventory_cache import InventoryCache
+from quoting_agent.inventory_loader import InventoryBatchLoader
+
+
+RECORD = {"stock": 500, "unit_price": 25.50, "lead_time_days": 0, "alternatives": []}
+
+
+class BulkSource:
+    """Fuente bulk falsa que registra cada lote recibido"""
+    
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.batches = []
+        self.delay = delay
+        self.error = error
+    
+    def __call__(self, part_numbers):
+        self.batches.append(list(part_numbers))
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {pn: (None if pn.startswith("NONE") else dict(RECORD, part_number=pn)) for pn in part_numbers}
+    
+    async def aload(self, part_numbers):
+        self.batches.append(list(part_numbers))
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {pn: (None if pn.startswith("NONE") else dict(RECORD, part_number=pn)) for pn in part_numbers}
+
+
+def load_in_threads(loader, part_numbers):
+    """Lanza una consulta por hilo, todas a la vez, y retorna los resultados en orden"""
+    results = [None] * len(part_numbers)
+    barrier = threading.Barrier(len(part_numbers))
+    
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = loader.load(part_numbers[i])
+        except Exception as e:
+            results[i] = e
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(part_numbers))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestInventoryBatchLoader:
+    """Tests del loader con fuentes falsas (no requieren API key)"""
+    
+    def test_concurrent_threads_share_one_batch(self):
+        """Consultas concurrentes de partes distintas → una sola llamada bulk"""
+        source = BulkSource()
+        # Ventana amplia: los 20 hilos deben alcanzar a entrar aunque la máquina esté cargada
+        loader = InventoryBatchLoader(source, window_seconds=0.25)
+        parts = [f"ABC-{i}" for i in range(20)]
+        
+        results = load_in_threads(loader, parts)
+        
+        assert len(source.batches) == 1
+        assert sorted(source.batches[0]) == sorted(parts)
+        assert [r["part_number"] for r in results] == parts
+        assert loader.stats()["requests_saved"] == 19
+    
+    def test_repeated_parts_are_sent_once(self):
+        """Una parte pedida varias veces en el lote viaja una sola vez"""
+        source = BulkSource()
+        loader = InventoryBatchLoader(source, window_seconds=0.05)
+        
+        results = load_in_threads(loader, ["ABC-45"] * 5 + ["NONEXISTENT-1"] * 3)
+        
+        assert len(source.batches) == 1
+        assert sorted(source.batches[0]) == ["ABC-45", "NONEXISTENT-1"]
+        assert all(r["stock"] == 500 for r in results[:5])
+        assert results[5:] == [None, None, None]
+    
+    def test_error_reaches_every_caller(self):
+        """Si la llamada bulk falla, todos los llamadores del lote reciben el error"""
+        source = BulkSource(error=ERPError("ERP caído"))
+        loader = InventoryBatchLoader(source, window_seconds=0.05)
+        
+        results = load_in_threads(loader, ["ABC-45", "XYZ-100", "DEF-200"])
+        
+        assert len(source.batches) == 1
+        assert all(isinstance(r, ERPError) for r in results)
+    
+    def test_full_batch_flushes_before_window(self):
+        """Al llegar a max_batch_size el lote sale sin esperar la ventana"""
+        source = BulkSource()
+        loader = InventoryBatchLoader(source, window_seconds=10, max_batch_size=4)
+        
+        start = time.perf_counter()
+        results = load_in_threads(loader, [f"ABC-{i}" for i in range(4)])
+        
+        assert time.perf_counter() - start < 1
+        assert len(source.batches) == 1
+        assert all(r is not None for r in results)
+    
+    def test_async_gather_shares_one_batch(self):
+        """Corrutinas concurrentes en el mismo loop → una sola llamada bulk"""
+        source = BulkSource(delay=0.01)
+        loader = InventoryBatchLoader(source, abatch_fn=source.aload, window_seconds=0.02)
+        parts = [f"ABC-{i}" for i in range(50)] + ["ABC-0", "NONEXISTENT-1"]
+        
+        async def run():
+            return await asyncio.gather(*[loader.aload(pn) for pn in parts])
+        
+        results = asyncio.run(run())
+        
+        assert len(source.batches) == 1
+        assert len(source.batches[0]) == 51
+        assert results[0] == results[50]
+        assert results[-1] is None
+    
+    def test_async_error_reaches_every_caller(self):
+        source = BulkSource(error=ERPError("ERP caído"))
+        loader = InventoryBatchLoader(source, abatch_fn=source.aload, window_seconds=0.01)
+        
+        async def run():
+            return await asyncio.gather(
+                loader.aload("ABC-45"), loader.aload("XYZ-100"), return_exceptions=True
+            )
+        
+        results = asyncio.run(run())
+        
+        assert all(isinstance(r, ERPError) for r in results)
+    
+    def test_cache_misses_are_batched(self, monkeypatch):
+        """Detrás de la caché: los misses concurrentes salen en un solo lote"""
+        source = BulkSource()
+        monkeypatch.setattr(tools.config, "ENABLE_MOCK_DATA", False)
+        monkeypatch.setattr(tools.config, "INVENTORY_CACHE_ENABLED", True)
+        monkeypatch.setattr(tools.config, "INVENTORY_BATCH_ENABLED", True)
+        monkeypatch.setattr(inventory_cache, "_cache", InventoryCache(ttl_seconds=60))
+        monkeypatch.setattr(
+            inventory_loader, "_loader",
+            InventoryBatchLoader(source, abatch_fn=source.aload, window_seconds=0.02)
+        )
+        parts = ["ABC-45", "XYZ-100", "DEF-200", "ABC-45"]
+        
+        async def run():
+            return await asyncio.gather(*[tools.acheck_inventory_tool(pn, 10) for pn in parts])
+        
+        results = asyncio.run(run())
+        
+        assert len(source.batches) == 1
+        assert sorted(source.batches[0]) == ["ABC-45", "DEF-200", "XYZ-100"]
+        assert all(r.status == "available" for r in results)
+
+
+class TestBulkEndpoint:
+    """Tests del endpoint bulk del stand-in y del cliente"""
+    
+    def test_standin_bulk(self):
+        client = TestClient(create_app())
+        
+        response = client.post("/inventory/bulk", json={"part_numbers": ["abc-45", "NONEXISTENT-1"]})
+        
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert items["ABC-45"]["stock"] == 500
+        assert items["NONEXISTENT-1"] is None
+    
+    def test_client_get_inventory_many(self):
+        calls = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(503, json={})
+            return httpx.Response(200, json={"items": {"ABC-45": RECORD, "NONEXISTENT-1": None}})
+        
+        client = ERPClient(base_url="http://erp", transport=httpx.MockTransport(handler))
+        
+        records = client.get_inventory_many(["ABC-45", "NONEXISTENT-1"])
+        
+        assert records == {"ABC-45": RECORD, "NONEXISTENT-1": None}
+        assert len(calls) == 2
+        assert calls[-1].url.path == "/inventory/bulk"
+    
+    def test_client_bulk_exhausts_retries(self):
+        client = ERPClient(
+            base_url="http://erp",
+            max_retries=1,
+            transport=httpx.MockTransport(lambda request: httpx.Response(503, json={}))
+        )
+        
+        with pytest.raises(ERPError):
+            client.get_inventory_many(["ABC-45"])
@@ -0,0 +1,68 @@
+"""
+Tests de la reparación local del JSON del LLM
+"""
+
+import json
+
+import pytest
+
+from quoting_agent.json_repair import loads_lenient, repair_json
+
+EXPECTED = {"part_number": "ABC-45", "quantity": 100}
+
+
+class TestRepairJson:
+    """Tests de los defectos típicos de una respuesta pedida por prompt"""
+    
+    @pytest.mark.parametrize("content", [
+        'Claro, aquí está:\n```json\n{"part_number": "ABC-45", "quantity": 100}\n```\n¡Saludos!',
+        'La solicitud es {"part_number": "ABC-45", "quantity": 100}. ¿Algo más?',
+        '{"part_number": "ABC-45", "quantity": 100,}',
+        "{'part_number': 'ABC-45', 'quantity': 100}",
+        '{part_number: "ABC-45", quantity: 100} // listo',
+        '{"part_number": "ABC-45", /* parte */ "quantity": 100}',
+    ])
+    def test_common_defects(self, content):
+        assert loads_lenient(content) == EXPECTED
+    
+    def test_python_literals_and_inner_quotes(self):
+        data = loads_lenient("{'notes': 'dice \"urgente\"', 'urgent': True, 'customer_id': None}")
+        
+        assert data == {"notes": 'dice "urgente"', "urgent": True, "customer_id": None}
+    
+    def test_truncated_between_members_is_closed(self):
+        content = '{"part_number": "ABC-45", "quantity": 100, "urgent": true,'
+        
+        assert loads_lenient(content) == {**EXPECTED, "urgent": True}
+    
+    @pytest.mark.parametrize("content", [
+        '{"line_items": [{"part_number": "ABC-45", "quantity": 100},',
+        '{"line_items": [{"part_number": "ABC-45", "quantity": 100}, {"part_number": "XYZ-100", "quantity": 20}',
+    ])
+    def test_unterminated_list_is_not_closed(self, content):
+        # Pueden faltar líneas: cotizar solo las que llegaron sería otra solicitud
+        with pytest.raises(json.JSONDecodeError):
+            loads_lenient(content)
+    
+    @pytest.mark.parametrize("content", [
+        '{"part_number": "ABC-45", "quantity": 10',
+        '{"part_number": "ABC-45", "quantity": 100, "notes": "entrega en',
+    ])
+    def test_truncated_value_is_not_guessed(self, content):
+        # "quantity": 10 podía ser 100: mejor reintentar que cotizar otra cantidad
+        with pytest.raises(json.JSONDecodeError):
+            loads_lenient(content)
+    
+    def test_strings_are_not_touched(self):
+        content = '{"notes": "ver http://ejemplo.com, True", "part_number": "ABC-45", "quantity": 100,}'
+        
+        assert loads_lenient(content)["notes"] == "ver http://ejemplo.com, True"
+    
+    def test_prose_stays_invalid_with_original_error(self):
+        with pytest.raises(json.JSONDecodeError) as error:
+            loads_lenient("No encontré número de parte.")
+        
+        assert error.value.doc == "No encontré número de parte."
+    
+    def test_valid_json_is_unchanged(self):
+        assert repair_json('{"a": [1, 2]}') == '{"a": [1, 2]}'
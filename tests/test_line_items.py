@@ -0,0 +1,157 @@
+"""
+Tests de cotizaciones con varias líneas
+"""
+
+import numpy as np
+import pytest
+
+from quoting_agent import tools
+from quoting_agent.agent import run_agent
+from quoting_agent.fast_parser import extract_quote_lines, fast_parse
+from quoting_agent.models import QuoteRequest, QuoteLineItem
+from quoting_agent.pricing import PricingEngine
+from quoting_agent.tools import check_inventory_lines_tool, generate_quote_tool
+
+
+RFQ = """Hola, necesito cotizar:
+100 unidades de ABC-45
+20 pzas XYZ-100
+10 unidades DEF-200"""
+
+
+class TestLineItemModels:
+    """Tests de QuoteRequest con line_items (no requieren API key)"""
+    
+    def test_single_part_request_has_one_line(self):
+        request = QuoteRequest(part_number="abc-45", quantity=100)
+        
+        assert request.line_items == [QuoteLineItem(part_number="ABC-45", quantity=100)]
+        assert not request.is_multi_line
+    
+    def test_request_from_line_items_only(self):
+        request = QuoteRequest(line_items=[
+            {"part_number": "abc-45", "quantity": 100},
+            {"part_number": "XYZ-100", "quantity": 20},
+        ])
+        
+        assert request.part_number == "ABC-45"
+        assert request.quantity == 100
+        assert request.is_multi_line
+    
+    def test_repeated_parts_are_merged(self):
+        request = QuoteRequest(line_items=[
+            {"part_number": "ABC-45", "quantity": 100},
+            {"part_number": "XYZ-100", "quantity": 20},
+            {"part_number": "abc-45", "quantity": 5},
+        ])
+        
+        assert [(i.part_number, i.quantity) for i in request.line_items] == [("ABC-45", 105), ("XYZ-100", 20)]
+    
+    def test_invalid_line_quantity(self):
+        with pytest.raises(ValueError):
+            QuoteRequest(line_items=[{"part_number": "ABC-45", "quantity": 0}])
+
+
+class TestLinePricing:
+    """Tests del cálculo exacto de montos"""
+    
+    def test_engine_rounds_each_line_to_cents(self):
+        priced = PricingEngine().price([("A-1", 3, 0.10), ("A-2", 7, 0.20)])
+        
+        assert [float(line.subtotal) for line in priced.lines] == [0.30, 1.40]
+        assert float(priced.subtotal) == 1.70
+        assert float(priced.tax) == 0.32
+        assert float(priced.total) == 2.02
+    
+    def test_large_rfq_matches_line_by_line(self):
+        """500 líneas: el total coincide con la suma exacta en centavos"""
+        rng = np.random.default_rng(7)
+        quantities = rng.integers(1, 5000, size=500).tolist()
+        prices = np.round(rng.uniform(0.01, 999.99, size=500), 2).tolist()
+        
+        priced = PricingEngine().price((f"P-{i}", q, p) for i, (q, p) in enumerate(zip(quantities, prices)))
+        
+        expected_cents = sum(q * round(p * 100) for q, p in zip(quantities, prices))
+        assert float(priced.subtotal) == expected_cents / 100
+        assert float(priced.total) == pytest.approx(float(priced.subtotal) * 1.19, abs=0.01)
+    
+    def test_generate_multi_line_quote(self):
+        request = QuoteRequest(line_items=[
+            {"part_number": "ABC-45", "quantity": 100},
+            {"part_number": "XYZ-100", "quantity": 20},
+        ])
+        inventory = check_inventory_lines_tool(request.line_items)
+        
+        quote = generate_quote_tool(request, inventory)
+        
+        assert [line.subtotal for line in quote.line_items] == [2550.00, 900.00]
+        assert quote.subtotal == 3450.00
+        assert quote.tax == 655.50
+        assert quote.total == 4105.50
+        
+        formatted = quote.format_for_display()
+        assert "2 líneas" in formatted
+        assert "XYZ-100" in formatted
+        assert "4,105.50" in formatted
+
+
+class TestMultiLineInventory:
+    """Tests de consulta de inventario por líneas"""
+    
+    def test_combined_status(self):
+        request = QuoteRequest(line_items=[
+            {"part_number": "ABC-45", "quantity": 100},
+            {"part_number": "DEF-200", "quantity": 1000},
+            {"part_number": "NONEXISTENT-1", "quantity": 1},
+        ])
+        
+        inventory = check_inventory_lines_tool(request.line_items)
+        
+        assert inventory.status == "insufficient"
+        assert [r.status for r in inventory.line_results] == ["available", "insufficient", "unavailable"]
+    
+    def test_all_lines_in_one_bulk_call(self, monkeypatch):
+        """Con el ERP real, todas las líneas salen en una sola llamada bulk"""
+        calls = []
+        
+        def fake_many(part_numbers):
+            calls.append(list(part_numbers))
+            return {pn: tools.MOCK_INVENTORY.get(pn) for pn in part_numbers}
+        
+        monkeypatch.setattr(tools.config, "ENABLE_MOCK_DATA", False)
+        monkeypatch.setattr(tools.config, "INVENTORY_CACHE_ENABLED", False)
+        monkeypatch.setattr(tools, "check_inventory_many", fake_many)
+        items = [QuoteLineItem(part_number=pn, quantity=1) for pn in ["ABC-45", "XYZ-100", "DEF-200"]]
+        
+        inventory = check_inventory_lines_tool(items)
+        
+        assert calls == [["ABC-45", "XYZ-100", "DEF-200"]]
+        assert inventory.status == "available"
+
+
+class TestMultiLineAgent:
+    """El grafo completo con un RFQ de varias líneas (fast path, sin LLM)"""
+    
+    def test_extract_quote_lines(self):
+        assert extract_quote_lines(RFQ) == [
+            {"part_number": "ABC-45", "quantity": 100},
+            {"part_number": "XYZ-100", "quantity": 20},
+            {"part_number": "DEF-200", "quantity": 10},
+        ]
+        assert extract_quote_lines("100 unidades de ABC-45\n2 cajas de XYZ-100") is None
+        assert fast_parse(RFQ).is_multi_line
+    
+    def test_agent_quotes_all_lines(self):
+        result = run_agent(RFQ)
+        
+        quote = result["quote"]
+        assert quote is not None
+        assert len(quote.line_items) == 3
+        assert quote.subtotal == 2550.00 + 900.00 + 1200.00
+    
+    def test_agent_reports_problem_lines(self):
+        result = run_agent("100 unidades de ABC-45\n1000 unidades de DEF-200")
+        
+        assert result["quote"] is None
+        assert "DEF-200" in result["messages"][-1].content
+        assert "1 de 2" in result["messages"][-1].content
@@ -0,0 +1,152 @@
+"""
+Tests de la caché de respuestas del LLM
+"""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from quoting_agent import llm_cache
+from quoting_agent.llm_cache import LLMResponseCache
+from quoting_agent.llm_failover import ProviderChain
+from quoting_agent.model_router import ModelRouter
+
+
+LLM_CONFIG = {"provider": "gemini", "model": "gemini-1.5-flash", "temperature": 0, "api_key": "x"}
+
+
+VALID = '{"part_number": "ABC-45", "quantity": 100}'
+
+
+class CountingLLM:
+    """LLM falso que cuenta invocaciones (falla las primeras `failures`)"""
+    
+    def __init__(self, content=VALID, failures=0):
+        self.content = content
+        self.failures = failures
+        self.calls = 0
+    
+    def invoke(self, messages):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("proveedor caído")
+        return AIMessage(content=self.content)
+
+
+def validate(content):
+    if content != VALID:
+        raise ValueError("respuesta inválida")
+
+
+class TestLLMResponseCache:
+    """Tests de los niveles memoria/SQLite (no requieren API key)"""
+    
+    def test_key_normalizes_whitespace(self):
+        """El historial se normaliza antes de calcular la clave"""
+        a = LLMResponseCache.make_key([HumanMessage(content="100  unidades de ABC-45 ")], LLM_CONFIG)
+        b = LLMResponseCache.make_key([HumanMessage(content="100 unidades de ABC-45")], LLM_CONFIG)
+        c = LLMResponseCache.make_key(
+            [HumanMessage(content="100 unidades de ABC-45")], {**LLM_CONFIG, "model": "gemini-1.5-pro"}
+        )
+        assert a == b
+        assert a != c
+    
+    def test_memory_lru_eviction(self):
+        """El nivel en memoria descarta la entrada menos usada"""
+        cache = LLMResponseCache(memory_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.stats()["evictions"] == 1
+    
+    def test_disk_tier_shared_between_instances(self, tmp_path):
+        """Otro proceso (otra instancia) lee lo escrito en SQLite"""
+        path = str(tmp_path / "cache.sqlite3")
+        LLMResponseCache(path=path).set("k", "valor")
+        
+        other = LLMResponseCache(path=path)
+        assert other.get("k") == "valor"
+        assert other.stats()["disk_hits"] == 1
+        assert other.get("k") == "valor"
+        assert other.stats()["memory_hits"] == 1
+    
+    def test_ttl_expiration(self, tmp_path):
+        """Las entradas expiradas no se sirven"""
+        cache = LLMResponseCache(path=str(tmp_path / "cache.sqlite3"), ttl_seconds=0)
+        cache.set("k", "valor")
+        assert cache.get("k") is None
+    
+    def test_cached_invoke_calls_llm_once(self, monkeypatch):
+        """Mensajes repetidos no vuelven a invocar al modelo"""
+        monkeypatch.setattr(llm_cache, "_cache", LLMResponseCache())
+        monkeypatch.setattr(llm_cache.config, "get_llm_config", lambda: LLM_CONFIG)
+        monkeypatch.setattr(llm_cache.config, "LLM_CACHE_ENABLED", True)
+        llm = CountingLLM()
+        messages = [SystemMessage(content="prompt"), HumanMessage(content="cotiza ABC-45")]
+        
+        first = llm_cache.cached_invoke(llm, messages)
+        second = llm_cache.cached_invoke(llm, messages)
+        
+        assert first == second
+        assert llm.calls == 1
+        assert llm_cache.get_llm_cache().stats()["hit_rate"] == 0.5
+
+
+class TestCachedInvoke:
+    """Tests de qué se guarda y bajo qué modelo"""
+    
+    MESSAGES = [SystemMessage(content="prompt"), HumanMessage(content="cotiza ABC-45")]
+    
+    @pytest.fixture(autouse=True)
+    def cache(self, monkeypatch):
+        cache = LLMResponseCache()
+        monkeypatch.setattr(llm_cache, "_cache", cache)
+        monkeypatch.setattr(llm_cache.config, "get_llm_config", lambda: LLM_CONFIG)
+        monkeypatch.setattr(llm_cache.config, "LLM_CACHE_ENABLED", True)
+        return cache
+    
+    def test_invalid_answer_is_not_cached(self):
+        llm = CountingLLM(content="no sé")
+        
+        llm_cache.cached_invoke(llm, self.MESSAGES, validate=validate)
+        llm_cache.cached_invoke(llm, self.MESSAGES, validate=validate)
+        
+        assert llm.calls == 2
+    
+    def test_empty_extraction_is_cached(self):
+        from quoting_agent.nodes import _parse_llm_content
+        
+        # Un saludo se responde con {}: la repetición no paga otra llamada
+        llm = CountingLLM(content="{}")
+        
+        llm_cache.cached_invoke(llm, self.MESSAGES, validate=_parse_llm_content)
+        llm_cache.cached_invoke(llm, self.MESSAGES, validate=_parse_llm_content)
+        
+        assert llm.calls == 1
+    
+    def test_fallback_answer_is_keyed_by_fallback(self, cache):
+        primary, fallback = CountingLLM(failures=1), CountingLLM()
+        chain = ProviderChain([("gemini", primary), ("openai", fallback)], hedge_enabled=False)
+        
+        llm_cache.cached_invoke(chain, self.MESSAGES, validate=validate)
+        # El principal se recuperó: la respuesta del fallback no se sirve en su nombre
+        llm_cache.cached_invoke(chain, self.MESSAGES, validate=validate)
+        llm_cache.cached_invoke(chain, self.MESSAGES, validate=validate)
+        
+        assert (primary.calls, fallback.calls) == (2, 1)
+        openai_config = llm_cache.config.get_provider_config("openai")
+        assert cache.get(cache.make_key(self.MESSAGES, openai_config)) == VALID
+    
+    def test_router_answer_is_keyed_by_model_used(self, cache):
+        fast, strong = CountingLLM(), CountingLLM()
+        router = ModelRouter(fast=("fast-model", fast), strong=("strong-model", strong))
+        
+        llm_cache.cached_invoke(router, self.MESSAGES, validate=validate)
+        llm_cache.cached_invoke(router, self.MESSAGES, validate=validate)
+        
+        assert (fast.calls, strong.calls) == (1, 0)
+        assert cache.get(cache.make_key(self.MESSAGES, {**LLM_CONFIG, "model": "fast-model"})) == VALID
+        assert cache.get(cache.make_key(self.MESSAGES, LLM_CONFIG)) is None
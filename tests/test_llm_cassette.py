@@ -0,0 +1,155 @@
+"""
+Tests de grabación/reproducción del LLM y de las distribuciones del LLM falso
+"""
+
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from quoting_agent import llm_cassette
+from quoting_agent.agent import run_agent
+from quoting_agent.config import Config, config
+from quoting_agent.fake_llm import FakeLLMError, FakeQuotingLLM
+from quoting_agent.llm_cassette import Cassette, CassetteMissError, RecordingLLM, ReplayLLM, prompt_key
+from quoting_agent.llm_factory import clear_llm_pool, get_llm
+
+
+@pytest.fixture
+def cassette_path(tmp_path, monkeypatch):
+    """Cassette temporal y sin cassettes compartidos de otros tests"""
+    path = str(tmp_path / "cassette.jsonl")
+    monkeypatch.setattr(Config, "LLM_CASSETTE_PATH", path)
+    monkeypatch.setattr(config, "FAST_PARSE_ENABLED", False)
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(llm_cassette, "_cassettes", {})
+    clear_llm_pool()
+    yield path
+    clear_llm_pool()
+
+
+def _messages(text):
+    return [SystemMessage(content="Extrae la parte"), HumanMessage(content=text)]
+
+
+class TestCassette:
+    """Tests del archivo de llamadas grabadas"""
+    
+    def test_record_and_reload(self, tmp_path):
+        path = str(tmp_path / "c.jsonl")
+        cassette = Cassette(path)
+        cassette.record(_messages("40 de ABC-45"), '{"part_number": "ABC-45"}', 812.5, "gemini-1.5-flash")
+        cassette.close()
+        
+        reloaded = Cassette(path)
+        entry = reloaded.lookup(_messages("40  de ABC-45"))
+        
+        assert len(reloaded) == 1
+        assert entry["response"] == '{"part_number": "ABC-45"}'
+        assert entry["latency_ms"] == 812.5
+    
+    def test_repeated_prompt_rotates_responses(self, tmp_path):
+        cassette = Cassette(str(tmp_path / "c.jsonl"))
+        cassette.record(_messages("hola"), "primera", 10)
+        cassette.record(_messages("hola"), "segunda", 30)
+        
+        assert [cassette.lookup(_messages("hola"))["response"] for _ in range(3)] == ["primera", "segunda", "primera"]
+        assert cassette.latencies() == [10, 30]
+    
+    def test_miss_raises(self, tmp_path):
+        with pytest.raises(CassetteMissError):
+            Cassette(str(tmp_path / "c.jsonl")).lookup(_messages("nada"))
+    
+    def test_key_ignores_whitespace_not_role(self):
+        assert prompt_key([HumanMessage(content="a  b")]) == prompt_key([HumanMessage(content="a b")])
+        assert prompt_key([HumanMessage(content="a")]) != prompt_key([SystemMessage(content="a")])
+
+
+class TestRecordReplay:
+    """Tests de los proveedores record y replay"""
+    
+    def test_recording_then_replay(self, tmp_path):
+        cassette = Cassette(str(tmp_path / "c.jsonl"))
+        recorder = RecordingLLM(inner=FakeQuotingLLM(), cassette=cassette, model_name="fake-quoting")
+        
+        recorded = recorder.invoke(_messages("40 de ABC-45")).content
+        replayed = ReplayLLM(cassette=cassette, replay_latency=False).invoke(_messages("40 de ABC-45"))
+        
+        assert json.loads(recorded) == {"part_number": "ABC-45", "quantity": 40}
+        assert replayed.content == recorded
+        assert replayed.usage_metadata["output_tokens"] > 0
+    
+    def test_async_replay(self, tmp_path):
+        cassette = Cassette(str(tmp_path / "c.jsonl"))
+        asyncio.run(RecordingLLM(inner=FakeQuotingLLM(), cassette=cassette).ainvoke(_messages("ABC-45 x 3")))
+        
+        replayed = asyncio.run(ReplayLLM(cassette=cassette, replay_latency=False).ainvoke(_messages("ABC-45 x 3")))
+        
+        assert json.loads(replayed.content)["quantity"] == 3
+    
+    def test_agent_replays_recorded_session(self, cassette_path, monkeypatch):
+        message = "hola, ¿me cotizas ABC-45? serían unas 40 piezas"
+        
+        # Graba con el LLM falso como proveedor "real"
+        monkeypatch.setattr(Config, "LLM_PROVIDER", "record")
+        monkeypatch.setattr(Config, "LLM_RECORD_PROVIDER", "fake")
+        assert isinstance(get_llm(), RecordingLLM)
+        recorded = run_agent(message)
+        llm_cassette.get_cassette(cassette_path).close()
+        
+        # Reproduce desde el archivo en un proceso "nuevo"
+        monkeypatch.setattr(llm_cassette, "_cassettes", {})
+        monkeypatch.setattr(Config, "LLM_PROVIDER", "replay")
+        assert isinstance(get_llm(), ReplayLLM)
+        replayed = run_agent(message)
+        
+        assert replayed["quote"].quantity == recorded["quote"].quantity == 40
+    
+    def test_replay_requires_cassette(self, cassette_path, monkeypatch):
+        monkeypatch.setattr(Config, "LLM_PROVIDER", "replay")
+        
+        with pytest.raises(ValueError):
+            get_llm()
+        with pytest.raises(ValueError):
+            Config.validate()
+
+
+class TestFakeDistributions:
+    """Tests de latencias y fallas simuladas del LLM falso"""
+    
+    def test_lognormal_median_and_tail(self):
+        llm = FakeQuotingLLM(latency_ms=100, jitter_ms=200, latency_distribution="lognormal")
+        delays = sorted(llm._delay([HumanMessage(content=f"ABC-45 x {i}")]) for i in range(2000))
+        
+        assert 0.085 < delays[1000] < 0.115
+        assert 0.24 < delays[1900] < 0.36
+    
+    def test_cassette_profile(self):
+        llm = FakeQuotingLLM(latency_distribution="cassette", latency_profile=[100, 200, 900])
+        delays = {llm._delay([HumanMessage(content=f"m{i}")]) for i in range(200)}
+        
+        assert delays == {0.1, 0.2, 0.9}
+    
+    def test_unknown_distribution(self):
+        with pytest.raises(ValueError):
+            FakeQuotingLLM(latency_distribution="pareto")
+        with pytest.raises(ValueError):
+            FakeQuotingLLM(latency_distribution="cassette")
+    
+    def test_error_rate_is_seeded(self):
+        def outcomes(seed):
+            llm = FakeQuotingLLM(error_rate=0.3, seed=seed)
+            results = []
+            for _ in range(200):
+                try:
+                    llm.invoke([HumanMessage(content="ABC-45 x 3")])
+                    results.append(True)
+                except FakeLLMError:
+                    results.append(False)
+            return results
+        
+        first = outcomes(7)
+        
+        assert first == outcomes(7)
+        assert 40 < first.count(False) < 80
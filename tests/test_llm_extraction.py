@@ -0,0 +1,188 @@
+"""
+Tests de la extracción con structured output, reparación y reintento
+"""
+
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from quoting_agent.agent import run_agent
+from quoting_agent.config import Config, config
+from quoting_agent.fake_llm import FakeQuotingLLM
+from quoting_agent.llm_extraction import (
+    EmptyExtractionError,
+    StructuredOutputLLM,
+    extract,
+    extraction_schema,
+    parse_stats,
+    reset_parse_stats,
+    structured_output_active,
+)
+from quoting_agent.llm_factory import clear_llm_pool, get_llm
+from quoting_agent.nodes import STRUCTURED_PARSE_PROMPT, _parse_llm_content
+
+VALID = '{"part_number": "ABC-45", "quantity": 40}'
+
+
+class StubLLM:
+    """Responde en orden los contenidos dados y guarda los prompts"""
+    
+    def __init__(self, *contents):
+        self.contents = list(contents)
+        self.prompts = []
+    
+    def invoke(self, messages):
+        self.prompts.append(messages)
+        return AIMessage(content=self.contents.pop(0))
+
+
+@pytest.fixture(autouse=True)
+def clean_stats(monkeypatch):
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+    reset_parse_stats()
+    yield
+    reset_parse_stats()
+
+
+def _prompt(text="unas 40 de ABC-45"):
+    return [SystemMessage(content="Extrae"), HumanMessage(content="hola"), HumanMessage(content=text)]
+
+
+class TestExtract:
+    """Tests de la reparación local y el reintento barato"""
+    
+    def test_valid_first_try(self):
+        llm = StubLLM(VALID)
+        
+        update = extract(llm, _prompt(), _parse_llm_content)
+        
+        assert update["quote_request"].quantity == 40
+        assert parse_stats()["first_try"] == 1
+    
+    def test_repaired_locally_without_second_call(self):
+        llm = StubLLM("Claro:\n```json\n" + VALID + "\n```")
+        
+        extract(llm, _prompt(), _parse_llm_content)
+        
+        assert len(llm.prompts) == 1
+        assert parse_stats()["repaired"] == 1
+    
+    def test_unrepairable_retries_once_with_short_prompt(self):
+        llm = StubLLM('{"part_number": "ABC-45", "quantity": 4', VALID)
+        
+        update = extract(llm, _prompt(), _parse_llm_content)
+        
+        assert update["quote_request"].quantity == 40
+        retry = llm.prompts[1]
+        # Solo el formato y el último mensaje: sin el historial ni los ejemplos
+        assert [m.content for m in retry[1:]] == ["unas 40 de ABC-45"]
+        assert "no era JSON válido" in retry[0].content
+        assert parse_stats()["retried"] == 1
+    
+    def test_invalid_schema_retry_names_fields(self):
+        llm = StubLLM('{"part_number": "ABC-45", "quantity": 0}', VALID)
+        
+        extract(llm, _prompt(), _parse_llm_content)
+        
+        assert "quantity" in llm.prompts[1][0].content
+    
+    def test_failed_retry_raises(self):
+        llm = StubLLM("no sé", "tampoco")
+        
+        with pytest.raises(json.JSONDecodeError):
+            extract(llm, _prompt(), _parse_llm_content)
+        assert parse_stats()["failure_rate"] == 1.0
+    
+    def test_empty_answer_is_not_retried(self):
+        llm = StubLLM("{}")
+        
+        with pytest.raises(EmptyExtractionError):
+            extract(llm, _prompt("hola"), _parse_llm_content)
+        assert len(llm.prompts) == 1
+        assert parse_stats()["empty"] == 1
+        assert parse_stats()["failure_rate"] == 0.0
+    
+    def test_retry_disabled(self, monkeypatch):
+        monkeypatch.setattr(config, "LLM_PARSE_RETRY_ENABLED", False)
+        llm = StubLLM("no sé", VALID)
+        
+        with pytest.raises(json.JSONDecodeError):
+            extract(llm, _prompt(), _parse_llm_content)
+        assert len(llm.prompts) == 1
+
+
+class TestStructuredOutput:
+    """Tests del cliente con structured output"""
+    
+    def test_schema_follows_quote_line_item(self):
+        items = extraction_schema()["properties"]["line_items"]["items"]
+        
+        assert items["required"] == ["part_number", "quantity"]
+        assert items["properties"]["quantity"]["type"] == "integer"
+    
+    def test_returns_schema_json_as_text(self):
+        llm = StructuredOutputLLM(inner=FakeQuotingLLM(malformed_rate=1.0))
+        
+        message = llm.invoke([SystemMessage(content=STRUCTURED_PARSE_PROMPT), HumanMessage(content="40 de ABC-45")])
+        
+        assert json.loads(message.content) == {"line_items": [{"part_number": "ABC-45", "quantity": 40}]}
+        assert llm.invoke([HumanMessage(content="hola")]).content == "{}"
+    
+    def test_schema_tokens_are_counted(self):
+        messages = [HumanMessage(content="40 de ABC-45")]
+        
+        plain = FakeQuotingLLM().invoke(messages).usage_metadata["input_tokens"]
+        structured = StructuredOutputLLM(inner=FakeQuotingLLM()).invoke(messages).usage_metadata["input_tokens"]
+        
+        assert structured > plain
+    
+    def test_unfilled_schema_falls_back_to_tool_arguments(self):
+        raw = AIMessage(content="", tool_calls=[{"name": "quote_request", "args": {"part_number": "ABC-45", "quantity": 40}, "id": "1"}])
+        
+        result = StructuredOutputLLM._result({"raw": raw, "parsed": None, "parsing_error": ValueError()})
+        
+        assert json.loads(result.generations[0].message.content)["quantity"] == 40
+    
+    def test_active_only_if_every_provider_supports_it(self, monkeypatch):
+        monkeypatch.setattr(Config, "LLM_PROVIDER", "openai")
+        assert structured_output_active()
+        
+        monkeypatch.setattr(Config, "LLM_FALLBACK_PROVIDERS", "replay")
+        monkeypatch.setattr(config, "LLM_RECORD_PROVIDER", "fake")
+        assert structured_output_active()
+        
+        monkeypatch.setattr(config, "LLM_STRUCTURED_OUTPUT", False)
+        assert not structured_output_active()
+
+
+class TestExtractionAgent:
+    """Tests del agente con respuestas mal formadas del LLM falso"""
+    
+    @pytest.fixture
+    def malformed_fake(self, monkeypatch):
+        monkeypatch.setattr(Config, "LLM_PROVIDER", "fake")
+        monkeypatch.setattr(Config, "FAKE_LLM_MALFORMED_RATE", 1.0)
+        monkeypatch.setattr(config, "FAST_PARSE_ENABLED", False)
+        clear_llm_pool()
+        yield
+        clear_llm_pool()
+    
+    def test_json_prompt_recovers_malformed_answers(self, malformed_fake, monkeypatch):
+        monkeypatch.setattr(config, "LLM_STRUCTURED_OUTPUT", False)
+        
+        result = run_agent("Necesito 40 unidades de ABC-45")
+        
+        # Con malformed_rate=1 ninguna respuesta sale bien al primer intento
+        assert result["quote"].quantity == 40
+        stats = parse_stats()
+        assert stats["first_try"] == 0
+        assert stats["repaired"] + stats["retried"] == 1
+    
+    def test_structured_output_path(self, malformed_fake):
+        assert isinstance(get_llm(), StructuredOutputLLM)
+        
+        result = run_agent("Necesito 40 unidades de ABC-45")
+        
+        assert result["quote"].quantity == 40
+        assert parse_stats()["first_try"] == 1
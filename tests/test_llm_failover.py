@@ -0,0 +1,245 @@
+"""
+Tests de la cadena de proveedores LLM (hedging y circuit breakers)
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from quoting_agent import llm_cassette
+from quoting_agent.agent import run_agent
+from quoting_agent.config import Config, config
+from quoting_agent.llm_cassette import Cassette
+from quoting_agent.llm_factory import clear_llm_pool, get_llm, get_provider_chain_stats
+from quoting_agent.llm_failover import CircuitBreaker, CircuitOpenError, LatencyWindow, ProviderChain
+
+VALID = '{"part_number": "ABC-45", "quantity": 10}'
+MESSAGES = [HumanMessage(content="10 de ABC-45")]
+
+
+class StubLLM:
+    """Proveedor con latencia y respuesta fijas (o que siempre falla)"""
+    
+    def __init__(self, content=VALID, delay=0.0, error=None):
+        self.content = content
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+    
+    def invoke(self, messages):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return AIMessage(content=self.content)
+    
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return AIMessage(content=self.content)
+
+
+def _chain(*providers, **kwargs):
+    kwargs.setdefault("hedge_initial_delay_ms", 50)
+    kwargs.setdefault("hedge_min_delay_ms", 10)
+    return ProviderChain([(f"p{i}", llm) for i, llm in enumerate(providers)], **kwargs)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Tests del breaker por proveedor"""
+    
+    def test_opens_on_error_burst(self):
+        breaker = CircuitBreaker(failure_threshold=3, window_seconds=10, cooldown_seconds=5, clock=Clock())
+        
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record_failure()
+        
+        assert breaker.state == "open"
+        assert not breaker.allow()
+    
+    def test_failures_outside_window_do_not_count(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=3, window_seconds=10, clock=clock)
+        
+        for _ in range(2):
+            breaker.record_failure()
+        clock.now = 11
+        breaker.record_failure()
+        
+        assert breaker.state == "closed"
+    
+    def test_half_open_allows_one_trial(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=5, clock=clock)
+        breaker.record_failure()
+        clock.now = 5
+        
+        assert breaker.state == "half_open"
+        assert breaker.allow()
+        assert not breaker.allow()
+        
+        breaker.record_success()
+        assert breaker.state == "closed"
+    
+    def test_failed_trial_reopens(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=5, clock=clock)
+        breaker.record_failure()
+        clock.now = 5
+        breaker.allow()
+        breaker.record_failure()
+        
+        assert breaker.state == "open"
+        assert breaker.stats()["opens"] == 1
+
+
+class TestLatencyWindow:
+    def test_percentile_needs_samples(self):
+        window = LatencyWindow()
+        for ms in range(1, 11):
+            window.add(ms)
+        assert window.percentile(95) is None
+        
+        for ms in range(11, 101):
+            window.add(ms)
+        assert window.percentile(95) == 96
+
+
+class TestProviderChain:
+    """Tests de hedging y failover"""
+    
+    def test_fast_primary_does_not_hedge(self):
+        primary, secondary = StubLLM(), StubLLM()
+        
+        assert _chain(primary, secondary).invoke(MESSAGES).content == VALID
+        assert secondary.calls == 0
+    
+    def test_slow_primary_is_hedged(self):
+        primary = StubLLM(content='{"part_number": "SLOW-1", "quantity": 1}', delay=0.5)
+        secondary = StubLLM()
+        chain = _chain(primary, secondary)
+        
+        start = time.perf_counter()
+        message = chain.invoke(MESSAGES, validate=json.loads)
+        
+        assert message.content == VALID
+        assert time.perf_counter() - start < 0.4
+        stats = chain.stats()
+        assert stats["p1"]["hedges"] == 1
+        assert stats["p1"]["wins"] == 1
+    
+    def test_hedge_delay_follows_observed_percentile(self):
+        primary = StubLLM()
+        chain = _chain(primary, StubLLM(), hedge_initial_delay_ms=2000)
+        for ms in range(1, 101):
+            chain.providers[0].latency.add(ms)
+        
+        assert chain.hedge_delay(chain.providers[0]) == pytest.approx(0.096)
+    
+    def test_error_fails_over_immediately(self):
+        chain = _chain(StubLLM(error=RuntimeError("503")), StubLLM(), hedge_enabled=False)
+        
+        assert chain.invoke(MESSAGES).content == VALID
+        assert chain.stats()["p0"]["errors"] == 1
+    
+    def test_invalid_response_tries_next(self):
+        chain = _chain(StubLLM(content="no es json"), StubLLM(), hedge_enabled=False)
+        
+        assert chain.invoke(MESSAGES, validate=json.loads).content == VALID
+        assert chain.stats()["p0"]["invalid"] == 1
+    
+    def test_empty_extraction_wins_on_first_provider(self):
+        from quoting_agent.nodes import _parse_llm_content
+        
+        # "hola" → {}: respuesta correcta aunque no haya solicitud
+        fallback = StubLLM()
+        chain = _chain(StubLLM(content="{}"), fallback, hedge_enabled=False)
+        
+        assert chain.invoke(MESSAGES, validate=_parse_llm_content).content == "{}"
+        assert fallback.calls == 0
+        assert chain.stats()["p0"]["wins"] == 1
+        assert chain.stats()["p0"]["invalid"] == 0
+    
+    def test_all_invalid_returns_first_response(self):
+        chain = _chain(StubLLM(content="uno"), StubLLM(content="dos"), hedge_enabled=False)
+        
+        assert chain.invoke(MESSAGES, validate=json.loads).content == "uno"
+    
+    def test_all_errors_raise_last(self):
+        chain = _chain(StubLLM(error=RuntimeError("a")), StubLLM(error=ValueError("b")), hedge_enabled=False)
+        
+        with pytest.raises(ValueError):
+            chain.invoke(MESSAGES)
+    
+    def test_open_breaker_is_skipped(self):
+        primary, secondary = StubLLM(error=RuntimeError("503")), StubLLM()
+        chain = _chain(primary, secondary, hedge_enabled=False, breaker_factory=lambda: CircuitBreaker(failure_threshold=2))
+        
+        for _ in range(3):
+            chain.invoke(MESSAGES)
+        
+        assert primary.calls == 2
+        assert chain.stats()["p0"]["state"] == "open"
+    
+    def test_all_open_raises(self):
+        chain = _chain(StubLLM(error=RuntimeError("503")), breaker_factory=lambda: CircuitBreaker(failure_threshold=1))
+        with pytest.raises(RuntimeError):
+            chain.invoke(MESSAGES)
+        
+        with pytest.raises(CircuitOpenError):
+            chain.invoke(MESSAGES)
+    
+    def test_async_hedge(self):
+        primary, secondary = StubLLM(content="lento", delay=0.5), StubLLM()
+        chain = _chain(primary, secondary)
+        
+        async def scenario():
+            start = time.perf_counter()
+            message = await chain.ainvoke(MESSAGES, validate=json.loads)
+            return message, time.perf_counter() - start
+        
+        message, elapsed = asyncio.run(scenario())
+        
+        assert message.content == VALID
+        assert elapsed < 0.4
+
+
+class TestChainConfig:
+    """Tests de la cadena armada desde la configuración"""
+    
+    def test_agent_uses_chain(self, tmp_path, monkeypatch):
+        path = tmp_path / "cassette.jsonl"
+        Cassette(str(path)).record(MESSAGES, VALID, 1.0)
+        monkeypatch.setattr(llm_cassette, "_cassettes", {})
+        monkeypatch.setattr(Config, "LLM_PROVIDER", "fake")
+        monkeypatch.setattr(Config, "LLM_FALLBACK_PROVIDERS", "replay, fake")
+        monkeypatch.setattr(Config, "LLM_CASSETTE_PATH", str(path))
+        monkeypatch.setattr(config, "FAST_PARSE_ENABLED", False)
+        monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+        clear_llm_pool()
+        
+        chain = get_llm()
+        result = run_agent("hola, ¿me cotizas ABC-45? serían unas 40 piezas")
+        
+        assert [provider.name for provider in chain.providers] == ["fake", "replay"]
+        assert get_llm() is chain
+        assert result["quote"].quantity == 40
+        assert get_provider_chain_stats()["fake"]["wins"] == 1
+        clear_llm_pool()
+    
+    def test_single_provider_has_no_chain(self):
+        assert get_provider_chain_stats() is None
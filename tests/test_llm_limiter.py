@@ -0,0 +1,267 @@
+"""
+Tests del rate limiting del lado del cliente para el LLM
+"""
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from quoting_agent import llm_limiter
+from quoting_agent.agent import run_agent
+from quoting_agent.config import Config, config
+from quoting_agent.fake_llm import FakeQuotingLLM
+from quoting_agent.llm_factory import clear_llm_pool, get_llm
+from quoting_agent.llm_limiter import (
+    AdaptiveConcurrency,
+    LLMRateLimiter,
+    MemoryBucketStore,
+    RateLimitedLLM,
+    RateLimitTimeout,
+    SQLiteBucketStore,
+    is_rate_limit_error,
+)
+from quoting_agent.nodes import _parse_error_update
+
+
+class QuotaError(Exception):
+    """Imita el 429 de los SDK de los proveedores"""
+    status_code = 429
+
+
+class FlakyLLM(FakeQuotingLLM):
+    """Falla con 429 las primeras `failures` llamadas"""
+    failures: int = 1
+    calls: int = 0
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise QuotaError("429 Too Many Requests")
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def _limiter(store=None, rpm=600, tpm=0, timeout=2.0, **kwargs):
+    return LLMRateLimiter("fake:test", store or MemoryBucketStore(), rpm=rpm, tpm=tpm, target=1.0,
+                          queue_timeout=timeout, **kwargs)
+
+
+def _prompt(text="ABC-45 x 40"):
+    return [HumanMessage(content=text)]
+
+
+class TestBuckets:
+    """Tests de los token buckets y su store"""
+    
+    def test_burst_then_wait(self):
+        store = MemoryBucketStore()
+        needs = {"requests": (1, 2, 1.0)}
+        
+        assert store.take("k", needs) == 0
+        assert store.take("k", needs) == 0
+        assert 0.9 < store.take("k", needs) <= 1.0
+    
+    def test_all_buckets_must_fit(self):
+        store = MemoryBucketStore()
+        
+        wait = store.take("k", {"requests": (1, 10, 1.0), "tokens": (50, 20, 10.0)})
+        
+        assert wait == pytest.approx(3.0, abs=0.01)
+        # Nada se descontó: el bucket de requests sigue lleno
+        assert store.take("k", {"requests": (10, 10, 1.0)}) == 0
+    
+    def test_sqlite_buckets_shared_between_workers(self, tmp_path):
+        path = str(tmp_path / "rate.sqlite3")
+        worker_a, worker_b = SQLiteBucketStore(path), SQLiteBucketStore(path)
+        needs = {"requests": (1, 1, 0.1)}
+        
+        assert worker_a.take("k", needs) == 0
+        assert worker_b.take("k", needs) > 0
+        worker_a.close()
+        worker_b.close()
+    
+    def test_sqlite_cooldown_shared(self, tmp_path):
+        path = str(tmp_path / "rate.sqlite3")
+        worker_a, worker_b = SQLiteBucketStore(path), SQLiteBucketStore(path)
+        
+        worker_a.cooldown("k", 5)
+        
+        assert 4 < worker_b.take("k", {"requests": (1, 10, 1.0)}) <= 5
+        worker_a.close()
+        worker_b.close()
+
+
+class TestAdaptiveConcurrency:
+    """Tests del ajuste AIMD"""
+    
+    def test_halves_on_overload_and_recovers_additively(self):
+        concurrency = AdaptiveConcurrency(max_limit=8)
+        
+        concurrency.on_overload()
+        assert concurrency.limit == 4
+        for _ in range(4):
+            concurrency.on_success(10)
+        assert 4.9 < concurrency.limit < 5
+    
+    def test_slow_calls_reduce_limit(self):
+        concurrency = AdaptiveConcurrency(max_limit=10, latency_target_ms=100)
+        
+        concurrency.on_success(500)
+        
+        assert concurrency.limit == 9
+    
+    def test_never_below_min(self):
+        concurrency = AdaptiveConcurrency(max_limit=2, min_limit=1)
+        for _ in range(5):
+            concurrency.on_overload()
+        
+        assert concurrency.limit == 1
+        assert concurrency.try_acquire()
+        assert not concurrency.try_acquire()
+
+
+class TestRateLimitedLLM:
+    """Tests del cliente limitado"""
+    
+    def test_queues_until_quota_refills(self):
+        # 60 RPM con ráfaga de 10 s: 10 llamadas inmediatas, luego 1 por segundo
+        limiter = _limiter(rpm=60)
+        llm = RateLimitedLLM(inner=FakeQuotingLLM(), limiter=limiter)
+        for _ in range(10):
+            llm.invoke(_prompt())
+        
+        start = time.perf_counter()
+        llm.invoke(_prompt())
+        
+        assert time.perf_counter() - start > 0.5
+        assert limiter.stats()["queued"] == 1
+    
+    def test_deadline_raises_timeout(self):
+        limiter = _limiter(rpm=6, timeout=0.1)
+        llm = RateLimitedLLM(inner=FakeQuotingLLM(), limiter=limiter)
+        llm.invoke(_prompt())
+        
+        with pytest.raises(RateLimitTimeout):
+            llm.invoke(_prompt())
+        assert limiter.stats()["timeouts"] == 1
+    
+    def test_429_cools_down_and_retries(self):
+        inner = FlakyLLM(failures=1)
+        limiter = _limiter()
+        llm = RateLimitedLLM(inner=inner, limiter=limiter)
+        
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(llm_limiter, "DEFAULT_COOLDOWN_SECONDS", 0.05)
+            message = llm.invoke(_prompt())
+        
+        assert '"part_number"' in message.content
+        assert inner.calls == 2
+        stats = limiter.stats()
+        assert stats["rate_limited"] == 1
+        assert stats["concurrency_limit"] < 16
+        assert stats["in_flight"] == 0
+    
+    def test_other_errors_are_not_retried(self):
+        limiter = _limiter()
+        llm = RateLimitedLLM(inner=FakeQuotingLLM(error_rate=1.0), limiter=limiter)
+        
+        with pytest.raises(Exception):
+            llm.invoke(_prompt())
+        assert limiter.stats()["in_flight"] == 0
+    
+    def test_actual_usage_adjusts_token_bucket(self):
+        class Store(MemoryBucketStore):
+            adjusted = []
+            
+            def adjust(self, key, bucket, amount):
+                self.adjusted.append((bucket, amount))
+        
+        class UsageLLM(FakeQuotingLLM):
+            def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+                result = super()._generate(messages, stop, run_manager, **kwargs)
+                result.generations[0].message.usage_metadata = {
+                    "input_tokens": 400, "output_tokens": 100, "total_tokens": 500
+                }
+                return result
+        
+        store = Store()
+        llm = RateLimitedLLM(inner=UsageLLM(), limiter=_limiter(store, tpm=60000))
+        llm.invoke(_prompt("x" * 400))
+        
+        # Reservó 400/4 + 100 = 200, usó 500
+        assert store.adjusted == [("tokens", 300)]
+    
+    def test_async_and_streaming(self):
+        limiter = _limiter()
+        llm = RateLimitedLLM(inner=FakeQuotingLLM(), limiter=limiter)
+        
+        message = asyncio.run(llm.ainvoke(_prompt()))
+        chunks = list(llm.stream(_prompt()))
+        
+        assert message.content == "".join(chunk.content for chunk in chunks)
+        assert limiter.stats()["calls"] == 2
+    
+    def test_cancelled_calls_release_their_slot(self):
+        concurrency = AdaptiveConcurrency(max_limit=2)
+        limiter = _limiter(timeout=0.2, concurrency=concurrency)
+        llm = RateLimitedLLM(inner=FakeQuotingLLM(latency_ms=500), limiter=limiter)
+        
+        async def timed_out():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(llm.ainvoke(_prompt()), timeout=0.05)
+        
+        for _ in range(2):
+            asyncio.run(timed_out())
+        
+        # Sin fuga de cupo ni castigo de AIMD: la siguiente llamada entra
+        assert limiter.stats()["in_flight"] == 0
+        assert concurrency.limit == 2
+        llm.inner.latency_ms = 0
+        asyncio.run(llm.ainvoke(_prompt()))
+    
+    def test_closed_stream_releases_its_slot(self):
+        limiter = _limiter()
+        llm = RateLimitedLLM(inner=FakeQuotingLLM(), limiter=limiter)
+        
+        stream = llm.stream(_prompt())
+        next(stream)
+        stream.close()
+        
+        assert limiter.stats()["in_flight"] == 0
+
+
+class TestRateLimitIntegration:
+    """Tests del limitador armado desde la configuración y del mensaje al cliente"""
+    
+    def test_rate_limit_error_detection(self):
+        assert is_rate_limit_error(QuotaError("cuota"))
+        assert is_rate_limit_error(RuntimeError("Rate limit reached for gpt-4o-mini"))
+        assert not is_rate_limit_error(ValueError("clave inválida"))
+    
+    def test_customer_is_not_asked_to_rephrase(self):
+        update = _parse_error_update(RateLimitTimeout("sin cupo"))
+        
+        assert "reformular" not in update["messages"][0].content
+        assert update["error_message"].startswith("LLM rate limit")
+    
+    def test_agent_runs_through_limiter(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(Config, "LLM_PROVIDER", "fake")
+        monkeypatch.setattr(config, "LLM_RATE_LIMIT_ENABLED", True)
+        monkeypatch.setattr(config, "LLM_RATE_LIMIT_PATH", str(tmp_path / "rate.sqlite3"))
+        monkeypatch.setattr(config, "FAST_PARSE_ENABLED", False)
+        monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+        monkeypatch.setattr(llm_limiter, "_store", None)
+        monkeypatch.setattr(llm_limiter, "_limiters", {})
+        clear_llm_pool()
+        
+        assert isinstance(get_llm(), RateLimitedLLM)
+        result = run_agent("Necesito 40 unidades de ABC-45")
+        
+        assert result["quote"].quantity == 40
+        stats = llm_limiter.get_rate_limit_stats()
+        assert list(stats.values())[0]["calls"] == 1
+        clear_llm_pool()
+    
+    def test_disabled_by_default(self):
+        assert llm_limiter.get_rate_limit_stats() is None
@@ -0,0 +1,166 @@
+"""
+Tests del router de modelos por complejidad del mensaje
+"""
+
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from quoting_agent import model_router
+from quoting_agent.agent import run_agent
+from quoting_agent.config import Config, config
+from quoting_agent.fast_parser import fast_path_confidence
+from quoting_agent.llm_factory import clear_llm_pool, get_llm, get_model_router_stats
+from quoting_agent.model_router import ModelRouter, complexity, detect_language, message_features, routing_text
+
+VALID = '{"part_number": "ABC-45", "quantity": 40}'
+SIMPLE = "hola, ¿me cotizas ABC-45? serían unas 40 piezas"
+COMPLEX = (
+    "Necesito:\n- 2 cajas de ABC-45\n- XYZ-100, unas 30 o 40\n- DEF-200 (las que tengan)\n"
+    "Entrega en Bogotá antes del 15, precio con 5% de descuento si es posible."
+)
+
+
+class StubLLM:
+    def __init__(self, content=VALID, error=None):
+        self.content = content
+        self.error = error
+        self.calls = 0
+    
+    def invoke(self, messages):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return AIMessage(content=self.content)
+    
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+
+def _router(fast=None, strong=None, **kwargs):
+    return ModelRouter(("rapido", fast or StubLLM()), ("fuerte", strong or StubLLM()), **kwargs)
+
+
+def _prompt(text):
+    return [SystemMessage(content="Extrae"), HumanMessage(content=text)]
+
+
+class TestComplexity:
+    """Tests del puntaje de complejidad"""
+    
+    def test_clean_rfq_is_simple(self):
+        assert complexity(message_features(SIMPLE)) < 0.1
+    
+    def test_multi_line_ambiguous_rfq_is_complex(self):
+        assert complexity(message_features(COMPLEX)) > 0.5
+    
+    def test_language(self):
+        assert detect_language(SIMPLE) == "es"
+        assert detect_language("Hi, could you quote 40 of ABC-45 please") == "en"
+        assert detect_language("Bonjour, pourriez-vous faire un devis pour ABC-45") == "other"
+        assert detect_language("mejor 60") == "es"
+    
+    def test_fast_path_confidence(self):
+        assert fast_path_confidence("Necesito 100 unidades de ABC-45") == 1.0
+        assert 0 < fast_path_confidence("ABC-45, 2 cajas") < 1.0
+        assert fast_path_confidence("hola") == 0.0
+    
+    def test_delta_prompt_scores_only_client_message(self):
+        prompt = _prompt('Solicitud en curso: {"line_items": []}\nMensaje del cliente: mejor 60')
+        
+        assert routing_text(prompt) == "mejor 60"
+
+
+class TestRouting:
+    """Tests de la decisión y de su ajuste por la tabla de modelos"""
+    
+    def test_simple_goes_fast_complex_goes_strong(self):
+        fast, strong = StubLLM(), StubLLM()
+        router = _router(fast, strong)
+        
+        router.invoke(_prompt(SIMPLE))
+        router.invoke(_prompt(COMPLEX))
+        
+        assert (fast.calls, strong.calls) == (1, 1)
+        assert router.stats()["decisions"] == {"rapido": 1, "fuerte": 1}
+    
+    def test_invalid_fast_answer_escalates(self):
+        router = _router(StubLLM(content="no sé"), StubLLM())
+        
+        message = router.invoke(_prompt(SIMPLE), validate=json.loads)
+        
+        assert message.content == VALID
+        assert router.stats()["reasons"]["escalated"] == 1
+    
+    def test_empty_extraction_does_not_escalate(self):
+        from quoting_agent.nodes import _parse_llm_content
+        
+        fast, strong = StubLLM(content="{}"), StubLLM()
+        router = _router(fast, strong)
+        
+        for _ in range(3):
+            assert router.invoke(_prompt("hola"), validate=_parse_llm_content).content == "{}"
+        
+        assert strong.calls == 0
+        assert router.stats()["reasons"]["escalated"] == 0
+        assert router.stats()["models"]["rapido"]["accuracy"] == 1.0
+    
+    def test_fast_error_escalates_strong_error_raises(self):
+        router = _router(StubLLM(error=RuntimeError("503")), StubLLM(error=ValueError("caído")))
+        
+        with pytest.raises(ValueError):
+            router.invoke(_prompt(SIMPLE))
+    
+    def test_inaccurate_band_moves_to_strong(self):
+        fast, strong = StubLLM(content="no sé"), StubLLM()
+        router = _router(fast, strong)
+        
+        for _ in range(model_router.MIN_SAMPLES):
+            router.invoke(_prompt(SIMPLE), validate=json.loads)
+        fast.calls = 0
+        for _ in range(model_router.EXPLORE_EVERY):
+            router.invoke(_prompt(SIMPLE), validate=json.loads)
+        
+        # Solo la llamada de exploración vuelve al modelo rápido
+        assert fast.calls == 1
+        assert router.stats()["reasons"]["accuracy"] == model_router.EXPLORE_EVERY - 1
+    
+    def test_slow_fast_model_moves_to_strong(self):
+        router = _router()
+        for _ in range(model_router.MIN_SAMPLES):
+            router._tables["rapido"].add(0, 900.0, True)
+            router._tables["fuerte"].add(0, 300.0, True)
+        
+        assert router.route(_prompt(SIMPLE))[2] == "latency"
+    
+    def test_async_routing(self):
+        fast, strong = StubLLM(), StubLLM()
+        router = _router(fast, strong)
+        
+        asyncio.run(router.ainvoke(_prompt(COMPLEX)))
+        
+        assert strong.calls == 1
+
+
+class TestRouterConfig:
+    """Tests del router armado desde la configuración"""
+    
+    def test_agent_uses_router(self, monkeypatch):
+        monkeypatch.setattr(Config, "LLM_PROVIDER", "fake")
+        monkeypatch.setattr(config, "LLM_ROUTER_ENABLED", True)
+        monkeypatch.setattr(config, "LLM_ROUTER_FAST_MODEL", "fake-rapido")
+        monkeypatch.setattr(config, "FAST_PARSE_ENABLED", False)
+        monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+        clear_llm_pool()
+        
+        assert isinstance(get_llm(), ModelRouter)
+        result = run_agent(SIMPLE)
+        
+        assert result["quote"].quantity == 40
+        assert get_model_router_stats()["decisions"] == {"fake-rapido": 1, "fake-quoting": 0}
+        clear_llm_pool()
+    
+    def test_disabled_by_default(self):
+        assert get_model_router_stats() is None
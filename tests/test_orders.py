@@ -0,0 +1,309 @@
+"""
+Tests del envío de órdenes (outbox + despachador)
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from integrations.erp_standin import FaultConfig, create_app
+from quoting_agent import orders
+from quoting_agent import runtime as runtime_module
+from quoting_agent.agent import run_agent
+from quoting_agent.models import Quote, QuoteLine
+from quoting_agent.orders import OrderDispatcher, OrderOutbox, idempotency_key, order_payload
+from quoting_agent.runtime import AgentRuntime
+from quoting_agent.sessions import SessionCheckpointer
+
+
+def make_quote(quote_id: str = "Q-1", part_number: str = "ABC-45") -> Quote:
+    return Quote(
+        quote_id=quote_id,
+        part_number=part_number,
+        quantity=10,
+        unit_price=25.50,
+        subtotal=255.0,
+        tax=48.45,
+        total=303.45,
+        valid_until=datetime.now() + timedelta(days=30),
+        line_items=[QuoteLine(part_number=part_number, quantity=10, unit_price=25.50, subtotal=255.0)]
+    )
+
+
+def accept_all(calls):
+    """submit_fn que acepta todo y registra cada lote"""
+    def submit(batch):
+        calls.append(batch)
+        return {order["idempotency_key"]: {"status": "accepted", "order_id": f"ORD-{order['quote_id']}"} for order in batch}
+    return submit
+
+
+def make_dispatcher(outbox, submit_fn, **kwargs) -> OrderDispatcher:
+    kwargs.setdefault("retry_base_seconds", 0)
+    return OrderDispatcher(outbox, submit_fn=submit_fn, **kwargs)
+
+
+class TestOrderOutbox:
+    """Tests de la cola durable"""
+    
+    def test_enqueue_is_idempotent(self):
+        outbox = OrderOutbox()
+        
+        first, created = outbox.enqueue(make_quote())
+        again, created_again = outbox.enqueue(make_quote())
+        
+        assert created is True and created_again is False
+        assert first.idempotency_key == again.idempotency_key == idempotency_key("Q-1")
+        assert outbox.stats()["pending"] == 1
+    
+    def test_payload_keeps_exact_amounts(self):
+        outbox = OrderOutbox()
+        outbox.enqueue(make_quote())
+        
+        payload, _ = outbox.claim(10)[0]
+        
+        # Texto decimal, sin pasar por float
+        assert (payload["subtotal"], payload["tax"], payload["total"]) == ("255.0", "48.45", "303.45")
+        assert payload["line_items"][0]["unit_price"] == "25.5"
+    
+    def test_claimed_orders_are_leased(self):
+        outbox = OrderOutbox(lease_seconds=60)
+        outbox.enqueue(make_quote())
+        
+        assert len(outbox.claim(10)) == 1
+        # Reservada para quien la reclamó
+        assert outbox.claim(10) == []
+    
+    def test_expired_lease_is_claimed_again(self):
+        outbox = OrderOutbox(lease_seconds=0)
+        outbox.enqueue(make_quote())
+        
+        outbox.claim(10)
+        
+        assert [attempt for _, attempt in outbox.claim(10)] == [2]
+    
+    def test_pending_orders_survive_restart(self, tmp_path):
+        path = str(tmp_path / "orders.sqlite3")
+        outbox = OrderOutbox(path)
+        outbox.enqueue(make_quote())
+        outbox.close()
+        
+        calls = []
+        reopened = OrderOutbox(path)
+        make_dispatcher(reopened, accept_all(calls)).run_once()
+        
+        assert reopened.get("Q-1").status == "sent"
+        assert reopened.get("Q-1").order_id == "ORD-Q-1"
+
+
+class TestOrderDispatcher:
+    """Tests del envío en lotes con reintentos"""
+    
+    def test_batches_with_bounded_size(self):
+        outbox = OrderOutbox()
+        for i in range(120):
+            outbox.enqueue(make_quote(f"Q-{i}"))
+        calls = []
+        
+        processed = make_dispatcher(outbox, accept_all(calls), batch_size=50, concurrency=4).run_once()
+        
+        assert processed == 120
+        assert sorted(len(batch) for batch in calls) == [20, 50, 50]
+        assert outbox.stats()["sent"] == 120
+    
+    def test_erp_outage_is_retried_then_fails(self):
+        outbox = OrderOutbox()
+        outbox.enqueue(make_quote())
+        
+        def down(batch):
+            raise ConnectionError("ERP caído")
+        
+        dispatcher = make_dispatcher(outbox, down, max_attempts=3)
+        for _ in range(3):
+            dispatcher.run_once()
+        
+        order = outbox.get("Q-1")
+        assert order.status == "failed"
+        assert order.attempts == 3
+        assert "ERP caído" in order.last_error
+        assert dispatcher.stats()["retries"] == 2
+    
+    def test_recovers_after_transient_failure(self):
+        outbox = OrderOutbox()
+        outbox.enqueue(make_quote())
+        calls = []
+        healthy = accept_all(calls)
+        responses = iter([ConnectionError("timeout")])
+        
+        def flaky(batch):
+            error = next(responses, None)
+            if error:
+                raise error
+            return healthy(batch)
+        
+        dispatcher = make_dispatcher(outbox, flaky)
+        dispatcher.run_once()
+        dispatcher.run_once()
+        
+        assert outbox.get("Q-1").status == "sent"
+        assert outbox.get("Q-1").attempts == 2
+    
+    def test_rejected_order_is_not_retried(self):
+        outbox = OrderOutbox()
+        outbox.enqueue(make_quote())
+        
+        dispatcher = make_dispatcher(outbox, lambda batch: {
+            order["idempotency_key"]: {"status": "rejected", "detail": "Cliente bloqueado"} for order in batch
+        })
+        dispatcher.run_once()
+        
+        assert outbox.get("Q-1").status == "failed"
+        assert outbox.get("Q-1").last_error == "Cliente bloqueado"
+        assert dispatcher.run_once() == 0
+    
+    def test_background_thread_dispatches_on_notify(self):
+        outbox = OrderOutbox()
+        calls = []
+        dispatcher = make_dispatcher(outbox, accept_all(calls), poll_seconds=10)
+        dispatcher.start()
+        try:
+            outbox.enqueue(make_quote())
+            dispatcher.notify()
+            deadline = time.time() + 2
+            while outbox.get("Q-1").status != "sent" and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            dispatcher.stop()
+        
+        assert outbox.get("Q-1").status == "sent"
+
+
+class TestERPStandInOrders:
+    """Tests del endpoint de órdenes del ERP simulado"""
+    
+    def test_resubmission_returns_same_order(self):
+        client = TestClient(create_app())
+        body = {"orders": [order_payload(make_quote())]}
+        
+        first = client.post("/orders/batch", json=body).json()["results"]
+        second = client.post("/orders/batch", json=body).json()["results"]
+        
+        assert first == second
+        assert first["order:Q-1"]["status"] == "accepted"
+        assert client.get("/health").json()["orders"] == 1
+    
+    def test_unknown_part_is_rejected(self):
+        client = TestClient(create_app())
+        
+        results = client.post("/orders/batch", json={"orders": [order_payload(make_quote(part_number="NOPE-1"))]}).json()["results"]
+        
+        assert results["order:Q-1"]["status"] == "rejected"
+    
+    def test_dispatcher_absorbs_erp_errors(self):
+        erp = TestClient(create_app(FaultConfig(error_rate=1.0)))
+        
+        def submit(batch):
+            response = erp.post("/orders/batch", json={"orders": batch})
+            response.raise_for_status()
+            return response.json()["results"]
+        
+        outbox = OrderOutbox()
+        outbox.enqueue(make_quote())
+        dispatcher = make_dispatcher(outbox, submit)
+        dispatcher.run_once()
+        assert outbox.get("Q-1").status == "pending"
+        
+        erp.put("/_admin/faults", json={"error_rate": 0})
+        dispatcher.run_once()
+        
+        assert outbox.get("Q-1").status == "sent"
+
+
+@pytest.fixture
+def session_orders(monkeypatch):
+    """Sesiones y outbox en memoria; el despachador acepta todo"""
+    monkeypatch.setattr(runtime_module, "_runtime", AgentRuntime(checkpointer=SessionCheckpointer.from_path(":memory:")))
+    outbox = OrderOutbox()
+    dispatcher = make_dispatcher(outbox, accept_all([]), poll_seconds=0.01)
+    monkeypatch.setattr(orders, "_outbox", outbox)
+    monkeypatch.setattr(orders, "_dispatcher", dispatcher)
+    yield outbox
+    dispatcher.stop()
+
+
+class TestSubmitOrderNode:
+    """Tests de la aceptación de la cotización en una sesión"""
+    
+    def test_acceptance_registers_order_once(self, session_orders):
+        quote = run_agent("Necesito 100 unidades de ABC-45", thread_id="t1")["quote"]
+        
+        result = run_agent("sí, procede", thread_id="t1")
+        
+        assert result["order"].quote_id == quote.quote_id
+        assert "Orden registrada" in result["messages"][-1].content
+        
+        deadline = time.time() + 2
+        while session_orders.get(quote.quote_id).status != "sent" and time.time() < deadline:
+            time.sleep(0.01)
+        again = run_agent("ok, confirmo", thread_id="t1")
+        
+        assert again["order"].order_id == f"ORD-{quote.quote_id}"
+        assert session_orders.stats()["sent"] == 1
+    
+    def test_async_node_enqueues_off_the_event_loop(self, session_orders, monkeypatch):
+        from quoting_agent.nodes import asubmit_order_node
+        
+        threads = []
+        enqueue = session_orders.enqueue
+        
+        def record_thread(quote):
+            threads.append(threading.current_thread())
+            return enqueue(quote)
+        
+        # La escritura en SQLite no debe correr en el hilo del event loop
+        monkeypatch.setattr(session_orders, "enqueue", record_thread)
+        
+        result = asyncio.run(asubmit_order_node({"quote": make_quote()}))
+        
+        assert result["order"].quote_id == "Q-1"
+        assert threads and threads[0] is not threading.main_thread()
+    
+    def test_acceptance_without_quote_is_not_an_order(self):
+        from langchain_core.messages import HumanMessage
+        
+        from quoting_agent.edges import route_entry
+        from quoting_agent.models import QuoteRequest
+        
+        state = {
+            "messages": [HumanMessage(content="sí, confirmo")],
+            "quote_request": QuoteRequest(part_number="DEF-200", quantity=1000),
+            "quote": None,
+        }
+        
+        assert route_entry(state) == "update_request"
+        assert route_entry({**state, "quote": make_quote()}) == "submit_order"
+    
+    @pytest.mark.parametrize("text,expected", [
+        ("sí, procede", True),
+        ("Confirmo", True),
+        ("ok, acepto la cotización", True),
+        ("yes, go ahead", True),
+        ("Ok", False),
+        ("ok gracias", False),
+        ("ok, quiero saber el plazo de entrega", False),
+        ("ok ¿cuál es el plazo?", False),
+        ("sí, ¿y el envío?", False),
+        ("confirmo?", False),
+        ("go", False),
+        ("no, espera", False),
+        ("sí, pero que sean 80", False),
+        ("mejor ABC-46", False),
+    ])
+    def test_is_confirmation(self, text, expected):
+        from quoting_agent.fast_parser import is_confirmation
+        
+        assert is_confirmation(text) is expected
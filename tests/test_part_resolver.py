@@ -0,0 +1,133 @@
+"""
+Tests de la resolución aproximada de números de parte ("¿quisiste decir?")
+"""
+
+import time
+
+import httpx
+import numpy as np
+
+from quoting_agent import catalog as catalog_module
+from quoting_agent import erp_client
+from quoting_agent.agent import run_agent
+from quoting_agent.catalog import Catalog, CatalogStore
+from quoting_agent.erp_client import ERPClient
+from quoting_agent.part_resolver import FuzzyPartIndex, canonical_part_number, resolve_part_number
+from quoting_agent.tools import MOCK_INVENTORY
+
+
+class TestPartResolver:
+    """Tests del índice aproximado (no requieren API key)"""
+    
+    def test_canonical_form(self):
+        assert canonical_part_number(" abc-45 ") == "ABC45"
+        assert canonical_part_number("ABC_45") == "ABC45"
+    
+    def test_exact_part_is_not_resolved(self):
+        assert resolve_part_number("ABC-45") is None
+    
+    def test_format_transposition_and_confusable(self):
+        for typed, reason in [("abc 45", "formato"), ("ABC-54", "transposición"), ("ABC-4S", "carácter confundible")]:
+            resolution = resolve_part_number(typed)
+            
+            assert resolution.autocorrection() == "ABC-45"
+            assert resolution.candidates[0].reason == reason
+    
+    def test_single_edit_is_only_suggested(self):
+        resolution = resolve_part_number("XYZ-10")
+        
+        assert resolution.autocorrection() is None
+        assert resolution.suggestions() == ["XYZ-100"]
+        assert resolve_part_number("ZZZ-1").candidates == []
+    
+    def test_ambiguous_match_is_not_corrected(self):
+        index = FuzzyPartIndex(Catalog.from_records({
+            "AB-12": MOCK_INVENTORY["ABC-45"],
+            "AB-21": MOCK_INVENTORY["ABC-45"],
+        }))
+        
+        # "AB-11" está a una edición de las dos
+        resolution = index.resolve("AB-11")
+        
+        assert resolution.suggestions() == ["AB-12", "AB-21"]
+        assert resolution.autocorrection() is None
+    
+    def test_large_catalog_latency(self):
+        """100k SKUs: cada resolución tarda menos de 1 ms"""
+        size = 100_000
+        part_numbers = np.char.add("SKU-", np.char.zfill(np.arange(size).astype("U6"), 6))
+        index = FuzzyPartIndex(Catalog.from_arrays(part_numbers, np.arange(size), np.full(size, 1.5)))
+        queries = [f"SKU-{i:06d}"[::-1] for i in range(0, size, 1000)] + ["sku 012345", "SKU-01234S"]
+        index.resolve(queries[0])
+        
+        start = time.perf_counter()
+        for query in queries:
+            index.resolve(query)
+        elapsed = (time.perf_counter() - start) / len(queries)
+        
+        assert index.resolve("sku 012345").autocorrection() == "SKU-012345"
+        assert index.resolve("SKU-01234S").autocorrection() == "SKU-012345"
+        assert elapsed < 0.001
+    
+    def test_reload_builds_new_index(self, monkeypatch):
+        monkeypatch.setattr(catalog_module, "_store", CatalogStore(Catalog.from_records(MOCK_INVENTORY)))
+        assert resolve_part_number("QRS-90").candidates == []
+        
+        catalog_module.get_catalog_store().swap(Catalog.from_records({
+            **MOCK_INVENTORY, "QRS-900": MOCK_INVENTORY["ABC-45"]
+        }))
+        
+        assert resolve_part_number("QRS-90").suggestions() == ["QRS-900"]
+
+
+class TestAgentFuzzyMatch:
+    """Tests del agente con números de parte mal escritos"""
+    
+    def test_agent_autocorrects_part_number(self):
+        result = run_agent("Necesito 100 unidades de ABC-54")
+        
+        assert result["quote"] is not None
+        assert result["quote"].part_number == "ABC-45"
+        assert any("Interpreté **ABC-54** como **ABC-45**" in m.content for m in result["messages"])
+    
+    def test_agent_offers_candidates(self):
+        result = run_agent("Necesito 10 unidades de XYZ-10")
+        
+        assert result["quote"] is None
+        assert "¿Quisiste decir?" in result["messages"][-1].content
+        assert "XYZ-100" in result["messages"][-1].content
+    
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(catalog_module.config, "FUZZY_MATCH_ENABLED", False)
+        
+        result = run_agent("Necesito 100 unidades de ABC-54")
+        
+        assert result["quote"] is None
+        assert "¿Quisiste decir?" not in result["messages"][-1].content
+    
+    def test_out_of_stock_part_is_not_corrected(self, monkeypatch):
+        """Una parte real sin stock no se "corrige" a otra parecida"""
+        monkeypatch.setattr(catalog_module, "_store", CatalogStore(Catalog.from_records({
+            **MOCK_INVENTORY, "ABC-54": {**MOCK_INVENTORY["ABC-45"], "stock": 0}
+        })))
+        
+        result = run_agent("Necesito 100 unidades de ABC-54")
+        
+        assert result["quote"] is None
+        assert "Interpreté" not in result["messages"][-1].content
+        assert "¿Quisiste decir?" not in result["messages"][-1].content
+    
+    def test_skipped_with_erp(self, monkeypatch):
+        """Con el ERP el catálogo local no respalda el inventario: no se corrige"""
+        record = {"part_number": "ABC-54", "stock": 0, "unit_price": 10.0, "lead_time_days": 5, "alternatives": []}
+        monkeypatch.setattr(catalog_module.config, "ENABLE_MOCK_DATA", False)
+        monkeypatch.setattr(catalog_module.config, "INVENTORY_CACHE_ENABLED", False)
+        monkeypatch.setattr(catalog_module.config, "INVENTORY_BATCH_ENABLED", False)
+        monkeypatch.setattr(erp_client, "_erp_client", ERPClient(
+            base_url="http://erp", transport=httpx.MockTransport(lambda request: httpx.Response(200, json=record))
+        ))
+        
+        result = run_agent("Necesito 100 unidades de ABC-54")
+        
+        assert result["quote"] is None
+        assert all("Interpreté" not in m.content for m in result["messages"])
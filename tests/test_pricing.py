@@ -0,0 +1,107 @@
+"""
+Tests del motor de precios
+"""
+
+import json
+from decimal import Decimal
+
+import pytest
+
+from quoting_agent import pricing
+from quoting_agent.models import InventoryResult, QuoteRequest
+from quoting_agent.pricing import PricingEngine, TierTable, reload_pricing
+from quoting_agent.tools import generate_quote_tool
+
+
+RULES = {
+    "base_currency": "USD",
+    "default_region": "CO",
+    "tax_rates": {"CO": 19, "MX": 16, "US-TX": 8.25},
+    "currencies": {"USD": 1, "MXN": "17.05"},
+    "volume_tiers": {"*": [[100, 2], [1000, 5]], "ABC-45": [[500, 3]]},
+    "customers": {
+        "C-77": {"region": "MX", "currency": "MXN", "prices": {"XYZ-100": 700}},
+        "C-88": {"region": "US-TX", "discount_percent": 10},
+    },
+}
+
+
+class TestTierTable:
+    """Tests de la búsqueda de tramos"""
+    
+    @pytest.mark.parametrize("quantity,index", [(1, -1), (99, -1), (100, 0), (999, 0), (1000, 1), (10**9, 1)])
+    def test_lookup_boundaries(self, quantity, index):
+        assert TierTable([[1000, 5], [100, 2]]).lookup(quantity) == index
+
+
+class TestPricingEngine:
+    """Tests de las reglas de precios"""
+    
+    def test_defaults_match_list_price_and_iva(self):
+        priced = PricingEngine().price([("ABC-45", 100, 25.50)])
+        
+        assert priced.subtotal == Decimal("2550.00")
+        assert priced.tax == Decimal("484.50")
+        assert priced.total == Decimal("3034.50")
+        assert priced.lines[0].source == "list"
+    
+    def test_volume_tiers_and_part_override(self):
+        engine = PricingEngine(RULES)
+        
+        general, part = engine.price([("XYZ-100", 1000, 45.00), ("ABC-45", 1000, 25.50)]).lines
+        
+        assert general.unit_price == Decimal("42.75")
+        assert general.discount_percent == Decimal("5")
+        # ABC-45 tiene tramos propios: 3% desde 500
+        assert part.unit_price == Decimal("24.74")
+        assert part.source == "volume"
+    
+    def test_contract_price_region_and_currency(self):
+        priced = PricingEngine(RULES).price([("XYZ-100", 10, 45.00), ("ABC-45", 10, 25.50)], "C-77")
+        
+        contract, converted = priced.lines
+        assert priced.currency == "MXN" and priced.tax_percent == Decimal("16")
+        assert contract.unit_price == Decimal("700") and contract.source == "contract"
+        assert converted.unit_price == Decimal("434.78")  # 25.50 × 17.05 = 434.775
+        assert priced.subtotal == Decimal("11347.80")
+        assert priced.tax == Decimal("1815.65")
+    
+    def test_customer_discount_chains_with_volume(self):
+        line = PricingEngine(RULES).price([("XYZ-100", 100, 45.00)], "C-88").lines[0]
+        
+        # 45 × 0.98 × 0.90 = 39.69
+        assert line.unit_price == Decimal("39.69")
+        assert line.discount_percent == Decimal("11.8")
+    
+    def test_unknown_region_is_rejected(self):
+        with pytest.raises(ValueError):
+            PricingEngine({**RULES, "customers": {"C-1": {"region": "AR"}}})
+    
+    def test_amounts_are_exact_where_floats_drift(self):
+        priced = PricingEngine().price([("A-1", 1, 0.10)] * 3)
+        
+        assert priced.subtotal == Decimal("0.30")
+
+
+class TestQuotePricing:
+    """Tests de generate_quote_tool con reglas cargadas"""
+    
+    def test_quote_uses_customer_terms(self, tmp_path, monkeypatch):
+        path = tmp_path / "rules.json"
+        path.write_text(json.dumps(RULES))
+        monkeypatch.setattr(pricing, "_engine", None)
+        reload_pricing(str(path))
+        
+        request = QuoteRequest(part_number="ABC-45", quantity=10, customer_id="C-77")
+        inventory = InventoryResult(part_number="ABC-45", status="available", available_stock=500, unit_price=25.50)
+        quote = generate_quote_tool(request, inventory)
+        monkeypatch.setattr(pricing, "_engine", None)
+        
+        assert quote.currency == "MXN"
+        assert quote.unit_price == Decimal("434.78")
+        assert quote.line_items[0].list_price == Decimal("434.78")
+        assert quote.total == Decimal("5043.45")
+        formatted = quote.format_for_display()
+        assert "IVA (16%)" in formatted
+        assert "TOTAL:            5,043.45 MXN" in formatted
+        assert "$" not in formatted
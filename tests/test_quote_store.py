@@ -0,0 +1,115 @@
+"""
+Tests del repositorio de cotizaciones
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from quoting_agent.agent import run_agent
+from quoting_agent.models import Quote, QuoteLine
+from quoting_agent.quote_store import QuoteStore
+
+
+def make_quote(
+    quote_id: str,
+    customer_id: str = "C-1",
+    part_numbers=("ABC-45",),
+    valid_days: int = 30
+) -> Quote:
+    lines = [QuoteLine(part_number=p, quantity=10, unit_price=25.50, subtotal=255.0) for p in part_numbers]
+    return Quote(
+        quote_id=quote_id,
+        part_number=part_numbers[0],
+        quantity=10 * len(lines),
+        unit_price=25.50,
+        subtotal=255.0 * len(lines),
+        tax=48.45 * len(lines),
+        total=303.45 * len(lines),
+        valid_until=datetime.now() + timedelta(days=valid_days),
+        customer_id=customer_id,
+        line_items=lines
+    )
+
+
+class TestQuoteStore:
+    """Tests de escritura y consultas indexadas"""
+    
+    def test_saved_quote_is_visible_before_flush(self):
+        store = QuoteStore(flush_interval_seconds=60)
+        
+        store.save(make_quote("Q-1"))
+        
+        assert store.get("Q-1").quote_id == "Q-1"
+        assert store.stats()["pending"] == 1
+        assert store.get("Q-404") is None
+    
+    def test_writer_flushes_in_background(self):
+        store = QuoteStore(flush_interval_seconds=0.01)
+        store.save(make_quote("Q-1"))
+        
+        deadline = time.time() + 2
+        while store.stats()["pending"] and time.time() < deadline:
+            time.sleep(0.01)
+        
+        assert store.stats()["written"] == 1
+        store.close()
+    
+    def test_by_customer_newest_first(self):
+        store = QuoteStore(flush_interval_seconds=60)
+        store.save(make_quote("Q-1", customer_id="C-1"))
+        store.save(make_quote("Q-2", customer_id="C-2"))
+        store.flush()
+        store.save(make_quote("Q-3", customer_id="C-1"))
+        
+        assert [q.quote_id for q in store.by_customer("C-1")] == ["Q-3", "Q-1"]
+        assert store.by_customer("C-9") == []
+    
+    def test_by_part_matches_any_line(self):
+        store = QuoteStore()
+        store.save_many([
+            make_quote("Q-1", part_numbers=("ABC-45",)),
+            make_quote("Q-2", part_numbers=("DEF-200", "ABC-45")),
+            make_quote("Q-3", part_numbers=("DEF-200",)),
+        ])
+        
+        assert sorted(q.quote_id for q in store.by_part("abc-45")) == ["Q-1", "Q-2"]
+    
+    def test_expiring_between(self):
+        store = QuoteStore()
+        store.save_many([make_quote(f"Q-{days}", valid_days=days) for days in (1, 5, 10, 40)])
+        now = datetime.now()
+        
+        expiring = store.expiring_between(now, now + timedelta(days=15))
+        
+        assert [q.quote_id for q in expiring] == ["Q-1", "Q-5", "Q-10"]
+    
+    def test_save_many_commits_in_batches(self):
+        store = QuoteStore(batch_size=100)
+        
+        written = store.save_many(make_quote(f"Q-{i}") for i in range(250))
+        
+        assert written == 250
+        assert store.stats()["batches"] == 3
+        assert len(store.by_customer("C-1", limit=1000)) == 250
+    
+    def test_pending_quotes_survive_close(self, tmp_path):
+        path = str(tmp_path / "quotes.sqlite3")
+        store = QuoteStore(path, flush_interval_seconds=60)
+        store.save(make_quote("Q-1"))
+        store.close()
+        
+        reopened = QuoteStore(path)
+        
+        assert reopened.get("Q-1").customer_id == "C-1"
+
+
+class TestQuotePersistence:
+    """Tests de la persistencia desde el grafo"""
+    
+    def test_generated_quote_is_stored_with_customer(self, memory_quote_store):
+        result = run_agent("Necesito 100 unidades de ABC-45", customer_id="C-77")
+        quote = result["quote"]
+        
+        assert quote.customer_id == "C-77"
+        assert memory_quote_store.get(quote.quote_id) == quote
+        assert [q.quote_id for q in memory_quote_store.by_part("ABC-45")] == [quote.quote_id]
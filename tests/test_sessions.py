@@ -0,0 +1,189 @@
+"""
+Tests de sesiones de varios turnos (checkpointer SQLite)
+"""
+
+import asyncio
+import time
+import zlib
+from decimal import Decimal
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from quoting_agent import runtime as runtime_module
+from quoting_agent.agent import arun_agent, run_agent
+from quoting_agent.runtime import AgentRuntime
+from quoting_agent.sessions import CompactSerializer, SessionCheckpointer
+
+
+@pytest.fixture
+def checkpointer(monkeypatch, tmp_path):
+    checkpointer = SessionCheckpointer.from_path(str(tmp_path / "sessions.sqlite3"))
+    monkeypatch.setattr(runtime_module, "_runtime", AgentRuntime(checkpointer=checkpointer))
+    return checkpointer
+
+
+class TestSessions:
+    """Tests de conversaciones con thread_id (fast path, no requieren API key)"""
+    
+    def test_follow_up_resumes_state(self, checkpointer):
+        first = run_agent("Necesito 1000 unidades de DEF-200", thread_id="t1")
+        second = run_agent("Necesito 50 unidades de DEF-200", thread_id="t1")
+        
+        assert first["needs_clarification"] is True
+        assert second["quote"].total == 7140.00
+        # El historial se acumula entre turnos
+        assert second["messages"][0].content == "Necesito 1000 unidades de DEF-200"
+        assert second["messages"][-1].content.endswith("¿Deseas proceder con esta orden?")
+    
+    def test_iteration_count_carries_across_turns(self, checkpointer):
+        for _ in range(5):
+            result = run_agent("Necesito 1000 unidades de DEF-200", thread_id="t1")
+        assert result["iteration_count"] == 5
+        
+        result = run_agent("Necesito 1000 unidades de DEF-200", thread_id="t1")
+        
+        assert result["iteration_count"] == 6
+        assert "ventas@tuempresa.com" in result["messages"][-1].content
+    
+    def test_threads_are_isolated(self, checkpointer):
+        run_agent("Necesito 1000 unidades de DEF-200", thread_id="a")
+        
+        result = run_agent("Necesito 1000 unidades de DEF-200", thread_id="b")
+        
+        assert result["iteration_count"] == 1
+    
+    def test_async_turns_share_session(self, checkpointer):
+        async def conversation():
+            await arun_agent("Necesito 1000 unidades de DEF-200", thread_id="t1")
+            return await arun_agent("Necesito 1000 unidades de DEF-200", thread_id="t1")
+        
+        assert asyncio.run(conversation())["iteration_count"] == 2
+    
+    def test_without_thread_id_nothing_is_stored(self, checkpointer):
+        result = run_agent("Necesito 1000 unidades de DEF-200")
+        
+        assert result["iteration_count"] == 1
+        assert checkpointer.stats()["sessions"] == 0
+    
+    def test_only_latest_checkpoint_is_kept(self, checkpointer):
+        run_agent("Necesito 1000 unidades de DEF-200", thread_id="t1")
+        run_agent("Necesito 50 unidades de DEF-200", thread_id="t1")
+        
+        with checkpointer.cursor(transaction=False) as cur:
+            assert cur.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] == 1
+    
+    def test_idle_sessions_are_evicted(self, checkpointer):
+        run_agent("Necesito 1000 unidades de DEF-200", thread_id="old")
+        time.sleep(0.05)
+        run_agent("Necesito 1000 unidades de DEF-200", thread_id="new")
+        
+        assert checkpointer.evict_idle(idle_ttl_seconds=0.03) == 1
+        
+        assert runtime_module.get_runtime().has_session("new")
+        assert not runtime_module.get_runtime().has_session("old")
+        # La sesión expulsada empieza de nuevo
+        assert run_agent("Necesito 1000 unidades de DEF-200", thread_id="old")["iteration_count"] == 1
+
+
+class TestFollowUpTurns:
+    """Tests de los turnos siguientes (update_request en vez de parse_request)"""
+    
+    def test_quantity_change_reuses_inventory(self, checkpointer, monkeypatch):
+        from quoting_agent import nodes
+        
+        run_agent("Necesito 1000 unidades de DEF-200", thread_id="t1")
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("No debe consultarse inventario de nuevo")
+        
+        monkeypatch.setattr(nodes, "check_inventory_tool", fail)
+        result = run_agent("cotiza las disponibles", thread_id="t1")
+        
+        assert result["quote"].quantity == 75
+        assert result["messages"][-2].content == "✓ Actualizado: 75 unidades de **DEF-200**."
+    
+    def test_part_change_checks_inventory_again(self, checkpointer):
+        run_agent("Necesito 100 unidades de ABC-45", thread_id="t1")
+        
+        result = run_agent("usa XYZ-100 en vez de ABC-45", thread_id="t1")
+        
+        assert result["quote"].part_number == "XYZ-100"
+        assert result["quote"].quantity == 100
+        assert result["messages"][-2].content == "📊 Inventario consultado para XYZ-100..."
+    
+    def test_llm_delta_prompt_skips_history(self, checkpointer, monkeypatch):
+        from quoting_agent import nodes
+        from quoting_agent.config import config
+        
+        prompts = []
+        
+        class FakeLLM:
+            def invoke(self, messages):
+                prompts.append(messages)
+                return AIMessage(content='{"line_items": [{"part_number": "ABC-45", "quantity": 60}]}')
+        
+        monkeypatch.setattr(nodes, "get_llm", lambda: FakeLLM())
+        monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+        run_agent("Necesito 100 unidades de ABC-45", thread_id="t1")
+        
+        result = run_agent("¿y si fueran 60 o 70?", thread_id="t1")
+        
+        assert result["quote"].quantity == 60
+        # Solo el prompt del cambio y un mensaje, no los del primer turno
+        assert len(prompts) == 1 and len(prompts[0]) == 2
+        assert '"quantity": 100' in prompts[0][1].content
+    
+    def test_non_change_falls_back_to_full_parse(self, checkpointer, monkeypatch):
+        from quoting_agent import nodes
+        from quoting_agent.config import config
+        
+        responses = iter(["{}", '{"part_number": "XYZ-100", "quantity": 10}'])
+        
+        class FakeLLM:
+            def invoke(self, messages):
+                return AIMessage(content=next(responses))
+        
+        monkeypatch.setattr(nodes, "get_llm", lambda: FakeLLM())
+        monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+        run_agent("Necesito 100 unidades de ABC-45", thread_id="t1")
+        
+        result = run_agent("¿tienen algo parecido pero más barato?", thread_id="t1")
+        
+        assert result["quote"].part_number == "XYZ-100"
+        assert result["messages"][-3].content.startswith("✓ Entendido")
+
+
+class TestCompactSerializer:
+    """Tests de la serialización de checkpoints"""
+    
+    def test_roundtrip_pydantic_state_is_compressed(self):
+        state = run_agent("Necesito 100 unidades de ABC-45")
+        serde = CompactSerializer()
+        
+        data = serde.dumps(state)
+        restored = serde.loads(data)
+        
+        assert restored["quote"] == state["quote"]
+        assert restored["quote_request"] == state["quote_request"]
+        assert restored["quote"].total == Decimal("3034.50")
+        assert len(data) < len(zlib.decompress(data[1:])) / 2
+
+
+class TestSessionAPI:
+    """Tests de session_id en el servicio HTTP"""
+    
+    def test_session_round_trip_and_delete(self, checkpointer):
+        from fastapi.testclient import TestClient
+        
+        from api.main import create_app
+        
+        with TestClient(create_app()) as client:
+            body = {"message": "Necesito 1000 unidades de DEF-200", "session_id": "s1"}
+            assert client.post("/api/v1/quote", json=body).json()["session_id"] == "s1"
+            
+            follow_up = {"message": "Necesito 50 unidades de DEF-200", "session_id": "s1"}
+            assert client.post("/api/v1/quote", json=follow_up).json()["quote"]["total"] == "7140.00"
+            
+            assert client.delete("/api/v1/sessions/s1").status_code == 204
+            assert not runtime_module.get_runtime().has_session("s1")
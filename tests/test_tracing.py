@@ -0,0 +1,127 @@
+"""
+Tests de trazas y métricas
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from api.main import create_app
+from quoting_agent import nodes, tracing
+from quoting_agent.agent import arun_agent, run_agent
+from quoting_agent.config import config
+from quoting_agent.llm_cache import LLMResponseCache
+from quoting_agent.tracing import Tracer, traced
+
+
+@pytest.fixture
+def tracer(monkeypatch, tmp_path):
+    """Tracer activo que escribe en un archivo temporal"""
+    tracer = Tracer(enabled=True, path=str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    yield tracer
+    tracer.close()
+
+
+def read_spans(tracer: Tracer):
+    tracer.flush()
+    with open(tracer.path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestTracer:
+    """Tests de spans y métricas"""
+    
+    def test_graph_spans_share_one_trace(self, tracer):
+        run_agent("Necesito 100 unidades de ABC-45")
+        
+        spans = read_spans(tracer)
+        root = next(s for s in spans if s["kind"] == "graph")
+        nodes_run = [s["name"] for s in spans if s["kind"] == "node"]
+        
+        assert root["parent_id"] is None
+        assert nodes_run == ["parse_request", "check_inventory", "generate_quote"]
+        assert {s["trace_id"] for s in spans} == {root["trace_id"]}
+        
+        by_id = {s["span_id"]: s for s in spans}
+        quote_tool = next(s for s in spans if s["name"] == "generate_quote_tool")
+        assert by_id[quote_tool["parent_id"]]["name"] == "generate_quote"
+    
+    def test_async_run_keeps_parent_links(self, tracer):
+        asyncio.run(arun_agent("Necesito 100 unidades de ABC-45"))
+        
+        spans = read_spans(tracer)
+        root = next(s for s in spans if s["kind"] == "graph")
+        assert all(s["parent_id"] == root["span_id"] for s in spans if s["kind"] == "node")
+    
+    def test_errors_are_recorded_and_reraised(self, tracer):
+        @traced("tool", "broken")
+        def broken():
+            raise RuntimeError("falla")
+        
+        with pytest.raises(RuntimeError):
+            broken()
+        
+        span = read_spans(tracer)[-1]
+        assert span["outcome"] == "error"
+        assert span["attributes"]["error"] == "RuntimeError"
+        assert 'quoting_agent_spans_total{kind="tool",name="broken",outcome="error"} 1' in tracer.metrics.render()
+    
+    def test_llm_span_records_tokens_and_cache(self, tracer, monkeypatch):
+        class FakeLLM:
+            def invoke(self, messages):
+                return AIMessage(
+                    content='{"part_number": "ABC-45", "quantity": 10}',
+                    usage_metadata={"input_tokens": 120, "output_tokens": 14, "total_tokens": 134}
+                )
+        
+        monkeypatch.setattr(nodes, "get_llm", lambda: FakeLLM())
+        monkeypatch.setattr("quoting_agent.llm_cache._cache", LLMResponseCache(path=None))
+        run_agent("cotízame ABC-45 por favor")
+        run_agent("cotízame ABC-45 por favor")
+        
+        llm_spans = [s for s in read_spans(tracer) if s["kind"] == "llm"]
+        assert [s["attributes"]["cache_hit"] for s in llm_spans] == [False, True]
+        assert llm_spans[0]["attributes"]["input_tokens"] == 120
+        
+        metrics = tracer.metrics.render()
+        model = config.get_llm_config()["model"]
+        assert f'quoting_agent_llm_tokens_total{{name="{model}",type="output"}} 14' in metrics
+        assert f'quoting_agent_cache_lookups_total{{kind="llm",name="{model}",result="hit"}} 1' in metrics
+    
+    def test_histogram_is_cumulative(self):
+        tracer = Tracer(enabled=True)
+        for _ in range(3):
+            with tracer.span("node", "parse_request"):
+                pass
+        
+        lines = [l for l in tracer.metrics.render().splitlines() if l.startswith("quoting_agent_span_duration_seconds")]
+        buckets = [int(l.rsplit(" ", 1)[1]) for l in lines if "_bucket" in l]
+        
+        assert buckets == sorted(buckets) and buckets[-1] == 3
+        assert lines[-1] == 'quoting_agent_span_duration_seconds_count{kind="node",name="parse_request"} 3'
+    
+    def test_disabled_tracer_records_nothing(self, monkeypatch):
+        tracer = Tracer(enabled=False)
+        monkeypatch.setattr(tracing, "_tracer", tracer)
+        
+        run_agent("Necesito 100 unidades de ABC-45")
+        
+        assert tracer.span("node", "x") is tracing.NOOP_SPAN
+        assert "_bucket" not in tracer.metrics.render()
+
+
+class TestMetricsEndpoint:
+    """Tests de GET /metrics"""
+    
+    def test_metrics_exposes_node_histograms(self, tracer):
+        with TestClient(create_app()) as client:
+            client.post("/api/v1/quote", json={"message": "Necesito 100 unidades de ABC-45"})
+            response = client.get("/metrics")
+        
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'quoting_agent_span_duration_seconds_count{kind="node",name="check_inventory"} 1' in response.text
+        assert 'quoting_agent_span_duration_seconds_count{kind="graph",name="agent"} 1' in response.text